@@ -1,7 +1,13 @@
 import subprocess
 import os
+import sys
 import datetime
+import time
 from colorama import Fore, Style, init
+from system_checks import run_many, get_cache, get_history, record_history
+from commands import commands
+from admin_check import is_admin, is_recovery_environment
+from log_reader import LogIndex
 
 init(autoreset=True)  # Инициализация colorama для Windows
 
@@ -11,8 +17,15 @@ def run_command(command):
     """Выполняет указанную команду и записывает результат в лог-файл."""
     try:
         print(f"{Fore.CYAN}Запуск команды: {command}")
+        started_at = time.time()
+        # Меню выполняет команды через cmd, как и раньше: синтаксис своих команд не меняется,
+        # а chkdsk спрашивает подтверждение в этой же консоли
         result = subprocess.run(command, shell=True, text=True, capture_output=True)
         log_result(command, result.stdout, result.stderr)
+        record_history(command, command, {"stdout": result.stdout, "stderr": result.stderr,
+                                          "returncode": result.returncode, "timeout": False,
+                                          "started_at": started_at, "duration": time.time() - started_at},
+                       source="cli")
         print(f"{Fore.GREEN}Команда выполнена. Результат сохранён в лог.")
     except Exception as e:
         print(f"{Fore.RED}Ошибка при выполнении команды {command}: {e}")
@@ -29,14 +42,91 @@ def log_result(command, stdout, stderr):
             log_file.write(f"Ошибки:\n{stderr}\n")
         log_file.write("\n")
 
-def read_log():
-    """Читает и отображает содержимое лог-файла."""
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, "r", encoding="utf-8") as log_file:
-            print(f"{Fore.YELLOW}Последние результаты:\n")
-            print(log_file.read())
-    else:
+def read_log(page=40):
+    """Показывает лог-файл постранично с конца, не читая его целиком."""
+    if not os.path.exists(LOG_FILE):
         print(f"{Fore.RED}Лог-файл не найден. Выполните проверку для создания логов.")
+        return
+    index = LogIndex(LOG_FILE, default_encoding="utf-8")  # log_result пишет в UTF-8
+    start = max(0, len(index) - page)
+    print(f"{Fore.YELLOW}Последние результаты ({len(index)} строк):\n")
+    while True:
+        for line in index.read_lines(start, page):
+            print(line)
+        print(f"{Fore.CYAN}[строки {start + 1}-{min(start + page, len(index))} из {len(index)}] "
+              "Enter — раньше, n — позже, d ГГГГ-ММ-ДД [ЧЧ:ММ] — к дате, /текст — поиск, q — выход")
+        answer = input("> ").strip()
+        if answer == "q":
+            return
+        if answer == "":
+            if start == 0:
+                return
+            start = max(0, start - page)
+        elif answer == "n":
+            index.refresh()
+            start = min(start + page, max(0, len(index) - page))
+        elif answer.startswith("d "):
+            try:
+                when = datetime.datetime.strptime(answer[2:].strip(), "%Y-%m-%d %H:%M")
+            except ValueError:
+                try:
+                    when = datetime.datetime.strptime(answer[2:].strip(), "%Y-%m-%d")
+                except ValueError:
+                    print(f"{Fore.RED}Неверная дата.")
+                    continue
+            start = index.line_for_time(when)
+        elif answer.startswith("/"):
+            line = index.find(answer[1:], start_line=start + 1)
+            if line is None:
+                line = index.find(answer[1:], start_line=0)  # по кругу
+            if line is None:
+                print(f"{Fore.RED}Не найдено.")
+                continue
+            start = line
+
+def show_history(limit=20):
+    """Последние запуски из истории с фильтром по команде и тексту вывода."""
+    name = input("Команда (Enter — все): ").strip() or None
+    contains = input("Текст в выводе (Enter — любой): ").strip() or None
+    history = get_history()
+    runs = history.runs(name=name, contains=contains, limit=limit)
+    if not runs:
+        print(f"{Fore.RED}Запусков не найдено.")
+        return
+    for run in runs:
+        failed = run["timeout"] or run["returncode"] != 0
+        color = Fore.RED if failed else Fore.GREEN
+        when = datetime.datetime.fromtimestamp(run["started_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        code = "таймаут" if run["timeout"] else run["returncode"]
+        print(f"{color}#{run['id']:<6} {when}  {run['name']}  (код {code}, {run['duration']:.1f} с)")
+    run_id = input("Номер запуска для просмотра вывода (Enter — выход): ").strip().lstrip("#")
+    if run_id.isdigit():
+        run = history.get(int(run_id))
+        if run is None:
+            print(f"{Fore.RED}Запуск #{run_id} не найден.")
+            return
+        print(f"{Fore.YELLOW}{run['command']}")
+        print(run["stdout"])
+        if run["stderr"]:
+            print(f"{Fore.RED}{run['stderr']}")
+
+def run_full_sweep(max_workers=4, timeout=60):
+    """Параллельно выполняет все команды каталога и выводит результаты по мере готовности."""
+    names = [name for name, meta in commands.items() if "template" not in meta]
+    print(f"{Fore.CYAN}Запуск {len(names)} проверок (параллельно: {max_workers})...")
+    for name, result in run_many(names, commands, max_workers=max_workers, timeout=timeout,
+                                 admin=bool(is_admin()), recovery=is_recovery_environment()):
+        if result.get("skipped"):
+            print(f"{Fore.YELLOW}[пропуск] {name}: {result['skipped']}")
+            continue
+        color = Fore.GREEN if result["returncode"] == 0 else Fore.RED
+        source = "кэш" if result.get("cached") else f"{result['duration']:.1f} с"
+        print(f"{color}=== {name} ({source}) ===")
+        print(result["stdout"])
+        if not result.get("cached"):
+            log_result(name, result["stdout"], result["stderr"])
+    stats = get_cache().stats()
+    print(f"{Fore.CYAN}Кэш: попаданий {stats['hits']}, промахов {stats['misses']}, записей {stats['entries']}")
 
 def main():
     print(f"{Fore.BLUE}=== SystemCheckPy ===")
@@ -49,7 +139,9 @@ def main():
         3: "ipconfig /all",
         4: "netstat -an",
         5: "Ввести свою команду",
-        6: "Просмотреть лог"
+        6: "Просмотреть лог",
+        7: "Полная диагностика (все проверки каталога параллельно)",
+        8: "История запусков"
     }
 
     for key, value in options.items():
@@ -63,6 +155,11 @@ def main():
                 run_command(custom_command)
             elif choice == 6:  # Просмотр логов
                 read_log()
+            elif choice == 7:  # Пакетный запуск
+                workers = input("Параллельных проверок [4]: ").strip()
+                run_full_sweep(max_workers=int(workers) if workers else 4)
+            elif choice == 8:  # История запусков
+                show_history()
             else:
                 run_command(options[choice])
         else:
@@ -71,4 +168,8 @@ def main():
         print(f"{Fore.RED}Ошибка! Введите число.")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # С аргументами — неинтерактивный режим (см. cli.py)
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     main()
@@ -1,8 +1,20 @@
 # admin_check.py
 import ctypes
+import os
 
 def is_admin():
     try:
         return ctypes.windll.shell32.IsUserAnAdmin()
     except Exception:
-        return False
\ No newline at end of file
+        return False
+
+def is_recovery_environment():
+    # WinPE/WinRE: системный диск X: и ключ реестра MiniNT
+    if os.environ.get("SystemDrive", "").upper() == "X:":
+        return True
+    try:
+        import winreg
+        winreg.CloseKey(winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SYSTEM\CurrentControlSet\Control\MiniNT"))
+        return True
+    except Exception:
+        return False
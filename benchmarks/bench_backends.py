@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Сколько времени экономит прямой запуск утилит: argv без оболочки против PowerShell.
+
+Для каждой записи каталога с "argv" (без прав администратора, без шаблона ввода) команда
+выполняется --repeat раз каждым исполнителем, в таблице — медиана от запуска до выхода:
+
+exec      программа напрямую (CreateProcess / fork+exec), как теперь для таких записей
+spawn     cmd.exe → powershell.exe → программа, вывод через Out-String (прежний путь)
+pool      тёплый хост PowerShell → программа
+scripted  заменитель процесса без запуска программ — накладные расходы самого конвейера
+
+Имеет смысл на Windows; на другой ОС записи, чьих программ нет в PATH, пропускаются, а
+PowerShell можно заменить benchmarks/fake_powershell.py (--fake): тогда spawn и pool
+показывают стоимость запуска интерпретатора, но саму утилиту не выполняют.
+
+  python benchmarks/bench_backends.py
+  python benchmarks/bench_backends.py "Таблица ARP" "Маршруты" --repeat 10
+  python benchmarks/bench_backends.py --fake --argv uname -a
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from commands import commands  # noqa: E402
+from fake_powershell import write_shim  # noqa: E402  (папка скрипта уже в sys.path)
+import system_checks  # noqa: E402
+from scripted_process import scripted_backend  # noqa: E402
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+BACKENDS = ("exec", "spawn", "pool", "scripted")
+# Долгие или с задержками по сети — только если названы явно
+SLOW = {"Проверить состояние сети", "Проверить скорость интернета"}
+
+
+def measure(command, argv, backend, repeat, timeout):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = system_checks.launch_command(command, argv if backend == "exec" else None, backend)
+        result = system_checks.collect_output(process, timeout=timeout)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("names", nargs="*", help="записи каталога (по умолчанию — все подходящие)")
+    ap.add_argument("--argv", nargs=argparse.REMAINDER, help="своя команда вместо записей каталога")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--timeout", type=int, default=60)
+    ap.add_argument("--fake", action="store_true", help="fake_powershell.py вместо powershell.exe")
+    args = ap.parse_args()
+
+    if args.argv:
+        entries = [(" ".join(args.argv), {"command": " ".join(args.argv), "argv": args.argv})]
+    else:
+        names = args.names or [n for n, m in commands.items() if "argv" in m and "template" not in m
+                               and not m.get("requires_admin") and not m.get("requires_recovery")
+                               and n not in SLOW]
+        entries = [(n, commands[n]) for n in names if "argv" in commands.get(n, {})]
+    workdir = tempfile.mkdtemp(prefix="scp-backends-")
+    if args.fake:
+        write_shim(workdir)
+        os.environ["PATH"] = workdir + os.pathsep + os.environ.get("PATH", "")
+        system_checks.configure_pool(host_argv=[sys.executable, FAKE], size=1)
+    system_checks.get_pool().warm_up()
+
+    print(f"{'запись':36} {'exec':>8} {'spawn':>8} {'pool':>8} {'scripted':>9} {'экономия':>9}  (мс, медиана)")
+    saved = []
+    for name, meta in entries:
+        argv = meta["argv"]
+        if shutil.which(argv[0]) is None:
+            print(f"{name[:36]:36} пропуск: нет {argv[0]} в PATH")
+            continue
+        # Вывод для заменителя — тот, что дал прямой запуск
+        _, reference = measure(meta["command"], argv, "exec", 1, args.timeout)
+        system_checks.register_backend("scripted", scripted_backend(
+            {meta["command"]: (reference["stdout"], reference["stderr"], reference["returncode"])}))
+        row = {backend: measure(meta["command"], argv, backend, args.repeat, args.timeout)[0]
+               for backend in BACKENDS}
+        gain = min(row["spawn"], row["pool"]) - row["exec"]
+        saved.append(row["spawn"] - row["exec"])
+        print(f"{name[:36]:36} {row['exec']:8.1f} {row['spawn']:8.1f} {row['pool']:8.1f} "
+              f"{row['scripted']:9.2f} {gain:9.1f}")
+    if saved:
+        print(f"\nВ среднем прямой запуск быстрее отдельного PowerShell на {statistics.mean(saved):.0f} мс "
+              f"на проверку ({len(saved)} записей)")
+    shutil.rmtree(workdir, True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность пакетного запуска run_many на заменителе PowerShell.
+
+Каждая запись каталога подменяется на «sleep <latency>; emit <lines>», после чего
+весь каталог прогоняется при разном числе параллельных проверок.
+
+  python benchmarks/bench_batch.py --latency 0.05 --workers 1 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import system_checks  # noqa: E402
+from commands import commands  # noqa: E402
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+
+
+def fake_catalog(latency, lines):
+    return {name: {**meta, "command": f"sleep {latency}; emit {lines}"}
+            for name, meta in commands.items() if "template" not in meta}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latency", type=float, default=0.05, help="Длительность одной проверки (сек)")
+    ap.add_argument("--lines", type=int, default=50, help="Строк вывода на проверку")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = ap.parse_args()
+
+    catalog = fake_catalog(args.latency, args.lines)
+    names = list(catalog)
+    for workers in args.workers:
+        system_checks.configure_pool(host_argv=[sys.executable, FAKE], size=workers)
+        system_checks.get_pool().warm_up()
+        start = time.perf_counter()
+        done = sum(1 for _ in system_checks.run_many(names, catalog, max_workers=workers,
+                                                     admin=True, recovery=True))
+        elapsed = time.perf_counter() - start
+        print(f"workers={workers:<3} checks={done:<4} total={elapsed:7.2f} s  "
+              f"throughput={done / elapsed:7.1f} checks/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Отмена проверки с деревом потомков: задержка отмены и оставшиеся процессы.
+
+Заменитель PowerShell (fake_powershell.py) запускает дерево висящих потомков
+(tree FANOUT DEPTH), которые, как chkdsk под PowerShell, наследуют пайпы вывода.
+Когда все pid записаны в файл, проверка отменяется, и замеряется время от kill() до
+возврата stream_output / collect_output; затем ищутся выжившие процессы дерева.
+
+spawn   launch_command отдельным процессом (sh → заменитель → потомки), TreePopen
+exec    launch_command по argv без оболочки, TreePopen
+pool    хост пула, kill() убивает хост и потомков текущей команды
+legacy  прежний путь: Popen(shell=True) и kill() только внешней оболочки — для сравнения
+
+--cycles повторяет отмену и перезапуск: выжившие накапливаются только у legacy.
+--setsid уводит первый уровень потомков в свою сессию (мимо группы процессов).
+Только POSIX; оставшиеся после legacy процессы в конце добиваются.
+
+  python benchmarks/bench_cancel.py --cycles 10
+  python benchmarks/bench_cancel.py --modes exec legacy --fanout 3 --depth 2 --setsid
+"""
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_powershell import write_shim  # noqa: E402  (папка скрипта уже в sys.path)
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+MODES = ("spawn", "exec", "pool", "legacy")
+
+
+def tree_size(fanout, depth):
+    return sum(fanout ** level for level in range(depth + 1))
+
+
+def launch_tree(mode, pidfile, fanout, depth, setsid=False):
+    """Запускает заменитель, строящий дерево; ждёт, пока все процессы запишут pid."""
+    import system_checks
+    code = f"pidfile {pidfile}; tree {fanout} {depth}{' setsid' if setsid else ''}; hang"
+    if mode == "exec":
+        process = system_checks.launch_command(code, argv=[sys.executable, FAKE, "-Command", code])
+    elif mode == "legacy":
+        process = subprocess.Popen(system_checks._build_powershell_command(code), shell=True,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    else:
+        system_checks.set_execution_mode(mode)
+        process = system_checks.launch_command(code)
+    expected = tree_size(fanout, depth)
+    deadline = time.monotonic() + 30
+    pids = []
+    while time.monotonic() < deadline:
+        if os.path.exists(pidfile):
+            with open(pidfile, encoding="ascii") as f:
+                pids = [int(p) for p in f.read().split()]
+            if len(pids) >= expected:
+                break
+        time.sleep(0.01)
+    return process, pids
+
+
+def cancel_tree(process, pids, streamed=True):
+    """Отменяет через 50 мс из другого потока (как кнопка «Отмена»); → (сек до возврата, результат, живые)."""
+    import system_checks
+    from process_tree import _alive
+
+    killed_at = []
+
+    def cancel():
+        time.sleep(0.05)
+        killed_at.append(time.perf_counter())
+        process.kill()
+
+    threading.Thread(target=cancel, daemon=True).start()
+    if streamed:
+        result = system_checks.stream_output(process, on_chunk=None, timeout=600,
+                                             cancelled=lambda: bool(killed_at))
+    else:
+        result = system_checks.collect_output(process, timeout=600)
+    latency = time.perf_counter() - killed_at[0]
+    return latency, result, [pid for pid in pids if _alive(pid)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    ap.add_argument("--cycles", type=int, default=5, help="отмен подряд на каждый режим (5)")
+    ap.add_argument("--fanout", type=int, default=2)
+    ap.add_argument("--depth", type=int, default=2)
+    ap.add_argument("--setsid", action="store_true", help="первый уровень потомков — в своей сессии")
+    ap.add_argument("--collect", action="store_true", help="collect_output вместо stream_output")
+    args = ap.parse_args()
+    if os.name == "nt":
+        ap.error("замер рассчитан на POSIX: заменитель powershell.exe кладётся в PATH как сценарий sh")
+
+    workdir = tempfile.mkdtemp(prefix="scp-cancel-")
+    write_shim(workdir)
+    os.environ["PATH"] = workdir + os.pathsep + os.environ.get("PATH", "")
+    os.chdir(workdir)
+    import system_checks
+    system_checks.configure_pool(host_argv=[sys.executable, FAKE], size=1).warm_up()
+
+    print(f"Дерево: {tree_size(args.fanout, args.depth)} процессов (fanout {args.fanout}, depth {args.depth})"
+          f"{', первый уровень в своей сессии' if args.setsid else ''}")
+    print(f"{'режим':8} {'отмена, мс (медиана)':>21} {'макс., мс':>10} {'выжило':>7} {'отчёт kill':>30}")
+    leftovers = []
+    for mode in args.modes:
+        latencies, survived, report = [], 0, None
+        for cycle in range(args.cycles):
+            pidfile = os.path.join(workdir, f"{mode}-{cycle}.pids")
+            process, pids = launch_tree(mode, pidfile, args.fanout, args.depth, args.setsid)
+            latency, result, alive = cancel_tree(process, pids, streamed=not args.collect)
+            latencies.append(latency * 1000)
+            survived += len(alive)
+            leftovers += alive
+            report = result.get("kill") or report
+        summary = (f"{report['members']} / выжили {len(report['survivors'] or [])}" if report else "—")
+        print(f"{mode:8} {statistics.median(latencies):21.1f} {max(latencies):10.1f} {survived:7} {summary:>30}")
+    for pid in leftovers:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    if leftovers:
+        print(f"\nДобито оставшихся процессов: {len(leftovers)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Сводка о системе: запросы Get-CimInstance по одному против пакетов cim_batch.
+
+Выполняет записи каталога, которые можно объединить (cim_batch.batchable, без прав
+администратора), через run_many дважды — по процессу или команде пула на запись и пакетами
+(batch_cim=True) — --repeat раз в каждом режиме запуска. В таблице — медиана времени до
+последнего результата, число запусков PowerShell и сколько записей дали тот же вывод, что и
+по одному (время и счётчики в выводе могут отличаться, это не ошибка пакета).
+
+Нужна Windows: запросы CIM выполняет настоящий PowerShell.
+
+  python benchmarks/bench_cim_batch.py
+  python benchmarks/bench_cim_batch.py --modes spawn --repeat 5 -j 1
+  python benchmarks/bench_cim_batch.py "Получить информацию о BIOS" "Получение информации о RAM"
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cim_batch  # noqa: E402
+from commands import commands  # noqa: E402
+import system_checks  # noqa: E402
+
+
+def run(names, workers, batch_cim):
+    start = time.perf_counter()
+    results = dict(system_checks.run_many(names, commands, max_workers=workers, timeout=120, use_cache=False,
+                                          history=False, coalesce=False, batch_cim=batch_cim))
+    return time.perf_counter() - start, results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("names", nargs="*", help="записи каталога (по умолчанию — все подходящие)")
+    ap.add_argument("--modes", nargs="+", choices=("spawn", "pool"), default=["spawn", "pool"])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("-j", "--jobs", type=int, default=4, help="параллельных проверок (4)")
+    args = ap.parse_args()
+    if os.name != "nt":
+        ap.error("запросы CIM выполняются только в PowerShell на Windows")
+
+    names = args.names or [n for n, m in commands.items() if "template" not in m and not m.get("requires_admin")
+                           and cim_batch.batchable(m, m["command"])]
+    print(f"Записей: {len(names)}, параллельно: {args.jobs}")
+    print(f"{'режим':6} {'по одному, с':>13} {'пакетами, с':>12} {'запусков':>14} {'тот же вывод':>13}")
+    for mode in args.modes:
+        system_checks.set_execution_mode(mode)
+        if mode == "pool":
+            system_checks.get_pool().warm_up()
+        single, batched, same = [], [], 0
+        for _ in range(args.repeat):
+            elapsed, reference = run(names, args.jobs, False)
+            single.append(elapsed)
+            elapsed, results = run(names, args.jobs, True)
+            batched.append(elapsed)
+            same = sum(results[n]["stdout"] == reference[n]["stdout"] for n in names)
+        batches = len({(r["batch"]["size"], r["started_at"]) for r in results.values() if r.get("batch")})
+        launches = f"{len(names)} → {batches + sum(1 for r in results.values() if not r.get('batch'))}"
+        print(f"{mode:6} {statistics.median(single):13.2f} {statistics.median(batched):12.2f} "
+              f"{launches:>14} {same:>8}/{len(names)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Скорость и корректность декодирования вывода на крупных наборах в разных кодировках.
+
+Наборы генерируются в памяти: вывод sfc/DISM-подобных утилит (русский текст с
+таблицами) в UTF-8, UTF-8 с BOM, cp866 (OEM-консоль), cp1251 (ANSI), UTF-16LE и
+почти чистый ASCII с редкими русскими строками. Каждый набор режется на блоки
+по 64 КиБ со случайным сдвигом — многобайтовые символы попадают на границы.
+
+legacy — прежний способ: GUI декодировал каждый блок как cp1251, итог —
+         _decode_output «сначала cp1251, потом UTF-8» по всему буферу.
+stream — output_decoding.StreamDecoder по блокам (определение кодировки один раз).
+whole  — output_decoding.decode_bytes по всему буферу.
+
+  python benchmarks/bench_decode.py --mb 32
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from output_decoding import StreamDecoder, decode_bytes  # noqa: E402
+
+LINES = [
+    "Проверка системы начата. Этот процесс может занять некоторое время.",
+    "Начальный этап проверки системы.",
+    "Проверка 100% завершена.",
+    "Программа защиты ресурсов Windows не обнаружила нарушений целостности.",
+    "Name                           Status   StartType",
+    "----                           ------   ---------",
+    "Служба журнала событий Windows Running  Automatic",
+    "Диспетчер печати               Stopped  Manual",
+    "Инструмент DISM для обслуживания образов: версия 10.0.19041.844",
+    "Ошибка: 87. Параметр задан неверно.",
+]
+ASCII_LINES = [
+    "Name                           Status   StartType",
+    "EventLog                       Running  Automatic",
+    "Spooler                        Stopped  Manual",
+    "wuauserv                       Running  Manual",
+]
+CHUNK = 64 * 1024
+
+
+def make_text(mb, ascii_heavy=False, seed=1):
+    rnd = random.Random(seed)
+    target = mb * 1024 * 1024
+    out, size = [], 0
+    while size < target:
+        if ascii_heavy and rnd.random() > 0.01:
+            line = rnd.choice(ASCII_LINES)
+        else:
+            line = rnd.choice(LINES)
+        out.append(line)
+        size += len(line) * 2
+    return "\r\n".join(out) + "\r\n"
+
+
+def fixtures(mb):
+    text = make_text(mb)
+    ascii_text = make_text(mb, ascii_heavy=True)
+    return [
+        ("utf-8", text, text.encode("utf-8")),
+        ("utf-8+BOM", text, text.encode("utf-8-sig")),
+        ("cp866", text, text.encode("cp866")),
+        ("cp1251", text, text.encode("cp1251")),
+        ("utf-16le", text, text.encode("utf-16-le")),
+        ("ascii+1% utf-8", ascii_text, ascii_text.encode("utf-8")),
+    ]
+
+
+def chunks(raw, seed=2):
+    rnd = random.Random(seed)
+    pos = 0
+    while pos < len(raw):
+        step = CHUNK + rnd.randint(-CHUNK // 2, CHUNK // 2)
+        yield raw[pos:pos + step]
+        pos += step
+
+
+def legacy_whole(raw):
+    for enc in ("cp1251", "utf-8"):
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("utf-8", errors="replace")
+
+
+def run_legacy(raw):
+    parts = [c.decode("cp1251", errors="replace") for c in chunks(raw)]
+    return "".join(parts), legacy_whole(raw)
+
+
+def run_stream(raw):
+    decoder = StreamDecoder()
+    parts = [decoder.decode(c) for c in chunks(raw)]
+    parts.append(decoder.flush())
+    return "".join(parts), decoder.encoding
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mb", type=int, default=16, help="Размер каждого набора (текста), МиБ")
+    args = ap.parse_args()
+
+    print(f"{'набор':16} {'способ':7} {'МиБ/с':>9}  результат")
+    for name, text, raw in fixtures(args.mb):
+        mib = len(raw) / (1024 * 1024)
+        elapsed, (streamed, final) = timed(run_legacy, raw)
+        ok = "верно" if streamed == text and final == text else "искажено"
+        print(f"{name:16} {'legacy':7} {mib / elapsed:9.0f}  {ok}")
+        elapsed, (streamed, encoding) = timed(run_stream, raw)
+        ok = "верно" if streamed == text else "искажено"
+        print(f"{name:16} {'stream':7} {mib / elapsed:9.0f}  {ok} ({encoding})")
+        elapsed, whole = timed(decode_bytes, raw)
+        ok = "верно" if whole == text else "искажено"
+        print(f"{name:16} {'whole':7} {mib / elapsed:9.0f}  {ok}")
+
+
+if __name__ == "__main__":
+    main()
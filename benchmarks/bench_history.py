@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+История запусков: скорость записи пачками и время ответа на вопрос
+«когда служба X последний раз была остановлена».
+
+text    — прежний способ: поиск по текстовому логу (формат logger.log_command_result),
+          чтение файла целиком и разбор записей от конца к началу.
+history — HistoryStore.last_run(name, contains=...) по индексу (name, started_at).
+
+  python benchmarks/bench_history.py --runs 50000 --commands 40
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_store import HistoryStore  # noqa: E402
+
+SERVICES = ["Spooler", "EventLog", "wuauserv", "BITS", "Dhcp", "Dnscache", "WinDefend", "W32Time"]
+
+
+def make_output(rnd):
+    lines = ["Status   Name               DisplayName", "------   ----               -----------"]
+    for svc in SERVICES:
+        state = "Stopped" if rnd.random() < 0.05 else "Running"
+        lines.append(f"{state:8} {svc:18} Служба {svc}")
+    return "\n".join(lines * 4)
+
+
+def text_last(path, name, needle):
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    entries = content.split("\n20")
+    for entry in reversed(entries):
+        if f"Command: {name}\n" in entry and needle.casefold() in entry.casefold():
+            return entry[:19]
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=20000)
+    ap.add_argument("--commands", type=int, default=40)
+    args = ap.parse_args()
+
+    rnd = random.Random(1)
+    names = [f"Проверка {i}" for i in range(args.commands)]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"), retention_days=None, max_runs=None)
+        text_path = os.path.join(tmp, "log.txt")
+        now = time.time() - args.runs * 60
+        start = time.perf_counter()
+        with open(text_path, "w", encoding="utf-8") as text:
+            for i in range(args.runs):
+                name = rnd.choice(names)
+                out = make_output(rnd)
+                started = now + i * 60
+                store.record(name, "Get-Service", {"stdout": out, "stderr": "", "returncode": 0,
+                                                   "duration": 1.0}, started_at=started)
+                stamp = datetime.fromtimestamp(started).strftime("%Y-%m-%d %H:%M:%S,000")
+                text.write(f"{stamp} - INFO - Command: {name}\nResult: {out}\n")
+        enqueue = time.perf_counter() - start
+        store.flush()
+        total = time.perf_counter() - start
+        stats = store.stats()
+        print(f"запись: {args.runs} запусков, в очередь {enqueue:.2f} с, на диске через {total:.2f} с "
+              f"({args.runs / total:,.0f} запусков/с, пачек {stats['batches']}, "
+              f"{stats['bytes'] / 1048576:.1f} МиБ; текстовый лог {os.path.getsize(text_path) / 1048576:.1f} МиБ)")
+
+        queries = [(rnd.choice(names), rnd.choice(SERVICES) + " ") for _ in range(5)]
+        for label, fn in (("text", lambda n, s: text_last(text_path, n, "Stopped  " + s.strip())),
+                          ("history", lambda n, s: store.last_run(n, contains="Stopped  " + s.strip()))):
+            start = time.perf_counter()
+            for name, svc in queries:
+                fn(name, svc)
+            print(f"{label:8} {(time.perf_counter() - start) / len(queries) * 1000:9.1f} мс на запрос")
+        start = time.perf_counter()
+        for name in names[:10]:
+            store.runs(name=name, limit=50)
+        print(f"runs(name, limit=50): {(time.perf_counter() - start) / 10 * 1000:.2f} мс")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
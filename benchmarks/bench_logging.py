@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Время, которое поток GUI тратит на логирование результатов команд.
+
+before — прежний setup_logger: TimedRotatingFileHandler прямо в вызывающем потоке,
+         весь stdout вставляется в сообщение и кодируется в cp1251 при записи.
+after  — logger.setup_logger: ограниченная очередь + QueueListener, крупные
+         результаты уходят в logs/payloads в потоке записи.
+
+Для каждого размера результата log_command_result вызывается --calls раз; печатается
+среднее и максимальное время вызова в вызывающем потоке. Работает во временной папке.
+
+  python benchmarks/bench_logging.py --sizes 1 64 1024 8192 --calls 20
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import TimedRotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger  # noqa: E402
+
+LINE = "Служба журнала событий Windows      Running  Automatic\n"
+
+
+def legacy_setup():
+    logs_dir = os.path.join(os.getcwd(), "logs")
+    os.makedirs(logs_dir, exist_ok=True)
+    handler = TimedRotatingFileHandler(os.path.join(logs_dir, "legacy.txt"), when="midnight",
+                                       interval=1, backupCount=7, encoding="cp1251")
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.handlers = [handler]
+
+
+def legacy_log(command, result, success=True):
+    message = f"Command: {command}\nResult: {result}"
+    if success:
+        logging.info(message)
+    else:
+        logging.error(message)
+
+
+def measure(log, payload, calls):
+    times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        log(f"Проверка {i}", payload)
+        times.append(time.perf_counter() - start)
+    return sum(times) / len(times), max(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 1024, 8192], help="Размер результата, КиБ")
+    ap.add_argument("--calls", type=int, default=20)
+    ap.add_argument("--policy", choices=logger.OVERFLOW_POLICIES, default="spill")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        print(f"{'размер':>9} {'before ср/макс, мс':>22} {'after ср/макс, мс':>22}")
+        for kib in args.sizes:
+            payload = (LINE * (kib * 1024 // len(LINE.encode("utf-8")) + 1))[:kib * 1024 // 2]
+            legacy_setup()
+            before = measure(legacy_log, payload, args.calls)
+            logging.getLogger().handlers[0].close()
+            logger.setup_logger(policy=args.policy)
+            after = measure(logger.log_command_result, payload, args.calls)
+            drain_start = time.perf_counter()
+            logger.shutdown_logger()
+            drained = time.perf_counter() - drain_start
+            print(f"{kib:>7}КиБ {before[0] * 1000:10.3f} / {before[1] * 1000:8.3f} "
+                  f"{after[0] * 1000:10.3f} / {after[1] * 1000:8.3f}   (фоновая запись: {drained * 1000:.0f} мс)")
+        print("статистика очереди:", logger.logging_stats())
+        logging.getLogger().handlers = []
+        os.chdir(os.path.dirname(tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Открытие большого текстового лога: прежний view_log против LogIndex.
+
+legacy — чтение файла целиком (попытки utf-8, cp1251, cp866) и сборка одной строки
+         для setPlainText (сам виджет не создаётся, замер — только подготовка текста).
+index  — LogIndex: построение разреженного индекса, последняя страница, переход к дате,
+         поиск и дочитывание после дозаписи в файл.
+
+  python benchmarks/bench_logview.py --mb 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_reader import LogIndex  # noqa: E402
+
+PAGE = 1000
+
+
+def write_log(path, mb):
+    start = datetime(2026, 1, 1)
+    target = mb * 1024 * 1024
+    i = 0
+    with open(path, "w", encoding="cp1251") as f:
+        while f.tell() < target:
+            stamp = (start + timedelta(seconds=i * 5)).strftime("%Y-%m-%d %H:%M:%S,000")
+            f.write(f"{stamp} - INFO - Command: Проверка служб {i}\nResult: Status   Name\n"
+                    f"Running  Spooler\nRunning  EventLog\nStopped  wuauserv\n")
+            i += 1
+    return start + timedelta(seconds=i * 5 // 2)
+
+
+def legacy(path):
+    for encoding in ("utf-8", "cp1251", "cp866"):
+        try:
+            with open(path, "r", encoding=encoding) as f:
+                return f.read()
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mb", type=int, default=100)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "log.txt")
+        middle = write_log(path, args.mb)
+        ms, content = timed(lambda: legacy(path))
+        print(f"legacy: чтение целиком {ms:8.0f} мс, {len(content) / 1e6:.0f} млн символов в виджет")
+        del content
+        ms, index = timed(lambda: LogIndex(path))
+        print(f"index:  индекс          {ms:8.0f} мс ({len(index):,} строк, блоков {len(index._offsets)})")
+        ms, _ = timed(lambda: index.read_lines(len(index) - PAGE, PAGE))
+        print(f"        последняя стр.  {ms:8.1f} мс")
+        ms, line = timed(lambda: index.line_for_time(middle))
+        print(f"        к дате          {ms:8.1f} мс (строка {line:,})")
+        ms, _ = timed(lambda: index.read_lines(line, PAGE))
+        print(f"        страница        {ms:8.1f} мс")
+        ms, _ = timed(lambda: index.find("Проверка служб 12345\n"))
+        print(f"        поиск           {ms:8.1f} мс")
+        with open(path, "a", encoding="cp1251") as f:
+            f.write("2027-01-01 00:00:00,000 - INFO - Command: новая запись\n" * 1000)
+        ms, _ = timed(index.refresh)
+        print(f"        дочитывание     {ms:8.1f} мс (+1000 строк, всего {len(index):,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Хранилище рядов: запись и выборки по диапазону времени на --points точках одного ряда.
+
+list  — прежний способ: список кортежей (время, значение) и отбор по условию
+        в генераторе (так работал TimeSeries.window).
+store — MetricSeries: кольцевые буферы array('d') со свёртками 60 и 3600 с,
+        бинарный поиск границ и копирование срезов столбцов; запись по точке
+        (append, как у сэмплера) и пакетом (extend).
+
+Замеряются: скорость записи, память (tracemalloc для списка, размер буферов
+для хранилища), выборки окон 1 %, 10 % и 100 % ряда, выборка всего ряда
+с ограничением --max-points (берутся свёртки), а также save и open_mmap
+с той же выборкой из отображённого файла.
+
+  python benchmarks/bench_metric_store.py --points 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metric_store import MetricSeries, MetricStore  # noqa: E402
+
+T0 = 1_700_000_000.0
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def make_values(n, rnd):
+    # Похоже на загрузку ЦП: медленный дрейф и шум
+    value, out = 20.0, []
+    for _ in range(n):
+        value = min(100.0, max(0.0, value + rnd.uniform(-2, 2)))
+        out.append(value)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--points", type=int, default=1_000_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--max-points", type=int, default=2000)
+    args = ap.parse_args()
+    n = args.points
+    rnd = random.Random(1)
+    times = [T0 + i for i in range(n)]  # замер раз в секунду
+    values = make_values(n, rnd)
+
+    start = time.perf_counter()
+    pairs = []
+    for pair in zip(times, values):
+        pairs.append(pair)
+    list_ingest = time.perf_counter() - start
+    del pairs
+    # Память считается отдельным проходом: tracemalloc сильно замедляет запись
+    tracemalloc.start()
+    pairs = [(t + 0.0, v + 0.0) for t, v in zip(times, values)]  # новые float, как у замеров
+    list_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    series = MetricSeries("bench", raw_capacity=n)
+    start = time.perf_counter()
+    for t, v in zip(times, values):
+        series.append(t, v)
+    append_ingest = time.perf_counter() - start
+    series = MetricSeries("bench", raw_capacity=n)
+    start = time.perf_counter()
+    series.extend(times, values)
+    extend_ingest = time.perf_counter() - start
+    print(f"Точек: {n}")
+    print(f"{'':13} {'запись, с':>10} {'точек/с':>12} {'память, МБ':>11}")
+    print(f"{'list':13} {list_ingest:10.2f} {n / list_ingest:12,.0f} {list_bytes / 2**20:11.1f}")
+    print(f"{'store append':13} {append_ingest:10.2f} {n / append_ingest:12,.0f} {series.nbytes / 2**20:11.1f}"
+          "  (с минутными и часовыми свёртками)")
+    print(f"{'store extend':13} {extend_ingest:10.2f} {n / extend_ingest:12,.0f} {series.nbytes / 2**20:11.1f}")
+
+    def list_query(lo, hi):
+        return [(t, v) for t, v in pairs if lo <= t < hi]
+
+    print(f"\n{'окно':8} {'точек':>9} {'list, мс':>10} {'store, мс':>10}")
+    for share in (0.01, 0.1, 1.0):
+        span = n * share
+        lo = T0 + rnd.uniform(0, n - span)
+        hi = lo + span
+        t_old, old = timed(lambda: list_query(lo, hi), args.repeat)
+        t_new, new = timed(lambda: series.query(lo, hi, max_points=None), args.repeat)
+        assert len(old) == len(new)
+        print(f"{share:8.0%} {len(new):9} {t_old:10.2f} {t_new:10.2f}")
+    t_roll, rolled = timed(lambda: series.query(max_points=args.max_points), args.repeat)
+    print(f"весь ряд, не больше {args.max_points} точек: {t_roll:.2f} мс, "
+          f"{len(rolled)} корзин по {rolled.resolution:g} с")
+
+    store = MetricStore(raw_capacity=n)
+    store._series["bench"] = series
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metrics.tsm")
+        t_save, _ = timed(lambda: store.save(path), 1)
+        start = time.perf_counter()
+        mapped = MetricStore.open_mmap(path)
+        t_open = (time.perf_counter() - start) * 1000
+        lo = T0 + n * 0.45
+        t_map, new = timed(lambda: mapped.query("bench", lo, lo + n * 0.1, max_points=None), args.repeat)
+        t_map_roll, _ = timed(lambda: mapped.query("bench", max_points=args.max_points), args.repeat)
+        print(f"\nФайл: {os.path.getsize(path) / 2**20:.1f} МБ, save {t_save:.1f} мс, open_mmap {t_open:.2f} мс")
+        print(f"mmap: окно 10 % ({len(new)} точек) {t_map:.2f} мс, весь ряд по свёрткам {t_map_roll:.2f} мс")
+        mapped.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Стоимость непрерывного мониторинга: процесс на каждый замер против MetricsSampler.
+
+spawn   — прежняя схема: новый процесс на каждый замер (здесь — заменитель PowerShell,
+          у настоящего powershell.exe холодный старт в разы дороже).
+proc    — MetricsSampler + ProcBackend: чтение /proc в этом же процессе.
+stream  — MetricsSampler + CommandStreamBackend: один долгоживущий процесс печатает замеры.
+
+ЦП считается по os.times() вместе с дочерними процессами и делится на время замера:
+100 % — одно ядро целиком.
+
+  python benchmarks/bench_metrics.py --seconds 10 --interval 1 0.25
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import CommandStreamBackend, MetricsSampler, ProcBackend  # noqa: E402
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+STREAM_SCRIPT = ("import sys, time\n"
+                 "while True:\n"
+                 "    sys.stdout.write('cpu_percent=1 mem_percent=2 disk_queue=0 net_rx_bps=3 net_tx_bps=4\\n')\n"
+                 "    sys.stdout.flush()\n"
+                 "    time.sleep({interval})\n")
+
+
+def cpu_seconds():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def measure(run, seconds):
+    cpu0, wall0 = cpu_seconds(), time.perf_counter()
+    samples = run(seconds)
+    wall = time.perf_counter() - wall0
+    return samples, 100.0 * (cpu_seconds() - cpu0) / wall
+
+
+def spawn(interval):
+    def run(seconds):
+        samples = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            subprocess.run([sys.executable, FAKE, "-Command", "echo cpu_percent=1"], capture_output=True)
+            samples += 1
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        return samples
+    return run
+
+
+def sampler(backend_factory, interval):
+    def run(seconds):
+        s = MetricsSampler(backend_factory(), interval=interval)
+        s.start()
+        time.sleep(seconds)
+        s.stop()
+        return s.samples
+    return run
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--interval", type=float, nargs="+", default=[1.0, 0.25])
+    args = ap.parse_args()
+
+    print(f"{'интервал':>9} {'режим':8} {'замеров':>8} {'ЦП, %':>8}")
+    for interval in args.interval:
+        modes = [
+            ("spawn", spawn(interval)),
+            ("proc", sampler(ProcBackend, interval)),
+            ("stream", sampler(lambda: CommandStreamBackend([sys.executable, "-u", "-c", STREAM_SCRIPT]),
+                               interval)),
+        ]
+        for name, run in modes:
+            samples, cpu = measure(run, args.seconds)
+            print(f"{interval:9.2f} {name:8} {samples:8} {cpu:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
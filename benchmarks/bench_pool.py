@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Замер задержки одной проверки: отдельный процесс на команду против пула тёплых хостов.
+
+  python benchmarks/bench_pool.py                       # заменитель PowerShell
+  python benchmarks/bench_pool.py --startup-delay 0.3   # имитация холодного старта powershell.exe
+  python benchmarks/bench_pool.py --pwsh pwsh           # настоящий pwsh/powershell.exe
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from powershell_pool import PowerShellPool, powershell_host_argv  # noqa: E402
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+
+
+def summarize(label, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<8} n={len(samples):<4} median={statistics.median(samples) * 1000:8.1f} ms  "
+          f"p95={p95 * 1000:8.1f} ms  mean={statistics.mean(samples) * 1000:8.1f} ms")
+    return statistics.median(samples)
+
+
+def bench_spawn(argv_prefix, command, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv_prefix + ["-Command", command],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        proc.communicate()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_pool(host_argv, command, iterations, size):
+    pool = PowerShellPool(host_argv=host_argv, size=size)
+    pool.warm_up()
+    samples = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            pool.launch(command).communicate()
+            samples.append(time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+    return samples
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--iterations", type=int, default=30)
+    ap.add_argument("--size", type=int, default=2, help="Размер пула")
+    ap.add_argument("--startup-delay", type=float, default=0.0,
+                    help="Дополнительная задержка старта заменителя (сек)")
+    ap.add_argument("--pwsh", help="Путь к pwsh/powershell.exe вместо заменителя")
+    ap.add_argument("--command", help="Команда для замера")
+    args = ap.parse_args()
+
+    if args.pwsh:
+        spawn_prefix = [args.pwsh, "-NoProfile", "-NonInteractive"]
+        host_argv = powershell_host_argv(args.pwsh)
+        command = args.command or "$env:COMPUTERNAME"
+    else:
+        delay = ["--startup-delay", str(args.startup_delay)] if args.startup_delay else []
+        spawn_prefix = [sys.executable, FAKE] + delay
+        host_argv = [sys.executable, FAKE] + delay
+        command = args.command or "echo ok"
+
+    spawn = summarize("spawn", bench_spawn(spawn_prefix, command, args.iterations))
+    pooled = summarize("pool", bench_pool(host_argv, command, args.iterations, args.size))
+    print(f"speedup: x{spawn / pooled:.1f}")
+
+
+if __name__ == "__main__":
+    main()
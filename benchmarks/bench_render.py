@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Скорость отрисовки потокового вывода в окне (headless, платформа Qt offscreen).
+
+before — прежний append_stream на каждую строку (moveCursor x2, insertHtml для stderr).
+after  — SystemCheckApp.on_stream_progress: буфер + сброс пачками по таймеру.
+
+  python benchmarks/bench_render.py --lines 200000 --stderr-every 50
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication, QTextEdit  # noqa: E402
+
+
+def legacy_append(widget, text, is_stderr):
+    normalized = text.replace("\r\n", "\n").replace("\r", "\n")
+    if not normalized.endswith("\n"):
+        normalized += "\n"
+    widget.moveCursor(widget.textCursor().End)
+    if is_stderr:
+        html = (normalized.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                .replace("\n", "<br>"))
+        widget.insertHtml(f"<span style='color:#ff5555'>{html}</span>")
+    else:
+        widget.insertPlainText(normalized)
+    widget.moveCursor(widget.textCursor().End)
+
+
+def lines(count, stderr_every):
+    for i in range(count):
+        yield f"{i:08d} Обработка компонента {'x' * 60}\n", bool(stderr_every and i % stderr_every == 0)
+
+
+def bench_before(app, count, stderr_every):
+    widget = QTextEdit()
+    widget.setReadOnly(True)
+    widget.setLineWrapMode(QTextEdit.NoWrap)
+    widget.show()
+    start = time.perf_counter()
+    for text, is_stderr in lines(count, stderr_every):
+        legacy_append(widget, text, is_stderr)
+        app.processEvents()
+    return time.perf_counter() - start
+
+
+def bench_after(app, count, stderr_every, interval):
+    from main import SystemCheckApp
+    window = SystemCheckApp()
+    window.flush_interval_spin.setValue(interval)
+    window.show()
+    window.clear_output()
+    start = time.perf_counter()
+    for text, is_stderr in lines(count, stderr_every):
+        window.on_stream_progress(text, is_stderr)
+        app.processEvents()
+    window.flush_output()
+    app.processEvents()
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lines", type=int, default=50000)
+    ap.add_argument("--stderr-every", type=int, default=50, help="Каждая N-я строка — stderr (0 — нет)")
+    ap.add_argument("--interval", type=int, default=50, help="Интервал сброса, мс")
+    args = ap.parse_args()
+
+    app = QApplication(sys.argv)
+    before = bench_before(app, args.lines, args.stderr_every)
+    print(f"before: {args.lines / before:12,.0f} строк/с ({before:.2f} с)")
+    after = bench_after(app, args.lines, args.stderr_every, args.interval)
+    print(f"after:  {args.lines / after:12,.0f} строк/с ({after:.2f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Запись лога при всплеске крупных результатов: задержка записи и занятое место.
+
+legacy — прежний обработчик: TimedRotatingFileHandler, результат целиком в строке лога.
+after  — SizedTimedRotatingFileHandler (ротация по размеру) + PayloadSpooler + фоновое
+         сжатие сегментов и файлов результатов (SegmentCompressor).
+
+Замеряется время handler.handle() на запись (это работа потока записи QueueListener,
+включая ротации) и объём папки после того, как фоновое сжатие закончилось.
+
+  python benchmarks/bench_rotation.py --results 200 --kb 1024 --max-mb 32
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import TimedRotatingFileHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logger  # noqa: E402
+
+FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def make_payload(rnd, kib):
+    rows = []
+    size = 0
+    while size < kib * 1024:
+        row = f"{rnd.choice(['Running', 'Stopped'])}  {rnd.choice(['Spooler', 'EventLog', 'BITS'])}" \
+              f"  Служба {rnd.randint(0, 10 ** 6)}\n"
+        rows.append(row)
+        size += len(row.encode("utf-8"))
+    return "".join(rows)
+
+
+def du(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def burst(handler, results, kib, legacy):
+    rnd = random.Random(1)
+    latencies = []
+    for i in range(results):
+        payload = make_payload(rnd, kib)
+        if legacy:
+            record = logging.LogRecord("root", logging.INFO, __file__, 0,
+                                       f"Command: Проверка {i}\nResult: {payload}", None, None)
+        else:
+            record = logging.LogRecord("root", logging.INFO, __file__, 0, f"Command: Проверка {i}", None, None)
+            record.payload = payload
+        start = time.perf_counter()
+        handler.handle(record)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label, latencies, size, extra=""):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:7} запись ср {statistics.mean(latencies) * 1000:7.2f} мс, p99 {p99 * 1000:7.2f} мс, "
+          f"макс {latencies[-1] * 1000:7.2f} мс; на диске {size / 1048576:8.1f} МиБ{extra}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--results", type=int, default=200)
+    ap.add_argument("--kb", type=int, default=1024, help="Размер одного результата, КиБ")
+    ap.add_argument("--max-mb", type=int, default=32, help="Порог ротации по размеру, МиБ")
+    ap.add_argument("--method", choices=["gzip", "zstd"], default=None)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_dir = os.path.join(tmp, "legacy")
+        os.makedirs(legacy_dir)
+        handler = TimedRotatingFileHandler(os.path.join(legacy_dir, "log_20260101.txt"), when="midnight",
+                                           backupCount=7, encoding="cp1251", errors="replace")
+        handler.setFormatter(logging.Formatter(FORMAT))
+        latencies = burst(handler, args.results, args.kb, legacy=True)
+        handler.close()
+        report("legacy", latencies, du(legacy_dir), " (один файл)")
+
+        logs_dir = os.path.join(tmp, "after")
+        os.makedirs(logs_dir)
+        log_path = os.path.join(logs_dir, "log_20260101.txt")
+        compressor = logger.SegmentCompressor(logs_dir, args.method, keep=[log_path],
+                                              retention_days=None, max_total_bytes=None)
+        handler = logger.SizedTimedRotatingFileHandler(log_path, max_bytes=args.max_mb * 1024 * 1024,
+                                                       compressor=compressor, encoding="cp1251", errors="replace")
+        handler.setFormatter(logging.Formatter(FORMAT))
+        handler.addFilter(logger.PayloadSpooler(os.path.join(logs_dir, "payloads"), compressor=compressor))
+        latencies = burst(handler, args.results, args.kb, legacy=False)
+        handler.close()
+        before_flush = du(logs_dir)
+        start = time.perf_counter()
+        compressor.flush()
+        waited = time.perf_counter() - start
+        compressor.stop()
+        report("after", latencies, du(logs_dir),
+               f" (сразу после всплеска {before_flush / 1048576:.1f} МиБ; сжатие {compressor.method} "
+               f"{compressor.compressed} файлов, дожидались {waited:.1f} с, "
+               f"ротаций по размеру {handler.size_rollovers})")
+
+
+if __name__ == "__main__":
+    main()
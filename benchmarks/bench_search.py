@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Поиск по каталогу команд: прежний линейный фильтр против CommandSearchIndex.
+
+legacy — refresh_command_list до индекса: lower() имени и описания каждой команды
+         на каждое нажатие клавиши, подстрока, исходный порядок.
+index  — CommandSearchIndex.search: префиксы, подстроки, транслитерация, другая
+         раскладка и опечатки с ранжированием.
+--qt   — дополнительно: clear()/addItems() в QComboBox против CommandFilterProxy
+         (нужен PyQt5; окно не показывается).
+
+Каталог синтетический: реальные команды из commands.py, размноженные до --commands
+записей с вариациями слов.
+
+  python benchmarks/bench_search.py --commands 5000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_search import CommandSearchIndex  # noqa: E402
+from commands import commands  # noqa: E402
+
+QUERIES = [
+    ("префикс", "драйв"),
+    ("подстрока", "брандм"),
+    ("два слова", "список служб"),
+    ("транслит", "drayver"),
+    ("раскладка", "lbcr"),       # «диск» в английской раскладке
+    ("опечатка", "пользоватль"),
+    ("нет совпадений", "zzzzqq"),
+]
+SUFFIXES = ["сервера", "узла", "домена", "профиля", "тома", "сети", "группы", "пакета", "агента"]
+
+
+def make_catalog(size, rnd):
+    base = list(commands.items())
+    catalog = {}
+    i = 0
+    while len(catalog) < size:
+        name, meta = base[i % len(base)]
+        if i >= len(base):
+            name = f"{name} {rnd.choice(SUFFIXES)} {i}"
+        catalog[name] = dict(meta, description=meta.get("description", "") + f" #{i}")
+        i += 1
+    return catalog
+
+
+def legacy(catalog, text):
+    text = text.lower()
+    out = []
+    for name in catalog:
+        descr = catalog.get(name, {}).get("description", "").lower()
+        if text in name.lower() or text in descr:
+            out.append(name)
+    return out
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def bench_qt(catalog, index, repeat):
+    from PyQt5.QtWidgets import QApplication, QComboBox
+    from command_list import CommandFilterProxy
+
+    app = QApplication.instance() or QApplication([])
+    plain = QComboBox()
+    proxied = QComboBox()
+    start = time.perf_counter()
+    proxy = CommandFilterProxy(index)
+    proxied.setModel(proxy)
+    print(f"\nQt: модель и прокси построены за {(time.perf_counter() - start) * 1000:.1f} мс")
+    print(f"{'запрос':16} {'clear/addItems, мс':>20} {'proxy, мс':>10} {'строк':>7}")
+    for _, query in QUERIES[:3] + [("", "")]:
+        def rebuild():
+            plain.clear()
+            plain.addItems(legacy(catalog, query))
+
+        t_old, _ = timed(rebuild, repeat)
+        t_new, _ = timed(lambda: proxy.set_query(query), repeat)
+        print(f"{query or '(пусто)':16} {t_old:20.2f} {t_new:10.2f} {proxy.rowCount():7}")
+    app.processEvents()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--commands", type=int, default=5000)
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--qt", action="store_true", help="замерить и модель Qt")
+    args = ap.parse_args()
+
+    catalog = make_catalog(args.commands, random.Random(1))
+    start = time.perf_counter()
+    index = CommandSearchIndex(catalog)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Команд: {len(catalog)}, индекс построен за {build_ms:.1f} мс")
+    print(f"{'вид':15} {'запрос':14} {'legacy, мс':>10} {'найдено':>8} {'index, мс':>10} {'найдено':>8}")
+    for kind, query in QUERIES:
+        t_old, old = timed(lambda: legacy(catalog, query), args.repeat)
+        t_new, new = timed(lambda: index.search(query), args.repeat)
+        print(f"{kind:15} {query:14} {t_old:10.2f} {len(old):8} {t_new:10.2f} {len(new):8}")
+
+    # Набор запроса по буквам: сколько стоит каждое нажатие без паузы на debounce
+    word = "проверка драйверов"
+    t_old = sum(timed(lambda: legacy(catalog, word[:n]), 3)[0] for n in range(1, len(word) + 1))
+    t_new = sum(timed(lambda: index.search(word[:n]), 3)[0] for n in range(1, len(word) + 1))
+    print(f"\nНабор «{word}» по буквам ({len(word)} запросов): legacy {t_old:.1f} мс, index {t_new:.1f} мс")
+
+    if args.qt:
+        bench_qt(catalog, index, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Одинаковые одновременные запросы: один процесс на всех (single flight) против процесса на запрос.
+
+--callers потоков одновременно просят одну и ту же проверку через run_many (как окно, пакет
+и планировщик), каждый — с подключением к идущему выполнению и без него. Проверка — медленный
+вывод заменителя PowerShell (trickle), чтобы запросы заведомо пересекались; запросы приходят
+один за другим с шагом --stagger.
+
+В таблице — сколько процессов запущено, время до последнего результата и сэкономленные
+запуски (joins из get_flights().stats()). Затем отдельно проверяется потоковый вывод: запрос,
+подключившийся на середине, получает те же куски, что и первый (replayed — из буфера повтора).
+
+  python benchmarks/bench_single_flight.py
+  python benchmarks/bench_single_flight.py --callers 16 --lines 20 --stagger 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_powershell import write_shim  # noqa: E402  (папка скрипта уже в sys.path)
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+
+
+def run_callers(catalog, callers, stagger, coalesce):
+    """callers потоков просят одну проверку; → (сек до последнего результата, результаты)."""
+    import system_checks
+    results = []
+    lock = threading.Lock()
+
+    def caller(index):
+        time.sleep(stagger * index)
+        for _, result in system_checks.run_many(["check"], catalog, max_workers=1, timeout=60,
+                                                history=False, use_cache=False, coalesce=coalesce):
+            with lock:
+                results.append(result)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, results
+
+
+def replay_check(lines, delay):
+    """Опоздавший запрос получает весь поток вывода: уже выданное из буфера, затем новое."""
+    import system_checks
+    command = f"trickle {lines} {delay}"
+    chunks = ([], [])
+
+    def work(flight):
+        process = flight.track(system_checks.launch_command(command))
+        return system_checks.stream_output(process, on_chunk=flight.publish, timeout=60,
+                                           cancelled=flight.cancelled)
+
+    first = system_checks.get_flights().join(("replay", command), on_chunk=lambda t, e: chunks[0].append(t))
+    leader = threading.Thread(target=first.run, args=(work, 60))
+    leader.start()
+    time.sleep(lines * delay / 2)
+    late = system_checks.get_flights().join(("replay", command), on_chunk=lambda t, e: chunks[1].append(t))
+    result = late.run(work, 60)
+    leader.join()
+    return "".join(chunks[0]) == "".join(chunks[1]) == result["stdout"] + "\n"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--callers", type=int, default=8, help="одновременных запросов (8)")
+    ap.add_argument("--lines", type=int, default=10, help="строк вывода проверки (10)")
+    ap.add_argument("--delay", type=float, default=0.05, help="пауза после каждой строки, сек (0.05)")
+    ap.add_argument("--stagger", type=float, default=0.02, help="задержка между приходом запросов, сек (0.02)")
+    ap.add_argument("--mode", choices=("spawn", "pool"), default="spawn")
+    args = ap.parse_args()
+    if os.name == "nt":
+        ap.error("замер рассчитан на POSIX: заменитель powershell.exe кладётся в PATH как сценарий sh")
+
+    workdir = tempfile.mkdtemp(prefix="scp-flight-")
+    write_shim(workdir)
+    os.environ["PATH"] = workdir + os.pathsep + os.environ.get("PATH", "")
+    os.chdir(workdir)
+    import system_checks
+    system_checks.configure_pool(host_argv=[sys.executable, FAKE], size=args.callers)
+    system_checks.set_execution_mode(args.mode)
+    if args.mode == "pool":
+        system_checks.get_pool().warm_up()
+    catalog = {"check": {"command": f"trickle {args.lines} {args.delay}"}}
+
+    print(f"Запросов: {args.callers}, проверка ~{args.lines * args.delay:.2f} с, режим {args.mode}")
+    print(f"{'':17} {'процессов':>10} {'до последнего, с':>17} {'joins':>6}")
+    for coalesce in (False, True):
+        flights = system_checks.get_flights()
+        before = flights.stats()
+        elapsed, results = run_callers(catalog, args.callers, args.stagger, coalesce)
+        after = flights.stats()
+        launched = args.callers if not coalesce else after["launches"] - before["launches"]
+        assert all(r["returncode"] == 0 for r in results), "проверка завершилась с ошибкой"
+        print(f"{'объединение' if coalesce else 'процесс на запрос':17} {launched:10} {elapsed:17.2f} "
+              f"{after['joins'] - before['joins']:6}")
+    replayed = system_checks.get_flights().replayed
+    same = replay_check(args.lines, args.delay)
+    print(f"\nОпоздавший запрос получил тот же поток вывода: {'да' if same else 'НЕТ'} "
+          f"(из буфера повтора: {system_checks.get_flights().replayed - replayed} кусков)")
+
+
+if __name__ == "__main__":
+    main()
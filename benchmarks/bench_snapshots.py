@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Снимки списков и разница с прошлым запуском: полный снимок против SnapshotStore.
+
+full  — каждый снимок целиком в SQLite (JSON всех записей одной строкой); разница —
+        загрузка прошлого снимка и сравнение словарей по всем ключам.
+store — SnapshotStore: хэш записи, суммы хэшей по корзинам ключей, из базы читаются
+        только записи изменившихся корзин, пишутся только изменения.
+
+Список синтетический (похож на Get-Service), --rows записей; на каждом шаге меняется
+--changes записей: треть меняет поле, треть удаляется, треть добавляется.
+
+  python benchmarks/bench_snapshots.py --rows 100000 --changes 0 10 1000 10000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshot_store import SnapshotStore  # noqa: E402
+
+STATUSES = ["Running", "Stopped", "Paused"]
+
+
+def make_rows(n, rnd):
+    return [{"Name": f"svc{i:06d}", "DisplayName": f"Служба номер {i}", "Status": rnd.choice(STATUSES),
+             "StartType": rnd.choice(["Automatic", "Manual", "Disabled"])} for i in range(n)]
+
+
+def mutate(rows, changes, rnd, serial):
+    rows = [dict(r) for r in rows]
+    third = changes // 3
+    for i in rnd.sample(range(len(rows)), min(len(rows), changes - 2 * third)):
+        rows[i]["Status"] = STATUSES[(STATUSES.index(rows[i]["Status"]) + 1) % 3]
+    for i in sorted(rnd.sample(range(len(rows)), third), reverse=True):
+        del rows[i]
+    rows += [{"Name": f"new{serial}-{i}", "DisplayName": "Новая служба", "Status": "Running",
+              "StartType": "Manual"} for i in range(third)]
+    return rows
+
+
+class FullSnapshots:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS snaps (id INTEGER PRIMARY KEY, name TEXT, data TEXT)")
+
+    def take(self, name, rows, key):
+        with self.conn:
+            prev = self.conn.execute("SELECT data FROM snaps WHERE name = ? ORDER BY id DESC LIMIT 1",
+                                     (name,)).fetchone()
+            self.conn.execute("INSERT INTO snaps (name, data) VALUES (?, ?)",
+                              (name, json.dumps(rows, ensure_ascii=False)))
+        if prev is None:
+            return 0
+        old = {r[key]: r for r in json.loads(prev[0])}
+        new = {r[key]: r for r in rows}
+        added = [k for k in new if k not in old]
+        removed = [k for k in old if k not in new]
+        changed = [k for k in new if k in old and old[k] != new[k]]
+        return len(added) + len(removed) + len(changed)
+
+
+def db_size(path):
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--changes", type=int, nargs="+", default=[0, 10, 1000, 10000])
+    args = ap.parse_args()
+    rnd = random.Random(1)
+    rows = make_rows(args.rows, rnd)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_path, store_path = os.path.join(tmp, "full.db"), os.path.join(tmp, "snapshots.db")
+        full = FullSnapshots(full_path)
+        store = SnapshotStore(store_path)
+        start = time.perf_counter()
+        full.take("svc", rows, "Name")
+        t_full = time.perf_counter() - start
+        start = time.perf_counter()
+        store.take("svc", rows, ["Name"])
+        t_store = time.perf_counter() - start
+        print(f"Записей: {args.rows}; первый снимок: full {t_full * 1000:.0f} мс, store {t_store * 1000:.0f} мс")
+        print(f"{'изменений':>10} {'full, мс':>9} {'store, мс':>10} {'хэшей прочитано':>16} "
+              f"{'найдено':>8} {'+база full, КБ':>15} {'+база store, КБ':>16}")
+        for serial, changes in enumerate(args.changes):
+            rows = mutate(rows, changes, rnd, serial)
+            size_full, size_store = db_size(full_path), db_size(store_path)
+            start = time.perf_counter()
+            found_full = full.take("svc", rows, "Name")
+            t_full = time.perf_counter() - start
+            start = time.perf_counter()
+            diff = store.take("svc", rows, ["Name"])
+            t_store = time.perf_counter() - start
+            assert diff.count == found_full, (diff.count, found_full)
+            print(f"{changes:10} {t_full * 1000:9.0f} {t_store * 1000:10.0f} {store.rows_read:16} {diff.count:8} "
+                  f"{(db_size(full_path) - size_full) / 1024:15.0f} {(db_size(store_path) - size_store) / 1024:16.0f}")
+        store.close()
+        full.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Время запуска GUI: импорт модулей и время до первой отрисовки окна.
+
+Каждый замер — отдельный процесс python. Qt работает на платформе offscreen,
+поэтому скрипт запускается и без экрана (CI, ssh); рабочая папка дочернего
+процесса временная, логи туда же.
+
+imports — python -X importtime: накопленное время импорта каждого модуля,
+          который main.py раньше загружал сразу (каждый в своём процессе),
+          и всех вместе в одном процессе.
+startup — import main → окно создано → первая отрисовка (paintEvent окна) →
+          второй этап запуска завершён (каталог, индекс поиска, логгер).
+          eager — то же, но все модули и логгер загружаются до создания окна,
+          как было до отложенного запуска.
+
+  python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Импорты, которые main.py делал на уровне модуля до отложенного запуска
+EAGER_MODULES = ["re", "ctypes", "system_checks", "structured_output", "history_dialog", "log_viewer",
+                 "log_reader", "command_search", "command_list", "logger", "admin_check", "commands"]
+IMPORT_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def child_env():
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def import_time(modules, cwd):
+    """Накопленное время импорта (мс) модулей верхнего уровня или None при ошибке импорта."""
+    code = "".join(f"import {m}\n" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=child_env(),
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    total = 0
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE_RE.match(line)
+        if match and len(match.group(3)) == 1:
+            total += int(match.group(2))  # только модули верхнего уровня, без вложенных
+    return total / 1000
+
+
+def run_child(mode, cwd):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode], cwd=cwd,
+                          env=child_env(), capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "ошибка")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def child(mode):
+    """Дочерний процесс: отметки времени от начала скрипта, в мс, одной строкой JSON."""
+    t0 = time.perf_counter()
+    marks = {}
+
+    def mark(name):
+        marks[name] = round((time.perf_counter() - t0) * 1000, 2)
+
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+    mark("qt_import")
+    if mode == "eager":
+        for name in EAGER_MODULES:
+            __import__(name)
+        import logger
+        logger.setup_logger()
+        logger.setup_logger = lambda *a, **k: None  # уже настроен, как в прежнем __main__
+    import main
+    mark("main_import")
+    app = QApplication([])
+    window = main.SystemCheckApp()
+    mark("window_built")
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and "first_paint" not in marks:
+                mark("first_paint")
+            return False
+
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    finish = window.finish_startup
+
+    def finish_and_quit():
+        finish()
+        mark("ready")
+        QTimer.singleShot(0, app.quit)
+
+    window.finish_startup = finish_and_quit
+    QTimer.singleShot(10000, app.quit)
+    window.show()
+    app.exec_()
+    print(json.dumps(marks))
+    sys.stdout.flush()
+    os._exit(0)  # без atexit: завершение пула и логгера не входит в замер
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--child", choices=("lazy", "eager"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory() as cwd:
+        print("Импорт (накопленное время, медиана, мс):")
+        importable = []
+        for module in EAGER_MODULES + ["main"]:
+            samples = [import_time([module], cwd) for _ in range(args.runs)]
+            if None in samples:
+                print(f"  {module:18} не импортируется (нет PyQt5?)")
+                continue
+            print(f"  {module:18} {statistics.median(samples):8.1f}")
+            if module in EAGER_MODULES:
+                importable.append(module)
+        # Общие зависимости в одном процессе считаются один раз
+        together = [import_time(importable, cwd) for _ in range(args.runs)]
+        label = "всё вместе" if len(importable) == len(EAGER_MODULES) else "всё без Qt"
+        print(f"  {label:18} {statistics.median(together):8.1f}")
+
+        try:
+            import PyQt5  # noqa: F401
+        except ImportError:
+            print("\nPyQt5 не установлен — замер окна пропущен.")
+            return
+        print("\nЗапуск окна (offscreen, медиана, мс от начала процесса python):")
+        print(f"{'режим':6} {'импорт Qt':>10} {'import main':>12} {'окно':>8} {'отрисовка':>10} {'готово':>8} {'процесс':>8}")
+        for mode in ("eager", "lazy"):
+            runs = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                marks = run_child(mode, cwd)
+                marks["wall"] = (time.perf_counter() - start) * 1000
+                runs.append(marks)
+            med = {k: statistics.median(r.get(k, float("nan")) for r in runs)
+                   for k in ("qt_import", "main_import", "window_built", "first_paint", "ready", "wall")}
+            print(f"{mode:6} {med['qt_import']:10.1f} {med['main_import']:12.1f} {med['window_built']:8.1f} "
+                  f"{med['first_paint']:10.1f} {med['ready']:8.1f} {med['wall']:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Пропускная способность чтения вывода дочернего процесса.
+
+legacy — прежний CommandWorker: readline() по stdout до EOF, затем stderr,
+         декодирование и отправка каждой строки отдельно.
+drain  — stream_reader.drain: оба пайпа одновременно блоками по 64 КиБ,
+         декодирование и отправка кусками целых строк.
+
+С болтливым stderr прежний способ блокируется (пайп stderr переполняется, пока
+читается stdout), поэтому он запускается со сторожевым таймером.
+
+  python benchmarks/bench_stream.py --mb 200 --err-mb 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stream_reader import drain  # noqa: E402
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+
+
+def spawn(mb, err_mb):
+    # stderr пишется первым — как DISM/pnputil, которые шумят в stderr до основного вывода
+    code = f"spewerr {err_mb}; spew {mb}" if err_mb else f"spew {mb}"
+    return subprocess.Popen([sys.executable, FAKE, "-Command", code],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def legacy(process):
+    counter = [0, 0]
+
+    def emit(text, is_stderr):
+        counter[1] += 1
+
+    for line in iter(process.stdout.readline, b""):
+        counter[0] += len(line)
+        emit(line.decode("cp1251", errors="replace"), False)
+    for line in iter(process.stderr.readline, b""):
+        counter[0] += len(line)
+        emit(line.decode("cp1251", errors="replace"), True)
+    process.wait()
+    print(f"        отправок в GUI: {counter[1]}")
+    return counter[0]
+
+
+def streamed(process):
+    counter = [0, 0]
+
+    def on_chunk(data, is_stderr):
+        counter[0] += len(data)
+        counter[1] += 1
+        data.decode("cp1251", errors="replace")
+
+    drain(process, on_chunk)
+    process.wait()
+    print(f"        отправок в GUI: {counter[1]}")
+    return counter[0]
+
+
+def measure(label, reader, mb, err_mb, watchdog):
+    process = spawn(mb, err_mb)
+    timer = threading.Timer(watchdog, process.kill)
+    timer.start()
+    start = time.perf_counter()
+    total = reader(process)
+    elapsed = time.perf_counter() - start
+    timer.cancel()
+    expected = (mb + err_mb) * (1024 * 1024 // 100) * 100
+    if total < expected:
+        print(f"{label:<7} STALLED: прочитано {total / 2**20:.1f} из {expected / 2**20:.1f} МиБ за {elapsed:.1f} с")
+        return
+    print(f"{label:<7} {total / 2**20:8.1f} МиБ за {elapsed:6.2f} с = {total / 2**20 / elapsed:8.1f} МиБ/с")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mb", type=int, default=200, help="Объём stdout, МиБ")
+    ap.add_argument("--err-mb", type=int, default=0, help="Объём stderr, МиБ")
+    ap.add_argument("--watchdog", type=float, default=30.0, help="Предел для legacy-чтения, сек")
+    args = ap.parse_args()
+    measure("legacy", legacy, args.mb, args.err_mb, args.watchdog)
+    measure("drain", streamed, args.mb, args.err_mb, args.watchdog * 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Объём и стоимость разбора: текст Format-Table (Out-String -Width 4096) против JSON/CSV-проекции.
+
+Сначала разбирает записанные фикстуры из benchmarks/fixtures, затем сравнивает
+синтетический список из --rows строк во всех представлениях.
+
+  python benchmarks/bench_structured.py --rows 20000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from structured_output import parse_csv_records, parse_json_records, render_records  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def check_fixtures():
+    for name in sorted(os.listdir(FIXTURES)):
+        path = os.path.join(FIXTURES, name)
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        if name.endswith(".json"):
+            records = parse_json_records(text)
+        elif name.endswith(".csv"):
+            records = parse_csv_records(text)
+        else:
+            continue
+        render_records(records)
+        print(f"fixture {name:<22} records={len(records)}")
+
+
+def synthetic(rows):
+    # Длина имени меняется, как у реальных устройств: -AutoSize выравнивает по самому длинному
+    records = [{"DeviceName": f"Устройство PCI {i:06d} " + "Controller " * (i % 7),
+                "DriverVersion": f"10.0.{i % 997}.{i % 31}", "Signed": bool(i % 2)} for i in range(rows)]
+    table = render_records(records)
+    # Format-Table под Out-String -Width 4096 дополняет строки пробелами до ширины колонок
+    width = max(len(line) for line in table.splitlines())
+    table_text = "\r\n".join(line.ljust(width) for line in table.splitlines()) + "\r\n"
+    json_text = json.dumps(records, ensure_ascii=False, separators=(",", ":"))
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=list(records[0]), quoting=csv.QUOTE_ALL)
+    writer.writeheader()
+    writer.writerows(records)
+    return table_text.encode("utf-8"), json_text.encode("utf-8"), buf.getvalue().encode("utf-8")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=20000)
+    args = ap.parse_args()
+
+    check_fixtures()
+    table_bytes, json_bytes, csv_bytes = synthetic(args.rows)
+    print(f"table text: {len(table_bytes) / 1024:10.1f} KiB")
+    print(f"json:       {len(json_bytes) / 1024:10.1f} KiB  ({len(json_bytes) / len(table_bytes):.0%} of text)")
+    print(f"csv:        {len(csv_bytes) / 1024:10.1f} KiB  ({len(csv_bytes) / len(table_bytes):.0%} of text)")
+
+    for label, parser, data in (("json", parse_json_records, json_bytes), ("csv", parse_csv_records, csv_bytes)):
+        start = time.perf_counter()
+        records = parser(data.decode("utf-8"))
+        parse_time = time.perf_counter() - start
+        print(f"parse {label:<4}: {parse_time * 1000:8.1f} ms ({len(records) / parse_time:,.0f} records/s)")
+    start = time.perf_counter()
+    render_records(records)
+    render_time = time.perf_counter() - start
+    print(f"render:      {render_time * 1000:8.1f} ms (only when shown to a human)")
+
+
+if __name__ == "__main__":
+    main()
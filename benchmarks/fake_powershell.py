@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Заменитель PowerShell для проверки и замеров на Linux.
+
+Два режима:
+  fake_powershell.py [--startup-delay S]                 # хост пула (построчный протокол)
+  fake_powershell.py [--startup-delay S] -Command "..."  # одна команда, как powershell -Command
+
+В режиме -Command обёртка из system_checks._build_powershell_command (преамбула
+и "& { ... | Out-String -Width N }") снимается, поэтому заменитель можно положить
+в PATH под именем powershell.exe (см. write_shim) и запускать через launch_command.
+
+Команда — мини-язык, инструкции разделяются ';':
+  echo TEXT        строка в stdout
+  error TEXT       строка в stderr (код возврата 1)
+  emit N [WIDTH]   N строк шириной WIDTH
+  emiterr N [WIDTH] то же в stderr
+  emitru N         N строк с кириллицей (как вывод Get-Service на русской Windows)
+  trickle N SEC    N строк с паузой SEC после каждой (медленный вывод)
+  encoding NAME    дальнейший вывод в кодировке NAME: utf-8, utf-8-sig, cp866, cp1251, utf-16-le
+  spew MB          MB мегабайт готовыми блоками строк (для замеров пропускной способности)
+  spewerr MB       то же в stderr
+  sleep SEC        пауза
+  exit RC          код возврата
+  crash            аварийное завершение процесса
+  hang             зависание
+  pidfile PATH     дописать свой pid в PATH; потомки tree делают то же
+  tree N DEPTH [setsid]  запустить N потомков, у каждого ещё N, DEPTH уровней; все висят.
+                   С -Command они наследуют stdout/stderr (держат пайпы, как chkdsk под
+                   PowerShell); setsid уводит первый уровень в свою сессию
+  setsid           уйти в новую сессию (вне группы процессов запустившего)
+Всё прочее (например, настоящие команды каталога) просто повторяется в stdout.
+"""
+import base64
+import os
+import re
+import stat
+import subprocess
+import sys
+import time
+
+WRAPPED_RE = re.compile(r"&\s*\{\s*(.*?)\s*\|\s*Out-String[^}]*\}\s*$", re.S)
+
+
+def _emit(write, arg):
+    parts = arg.split()
+    count = int(parts[0])
+    width = int(parts[1]) if len(parts) > 1 else 80
+    tail = "x" * width
+    block = 4096
+    for base in range(0, count, block):
+        write("\n".join(f"{i:08d} {tail}" for i in range(base, min(count, base + block))))
+
+
+def _emit_ru(write, arg):
+    count = int(arg)
+    block = 4096
+    for base in range(0, count, block):
+        write("\n".join(f"Служба {i:06d}  Выполняется  Автоматически  Сетевая служба (узел {i})"
+                        for i in range(base, min(count, base + block))))
+
+
+def _trickle(write, arg):
+    parts = arg.split()
+    for i in range(int(parts[0])):
+        write(f"{i:08d} {time.time():.6f}")
+        time.sleep(float(parts[1]))
+
+
+_BLOCK = ("x" * 99 + "\n") * (1024 * 1024 // 100)
+
+
+def _spew(write, arg):
+    for _ in range(int(arg)):
+        write(_BLOCK[:-1])
+
+
+def _tree(arg, state):
+    parts = arg.split()
+    count, depth = int(parts[0]), int(parts[1])
+    if depth <= 0:
+        return
+    pidfile = state.get("pidfile")
+    code = (f"pidfile {pidfile}; " if pidfile else "") + ("setsid; " if "setsid" in parts[2:] else "")
+    code += f"tree {count} {depth - 1}; hang"
+    # В режиме хоста вывод потомков не должен попасть в кадры протокола
+    output = None if state.get("inherit") else subprocess.DEVNULL
+    for _ in range(count):
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "-Command", code],
+                         stdin=subprocess.DEVNULL, stdout=output, stderr=output)
+
+
+def unwrap(code):
+    """Снимает преамбулу и обёртку Out-String, которые добавляет запуск отдельным процессом."""
+    match = WRAPPED_RE.search(code)
+    return match.group(1) if match else code
+
+
+def execute(code, write_out, write_err, state=None):
+    """
+    Выполняет мини-язык; write_out/write_err принимают текст без завершающего перевода строки.
+    state — общий с писателями словарь, в нём инструкция encoding меняет кодировку вывода.
+    """
+    rc = 0
+    for stmt in code.split(";"):
+        stmt = stmt.strip()
+        if not stmt:
+            continue
+        op, _, arg = stmt.partition(" ")
+        if op == "echo":
+            write_out(arg)
+        elif op == "error":
+            write_err(arg)
+            rc = rc or 1
+        elif op == "emit":
+            _emit(write_out, arg)
+        elif op == "emiterr":
+            _emit(write_err, arg)
+        elif op == "emitru":
+            _emit_ru(write_out, arg)
+        elif op == "trickle":
+            _trickle(write_out, arg)
+        elif op == "encoding" and state is not None:
+            state["encoding"] = arg.strip()
+        elif op == "spew":
+            _spew(write_out, arg)
+        elif op == "spewerr":
+            _spew(write_err, arg)
+        elif op == "sleep":
+            time.sleep(float(arg))
+        elif op == "exit":
+            rc = int(arg)
+        elif op == "crash":
+            os._exit(3)
+        elif op == "pidfile" and state is not None:
+            state["pidfile"] = arg.strip()
+            with open(state["pidfile"], "a", encoding="ascii") as f:
+                f.write(f"{os.getpid()}\n")
+        elif op == "tree":
+            _tree(arg, state if state is not None else {})
+        elif op == "setsid":
+            os.setsid()
+        elif op == "hang":
+            while True:
+                time.sleep(3600)
+        else:
+            write_out(stmt)
+    return rc
+
+
+def _writer(stream, state):
+    def write(text):
+        stream.write((text + "\n").encode(state["encoding"]))
+        if state["encoding"] == "utf-8-sig":
+            state["encoding"] = "utf-8"  # BOM только в начале потока
+        stream.flush()
+    return write
+
+
+def write_shim(directory, name="powershell.exe"):
+    """
+    Кладёт в directory исполняемый файл name, запускающий этот заменитель (только POSIX).
+    Если добавить directory в начало PATH, launch_command в режиме "spawn" пойдёт в него.
+    """
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def serve(stdin, stdout):
+    stdout.write(b"@@SCP:READY@@\n")
+    stdout.flush()
+    for raw in stdin:
+        line = raw.decode("ascii").strip()
+        if " " not in line:
+            continue
+        request_id, payload = line.split(" ", 1)
+        code = base64.b64decode(payload).decode("utf-8")
+        err = []
+        state = {"encoding": "utf-8"}
+        stdout.write(f"@@SCP:BEGIN:{request_id}@@\n".encode("ascii"))
+        stdout.flush()
+        # stdout идёт в кадр сразу, stderr — после маркера STDERR
+        rc = execute(code, _writer(stdout, state), err.append, state)
+        stdout.write(f"@@SCP:STDERR:{request_id}@@\n".encode("ascii"))
+        if err:
+            stdout.write(("\n".join(err) + "\n").encode("utf-8"))
+        stdout.write(f"@@SCP:END:{request_id}:{rc}@@\n".encode("ascii"))
+        stdout.flush()
+
+
+def main(argv):
+    args = list(argv)
+    if "--startup-delay" in args:
+        idx = args.index("--startup-delay")
+        time.sleep(float(args[idx + 1]))
+        del args[idx:idx + 2]
+    if "-Command" in args:
+        code = unwrap(args[args.index("-Command") + 1])
+        state = {"encoding": "utf-8", "inherit": True}
+        rc = execute(code, _writer(sys.stdout.buffer, state), _writer(sys.stderr.buffer, state), state)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        return rc
+    serve(sys.stdin.buffer, sys.stdout.buffer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
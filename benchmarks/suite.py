@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Набор замеров горячих путей выполнения и отрисовки, с базовой линией и поиском регрессий.
+
+Работает на Linux без Windows. Вместо PowerShell используется benchmarks/fake_powershell.py:
+он служит хостом пула и лежит в PATH под именем powershell.exe для запуска отдельным
+процессом. Qt замеряется в дочернем процессе на платформе offscreen. Рабочая папка
+временная: история, метрики, снимки, логи и QSettings пишутся туда.
+
+Группы (--only):
+  spawn   launch_command отдельным процессом: задержка запуска до выхода (collect_output),
+          время до первого байта (stream_output), поток stream_output и collect_output
+  pool    то же через тёплый хост пула
+  exec    прямой запуск по argv без оболочки: задержка — настоящая утилита (echo ok, как arp -a),
+          остальное — заменитель напрямую, без sh; сравните exec.latency со spawn.latency
+  cancel  отмена проверки с деревом из 7 висящих потомков (spawn, exec, pool): время от kill()
+          до возврата stream_output; выживший процесс дерева — ошибка
+  decode  _decode_output и StreamDecoder блоками по 64 КиБ на UTF-8, cp866, cp1251 и
+          UTF-16LE без BOM; сквозной прогон emitru в каждой кодировке со сверкой текста
+  search  CommandSearchIndex: построение и запросы по каталогу из --commands записей
+  qt      CommandWorker.run, SystemCheckApp.append_stream, on_stream_progress и
+          refresh_command_list (нужен PyQt5, иначе группа пропускается)
+
+Метрика — медиана --repeat замеров. С --save результат записывается как базовая линия
+(JSON, по умолчанию benchmarks/baseline.json). Без --save результат сравнивается с ней.
+Регрессия — метрика хуже базовой больше чем на --tolerance и больше разброса замеров.
+Базовая линия имеет смысл только для той же машины и тех же параметров.
+Код выхода: 0 — регрессий нет, 1 — регрессия или неверный результат, 2 — ошибка запуска.
+
+  python benchmarks/suite.py --save
+  python benchmarks/suite.py
+  python benchmarks/suite.py --only spawn pool --tolerance 0.3 --output current.json
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_powershell import write_shim  # noqa: E402  (папка скрипта уже в sys.path)
+
+FAKE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_powershell.py")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+GROUPS = ("spawn", "pool", "exec", "cancel", "decode", "search", "qt")
+ENCODINGS = ("utf-8", "cp866", "cp1251", "utf-16-le")
+FORMAT_VERSION = 1
+# Полный и быстрый наборы: объёмы в МБ, строки, размер каталога
+SIZES = {
+    "full": {"stream_mb": 64, "decode_mb": 16, "ui_lines": 20000, "worker_lines": 50000, "commands": 5000},
+    "quick": {"stream_mb": 8, "decode_mb": 4, "ui_lines": 2000, "worker_lines": 5000, "commands": 1000},
+}
+
+
+class Results:
+    """Метрики одного прогона: имя → замеры, единица и направление «лучше»."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.errors = []
+        self.skipped = {}
+
+    def add(self, name, samples, unit, better="lower"):
+        samples = [float(s) for s in samples]
+        self.metrics[name] = {
+            "median": statistics.median(samples),
+            "mad": statistics.median(abs(s - statistics.median(samples)) for s in samples),
+            "min": min(samples),
+            "max": max(samples),
+            "samples": [round(s, 4) for s in samples],
+            "unit": unit,
+            "better": better,
+        }
+
+    def check(self, ok, message):
+        if not ok:
+            self.errors.append(message)
+
+
+def repeat(fn, times):
+    return [fn() for _ in range(times)]
+
+
+def elapsed_ms(fn):
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def best_ms(fn, inner=3):
+    # Для коротких замеров в памяти, как timeit: сборщик мусора выключен, берётся лучший
+    # из нескольких запусков — так меньше влияние соседей по машине
+    gc.collect()
+    gc.disable()
+    try:
+        return min(elapsed_ms(fn) for _ in range(inner))
+    finally:
+        gc.enable()
+
+
+# --- Выполнение: отдельный процесс и пул ---------------------------------------------------
+
+def exec_launcher(code):
+    """launch_command с argv: утилита для задержки, заменитель — для остальных замеров."""
+    from system_checks import launch_command
+    argv = code.split() if code == "echo ok" else [sys.executable, FAKE, "-Command", code]
+    return launch_command(code, argv=argv)
+
+
+def bench_execution(results, prefix, args, sizes, launch_command=None):
+    from system_checks import collect_output, stream_output
+    if launch_command is None:
+        from system_checks import launch_command
+
+    def latency():
+        start = time.perf_counter()
+        result = collect_output(launch_command("echo ok"), timeout=60)
+        results.check(result["stdout"] == "ok", f"{prefix}: неверный вывод echo: {result['stdout']!r}")
+        return (time.perf_counter() - start) * 1000
+
+    def first_byte():
+        marks = []
+        start = time.perf_counter()
+        process = launch_command("echo first; sleep 0.2; echo done")
+        stream_output(process, on_chunk=lambda text, is_stderr: marks.append(time.perf_counter()), timeout=60)
+        return (marks[0] - start) * 1000 if marks else float("nan")
+
+    def throughput(streamed):
+        mb = sizes["stream_mb"]
+        size = [0]
+
+        def run():
+            process = launch_command(f"spew {mb}")
+            if streamed:
+                result = stream_output(process, on_chunk=lambda text, is_stderr: None, timeout=600)
+            else:
+                result = collect_output(process, timeout=600)
+            size[0] = len(result["stdout"])
+
+        seconds = elapsed_ms(run) / 1000
+        results.check(size[0] >= mb * 1000 * 1000, f"{prefix}: вывод spew {mb} обрезан ({size[0]} символов)")
+        return mb / seconds
+
+    latency()  # прогрев: кэш файлов интерпретатора, хосты пула
+    results.add(f"{prefix}.latency", repeat(latency, args.repeat), "мс")
+    results.add(f"{prefix}.first_byte", repeat(first_byte, args.repeat), "мс")
+    results.add(f"{prefix}.stream", repeat(lambda: throughput(True), args.repeat), "МБ/с", "higher")
+    results.add(f"{prefix}.collect", repeat(lambda: throughput(False), args.repeat), "МБ/с", "higher")
+
+
+# --- Отмена --------------------------------------------------------------------------------
+
+def bench_cancel(results, args, workdir):
+    from bench_cancel import cancel_tree, launch_tree
+
+    for mode in ("spawn", "exec", "pool"):
+        samples = []
+        for cycle in range(args.repeat):
+            pidfile = os.path.join(workdir, f"cancel-{mode}-{cycle}.pids")
+            process, pids = launch_tree(mode, pidfile, 2, 2)
+            latency, result, alive = cancel_tree(process, pids)
+            samples.append(latency * 1000)
+            results.check(not alive, f"cancel.{mode}: после отмены живы процессы дерева {alive}")
+        results.add(f"cancel.{mode}", samples, "мс")
+
+
+# --- Декодирование --------------------------------------------------------------------------
+
+def make_text(mb):
+    line_count = mb * 1024 * 1024 // 72
+    return "\n".join(f"Служба {i:06d}  Выполняется  Автоматически  Сетевая служба (узел {i})"
+                     for i in range(line_count)) + "\n"
+
+
+def bench_decode(results, args, sizes):
+    from output_decoding import StreamDecoder
+    from system_checks import _decode_output, collect_output, launch_command, set_execution_mode
+
+    text = make_text(sizes["decode_mb"])
+    for encoding in ENCODINGS:
+        raw = text.encode(encoding)
+        mb = len(raw) / 2 ** 20
+        decoded = [None]
+
+        def whole():
+            decoded[0] = _decode_output(raw)
+
+        def streamed():
+            decoder = StreamDecoder()
+            parts = [decoder.decode(raw[i:i + 65536]) for i in range(0, len(raw), 65536)]
+            parts.append(decoder.flush())
+            decoded[0] = "".join(parts)
+
+        label = encoding.replace("-", "")
+        results.add(f"decode.whole.{label}", [mb / (best_ms(whole) / 1000) for _ in range(args.repeat)],
+                    "МБ/с", "higher")
+        results.check(decoded[0] == text, f"decode: _decode_output неверно декодирует {encoding}")
+        results.add(f"decode.stream.{label}", [mb / (best_ms(streamed) / 1000) for _ in range(args.repeat)],
+                    "МБ/с", "higher")
+        results.check(decoded[0] == text, f"decode: StreamDecoder неверно декодирует {encoding}")
+
+    # Сквозная проверка: байты в кодировке консоли проходят через процесс и collect_output
+    set_execution_mode("spawn")
+    expected = make_text(1).splitlines()[:2000]
+    for encoding in ENCODINGS:
+        result = collect_output(launch_command(f"encoding {encoding}; emitru 2000"), timeout=60)
+        results.check(result["stdout"].splitlines() == expected,
+                      f"decode: вывод в {encoding} через launch_command декодирован неверно")
+
+
+# --- Поиск ----------------------------------------------------------------------------------
+
+def bench_search(results, args, sizes):
+    from bench_search import QUERIES, make_catalog
+    from command_search import CommandSearchIndex
+
+    catalog = make_catalog(sizes["commands"], random.Random(1))
+    index = [None]
+
+    def build():
+        index[0] = CommandSearchIndex(catalog)
+
+    results.add("search.build", [best_ms(build) for _ in range(args.repeat)], "мс")
+    results.add("search.queries", [best_ms(lambda: [index[0].search(q) for _, q in QUERIES])
+                                   for _ in range(args.repeat)], "мс")
+    word = "проверка драйверов"
+    results.add("search.typing", [best_ms(lambda: [index[0].search(word[:n]) for n in range(1, len(word) + 1)])
+                                  for _ in range(args.repeat)], "мс")
+
+
+# --- Qt (дочерний процесс) ------------------------------------------------------------------
+
+def qt_child(args, sizes):
+    """Замеры Qt в отдельном процессе; результат — одна строка JSON в конце stdout."""
+    results = Results()
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError:
+        print(json.dumps({"skipped": "PyQt5 не установлен"}))
+        return
+    from system_checks import configure_pool, set_execution_mode
+    import main
+
+    app = QApplication([])
+    set_execution_mode("pool")
+    configure_pool(host_argv=[sys.executable, FAKE], size=2).warm_up()
+
+    lines = sizes["worker_lines"]
+    chunks = []
+
+    def worker_run():
+        chunks.clear()
+        worker = main.CommandWorker(f"emit {lines}", "Замер")
+        worker.progress.connect(lambda text, is_stderr: chunks.append(text))
+        done = []
+        worker.finished.connect(lambda name, result: done.append(result))
+        start = time.perf_counter()
+        worker.run()  # в текущем потоке: замеряется сама работа, без планирования QThread
+        seconds = time.perf_counter() - start
+        results.check(done and done[0]["returncode"] == 0, "qt: CommandWorker.run завершился с ошибкой")
+        return lines / seconds
+
+    worker_run()
+    results.add("qt.worker_run", repeat(worker_run, args.repeat), "строк/с", "higher")
+
+    window = main.SystemCheckApp()
+    window.show()
+    deadline = time.monotonic() + 30
+    while not window.startup_done and time.monotonic() < deadline:
+        app.processEvents()  # второй этап запуска — как у пользователя, после первой отрисовки
+    count = sizes["ui_lines"]
+    text = [f"{i:08d} Обработка компонента {'x' * 60}\n" for i in range(count)]
+
+    def append_stream():
+        window.clear_output()
+        start = time.perf_counter()
+        for i, line in enumerate(text):
+            window.append_stream(line, i % 50 == 0)
+        app.processEvents()
+        return (time.perf_counter() - start) * 1e6 / count
+
+    def stream_progress():
+        window.clear_output()
+        start = time.perf_counter()
+        for i, line in enumerate(text):
+            window.on_stream_progress(line, i % 50 == 0)
+            app.processEvents()
+        window.flush_output()
+        app.processEvents()
+        return count / (time.perf_counter() - start)
+
+    results.add("qt.append_stream", repeat(append_stream, args.repeat), "мкс/строку")
+    results.add("qt.stream_progress", repeat(stream_progress, args.repeat), "строк/с", "higher")
+
+    queries = ["драйв", "служб", "брандм", "lbcr", "пользоватль", ""]
+
+    def refresh():
+        start = time.perf_counter()
+        for query in queries:
+            window.search_input.blockSignals(True)  # без отложенного поиска по таймеру
+            window.search_input.setText(query)
+            window.search_input.blockSignals(False)
+            window.refresh_command_list()
+        return (time.perf_counter() - start) * 1000 / len(queries)
+
+    results.add("qt.refresh_command_list", repeat(refresh, args.repeat), "мс")
+    print(json.dumps({"metrics": results.metrics, "errors": results.errors}, ensure_ascii=False))
+
+
+def bench_qt(results, args, sizes, workdir):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", XDG_CONFIG_HOME=os.path.join(workdir, "config"))
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    argv = [sys.executable, os.path.abspath(__file__), "--child-qt", "--repeat", str(args.repeat)]
+    if args.quick:
+        argv.append("--quick")
+    proc = subprocess.run(argv, cwd=workdir, env=env, capture_output=True, text=True, timeout=1800)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        tail = proc.stderr.strip().splitlines()
+        results.errors.append(f"qt: дочерний процесс завершился с ошибкой: {tail[-1] if tail else proc.returncode}")
+        return
+    data = json.loads(lines[-1])
+    if "skipped" in data:
+        results.skipped["qt"] = data["skipped"]
+        return
+    results.metrics.update(data["metrics"])
+    results.errors.extend(data["errors"])
+
+
+# --- Базовая линия --------------------------------------------------------------------------
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "node": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Строки отчёта (имя, текущее, базовое, изменение, статус) и число регрессий."""
+    rows, regressions = [], 0
+    for name, metric in current["metrics"].items():
+        base = baseline["metrics"].get(name) if baseline else None
+        if base is None or not base["median"]:
+            rows.append((name, metric, None, None, "новая" if baseline else ""))
+            continue
+        change = (metric["median"] - base["median"]) / base["median"]
+        worse = change if metric["better"] == "lower" else -change
+        # Разница меньше разброса замеров — шум, а не регрессия
+        noise = 3 * max(base["mad"], metric["mad"]) / abs(base["median"])
+        threshold = max(tolerance, noise)
+        if worse > threshold:
+            status = "РЕГРЕССИЯ"
+            regressions += 1
+        elif -worse > threshold:
+            status = "лучше"
+        else:
+            status = "ok"
+        rows.append((name, metric, base, change, status))
+    return rows, regressions
+
+
+def print_report(rows):
+    print(f"{'метрика':28} {'сейчас':>12} {'база':>12} {'':12} {'изм.':>8}  статус")
+    for name, metric, base, change, status in rows:
+        base_text = f"{base['median']:12.2f}" if base else f"{'—':>12}"
+        change_text = f"{change:+8.1%}" if change is not None else f"{'':8}"
+        print(f"{name:28} {metric['median']:12.2f} {base_text} {metric['unit']:12} {change_text}  {status}")
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    print(f"Записано: {path}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", nargs="+", choices=GROUPS, help="только эти группы")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--quick", action="store_true", help="малые объёмы, для быстрой проверки")
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="файл базовой линии")
+    ap.add_argument("--save", action="store_true", help="записать результат как базовую линию")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение (доля, по умолчанию 0.2)")
+    ap.add_argument("--output", help="записать результат этого прогона в JSON")
+    ap.add_argument("--child-qt", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    sizes = SIZES["quick" if args.quick else "full"]
+    if args.child_qt:
+        qt_child(args, sizes)
+        sys.stdout.flush()
+        os._exit(0)  # без atexit: завершение пула и логгера не входит в замер
+    if os.name == "nt":
+        ap.error("набор рассчитан на POSIX: заменитель powershell.exe кладётся в PATH как сценарий sh")
+
+    args.baseline = os.path.abspath(args.baseline)
+    args.output = args.output and os.path.abspath(args.output)
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != FORMAT_VERSION:
+            ap.error(f"{args.baseline}: неизвестная версия формата {baseline.get('version')}")
+
+    # Временная папка удаляется последней: atexit system_checks (закрытие пула и баз) отработает раньше
+    workdir = tempfile.mkdtemp(prefix="scp-bench-")
+    atexit.register(shutil.rmtree, workdir, True)
+    shim_dir = os.path.join(workdir, "bin")
+    os.makedirs(shim_dir)
+    write_shim(shim_dir)
+    os.environ["PATH"] = shim_dir + os.pathsep + os.environ.get("PATH", "")
+    os.chdir(workdir)
+
+    import system_checks
+    groups = args.only or GROUPS
+    results = Results()
+    started = time.perf_counter()
+    for group in groups:
+        print(f"[{group}] ...", file=sys.stderr)
+        if group == "spawn":
+            system_checks.set_execution_mode("spawn")
+            bench_execution(results, "spawn", args, sizes)
+        elif group == "pool":
+            system_checks.configure_pool(host_argv=[sys.executable, FAKE], size=2).warm_up()
+            system_checks.set_execution_mode("pool")
+            bench_execution(results, "pool", args, sizes)
+        elif group == "exec":
+            bench_execution(results, "exec", args, sizes, launch_command=exec_launcher)
+        elif group == "cancel":
+            system_checks.configure_pool(host_argv=[sys.executable, FAKE], size=2).warm_up()
+            bench_cancel(results, args, workdir)
+        elif group == "decode":
+            bench_decode(results, args, sizes)
+        elif group == "search":
+            bench_search(results, args, sizes)
+        elif group == "qt":
+            bench_qt(results, args, sizes, workdir)
+
+    current = {
+        "version": FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "options": {"repeat": args.repeat, "quick": args.quick, **sizes},
+        "metrics": results.metrics,
+    }
+    rows, regressions = compare(current, None if args.save else baseline, args.tolerance)
+    print_report(rows)
+    print(f"\nГрупп: {len(groups)}, метрик: {len(results.metrics)}, за {time.perf_counter() - started:.1f} с")
+    for group, reason in results.skipped.items():
+        print(f"Пропущено: {group} — {reason}")
+    if baseline is not None and not args.save:
+        if baseline["machine"].get("node") != current["machine"]["node"]:
+            print(f"Внимание: базовая линия снята на другой машине ({baseline['machine'].get('node')})")
+        if baseline.get("options") != current["options"]:
+            print("Внимание: параметры прогона отличаются от базовой линии, сравнение условное")
+        print(f"Регрессий: {regressions} (порог {args.tolerance:.0%}, база {args.baseline}, "
+              f"коммит {baseline['machine'].get('commit') or '?'})")
+    for message in results.errors:
+        print(f"ОШИБКА: {message}")
+
+    if args.output:
+        write_json(args.output, current)
+    if args.save:
+        if baseline is not None and args.only:
+            # Частичный прогон обновляет только свои метрики в базовой линии
+            current = dict(current, metrics=dict(baseline["metrics"], **current["metrics"]))
+        write_json(args.baseline, current)
+    sys.exit(1 if regressions or results.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,12 @@ Usage examples:
   python build.py --name MyApp     # custom exe name
   python build.py --target gui.py  # build from another entry point
   python build.py --clean          # clean build/ and dist/ before building
+  python build.py --mode onedir    # folder build: dist/SystemCheckPy/SystemCheckPy.exe, no unpacking on launch
+  python build.py --mode onedir --zip   # ... plus dist/SystemCheckPy.zip for distribution
+  python build.py --runtime-tmpdir "%LOCALAPPDATA%\\SystemCheckPy"  # onefile, unpack there instead of %TEMP%
+
+A onefile EXE unpacks Python, Qt and all modules into a temp folder on every launch,
+which costs seconds before the window appears. onedir skips that step.
 """
 
 import argparse
@@ -63,9 +69,11 @@ def build(args):
         "pyinstaller",
         "--noconfirm",
         "--clean",
-        "--onefile",
+        "--onedir" if args.mode == "onedir" else "--onefile",
         "--name", name,
     ]
+    if args.runtime_tmpdir and args.mode == "onefile":
+        pyi_args += ["--runtime-tmpdir", args.runtime_tmpdir]
 
     if not args.console:
         pyi_args.append("--windowed")
@@ -77,9 +85,15 @@ def build(args):
         print("PyInstaller failed with exit code", code)
         sys.exit(code)
 
-    exe_path = DIST / f"{name}.exe"
+    if args.mode == "onedir":
+        exe_path = DIST / name / f"{name}.exe"
+    else:
+        exe_path = DIST / f"{name}.exe"
     if exe_path.exists():
         print("Build finished. EXE path:", exe_path)
+        if args.mode == "onedir" and args.zip:
+            archive = shutil.make_archive(str(DIST / name), "zip", root_dir=DIST, base_dir=name)
+            print("Archive:", archive)
         sys.exit(0)
     else:
         print("Build finished, but EXE not found at:", exe_path)
@@ -97,6 +111,10 @@ def parse_args() -> argparse.Namespace:
     ap.add_argument("--target", help="Entry script (default: main.py)")
     ap.add_argument("--console", action="store_true", help="Build console app (omit --windowed)")
     ap.add_argument("--clean", action="store_true", help="Clean build/, dist/ before building")
+    ap.add_argument("--mode", choices=("onefile", "onedir"), default="onefile",
+                    help="onefile: single EXE unpacked on every launch; onedir: folder, fastest startup")
+    ap.add_argument("--runtime-tmpdir", help="onefile only: unpack to this folder instead of %%TEMP%%")
+    ap.add_argument("--zip", action="store_true", help="onedir only: also pack dist/<name>.zip")
     return ap.parse_args()
 
 
@@ -0,0 +1,169 @@
+# cim_batch.py
+"""
+Несколько CIM-запросов каталога одним вызовом PowerShell с общей CIM-сессией.
+
+Записи вида «Get-CimInstance -ClassName Win32_BIOS | Select-Object ...» независимы друг от
+друга, но «сводка о системе» платила за каждую запуск PowerShell и отдельную CIM-сессию.
+build_script склеивает совместимые команды в один сценарий: одна New-CimSession (если
+создать её не удалось — запросы идут без неё, как раньше), каждый подзапрос в своём
+try/catch с ErrorAction Stop и своим OperationTimeoutSec, поэтому ошибка или зависший класс
+не портят остальные. Вывод каждого подзапроса обрамляется маркерами с неповторяющимся
+токеном:
+
+    ##CIM:<токен>:BEGIN:<номер>:<мс от начала сценария>
+    ...вывод...
+    ##CIM:<токен>:ERROR:<номер>            только при ошибке; дальше — текст ошибки
+    ##CIM:<токен>:END:<номер>:<ok|error>:<мс подзапроса>
+
+split_results разбирает вывод обратно в результаты по подзапросам (как у collect_output) с
+собственным статусом, кодом возврата и временем. Всё пишется через [Console]::Out в порядке
+выполнения — одинаково в отдельном процессе и в хосте пула; маркеры не начинаются с @@SCP:,
+чтобы не путаться с кадрами пула. Сценарий — одна строка без двойных кавычек: он проходит и
+через powershell.exe -Command "...", и через пул.
+"""
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Sequence
+
+from timing import Trace
+
+MARKER = "##CIM:"
+# Подзапросов в одном пакете: длиннее — дольше ждать первый результат
+MAX_BATCH = 16
+# Запас на запуск PowerShell и CIM-сессию сверх суммы таймаутов подзапросов, сек
+BATCH_SLACK = 15
+
+_CIM = re.compile(r"\bGet-CimInstance\b", re.IGNORECASE)
+# Первая команда конвейера — Get-CimInstance, в том числе внутри JSON/CSV-проекции structured_output
+_CIM_HEAD = re.compile(r"^(?:\$__scp = (?:ConvertTo-Json -InputObject )?@\()?Get-CimInstance\s", re.IGNORECASE)
+_UNSAFE = re.compile(r"\bexit\b|-CimSession\b|-ComputerName\b|\"", re.IGNORECASE)
+
+
+def batchable(meta: Dict[str, Any], command: str) -> bool:
+    """
+    Можно ли выполнить команду внутри пакета: один Get-CimInstance в начале конвейера,
+    без своей сессии или удалённого компьютера, без exit и двойных кавычек.
+    "batch": False в записи каталога исключает её.
+    """
+    if meta.get("batch") is False or meta.get("backend") not in (None, "powershell"):
+        return False
+    return (_CIM_HEAD.match(command) is not None and len(_CIM.findall(command)) == 1
+            and _UNSAFE.search(command) is None)
+
+
+def new_token() -> str:
+    return uuid.uuid4().hex
+
+
+def build_script(commands: Sequence[str], token: str, op_timeouts: Sequence[int]) -> str:
+    """Сценарий пакета: подзапросы commands по порядку; op_timeouts — OperationTimeoutSec каждого."""
+    prefix = f"{MARKER}{token}:"
+    parts = [
+        "$ErrorActionPreference = 'Stop'",
+        "$__out = [Console]::Out",
+        "$__clock = [Diagnostics.Stopwatch]::StartNew()",
+        "$__session = $null",
+        "try { $__session = New-CimSession } catch { }",
+    ]
+    for index, (command, seconds) in enumerate(zip(commands, op_timeouts)):
+        query = _CIM.sub("Get-CimInstance @__cim", command, count=1)
+        parts += [
+            f"$__cim = @{{ OperationTimeoutSec = {max(1, int(seconds))} }}",
+            "if ($__session) { $__cim.CimSession = $__session }",
+            f"$__out.WriteLine('{prefix}BEGIN:{index}:' + $__clock.ElapsedMilliseconds)",
+            "$__watch = [Diagnostics.Stopwatch]::StartNew()",
+            f"try {{ $__text = & {{ {query} }} | Out-String -Width 4096; "
+            "if ($__text) { $__out.Write($__text); if (-not $__text.EndsWith([string][char]10)) { $__out.WriteLine() } }; "
+            f"$__out.WriteLine('{prefix}END:{index}:ok:' + $__watch.ElapsedMilliseconds) }} "
+            f"catch {{ $__out.WriteLine('{prefix}ERROR:{index}'); "
+            "$__out.WriteLine(($_ | Out-String -Width 4096).TrimEnd()); "
+            f"$__out.WriteLine('{prefix}END:{index}:error:' + $__watch.ElapsedMilliseconds) }}",
+            "$__out.Flush()",
+        ]
+    parts.append("if ($__session) { try { Remove-CimSession $__session } catch { } }")
+    return "; ".join(parts)
+
+
+def split_output(stdout: str, token: str, count: int) -> List[Dict[str, Any]]:
+    """
+    Вывод пакета → список по подзапросам: {'status': ok | error | incomplete (начат, но не
+    закончен) | not_run, 'stdout', 'stderr', 'begin_ms', 'query_ms'}. Строки вне кадров
+    (предупреждения самого PowerShell) отбрасываются.
+    """
+    prefix = f"{MARKER}{token}:"
+    parts = [{"status": "not_run", "stdout": [], "stderr": [], "begin_ms": None, "query_ms": None}
+             for _ in range(count)]
+    current, in_error = None, False
+    for line in stdout.splitlines():
+        if line.startswith(prefix):
+            fields = line[len(prefix):].split(":")
+            try:
+                kind, index = fields[0], int(fields[1])
+                part = parts[index]
+                if kind == "BEGIN":
+                    current, in_error = index, False
+                    part["status"], part["begin_ms"] = "incomplete", int(fields[2])
+                elif kind == "ERROR":
+                    in_error = True
+                elif kind == "END":
+                    part["status"], part["query_ms"] = fields[2], int(fields[3])
+                    current = None
+                continue
+            except (IndexError, ValueError):
+                pass
+        if current is not None:
+            parts[current]["stderr" if in_error else "stdout"].append(line)
+    for part in parts:
+        part["stdout"] = "\n".join(part["stdout"]).strip()
+        part["stderr"] = "\n".join(part["stderr"]).strip()
+    return parts
+
+
+def _item_trace(batch_trace: Optional[Trace], part: Dict[str, Any]) -> Trace:
+    """Трасса подзапроса: общие этапы пакета (запуск, чтение) и собственное выполнение в хосте."""
+    trace = Trace()
+    if batch_trace is None:
+        return trace
+    trace.origin, trace.started_at = batch_trace.origin, batch_trace.started_at
+    launched = trace.origin
+    for span in batch_trace.to_dict()["spans"]:
+        if span["lane"] == "main":
+            trace.spans.append(dict(span))
+            if span["stage"] == "launch":
+                launched = trace.origin + span["start"] + span["duration"]
+    if part["begin_ms"] is not None and part["query_ms"] is not None:
+        start = launched + part["begin_ms"] / 1000
+        trace.add("query", start, start + part["query_ms"] / 1000, lane="host")
+    trace.usage = dict(batch_trace.usage)
+    return trace
+
+
+def split_results(batch: Dict[str, Any], token: str, count: int) -> List[Dict[str, Any]]:
+    """
+    Результат collect_output для пакета → результаты подзапросов того же вида. Ошибка
+    подзапроса — код 1 и её текст в stderr; подзапрос, на котором пакет прервался (таймаут,
+    отмена, сбой), — код -1 с причиной пакета; не начатые — код -1 «не выполнен».
+    У каждого — 'batch': {'size', 'index', 'status', 'query_ms'} и собственная трасса.
+    """
+    results = []
+    reason = (batch.get("stderr")
+              or f"пакетный запрос завершился с кодом {batch.get('returncode')} без его результата")
+    for index, part in enumerate(split_output(batch.get("stdout") or "", token, count)):
+        status = part["status"]
+        if status == "ok":
+            result = {"stdout": part["stdout"], "stderr": "", "returncode": 0, "timeout": False}
+        elif status == "error":
+            result = {"stdout": part["stdout"], "stderr": part["stderr"], "returncode": 1, "timeout": False}
+        elif status == "incomplete":
+            result = {"stdout": part["stdout"], "stderr": reason, "returncode": -1,
+                      "timeout": bool(batch.get("timeout"))}
+            if batch.get("kill"):
+                result["kill"] = batch["kill"]
+        else:
+            result = {"stdout": "", "stderr": f"Подзапрос не выполнен: {reason}",
+                      "returncode": -1, "timeout": False}
+        result["batch"] = {"size": count, "index": index, "status": status, "query_ms": part["query_ms"]}
+        result["backend"] = batch.get("backend")
+        result["trace"] = _item_trace(batch.get("trace"), part)
+        results.append(result)
+    return results
@@ -0,0 +1,609 @@
+# cli.py
+"""
+Неинтерактивный запуск проверок каталога для сценариев, планировщика и других программ.
+
+  python cli.py list [--tag network] [--format text|jsonl|csv]
+  python cli.py tags
+  python cli.py run "Получить имя хоста" --tag disk -j 4 --timeout 120 --format jsonl
+  python cli.py run "Статус службы по имени" -i Spooler
+  python cli.py run --all --host "python benchmarks/fake_powershell.py"   # без PowerShell (Linux)
+  python cli.py run "Получить установленное ПО" --changes
+  python cli.py monitor --interval 1 --count 60 --format csv --store logs/metrics.tsm
+  python cli.py series cpu_percent --last 86400 --max-points 100
+  python cli.py run --tag network --trace logs/run-trace.json     # этапы запуска для chrome://tracing
+  python cli.py run --tag repair --adaptive-timeout              # таймауты по истории запусков
+  python cli.py run --tag inventory --batch-cim                   # запросы CIM одним PowerShell
+  python cli.py slowest --last 604800 --limit 10
+  python cli.py trace -o trace.json --name "Получить имя хоста" --last 86400
+
+Выполнение — через system_checks.run_many (пул PowerShell, кэш, история); Qt не импортируется.
+Коды выхода: 0 — всё успешно, 1 — есть ошибки, 2 — неверные аргументы, 3 — есть таймауты,
+4 — есть пропущенные проверки (нет прав, нет ввода), 130 — прервано (Ctrl+C).
+Если результаты разные, берётся самый серьёзный: прерывание, таймаут, ошибка, пропуск.
+"""
+import argparse
+import csv
+import json
+import os
+import shlex
+import signal
+import sys
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_TIMEOUT = 3
+EXIT_SKIPPED = 4
+EXIT_CANCELLED = 130
+
+# Статус результата → код выхода; порядок — от самого серьёзного
+STATUS_EXIT = {"cancelled": EXIT_CANCELLED, "timeout": EXIT_TIMEOUT, "failed": EXIT_FAILED,
+               "skipped": EXIT_SKIPPED, "ok": EXIT_OK}
+CSV_FIELDS = ["name", "status", "returncode", "duration", "cached", "started_at", "stdout", "stderr"]
+DEFAULT_TIMEOUT = 60
+
+
+class UsageError(Exception):
+    pass
+
+
+def load_catalog(path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Каталог commands.py или JSON-файл той же структуры (для тестов и своих наборов)."""
+    if path is None:
+        from commands import commands
+        return commands
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (OSError, ValueError) as e:
+        raise UsageError(f"Не удалось прочитать каталог {path}: {e}")
+    if not isinstance(catalog, dict):
+        raise UsageError(f"Каталог {path}: ожидается объект «имя → запись»")
+    return catalog
+
+
+def all_tags(catalog: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for meta in catalog.values():
+        for tag in meta.get("tags", ()):
+            counts[tag] = counts.get(tag, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def _suggest(catalog: Dict[str, Dict[str, Any]], name: str) -> str:
+    from command_search import CommandSearchIndex
+    matches = [n for n, _ in CommandSearchIndex(catalog, fields=("name",)).search(name, limit=3)]
+    return f" Похожие: {', '.join(matches)}" if matches else ""
+
+
+def select_names(catalog: Dict[str, Dict[str, Any]], names: Iterable[str], tags: Iterable[str],
+                 run_all: bool = False, templates: bool = False) -> List[str]:
+    """
+    Имена для запуска в порядке каталога; неизвестные имя или метка — UsageError.
+    Команды с шаблоном ввода по метке и --all выбираются только при templates=True
+    (когда ввод передан), по имени — всегда.
+    """
+    names, tags = list(names), list(tags)
+    for name in names:
+        if name not in catalog:
+            raise UsageError(f"Команда не найдена: «{name}».{_suggest(catalog, name)}")
+    known_tags = all_tags(catalog)
+    for tag in tags:
+        if tag not in known_tags:
+            raise UsageError(f"Неизвестная метка: {tag}. Метки: {', '.join(known_tags)}")
+    selected = set(names)
+    for name, meta in catalog.items():
+        if "template" in meta and not templates:
+            continue
+        if run_all or set(tags) & set(meta.get("tags", ())):
+            selected.add(name)
+    if not selected:
+        raise UsageError("Не выбрано ни одной команды: укажите имена, --tag или --all")
+    return [name for name in catalog if name in selected]
+
+
+def parse_inputs(values: Iterable[str], catalog: Dict[str, Dict[str, Any]],
+                 names: List[str]) -> Dict[str, str]:
+    """
+    -i «Имя=значение» — ввод для одной команды, -i значение — для всех выбранных
+    команд с шаблоном ({input}).
+    """
+    inputs: Dict[str, str] = {}
+    templated = [n for n in names if "template" in catalog[n]]
+    for value in values:
+        name, sep, text = value.partition("=")
+        if sep and name in catalog:
+            inputs[name] = text
+        else:
+            for target in templated:
+                inputs.setdefault(target, value)
+    return inputs
+
+
+def parse_timeouts(values: Iterable[str], catalog: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    timeouts: Dict[str, int] = {}
+    for value in values:
+        name, sep, seconds = value.rpartition("=")
+        if not sep or name not in catalog:
+            raise UsageError(f"--timeout-for: ожидается «Имя команды=секунды», получено «{value}»")
+        try:
+            timeouts[name] = int(seconds)
+        except ValueError:
+            raise UsageError(f"--timeout-for: не число секунд в «{value}»")
+    return timeouts
+
+
+def result_status(result: Dict[str, Any]) -> str:
+    if result.get("skipped"):
+        return "cancelled" if result["skipped"].startswith("Отменено") else "skipped"
+    if result.get("timeout"):
+        return "timeout"
+    return "ok" if result.get("returncode") == 0 else "failed"
+
+
+def exit_code(statuses: Iterable[str]) -> int:
+    seen = set(statuses)
+    for status, code in STATUS_EXIT.items():
+        if status in seen:
+            return code
+    return EXIT_OK
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def result_record(name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    record = {
+        "name": name,
+        "status": result_status(result),
+        "returncode": result.get("returncode"),
+        "duration": round(result.get("duration") or 0.0, 3),
+        "cached": bool(result.get("cached")),
+        "started_at": result.get("started_at"),
+        "stdout": result.get("stdout", ""),
+        "stderr": result.get("stderr", ""),
+    }
+    if result.get("backend"):
+        record["backend"] = result["backend"]
+    if result.get("kill"):
+        record["kill"] = result["kill"]
+    if result.get("timeout_policy"):
+        record["timeout_policy"] = result["timeout_policy"]
+    if result.get("coalesced"):
+        record["coalesced"] = result["coalesced"]
+    if result.get("batch"):
+        record["batch"] = result["batch"]
+    if result.get("skipped"):
+        record["reason"] = result["skipped"]
+    if result.get("records") is not None:
+        record["records"] = result["records"]
+    snapshot = result.get("snapshot")
+    if snapshot is not None:
+        record["changes"] = {"baseline": snapshot.baseline, "total": snapshot.total,
+                             "added": snapshot.added, "removed": snapshot.removed,
+                             "changed": [{"old": old, "new": new} for old, new in snapshot.changed]}
+        record["_snapshot"] = snapshot  # для текстового вывода; в jsonl не попадает
+    trace = result.get("trace")
+    if trace is not None:
+        record["timing"] = trace.to_dict()
+    return record
+
+
+class TextWriter:
+    def __init__(self, out: TextIO, quiet: bool = False, changes: bool = False):
+        self.out = out
+        self.quiet = quiet
+        self.changes = changes
+
+    def write(self, record: Dict[str, Any]):
+        status = record["status"]
+        if status in ("skipped", "cancelled"):
+            self.out.write(f"[{status}] {record['name']}: {record.get('reason', '')}\n")
+            return
+        source = "кэш" if record["cached"] else f"{record['duration']:.1f} с"
+        self.out.write(f"=== {record['name']} ({status}, код {record['returncode']}, {source}) ===\n")
+        if not self.quiet:
+            snapshot = record.get("_snapshot")
+            if self.changes and snapshot is not None and not snapshot.baseline:
+                from snapshot_store import format_diff
+                text = format_diff(snapshot)
+            elif record.get("records") is not None:
+                from structured_output import render_records
+                text = render_records(record["records"])
+            else:
+                text = record["stdout"]
+            if text:
+                self.out.write(text.rstrip("\n") + "\n")
+        if record["stderr"] and status != "ok":
+            self.out.write(record["stderr"].rstrip("\n") + "\n")
+        policy = record.get("timeout_policy")
+        if status == "timeout" and policy:
+            self.out.write(f"Таймаут {policy['seconds']} с выбран правилом {policy['policy']}: {policy['detail']}\n")
+        self.out.flush()
+
+
+class JsonLinesWriter:
+    def __init__(self, out: TextIO, changes: bool = False):
+        self.out = out
+        self.changes = changes
+
+    def write(self, record: Dict[str, Any]):
+        record = {k: v for k, v in record.items() if not k.startswith("_")}
+        if self.changes and "changes" in record:
+            if not record["changes"]["baseline"]:
+                record.pop("records", None)  # только разница с прошлым снимком
+        else:
+            record.pop("changes", None)
+        self.out.write(json.dumps(record, ensure_ascii=False, default=_json_default) + "\n")
+        self.out.flush()
+
+
+class CsvWriter:
+    def __init__(self, out: TextIO, fields: List[str] = CSV_FIELDS):
+        self.out = out
+        self.writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+        self.writer.writeheader()
+
+    def write(self, record: Dict[str, Any]):
+        self.writer.writerow(record)
+        self.out.flush()
+
+
+def make_writer(fmt: str, out: TextIO, quiet: bool = False, changes: bool = False):
+    if fmt == "jsonl":
+        return JsonLinesWriter(out, changes=changes)
+    if fmt == "csv":
+        return CsvWriter(out)
+    return TextWriter(out, quiet=quiet, changes=changes)
+
+
+def _open_output(path: Optional[str]) -> TextIO:
+    if path and path != "-":
+        return open(path, "w", encoding="utf-8", newline="")
+    # Консоль Windows может не уметь часть символов вывода — заменяем, а не падаем
+    if hasattr(sys.stdout, "reconfigure"):
+        sys.stdout.reconfigure(errors="replace")
+    return sys.stdout
+
+
+# --- команды ---
+
+def cmd_list(args) -> int:
+    catalog = load_catalog(args.catalog)
+    names = select_names(catalog, [], args.tag, templates=True) if args.tag else list(catalog)
+    out = _open_output(args.output)
+    fields = ["name", "tags", "requires_admin", "template", "description"]
+    rows = [{"name": n, "tags": ",".join(catalog[n].get("tags", ())),
+             "requires_admin": bool(catalog[n].get("requires_admin")),
+             "template": "template" in catalog[n],
+             "description": catalog[n].get("description", "")} for n in names]
+    if args.format == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False) + "\n")
+    elif args.format == "csv":
+        writer = csv.DictWriter(out, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    else:
+        for row in rows:
+            marks = (" [админ]" if row["requires_admin"] else "") + (" [ввод]" if row["template"] else "")
+            out.write(f"{row['name']}{marks}  ({row['tags']})\n")
+    out.flush()
+    return EXIT_OK
+
+
+def cmd_tags(args) -> int:
+    for tag, count in all_tags(load_catalog(args.catalog)).items():
+        print(f"{tag:14} {count}")
+    return EXIT_OK
+
+
+def cmd_run(args) -> int:
+    catalog = load_catalog(args.catalog)
+    names = select_names(catalog, args.names, args.tag, args.all, templates=bool(args.input))
+    inputs = parse_inputs(args.input, catalog, names)
+    timeouts = parse_timeouts(args.timeout_for, catalog)
+
+    import system_checks
+    from admin_check import is_admin, is_recovery_environment
+
+    if args.host:
+        # Свой хост пула с тем же построчным протоколом: pwsh или заменитель для тестов
+        system_checks.configure_pool(host_argv=shlex.split(args.host, posix=os.name != "nt"), size=args.jobs)
+    if args.mode:
+        system_checks.set_execution_mode(args.mode)
+
+    # Ctrl+C не обрывает генератор, а отменяет запуск: процессы завершаются, остаток помечается отменённым
+    cancel = threading.Event()
+    previous = signal.signal(signal.SIGINT, lambda *_: cancel.set())
+    out = _open_output(args.output)
+    writer = make_writer(args.format, out, quiet=args.quiet, changes=args.changes)
+    statuses = []
+    timings = []
+    try:
+        for name, result in system_checks.run_many(
+                names, catalog, max_workers=args.jobs, timeout=args.timeout, timeouts=timeouts,
+                inputs=inputs, admin=bool(is_admin()), recovery=is_recovery_environment(),
+                cancel_event=cancel, structured="json" if args.structured or args.changes else None,
+                use_cache=not args.no_cache, force_refresh=args.refresh or args.changes,
+                history=not args.no_history, source="cli", adaptive_timeouts=args.adaptive_timeout,
+                coalesce=not args.no_coalesce, batch_cim=args.batch_cim):
+            record = result_record(name, result)
+            if cancel.is_set() and record["status"] in ("failed", "timeout"):
+                record["status"] = "cancelled"  # процесс завершён отменой, а не сам
+            statuses.append(record["status"])
+            if "timing" in record:
+                timings.append(record["timing"])
+            writer.write(record)
+    finally:
+        signal.signal(signal.SIGINT, previous)
+        if out is not sys.stdout:
+            out.close()
+    if args.trace:
+        from timing import write_chrome_trace
+        count = write_chrome_trace(args.trace, timings)
+        print(f"Трассировка: {args.trace} (проверок: {count})", file=sys.stderr)
+    if cancel.is_set():
+        statuses.append("cancelled")
+    code = exit_code(statuses)
+    if not args.quiet or code != EXIT_OK:
+        summary = ", ".join(f"{s}: {statuses.count(s)}" for s in STATUS_EXIT if s in statuses)
+        joins = system_checks.get_flights().joins
+        if joins:
+            summary += f"; одинаковых запусков объединено: {joins}"
+        failures = {store: count for store, count in system_checks.persistence_failures().items() if count}
+        if failures:
+            summary += "; сбои сохранения: " + ", ".join(f"{store} {count}" for store, count in failures.items())
+        print(f"Проверок: {len(names)} ({summary}); код выхода {code}", file=sys.stderr)
+    return code
+
+
+def cmd_monitor(args) -> int:
+    """Поток замеров счётчиков до --count/--duration или Ctrl+C."""
+    import queue
+    from metrics import METRICS, MetricsSampler, default_backend
+    from metric_store import MetricStore
+
+    try:
+        backend = default_backend(args.backend)
+        store = MetricStore(args.store, autosave=60.0) if args.store else None
+    except (ValueError, OSError) as e:
+        raise UsageError(str(e))
+    samples: "queue.Queue" = queue.Queue()
+    sampler = MetricsSampler(backend, interval=args.interval, series=store)
+    sampler.subscribe(lambda t, sample: samples.put((t, sample)))
+    stop = threading.Event()
+    previous = signal.signal(signal.SIGINT, lambda *_: stop.set())
+    out = _open_output(args.output)
+    fields = ["time"] + list(METRICS)
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore", lineterminator="\n") \
+        if args.format == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+    count = 0
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        sampler.start()
+        while not stop.is_set() and (not args.count or count < args.count):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            try:
+                stamp, sample = samples.get(timeout=0.2)
+            except queue.Empty:
+                if not sampler.running:
+                    break  # источник завершился
+                continue
+            count += 1
+            when = datetime.fromtimestamp(stamp).isoformat(timespec="milliseconds")
+            if writer is not None:
+                writer.writerow({"time": when, **{k: round(v, 3) for k, v in sample.items()}})
+            elif args.format == "jsonl":
+                out.write(json.dumps({"time": when, **sample}) + "\n")
+            else:
+                from metrics import format_value
+                out.write(when[11:] + "  " + "  ".join(
+                    f"{METRICS[k][0]}: {format_value(k, sample.get(k))}" for k in METRICS if k in sample) + "\n")
+            out.flush()
+    finally:
+        sampler.stop()
+        signal.signal(signal.SIGINT, previous)
+        if out is not sys.stdout:
+            out.close()
+        if store is not None:
+            store.close()
+    error = f", ошибка: {sampler.last_error}" if sampler.last_error else ""
+    print(f"Замеров: {count}, источник {backend.name}, ЦП процесса {sampler.cpu_percent():.2f} %{error}",
+          file=sys.stderr)
+    return EXIT_OK if count else EXIT_FAILED
+
+
+def cmd_series(args) -> int:
+    """Ряды из файла хранилища (mmap, только чтение): список имён или точки одного ряда."""
+    from metric_store import MetricStore
+
+    if not os.path.exists(args.file):
+        raise UsageError(f"Нет файла рядов: {args.file}")
+    try:
+        store = MetricStore.open_mmap(args.file)
+    except ValueError as e:
+        raise UsageError(str(e))
+    out = _open_output(args.output)
+    try:
+        if not args.name:
+            for name in store.names(args.prefix or ""):
+                out.write(name + "\n")
+            return EXIT_OK
+        if args.name not in store:
+            raise UsageError(f"Нет ряда «{args.name}»")
+        end = time.time()
+        start = end - args.last if args.last else None
+        try:
+            data = store.query(args.name, start, None, max_points=args.max_points or None,
+                               resolution=args.resolution)
+        except ValueError as e:
+            raise UsageError(str(e))
+        fields = ["time", "min", "avg", "max"]
+        writer = csv.writer(out, lineterminator="\n") if args.format == "csv" else None
+        if writer is not None:
+            writer.writerow(fields)
+        for row in zip(data.times, data.min, data.avg, data.max):
+            when = datetime.fromtimestamp(row[0]).isoformat(timespec="seconds")
+            values = [round(v, 3) for v in row[1:]]
+            if writer is not None:
+                writer.writerow([when] + values)
+            elif args.format == "jsonl":
+                out.write(json.dumps(dict(zip(fields, [when] + values))) + "\n")
+            else:
+                out.write(f"{when}  {values[1]:g}" + (f"  [{values[0]:g} .. {values[2]:g}]" if data.resolution else "")
+                          + "\n")
+        print(f"Точек: {len(data)}, разрешение: {data.resolution:g} с", file=sys.stderr)
+        return EXIT_OK
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        store.close()
+
+
+def cmd_slowest(args) -> int:
+    """Самые медленные проверки из истории: средняя и p95 длительность, ЦП, память, этапы."""
+    import system_checks
+    from timing import format_slowest
+
+    since = time.time() - args.last if args.last else None
+    rows = system_checks.get_history().slowest(since=since, limit=args.limit,
+                                               successful_only=args.successful)
+    out = _open_output(args.output)
+    try:
+        if args.format == "jsonl":
+            for row in rows:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            out.write(format_slowest(rows) + "\n")
+        out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return EXIT_OK
+
+
+def cmd_trace(args) -> int:
+    """Этапы запусков из истории в Chrome trace JSON."""
+    import system_checks
+    from timing import write_chrome_trace
+
+    history = system_checks.get_history()
+    since = time.time() - args.last if args.last else None
+    runs = history.runs(name=args.name, since=since, limit=args.limit)
+    try:
+        count = write_chrome_trace(args.output, history.timings(runs))
+    except OSError as e:
+        raise UsageError(f"Не удалось записать {args.output}: {e}")
+    print(f"Трассировка: {args.output} (запусков с этапами: {count} из {len(runs)})", file=sys.stderr)
+    return EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="cli.py", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--catalog", help="JSON-файл каталога вместо commands.py")
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="команды каталога")
+    p_list.add_argument("--tag", action="append", default=[], help="только с меткой (можно несколько)")
+    p_list.add_argument("--format", choices=("text", "jsonl", "csv"), default="text")
+    p_list.add_argument("-o", "--output", help="файл вместо stdout")
+    p_list.set_defaults(func=cmd_list)
+
+    p_tags = sub.add_parser("tags", help="метки и число команд с ними")
+    p_tags.set_defaults(func=cmd_tags)
+
+    p_run = sub.add_parser("run", help="выполнить команды")
+    p_run.add_argument("names", nargs="*", help="имена команд каталога")
+    p_run.add_argument("-t", "--tag", action="append", default=[], help="все команды с меткой (можно несколько)")
+    p_run.add_argument("--all", action="store_true", help="все команды (с шаблоном ввода — только при -i)")
+    p_run.add_argument("-i", "--input", action="append", default=[],
+                       help="ввод для шаблона: «Имя=значение» или значение для всех шаблонов")
+    p_run.add_argument("-j", "--jobs", type=int, default=4, help="параллельных проверок (4)")
+    p_run.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help=f"таймаут, сек ({DEFAULT_TIMEOUT})")
+    p_run.add_argument("--timeout-for", action="append", default=[], metavar="ИМЯ=СЕК",
+                       help="свой таймаут для команды")
+    p_run.add_argument("--adaptive-timeout", action="store_true",
+                       help="таймаут каждой команды по истории её запусков; --timeout — если истории нет")
+    p_run.add_argument("--format", choices=("text", "jsonl", "csv"), default="text")
+    p_run.add_argument("-o", "--output", help="файл вместо stdout")
+    p_run.add_argument("-q", "--quiet", action="store_true", help="text: без вывода команд; без сводки при успехе")
+    p_run.add_argument("--structured", action="store_true", help="структурированный вывод (records в jsonl)")
+    p_run.add_argument("--changes", action="store_true",
+                       help="для проверок со snapshot_key — только разница с прошлым запуском (включает --structured)")
+    p_run.add_argument("--no-cache", action="store_true", help="не брать и не класть результаты в кэш")
+    p_run.add_argument("--refresh", action="store_true", help="выполнить заново, обновив кэш")
+    p_run.add_argument("--no-history", action="store_true", help="не записывать запуски в историю")
+    p_run.add_argument("--batch-cim", action="store_true",
+                       help="независимые запросы Get-CimInstance — пакетами в одном PowerShell с общей CIM-сессией")
+    p_run.add_argument("--no-coalesce", action="store_true",
+                       help="запускать каждую проверку, даже если такая же команда уже выполняется")
+    p_run.add_argument("--mode", choices=("pool", "spawn"), help="пул хостов PowerShell или процесс на команду")
+    p_run.add_argument("--host", help="команда хоста пула вместо powershell.exe (например, заменитель для тестов)")
+    p_run.add_argument("--trace", metavar="ФАЙЛ", help="записать этапы выполнения в Chrome trace JSON")
+    p_run.set_defaults(func=cmd_run)
+
+    p_mon = sub.add_parser("monitor", help="непрерывные счётчики: ЦП, память, очередь диска, сеть")
+    p_mon.add_argument("--interval", type=float, default=1.0, help="секунд между замерами (1)")
+    p_mon.add_argument("--count", type=int, default=0, help="остановиться после N замеров")
+    p_mon.add_argument("--duration", type=float, default=0, help="остановиться через N секунд")
+    p_mon.add_argument("--backend", help="proc, pdh, get-counter или cmd:<команда> (по умолчанию — для ОС)")
+    p_mon.add_argument("--format", choices=("text", "jsonl", "csv"), default="text")
+    p_mon.add_argument("-o", "--output", help="файл вместо stdout")
+    p_mon.add_argument("--store", help="дописывать замеры в файл рядов (например, logs/metrics.tsm)")
+    p_mon.set_defaults(func=cmd_monitor)
+
+    p_ser = sub.add_parser("series", help="ряды метрик из файла хранилища: список или точки ряда")
+    p_ser.add_argument("name", nargs="?", help="имя ряда; без имени — список рядов")
+    p_ser.add_argument("--file", default=os.path.join("logs", "metrics.tsm"), help="файл рядов (logs/metrics.tsm)")
+    p_ser.add_argument("--prefix", help="список: только ряды с этим началом имени")
+    p_ser.add_argument("--last", type=float, default=0, help="последние N секунд (по умолчанию — всё)")
+    p_ser.add_argument("--max-points", type=int, default=4000,
+                       help="не больше N точек: берутся минутные/часовые корзины (0 — без ограничения)")
+    p_ser.add_argument("--resolution", type=float, help="уровень явно: 0 — сырые точки, 60, 3600")
+    p_ser.add_argument("--format", choices=("text", "jsonl", "csv"), default="text")
+    p_ser.add_argument("-o", "--output", help="файл вместо stdout")
+    p_ser.set_defaults(func=cmd_series)
+
+    p_slow = sub.add_parser("slowest", help="самые медленные проверки по истории запусков")
+    p_slow.add_argument("--last", type=float, default=0, help="последние N секунд (по умолчанию — вся история)")
+    p_slow.add_argument("--limit", type=int, default=20, help="не больше N проверок (20)")
+    p_slow.add_argument("--successful", action="store_true", help="только успешные запуски")
+    p_slow.add_argument("--format", choices=("text", "jsonl"), default="text")
+    p_slow.add_argument("-o", "--output", help="файл вместо stdout")
+    p_slow.set_defaults(func=cmd_slowest)
+
+    p_trace = sub.add_parser("trace", help="этапы запусков из истории в Chrome trace JSON")
+    p_trace.add_argument("-o", "--output", default="trace.json", help="файл трассировки (trace.json)")
+    p_trace.add_argument("--name", help="только запуски этой команды")
+    p_trace.add_argument("--last", type=float, default=0, help="последние N секунд (по умолчанию — все)")
+    p_trace.add_argument("--limit", type=int, default=500, help="не больше N последних запусков (500)")
+    p_trace.set_defaults(func=cmd_trace)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, "jobs", 1) < 1:
+        parser.error("--jobs должен быть не меньше 1")
+    try:
+        return args.func(args)
+    except UsageError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
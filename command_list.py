@@ -0,0 +1,61 @@
+# command_list.py
+"""
+Модель списка команд для выпадающего списка.
+
+Элементы создаются один раз; фильтр и порядок задаёт QSortFilterProxyModel
+по результату CommandSearchIndex. Индекс опрашивается один раз на запрос,
+filterAcceptsRow и lessThan только смотрят баллы в словаре.
+"""
+from typing import Dict, Optional, Set
+
+from PyQt5.QtCore import Qt, QSortFilterProxyModel
+from PyQt5.QtGui import QStandardItem, QStandardItemModel
+
+from command_search import CommandSearchIndex
+
+ORDER_ROLE = Qt.UserRole + 1
+
+
+def build_command_model(names) -> QStandardItemModel:
+    model = QStandardItemModel()
+    for i, name in enumerate(names):
+        item = QStandardItem(name)
+        item.setData(i, ORDER_ROLE)
+        item.setEditable(False)
+        model.appendRow(item)
+    return model
+
+
+class CommandFilterProxy(QSortFilterProxyModel):
+    def __init__(self, index: CommandSearchIndex, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self._scores: Optional[Dict[str, float]] = None  # None — показывать всё
+        self.setSourceModel(build_command_model(index.names))
+        self.setDynamicSortFilter(False)
+
+    def set_query(self, query: str, allowed: Optional[Set[str]] = None):
+        """Пересчитывает выдачу: лучшие совпадения сверху, пустой запрос — исходный порядок."""
+        if not query.strip() and allowed is None:
+            scores = None
+        else:
+            scores = dict(self.index.search(query, allowed=allowed))
+        self._scores = scores
+        self.invalidate()
+        self.sort(0)
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self._scores is None:
+            return True
+        name = self.sourceModel().index(source_row, 0, source_parent).data()
+        return name in self._scores
+
+    def lessThan(self, left, right):
+        left_order = left.data(ORDER_ROLE)
+        right_order = right.data(ORDER_ROLE)
+        if self._scores:
+            left_score = self._scores.get(left.data(), 0.0)
+            right_score = self._scores.get(right.data(), 0.0)
+            if left_score != right_score:
+                return left_score > right_score
+        return left_order < right_order
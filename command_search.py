@@ -0,0 +1,244 @@
+# command_search.py
+"""
+Поиск по каталогу команд с заранее построенным индексом.
+
+Для имени, описания и текста команды один раз считаются токены в casefold (ё → е)
+и их транслитерация в латиницу. Запрос разбивается на слова; каждое слово ищется
+в нескольких вариантах: как есть, в транслитерации, в другой раскладке клавиатуры
+(«ghjdthrf» → «проверка»). Ранжирование по убыванию: точное совпадение имени,
+префикс имени, префикс слова, подстрока, затем нечёткое совпадение (опечатки).
+Все слова запроса должны найтись; баллы слов складываются.
+"""
+import bisect
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+_RU_LAT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh", "з": "z",
+    "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sch",
+    "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+_TRANSLIT = str.maketrans(_RU_LAT)
+_LAYOUT_EN = "qwertyuiop[]asdfghjkl;'zxcvbnm,.`"
+_LAYOUT_RU = "йцукенгшщзхъфывапролджэячсмитьбюё"
+_EN_TO_RU = str.maketrans(_LAYOUT_EN, _LAYOUT_RU)
+_RU_TO_EN = str.maketrans(_LAYOUT_RU, _LAYOUT_EN)
+_TOKEN_RE = re.compile(r"\w+")
+
+# Веса полей и видов совпадения
+FIELD_WEIGHTS = {"name": 1.0, "description": 0.6, "command": 0.45}
+SCORE_EXACT_NAME = 1000.0
+SCORE_PREFIX = 300.0       # слово каталога начинается с слова запроса
+SCORE_SUBSTRING = 150.0    # слово запроса внутри слова каталога
+SCORE_FUZZY = 80.0         # с опечаткой
+BONUS_NAME_START = 200.0   # имя команды начинается с запроса
+VARIANT_PENALTY = 0.85     # совпадение по транслитерации или другой раскладке
+FUZZY_MIN_LEN = 4
+
+
+def normalize(text: str) -> str:
+    return text.casefold().replace("ё", "е")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def transliterate(text: str) -> str:
+    return text.translate(_TRANSLIT)
+
+
+def swap_layout(text: str) -> str:
+    """Набор в другой раскладке: латиница → кириллица или наоборот (по первой букве)."""
+    for ch in text:
+        if ch in _LAYOUT_EN:
+            return text.translate(_EN_TO_RU)
+        if ch in _LAYOUT_RU:
+            return text.translate(_RU_TO_EN)
+    return text
+
+
+def query_variants(word: str) -> Dict[str, float]:
+    """Варианты слова запроса с множителем балла."""
+    variants = {word: 1.0}
+    swapped = swap_layout(word)
+    for variant in (transliterate(word), swapped, transliterate(swapped)):
+        if variant and variant not in variants:
+            variants[variant] = VARIANT_PENALTY
+    return variants
+
+
+def _bigrams(token: str) -> Set[str]:
+    padded = f" {token} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _within_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Расстояние Левенштейна (с перестановкой соседних букв), если оно не больше limit."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        best = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            best = min(best, cur[j])
+        if best > limit:
+            return None
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else None
+
+
+class CommandSearchIndex:
+    def __init__(self, catalog: Dict[str, Dict], fields: Iterable[str] = ("name", "description", "command")):
+        self.names: List[str] = list(catalog.keys())
+        self.order = {name: i for i, name in enumerate(self.names)}
+        self._name_keys = [normalize(name) for name in self.names]
+        # токен → {номер записи: вес лучшего поля}
+        postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        translit_cache: Dict[str, str] = {}
+        for entry_id, name in enumerate(self.names):
+            meta = catalog[name]
+            # Сначала лучший вес каждого токена записи, потом один проход по postings
+            weights: Dict[str, float] = {}
+            for field in fields:
+                if field == "name":
+                    text = name
+                elif field == "command":
+                    text = meta.get("command") or meta.get("template", "")
+                else:
+                    text = meta.get(field, "")
+                weight = FIELD_WEIGHTS[field]
+                for token in set(tokenize(text)):
+                    if weights.get(token, 0.0) < weight:
+                        weights[token] = weight
+            for token, weight in weights.items():
+                latin = translit_cache.get(token)
+                if latin is None:
+                    latin = translit_cache[token] = transliterate(token)
+                postings[token][entry_id] = weight
+                if latin and latin != token and postings[latin].get(entry_id, 0.0) < weight:
+                    postings[latin][entry_id] = weight
+        self._postings = dict(postings)
+        self._vocab = sorted(self._postings)
+        # Подстроки ищутся одним str.find по склеенному словарю, а не циклом по токенам
+        self._vocab_blob = "\n".join(self._vocab) + "\n"
+        self._vocab_starts = []
+        offset = 0
+        for token in self._vocab:
+            self._vocab_starts.append(offset)
+            offset += len(token) + 1
+        # Для нечёткого поиска: биграмма → токены
+        bigram_index: Dict[str, List[str]] = defaultdict(list)
+        for token in self._vocab:
+            if len(token) >= FUZZY_MIN_LEN - 1:
+                for bg in _bigrams(token):
+                    bigram_index[bg].append(token)
+        self._bigram_index = dict(bigram_index)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # --- совпадения одного слова ---
+
+    def _prefix_tokens(self, word: str) -> Iterable[str]:
+        i = bisect.bisect_left(self._vocab, word)
+        while i < len(self._vocab) and self._vocab[i].startswith(word):
+            yield self._vocab[i]
+            i += 1
+
+    def _substring_tokens(self, word: str) -> Iterable[str]:
+        blob, starts = self._vocab_blob, self._vocab_starts
+        pos = blob.find(word)
+        while pos >= 0:
+            i = bisect.bisect_right(starts, pos) - 1
+            yield self._vocab[i]
+            if i + 1 >= len(starts):
+                break
+            pos = blob.find(word, starts[i + 1])
+
+    def _fuzzy_tokens(self, word: str) -> Iterable[Tuple[str, int]]:
+        if len(word) < FUZZY_MIN_LEN:
+            return
+        limit = 1 if len(word) < 7 else 2
+        grams = _bigrams(word)
+        shared: Dict[str, int] = defaultdict(int)
+        for bg in grams:
+            for token in self._bigram_index.get(bg, ()):
+                shared[token] += 1
+        # Каждая правка портит не больше двух из len(word) + 1 биграмм
+        need = max(1, len(word) + 1 - 2 * limit)
+        for token, count in shared.items():
+            if count >= need:
+                # Сравниваем с началом слова каталога: опечатка в префиксе тоже находится
+                best = None
+                for size in range(max(1, len(word) - limit), len(word) + limit + 1):
+                    distance = _within_distance(word, token[:size], limit)
+                    if distance is not None and (best is None or distance < best):
+                        best = distance
+                    if size >= len(token):
+                        break
+                if best is not None:
+                    yield token, best
+
+    def _word_scores(self, word: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+
+        def add(token: str, base: float):
+            for entry_id, weight in self._postings[token].items():
+                score = base * weight
+                if score > scores.get(entry_id, 0.0):
+                    scores[entry_id] = score
+
+        for variant, factor in query_variants(word).items():
+            prefixed = set()
+            for token in self._prefix_tokens(variant):
+                prefixed.add(token)
+                add(token, SCORE_PREFIX * factor * (1.2 if token == variant else 1.0))
+            if len(variant) >= 2:
+                for token in self._substring_tokens(variant):
+                    if token not in prefixed:
+                        add(token, SCORE_SUBSTRING * factor)
+            if not scores:
+                for token, distance in self._fuzzy_tokens(variant):
+                    add(token, SCORE_FUZZY * factor / (1 + distance))
+        return scores
+
+    # --- запрос ---
+
+    def search(self, query: str, allowed: Optional[Set[str]] = None,
+               limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        (имя, балл) от лучших к худшим. Пустой запрос — весь каталог в исходном порядке.
+        allowed ограничивает выдачу (например, избранным).
+        """
+        words = tokenize(query)
+        if not words:
+            result = [(name, 0.0) for name in self.names if allowed is None or name in allowed]
+            return result[:limit] if limit else result
+        total: Optional[Dict[int, float]] = None
+        for word in words:
+            scores = self._word_scores(word)
+            if total is None:
+                total = scores
+            else:
+                total = {e: s + scores[e] for e, s in total.items() if e in scores}
+            if not total:
+                return []
+        query_key = " ".join(words)
+        for entry_id in total:
+            name_key = self._name_keys[entry_id]
+            if name_key == query_key:
+                total[entry_id] += SCORE_EXACT_NAME
+            elif name_key.startswith(query_key):
+                total[entry_id] += BONUS_NAME_START
+        ranked = sorted(total.items(), key=lambda item: (-item[1], item[0]))
+        result = [(self.names[e], s) for e, s in ranked if allowed is None or self.names[e] in allowed]
+        return result[:limit] if limit else result
@@ -0,0 +1,186 @@
+# history_dialog.py
+"""
+Окно «Просмотреть лог»: история запусков из HistoryStore с фильтрами по команде,
+тексту вывода, периоду и неудачным запускам. Вывод запуска читается только при выборе строки.
+Этапы выполнения запуска показываются вместе с выводом; по отобранным запускам можно
+построить отчёт о самых медленных проверках и сохранить трассу (Chrome trace JSON).
+"""
+import time
+from datetime import datetime
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLineEdit, QCheckBox,
+                             QPushButton, QTableWidget, QTableWidgetItem, QSplitter, QLabel,
+                             QHeaderView, QAbstractItemView, QFileDialog, QMessageBox)
+
+from history_store import HistoryStore
+from output_view import OutputView
+from timing import format_timing, format_slowest, write_chrome_trace
+
+PERIODS = [
+    ("За всё время", None),
+    ("Последний час", 3600),
+    ("Сегодня", "today"),
+    ("7 дней", 7 * 86400),
+    ("30 дней", 30 * 86400),
+]
+PAGE_SIZE = 500
+
+
+class HistoryDialog(QDialog):
+    def __init__(self, history: HistoryStore, parent=None, open_text_log=None):
+        super().__init__(parent)
+        self.history = history
+        self.setWindowTitle("История запусков")
+        self.resize(1000, 700)
+        layout = QVBoxLayout(self)
+
+        filters = QHBoxLayout()
+        self.name_combo = QComboBox()
+        self.name_combo.setMinimumWidth(260)
+        filters.addWidget(self.name_combo)
+        self.contains_input = QLineEdit()
+        self.contains_input.setPlaceholderText("Текст в выводе (например: Stopped)")
+        filters.addWidget(self.contains_input, 1)
+        self.period_combo = QComboBox()
+        for title, _ in PERIODS:
+            self.period_combo.addItem(title)
+        filters.addWidget(self.period_combo)
+        self.failed_checkbox = QCheckBox("Только ошибки")
+        filters.addWidget(self.failed_checkbox)
+        refresh = QPushButton("Обновить")
+        refresh.clicked.connect(self.reload)
+        filters.addWidget(refresh)
+        slowest = QPushButton("Самые медленные")
+        slowest.clicked.connect(self.show_slowest)
+        filters.addWidget(slowest)
+        export = QPushButton("Трассировка…")
+        export.clicked.connect(self.export_trace)
+        filters.addWidget(export)
+        if open_text_log is not None:
+            text_log = QPushButton("Текстовый лог")
+            text_log.clicked.connect(open_text_log)
+            filters.addWidget(text_log)
+        layout.addLayout(filters)
+
+        splitter = QSplitter(Qt.Vertical)
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(["Время", "Команда", "Код", "Длительность, с", "Вывод, символов"])
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.itemSelectionChanged.connect(self.show_selected)
+        splitter.addWidget(self.table)
+        self.output = OutputView()
+        splitter.addWidget(self.output)
+        splitter.setSizes([350, 350])
+        layout.addWidget(splitter, 1)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Поиск по тексту запускается после паузы в наборе, а не на каждую букву
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(300)
+        self._debounce.timeout.connect(self.reload)
+        self.contains_input.textChanged.connect(lambda _: self._debounce.start())
+        self.name_combo.currentIndexChanged.connect(lambda _: self.reload())
+        self.period_combo.currentIndexChanged.connect(lambda _: self.reload())
+        self.failed_checkbox.toggled.connect(lambda _: self.reload())
+
+        self._run_ids = []
+        self.load_names()
+        self.reload()
+
+    def load_names(self):
+        self.name_combo.blockSignals(True)
+        self.name_combo.clear()
+        self.name_combo.addItem("Все команды", None)
+        for info in self.history.names():
+            self.name_combo.addItem(f"{info['name']} ({info['runs']})", info["name"])
+        self.name_combo.blockSignals(False)
+
+    def _since(self):
+        value = PERIODS[self.period_combo.currentIndex()][1]
+        if value == "today":
+            return datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        return time.time() - value if value else None
+
+    def _filtered_runs(self):
+        return self.history.runs(
+            name=self.name_combo.currentData(),
+            since=self._since(),
+            failed_only=self.failed_checkbox.isChecked(),
+            contains=self.contains_input.text().strip() or None,
+            limit=PAGE_SIZE,
+        )
+
+    def reload(self):
+        started = time.perf_counter()
+        runs = self._filtered_runs()
+        self.table.setUpdatesEnabled(False)
+        self.table.setRowCount(len(runs))
+        self._run_ids = []
+        for row, run in enumerate(runs):
+            failed = run["timeout"] or run["returncode"] != 0
+            code = "таймаут" if run["timeout"] else str(run["returncode"])
+            cells = [
+                datetime.fromtimestamp(run["started_at"]).strftime("%Y-%m-%d %H:%M:%S"),
+                run["name"],
+                code,
+                f"{run['duration']:.1f}",
+                str(run["stdout_len"] + run["stderr_len"]),
+            ]
+            for col, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if failed:
+                    item.setForeground(Qt.red)
+                self.table.setItem(row, col, item)
+            self._run_ids.append(run["id"])
+        self.table.setUpdatesEnabled(True)
+        elapsed = (time.perf_counter() - started) * 1000
+        more = f" (показаны последние {PAGE_SIZE})" if len(runs) == PAGE_SIZE else ""
+        self.status_label.setText(f"Запусков: {len(runs)}{more}, запрос {elapsed:.0f} мс")
+        self.output.clear_output()
+
+    def show_selected(self):
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return
+        run = self.history.get(self._run_ids[rows[0].row()])
+        if run is None:
+            return
+        self.output.clear_output()
+        self.output.append_segments([(f"{run['command']}\n\n", False)])
+        if run["stdout"]:
+            self.output.append_segments([(run["stdout"] + "\n", False)])
+        if run["stderr"]:
+            self.output.append_segments([(run["stderr"] + "\n", True)])
+        if run["timing"]:
+            self.output.append_segments([("\n" + format_timing(run["timing"]) + "\n", False)])
+        self.output.finish()
+        self.output.verticalScrollBar().setValue(0)
+
+    def show_slowest(self):
+        """Отчёт по проверкам за выбранный период: средняя и p95 длительность, самые долгие этапы."""
+        self.table.clearSelection()
+        rows = self.history.slowest(since=self._since())
+        self.output.clear_output()
+        self.output.append_segments([(format_slowest(rows) + "\n", False)])
+        self.output.finish()
+        self.output.verticalScrollBar().setValue(0)
+
+    def export_trace(self):
+        """Сохраняет этапы отобранных запусков в Chrome trace JSON (chrome://tracing, Perfetto)."""
+        path, _ = QFileDialog.getSaveFileName(self, "Сохранить трассировку", "trace.json", "JSON (*.json)")
+        if not path:
+            return
+        runs = self._filtered_runs()
+        try:
+            count = write_chrome_trace(path, self.history.timings(runs))
+        except OSError as e:
+            QMessageBox.warning(self, "Трассировка", f"Не удалось сохранить файл: {e}")
+            return
+        self.status_label.setText(f"Трассировка сохранена: {path} (запусков: {count})")
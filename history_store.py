@@ -0,0 +1,397 @@
+# history_store.py
+"""
+История запусков проверок в SQLite (режим WAL).
+
+Таблица runs — метаданные запуска (имя, итоговая команда, время, длительность, код
+возврата, таймаут, компьютер) с индексами по имени и времени; таблица outputs — тексты stdout/stderr
+отдельно, чтобы выборки по метаданным не читали вывод; spans и usage — этапы выполнения
+(timing.Trace) и ресурсы дочернего процесса для отчёта о медленных проверках и трассировки. Запись идёт в фоновом потоке
+пачками (одна транзакция на пачку), чтение — отдельными соединениями, которые WAL
+не блокирует. Старые записи удаляются по сроку хранения и лимиту числа запусков.
+Пачка, которую не удалось записать (база заблокирована или повреждена, диск полон), теряется:
+это видно в stats() (dropped, dropped_batches, last_error) и в логе — предупреждение не чаще
+раза в FAILURE_LOG_INTERVAL секунд.
+"""
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_MAX_RUNS = 100000
+BATCH_SIZE = 200
+FLUSH_INTERVAL = 0.5
+# Очистка по сроку хранения — не чаще раза в столько секунд
+PRUNE_INTERVAL = 3600
+# Сбои записи в лог — не чаще раза в столько секунд (остальные только считаются)
+FAILURE_LOG_INTERVAL = 60.0
+
+_log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    command TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    returncode INTEGER,
+    timeout INTEGER NOT NULL DEFAULT 0,
+    source TEXT NOT NULL DEFAULT '',
+    stdout_len INTEGER NOT NULL DEFAULT 0,
+    stderr_len INTEGER NOT NULL DEFAULT 0,
+    host TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS runs_name_time ON runs(name, started_at);
+CREATE INDEX IF NOT EXISTS runs_time ON runs(started_at);
+CREATE TABLE IF NOT EXISTS outputs (
+    run_id INTEGER PRIMARY KEY REFERENCES runs(id) ON DELETE CASCADE,
+    stdout TEXT NOT NULL DEFAULT '',
+    stderr TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS spans (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    lane TEXT NOT NULL,
+    start REAL NOT NULL,
+    duration REAL NOT NULL,
+    calls INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (run_id, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS usage (
+    run_id INTEGER PRIMARY KEY REFERENCES runs(id) ON DELETE CASCADE,
+    cpu REAL,
+    peak_rss INTEGER,
+    scope TEXT NOT NULL DEFAULT ''
+);
+"""
+
+_RUN_COLUMNS = ("id", "name", "command", "started_at", "finished_at", "duration",
+                "returncode", "timeout", "source", "stdout_len", "stderr_len", "host")
+
+
+def _contains_ci(haystack: Optional[str], needle: str) -> int:
+    # lower() в SQLite понимает только ASCII — для кириллицы регистр сравниваем в Python
+    return int(bool(haystack) and needle in haystack.casefold())
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.create_function("contains_ci", 2, _contains_ci, deterministic=True)
+    return conn
+
+
+class HistoryStore:
+    def __init__(self, path: str, retention_days: Optional[float] = DEFAULT_RETENTION_DAYS,
+                 max_runs: Optional[int] = DEFAULT_MAX_RUNS, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL, host: Optional[str] = None):
+        self.path = path
+        # Компьютер, на котором выполнялись проверки: база может лежать в общей папке
+        self.host = host or socket.gethostname()
+        self.retention_days = retention_days
+        self.max_runs = max_runs
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._reader = _connect(path)
+        self._reader.executescript(SCHEMA)
+        columns = {row[1] for row in self._reader.execute("PRAGMA table_info(runs)")}
+        if "host" not in columns:  # база прежней версии
+            with self._reader:
+                self._reader.execute("ALTER TABLE runs ADD COLUMN host TEXT NOT NULL DEFAULT ''")
+        self._reader_lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Condition()
+        self._last_prune = 0.0
+        self.written = 0
+        self.batches = 0
+        # Потерянные из-за ошибок SQLite запуски и пачки; текст последней ошибки
+        self.dropped = 0
+        self.dropped_batches = 0
+        self.last_error: Optional[str] = None
+        self._failure_logged: Optional[float] = None
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    # --- запись ---
+
+    def record(self, name: str, command: str, result: Dict[str, Any], started_at: Optional[float] = None,
+               source: str = ""):
+        """Ставит запуск в очередь записи; вызывающий поток не ждёт диска."""
+        finished_at = time.time()
+        duration = float(result.get("duration") or 0.0)
+        if started_at is None:
+            started_at = result.get("started_at") or finished_at - duration
+        stdout = result.get("stdout") or ""
+        stderr = result.get("stderr") or ""
+        row = (name, command, started_at, finished_at, duration, result.get("returncode"),
+               int(bool(result.get("timeout"))), source, len(stdout), len(stderr), self.host)
+        # Этапы — на момент записи: то, что вызывающий сделает после (отрисовка), сюда не попадёт
+        trace = result.get("trace")
+        timing = trace.to_dict() if trace is not None else None
+        with self._pending_lock:
+            self._pending += 1
+        self._queue.put((row, stdout, stderr, timing))
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._maybe_prune(conn)
+                continue
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if item is None:
+                stop = True
+            if batch:
+                self._write_batch(conn, batch)
+            self._maybe_prune(conn)
+        conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch):
+        try:
+            with conn:
+                for row, stdout, stderr, timing in batch:
+                    cur = conn.execute(
+                        "INSERT INTO runs (name, command, started_at, finished_at, duration, returncode,"
+                        " timeout, source, stdout_len, stderr_len, host) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row)
+                    run_id = cur.lastrowid
+                    conn.execute("INSERT INTO outputs (run_id, stdout, stderr) VALUES (?, ?, ?)",
+                                 (run_id, stdout, stderr))
+                    if timing:
+                        conn.executemany(
+                            "INSERT INTO spans (run_id, seq, stage, lane, start, duration, calls)"
+                            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [(run_id, seq, s["stage"], s["lane"], s["start"], s["duration"], s.get("calls", 1))
+                             for seq, s in enumerate(timing["spans"])])
+                        usage = timing.get("usage") or {}
+                        if usage.get("cpu") is not None or usage.get("peak_rss"):
+                            conn.execute("INSERT INTO usage (run_id, cpu, peak_rss, scope) VALUES (?, ?, ?, ?)",
+                                         (run_id, usage.get("cpu"), usage.get("peak_rss"), usage.get("scope", "")))
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.dropped += len(batch)
+            self.dropped_batches += 1
+            self._failed(e, f"не записана пачка истории ({len(batch)} запусков)")
+        finally:
+            with self._pending_lock:
+                self._pending -= len(batch)
+                self._pending_lock.notify_all()
+
+    def _maybe_prune(self, conn: sqlite3.Connection, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_prune < PRUNE_INTERVAL:
+            return
+        self._last_prune = now
+        try:
+            with conn:
+                if self.retention_days:
+                    conn.execute("DELETE FROM runs WHERE started_at < ?",
+                                 (now - self.retention_days * 86400,))
+                if self.max_runs:
+                    conn.execute("DELETE FROM runs WHERE id <= (SELECT id FROM runs ORDER BY id DESC"
+                                 " LIMIT 1 OFFSET ?)", (self.max_runs,))
+        except sqlite3.Error as e:
+            self._failed(e, "не удалась очистка истории")
+
+    def _failed(self, error: sqlite3.Error, what: str):
+        """Сбой SQLite: запоминается и пишется в лог с трассировкой, но не чаще FAILURE_LOG_INTERVAL."""
+        self.last_error = f"{what}: {error}"
+        now = time.monotonic()
+        if self._failure_logged is not None and now - self._failure_logged < FAILURE_LOG_INTERVAL:
+            return
+        self._failure_logged = now
+        _log.warning("%s: %s (%s; потеряно запусков: %d, пачек: %d)", what, error, self.path,
+                     self.dropped, self.dropped_batches, exc_info=True)
+
+    def prune(self):
+        """Немедленно применяет срок хранения и лимит числа запусков."""
+        self.flush()
+        with self._reader_lock:
+            self._last_prune = 0.0
+            self._maybe_prune(self._reader, force=True)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока очередь записи опустеет. False — не дождались за timeout."""
+        with self._pending_lock:
+            return self._pending_lock.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+        with self._reader_lock:
+            self._reader.close()
+
+    # --- чтение ---
+
+    def _query(self, sql: str, params=()) -> List[tuple]:
+        with self._reader_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def runs(self, name: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+             failed_only: bool = False, contains: Optional[str] = None, limit: int = 200,
+             offset: int = 0, host: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Запуски от новых к старым без текстов вывода. contains — подстрока (без учёта
+        регистра) в stdout или stderr: «когда служба X последний раз была остановлена».
+        """
+        where, params = [], []
+        if name:
+            where.append("r.name = ?")
+            params.append(name)
+        if host is not None:
+            where.append("r.host = ?")
+            params.append(host)
+        if since is not None:
+            where.append("r.started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.started_at < ?")
+            params.append(until)
+        if failed_only:
+            where.append("(r.returncode IS NULL OR r.returncode != 0 OR r.timeout)")
+        join = ""
+        if contains:
+            join = " JOIN outputs o ON o.run_id = r.id"
+            where.append("(contains_ci(o.stdout, ?) OR contains_ci(o.stderr, ?))")
+            params.extend([contains.casefold()] * 2)
+        sql = f"SELECT {', '.join('r.' + c for c in _RUN_COLUMNS)} FROM runs r{join}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.started_at DESC LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+        return [dict(zip(_RUN_COLUMNS, row)) for row in self._query(sql, params)]
+
+    def get(self, run_id: int) -> Optional[Dict[str, Any]]:
+        """Запуск вместе с stdout/stderr."""
+        rows = self._query(
+            f"SELECT {', '.join('r.' + c for c in _RUN_COLUMNS)}, o.stdout, o.stderr"
+            " FROM runs r LEFT JOIN outputs o ON o.run_id = r.id WHERE r.id = ?", (run_id,))
+        if not rows:
+            return None
+        run = dict(zip(_RUN_COLUMNS + ("stdout", "stderr"), rows[0]))
+        run["stdout"] = run["stdout"] or ""
+        run["stderr"] = run["stderr"] or ""
+        run["timing"] = self.timings([run])[0]
+        return run
+
+    def timings(self, runs: Iterable[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Этапы запусков (строки runs/get) в виде timing.Trace.to_dict(); None — запуск
+        записан без этапов (кэш или версия без трассировки).
+        """
+        runs = list(runs)
+        if not runs:
+            return []
+        spans: Dict[int, List[Dict[str, Any]]] = {}
+        usage: Dict[int, Dict[str, Any]] = {}
+        ids = [run["id"] for run in runs]
+        for part in range(0, len(ids), 500):
+            chunk = ids[part:part + 500]
+            marks = ",".join("?" * len(chunk))
+            for run_id, stage, lane, start, duration, calls in self._query(
+                    f"SELECT run_id, stage, lane, start, duration, calls FROM spans WHERE run_id IN ({marks})"
+                    " ORDER BY run_id, seq", chunk):
+                spans.setdefault(run_id, []).append(
+                    {"stage": stage, "lane": lane, "start": start, "duration": duration, "calls": calls})
+            for run_id, cpu, peak_rss, scope in self._query(
+                    f"SELECT run_id, cpu, peak_rss, scope FROM usage WHERE run_id IN ({marks})", chunk):
+                usage[run_id] = {"cpu": cpu, "peak_rss": peak_rss, "scope": scope}
+        out = []
+        for run in runs:
+            if run["id"] not in spans:
+                out.append(None)
+                continue
+            out.append({"name": run["name"], "started_at": run["started_at"], "total": run["duration"],
+                        "spans": spans[run["id"]], "usage": usage.get(run["id"], {})})
+        return out
+
+    def slowest(self, since: Optional[float] = None, until: Optional[float] = None, limit: int = 20,
+                successful_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Самые медленные проверки по средней длительности за период: число запусков, среднее,
+        p95 и максимум, средний ЦП и наибольший пик памяти, среднее время этапов.
+        """
+        where, params = [], []
+        if since is not None:
+            where.append("r.started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.started_at < ?")
+            params.append(until)
+        if successful_only:
+            where.append("r.returncode = 0 AND r.timeout = 0")
+        clause = (" WHERE " + " AND ".join(where)) if where else ""
+        rows = self._query(
+            f"SELECT r.name, COUNT(*), AVG(r.duration), MAX(r.duration), AVG(u.cpu), MAX(u.peak_rss)"
+            f" FROM runs r LEFT JOIN usage u ON u.run_id = r.id{clause}"
+            f" GROUP BY r.name ORDER BY AVG(r.duration) DESC LIMIT ?", params + [int(limit)])
+        report = []
+        for name, runs, avg, longest, cpu, peak in rows:
+            name_clause = clause + (" AND" if clause else " WHERE") + " r.name = ?"
+            durations = [d for (d,) in self._query(
+                f"SELECT r.duration FROM runs r{name_clause} ORDER BY r.duration", params + [name])]
+            p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))] if durations else None
+            # Среднее по запускам, у которых этап есть; этапы хоста пересекаются с чтением — отдельно не суммируются
+            stages = dict(self._query(
+                f"SELECT s.stage, SUM(s.duration) / COUNT(DISTINCT s.run_id) FROM spans s"
+                f" JOIN runs r ON r.id = s.run_id{name_clause} AND s.lane != 'host'"
+                f" GROUP BY s.stage ORDER BY 2 DESC", params + [name]))
+            report.append({"name": name, "runs": runs, "avg": avg, "p95": p95, "max": longest,
+                           "cpu": cpu, "peak_rss": peak, "stages": stages})
+        return report
+
+    def last_run(self, name: str, contains: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        runs = self.runs(name=name, contains=contains, limit=1)
+        return runs[0] if runs else None
+
+    def names(self) -> List[Dict[str, Any]]:
+        """Сводка по командам: число запусков, неудачных, время последнего."""
+        rows = self._query(
+            "SELECT name, COUNT(*), SUM(CASE WHEN returncode IS NULL OR returncode != 0 OR timeout"
+            " THEN 1 ELSE 0 END), MAX(started_at) FROM runs GROUP BY name ORDER BY MAX(started_at) DESC")
+        return [{"name": n, "runs": c, "failed": f, "last_started_at": t} for n, c, f, t in rows]
+
+    def durations(self, name: str, limit: int = 50, successful_only: bool = True,
+                  host: Optional[str] = None) -> List[float]:
+        """Длительности последних запусков команды (новые первыми); host — только с этого компьютера."""
+        sql, params = "SELECT duration FROM runs WHERE name = ?", [name]
+        if host is not None:
+            sql += " AND host = ?"
+            params.append(host)
+        if successful_only:
+            sql += " AND returncode = 0 AND timeout = 0"
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        return [row[0] for row in self._query(sql, params + [int(limit)])]
+
+    def stats(self) -> Dict[str, Any]:
+        count = self._query("SELECT COUNT(*) FROM runs")[0][0]
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return {"runs": count, "bytes": size, "written": self.written, "batches": self.batches,
+                "pending": self._pending, "dropped": self.dropped, "dropped_batches": self.dropped_batches,
+                "last_error": self.last_error}
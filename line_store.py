@@ -0,0 +1,102 @@
+# line_store.py
+"""
+Хранилище строк результата: только добавление, флаг stderr на строку.
+
+Окно вывода показывает лишь ограниченный срез строк, а копирование, сохранение
+и поиск работают напрямую с хранилищем, не собирая весь документ в виджете.
+"""
+import html
+from typing import Iterator, List, Optional, Tuple
+
+Line = Tuple[str, bool]  # текст без перевода строки, is_stderr
+
+
+class LineStore:
+    def __init__(self, max_lines: Optional[int] = None):
+        self.max_lines = max_lines
+        self._lines: List[str] = []
+        self._stderr = bytearray()
+        self._partial: Optional[List] = None  # незавершённая строка: [текст, is_stderr]
+        self.dropped = 0  # строк отброшено с начала из-за max_lines
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def append(self, text: str, is_stderr: bool = False) -> int:
+        """Добавляет текст; возвращает число новых завершённых строк."""
+        if not text:
+            return 0
+        if self._partial is not None:
+            text = self._partial[0] + text
+            is_stderr = is_stderr or self._partial[1]
+            self._partial = None
+        parts = text.split("\n")
+        tail = parts.pop()
+        if tail:
+            self._partial = [tail, is_stderr]
+        self._lines.extend(parts)
+        self._stderr.extend(b"\x01" * len(parts) if is_stderr else bytes(len(parts)))
+        if self.max_lines is not None and len(self._lines) > self.max_lines:
+            excess = len(self._lines) - self.max_lines
+            del self._lines[:excess]
+            del self._stderr[:excess]
+            self.dropped += excess
+        return len(parts)
+
+    @property
+    def has_partial(self) -> bool:
+        return self._partial is not None
+
+    def finish(self) -> int:
+        """Завершает незаконченную строку (конец вывода)."""
+        if self._partial is None:
+            return 0
+        return self.append("\n")
+
+    def clear(self):
+        self._lines = []
+        self._stderr = bytearray()
+        self._partial = None
+        self.dropped = 0
+
+    def lines(self, start: int, end: int) -> List[Line]:
+        start = max(0, start)
+        end = min(len(self._lines), end)
+        return [(self._lines[i], bool(self._stderr[i])) for i in range(start, end)]
+
+    def search(self, needle: str, start: int = 0, case_sensitive: bool = False,
+               backwards: bool = False) -> Optional[int]:
+        """Индекс первой строки, содержащей needle, начиная со start (или назад от него)."""
+        if not needle:
+            return None
+        if not case_sensitive:
+            needle = needle.casefold()
+        if backwards:
+            indices = range(min(start, len(self._lines) - 1), -1, -1)
+        else:
+            indices = range(max(0, start), len(self._lines))
+        for i in indices:
+            line = self._lines[i]
+            if needle in (line if case_sensitive else line.casefold()):
+                return i
+        return None
+
+    def iter_text(self, batch: int = 10000) -> Iterator[str]:
+        """Текст порциями по batch строк — для сохранения без сборки одной большой строки."""
+        for i in range(0, len(self._lines), batch):
+            yield "\n".join(self._lines[i:i + batch]) + "\n"
+        if self._partial is not None:
+            yield self._partial[0]
+
+    def text(self) -> str:
+        return "".join(self.iter_text())
+
+    def iter_html(self, batch: int = 10000) -> Iterator[str]:
+        yield "<html><body><pre>\n"
+        for i in range(0, len(self._lines), batch):
+            out = []
+            for text, is_stderr in self.lines(i, i + batch):
+                escaped = html.escape(text, quote=False)
+                out.append(f"<span style='color:#ff5555'>{escaped}</span>" if is_stderr else escaped)
+            yield "\n".join(out) + "\n"
+        yield "</pre></body></html>\n"
@@ -0,0 +1,77 @@
+# log_compression.py
+"""
+Сжатие ротированных сегментов логов и потоковое чтение сжатых файлов.
+
+gzip доступен всегда; zstd — если установлен пакет zstandard (быстрее и плотнее).
+Сжатие идёт блоками через временный файл, исходник удаляется только после успешной записи.
+"""
+import gzip
+import io
+import os
+import shutil
+from typing import BinaryIO, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd необязателен
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def resolve_method(method: Optional[str] = None) -> str:
+    """zstd, если он запрошен (или не задано ничего) и доступен; иначе gzip."""
+    if method in (None, "zstd") and zstandard is not None:
+        return "zstd"
+    return "gzip"
+
+
+def is_compressed(path: str) -> bool:
+    return path.endswith(tuple(SUFFIXES.values()))
+
+
+def strip_suffix(path: str) -> str:
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[:-len(suffix)]
+    return path
+
+
+def compress_file(path: str, method: Optional[str] = None) -> str:
+    """Сжимает path в path + .gz/.zst, удаляет исходник и возвращает новое имя."""
+    method = resolve_method(method)
+    target = path + SUFFIXES[method]
+    tmp = target + ".tmp"
+    try:
+        with open(path, "rb") as src:
+            if method == "zstd":
+                with open(tmp, "wb") as raw:
+                    with zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw) as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            else:
+                with gzip.open(tmp, "wb", compresslevel=GZIP_LEVEL) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    os.remove(path)
+    return target
+
+
+def open_compressed(path: str) -> BinaryIO:
+    """Бинарный поток с распаковкой на лету; несжатые файлы открываются как есть."""
+    if path.endswith(SUFFIXES["gzip"]):
+        return gzip.open(path, "rb")
+    if path.endswith(SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise OSError("Для чтения .zst требуется пакет zstandard")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True),
+                                 CHUNK_SIZE)
+    return open(path, "rb")
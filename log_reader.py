@@ -0,0 +1,288 @@
+# log_reader.py
+"""
+Постраничное чтение больших текстовых логов без загрузки файла целиком.
+
+Файл читается через mmap. Индекс строк разреженный: для каждого блока ~1 МиБ,
+выровненного по концу строки, хранятся смещение и число строк до него. Строки
+внутри блока находятся при чтении страницы. При росте файла индекс достраивается
+с последнего проиндексированного байта, при усечении или ротации — строится заново.
+Переход к дате — двоичный поиск по первой метке времени блоков (лог хронологический).
+
+Отображение открывается только на время операции: на Windows открытое отображение
+не дало бы обработчику логов переименовать файл при ротации.
+
+Сжатые сегменты (.gz, .zst) один раз распаковываются потоком во временный файл,
+дальше работа идёт с ним так же, как с обычным логом.
+"""
+import bisect
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from log_compression import CHUNK_SIZE, is_compressed, open_compressed, strip_suffix
+from output_decoding import detect_encoding
+
+BLOCK_SIZE = 1024 * 1024
+# Кодировка, в которой logger.py пишет лог; ею читается файл, если по началу кодировку не определить
+LOG_ENCODING = "cp1251"
+# Начало записи: logger.py («2026-01-31 12:00:00,123 - INFO - ...») и SystemCheckPy («=== 2026-01-31 12:00:00 ===»)
+TIMESTAMP_RE = re.compile(rb"^(?:=== )?(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)", re.MULTILINE)
+# Текущие логи и их ротированные копии: log_20260131.txt, log_20260131.txt.2026-02-01,
+# сегменты по размеру log_20260131.txt.2026-01-31_14-05-09 и сжатые .gz/.zst
+LOG_NAME_RE = re.compile(r"^log_\d{8}\.txt(\.\d{4}-\d\d-\d\d(_\d\d-\d\d-\d\d(-\d+)?)?)?(\.gz|\.zst)?$")
+
+
+def parse_timestamp(raw: bytes) -> Optional[datetime]:
+    try:
+        return datetime.strptime(raw.decode("ascii"), "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def list_log_files(logs_dir: str) -> List[str]:
+    """Логи в папке (включая ротированные копии), от новых к старым."""
+    try:
+        names = [n for n in os.listdir(logs_dir) if LOG_NAME_RE.match(n)]
+    except OSError:
+        return []
+    paths = [os.path.join(logs_dir, n) for n in names]
+    # Сжатый сегмент получает mtime момента сжатия — сортируем по имени без суффикса
+    def order(path: str):
+        day, _, rotated = os.path.basename(strip_suffix(path)).partition(".txt")
+        # Активный файл дня новее всех его сегментов; номера сравниваются как числа
+        return day, tuple(int(x) for x in re.findall(r"\d+", rotated)) if rotated else (float("inf"),)
+
+    return sorted(paths, key=order, reverse=True)
+
+
+class LogIndex:
+    def __init__(self, path: str, encoding: Optional[str] = None, block_size: int = BLOCK_SIZE,
+                 default_encoding: str = LOG_ENCODING):
+        self.source = path
+        self.path = path
+        self._spooled: Optional[str] = None
+        if is_compressed(path):
+            self._spooled = self.path = self._spool(path)
+        self.block_size = block_size
+        self.encoding = encoding
+        # Начало лога бывает чисто ASCII, а кириллица — дальше: тогда не utf-8, а кодировка записи
+        self.default_encoding = default_encoding
+        self._offsets = array("Q")   # начало блока
+        self._before = array("Q")    # строк до начала блока
+        self._indexed = 0            # байт проиндексировано (до конца последней полной строки)
+        self._lines = 0
+        self._size = 0
+        self._block_times: Dict[int, Optional[datetime]] = {}
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self._lines
+
+    @staticmethod
+    def _spool(path: str) -> str:
+        fd, spooled = tempfile.mkstemp(prefix="log_", suffix=".txt")
+        try:
+            with open(fd, "wb") as dst, open_compressed(path) as src:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        except BaseException:
+            os.remove(spooled)
+            raise
+        return spooled
+
+    def close(self):
+        """Удаляет временный файл распакованного сегмента."""
+        if getattr(self, "_spooled", None) is not None:
+            try:
+                os.remove(self._spooled)
+            except OSError:
+                pass
+            self._spooled = None
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @contextmanager
+    def _mapped(self) -> Iterator[Optional[mmap.mmap]]:
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            yield None
+            return
+        try:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                yield None
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                yield mm
+            finally:
+                mm.close()
+        finally:
+            f.close()
+
+    def _reset(self):
+        self._offsets = array("Q")
+        self._before = array("Q")
+        self._indexed = 0
+        self._lines = 0
+        self._block_times = {}
+
+    def refresh(self) -> bool:
+        """Достраивает индекс по новым данным. True — появились новые строки."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._indexed:
+            # Файл усечён или подменён при ротации
+            self._reset()
+        self._size = size
+        if size == self._indexed:
+            return False
+        old_lines = self._lines
+        with self._mapped() as mm:
+            if mm is None:
+                return False
+            size = len(mm)
+            if self.encoding is None:
+                self.encoding = detect_encoding(mm[:64 * 1024], final=size <= 64 * 1024) or self.default_encoding
+            # Последний блок мог быть неполным — переиндексируем его
+            if self._offsets and self._offsets[-1] + self.block_size > self._indexed:
+                pos = self._offsets.pop()
+                self._lines = self._before.pop()
+                self._block_times.pop(len(self._offsets), None)
+            else:
+                pos = self._indexed
+            while pos < size:
+                end = min(pos + self.block_size, size)
+                nl = mm.rfind(b"\n", pos, end)
+                if nl < 0:
+                    nl = mm.find(b"\n", end)  # строка длиннее блока
+                    if nl < 0:
+                        break  # незавершённая последняя строка — дождёмся перевода строки
+                block_end = nl + 1
+                self._offsets.append(pos)
+                self._before.append(self._lines)
+                self._lines += mm[pos:block_end].count(b"\n")
+                pos = block_end
+            self._indexed = pos
+        return self._lines > old_lines
+
+    # --- чтение ---
+
+    def _block_of_line(self, line: int) -> int:
+        return bisect.bisect_right(self._before, line) - 1
+
+    def _block_end(self, block: int) -> int:
+        return self._offsets[block + 1] if block + 1 < len(self._offsets) else self._indexed
+
+    def _decode(self, raw: bytes) -> str:
+        return raw.decode(self.encoding or self.default_encoding, errors="replace")
+
+    def read_lines(self, start: int, count: int) -> List[str]:
+        """Строки [start, start+count) без переводов строк."""
+        start = max(0, start)
+        count = min(count, self._lines - start)
+        if count <= 0:
+            return []
+        block = self._block_of_line(start)
+        out: List[str] = []
+        with self._mapped() as mm:
+            if mm is None:
+                return []
+            skip = start - self._before[block]
+            while len(out) < count and block < len(self._offsets):
+                lines = mm[self._offsets[block]:self._block_end(block)].split(b"\n")[:-1]
+                chunk = lines[skip:skip + count - len(out)]
+                out.extend(self._decode(line).rstrip("\r") for line in chunk)
+                skip = 0
+                block += 1
+        return out
+
+    def line_of_offset(self, offset: int) -> int:
+        """Номер строки, содержащей байт offset."""
+        block = bisect.bisect_right(self._offsets, offset) - 1
+        if block < 0:
+            return 0
+        with self._mapped() as mm:
+            if mm is None:
+                return 0
+            return self._before[block] + mm[self._offsets[block]:offset].count(b"\n")
+
+    def find(self, text: str, start_line: int = 0, backwards: bool = False) -> Optional[int]:
+        """Строка с первым вхождением text после start_line (или последним до неё)."""
+        needle = text.encode(self.encoding or self.default_encoding, errors="replace")
+        if not needle or not self._lines:
+            return None
+        start_line = min(max(0, start_line), self._lines - 1)
+        block = self._block_of_line(start_line)
+        with self._mapped() as mm:
+            if mm is None:
+                return None
+            # Смещение начала строки start_line
+            pos = self._offsets[block]
+            for _ in range(start_line - self._before[block]):
+                pos = mm.find(b"\n", pos) + 1
+            if backwards:
+                found = mm.rfind(needle, 0, pos)
+            else:
+                found = mm.find(needle, pos, self._indexed)
+        if found < 0:
+            return None
+        return self.line_of_offset(found)
+
+    def _first_time(self, mm: mmap.mmap, block: int) -> Optional[datetime]:
+        if block not in self._block_times:
+            start = self._offsets[block]
+            end = self._block_end(block)
+            match = TIMESTAMP_RE.search(mm, start, end)
+            self._block_times[block] = parse_timestamp(match.group(1)) if match else None
+        return self._block_times[block]
+
+    def line_for_time(self, when: datetime) -> int:
+        """Первая строка с меткой времени не раньше when (или конец лога)."""
+        with self._mapped() as mm:
+            if mm is None or not self._offsets:
+                return 0
+            lo, hi = 0, len(self._offsets)
+            # Первый блок, начинающийся позже when: искомая запись — в предыдущем
+            while lo < hi:
+                mid = (lo + hi) // 2
+                t = self._first_time(mm, mid)
+                if t is not None and t > when:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            block = max(0, lo - 1)
+            # Метки вида ГГГГ-ММ-ДД ЧЧ:ММ:СС упорядочены так же, как байтовые строки
+            target = when.strftime("%Y-%m-%d %H:%M:%S").encode("ascii")
+            for match in TIMESTAMP_RE.finditer(mm, self._offsets[block], self._indexed):
+                if match.group(1) >= target:
+                    offset = match.start()
+                    break
+            else:
+                return self._lines
+        return self.line_of_offset(offset)
+
+    def time_range(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """Метки времени первой и последней записи."""
+        with self._mapped() as mm:
+            if mm is None or not self._offsets:
+                return None, None
+            first = self._first_time(mm, 0)
+            last = None
+            start = self._offsets[-1]
+            for match in TIMESTAMP_RE.finditer(mm, start, self._indexed):
+                last = parse_timestamp(match.group(1)) or last
+        return first, last
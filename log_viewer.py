@@ -0,0 +1,204 @@
+# log_viewer.py
+"""
+Окно текстового лога поверх LogIndex: в виджете только текущая страница строк,
+открывается с конца файла, режим «Следить» дочитывает новые строки по таймеру.
+Соседние страницы подгружаются при прокрутке к краю, есть переход к дате и поиск.
+Сжатые сегменты (.gz, .zst) открываются так же, как обычные.
+"""
+import os
+
+from PyQt5.QtCore import QDateTime, QTimer
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLineEdit, QCheckBox,
+                             QPushButton, QPlainTextEdit, QLabel, QDateTimeEdit)
+
+from log_reader import LogIndex, list_log_files
+
+PAGE_LINES = 1000
+FOLLOW_INTERVAL_MS = 1000
+
+
+class LogViewerDialog(QDialog):
+    def __init__(self, logs_dir: str, parent=None, path: str = None):
+        super().__init__(parent)
+        self.logs_dir = logs_dir
+        self.index = None
+        self._start = 0  # первая показанная строка
+        self._loading = False
+        self.setWindowTitle("Текстовый лог")
+        self.resize(1000, 700)
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        self.file_combo = QComboBox()
+        self.file_combo.setMinimumWidth(280)
+        top.addWidget(self.file_combo)
+        self.date_edit = QDateTimeEdit(QDateTime.currentDateTime())
+        self.date_edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+        self.date_edit.setCalendarPopup(True)
+        top.addWidget(self.date_edit)
+        goto = QPushButton("К дате")
+        goto.clicked.connect(self.jump_to_date)
+        top.addWidget(goto)
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Найти в логе (Enter — дальше)")
+        self.find_input.returnPressed.connect(self.find_next)
+        top.addWidget(self.find_input, 1)
+        self.follow_checkbox = QCheckBox("Следить")
+        self.follow_checkbox.setChecked(True)
+        self.follow_checkbox.toggled.connect(self.on_follow_toggled)
+        top.addWidget(self.follow_checkbox)
+        layout.addLayout(top)
+
+        nav = QHBoxLayout()
+        for title, handler in (("⏮ Начало", self.go_first), ("◀ Страница", self.page_up),
+                               ("Страница ▶", self.page_down), ("Конец ⏭", self.go_last)):
+            button = QPushButton(title)
+            button.clicked.connect(handler)
+            nav.addWidget(button)
+        self.position_label = QLabel("")
+        nav.addWidget(self.position_label, 1)
+        layout.addLayout(nav)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.text.verticalScrollBar().valueChanged.connect(self._on_scroll)
+        layout.addWidget(self.text, 1)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(FOLLOW_INTERVAL_MS)
+        self.timer.timeout.connect(self.poll)
+
+        for log_path in list_log_files(logs_dir):
+            self.file_combo.addItem(os.path.basename(log_path), log_path)
+        if path and self.file_combo.findData(path) < 0:
+            self.file_combo.insertItem(0, os.path.basename(path), path)
+        if path:
+            self.file_combo.setCurrentIndex(self.file_combo.findData(path))
+        self.file_combo.currentIndexChanged.connect(lambda _: self.open_current())
+        self.open_current()
+
+    # --- файл ---
+
+    def open_current(self):
+        path = self.file_combo.currentData()
+        if not path:
+            self.text.setPlainText("Лог-файлы не найдены.")
+            return
+        if self.index is not None:
+            self.index.close()
+        self.index = LogIndex(path)
+        first, _ = self.index.time_range()
+        if first is not None:
+            self.date_edit.setDateTime(QDateTime(first))
+        self.go_last()
+        self.on_follow_toggled(self.follow_checkbox.isChecked())
+
+    def on_follow_toggled(self, checked):
+        if checked and self.index is not None:
+            self.timer.start()
+            self.go_last()
+        else:
+            self.timer.stop()
+
+    def poll(self):
+        if self.index is None:
+            return
+        at_end = self._start + self.text.blockCount() >= len(self.index)
+        if self.index.refresh() and at_end:
+            self.go_last()
+        else:
+            self._update_label()
+
+    # --- страницы ---
+
+    def _show(self, start: int, cursor_line: int = None, at_bottom: bool = False):
+        total = len(self.index) if self.index else 0
+        start = max(0, min(start, total - PAGE_LINES))
+        lines = self.index.read_lines(start, PAGE_LINES) if self.index else []
+        self._loading = True
+        try:
+            self._start = start
+            self.text.setPlainText("\n".join(lines))
+            bar = self.text.verticalScrollBar()
+            if cursor_line is not None:
+                block = self.text.document().findBlockByNumber(max(0, cursor_line - start))
+                cursor = QTextCursor(block)
+                cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+                self.text.setTextCursor(cursor)
+                self.text.centerCursor()
+            elif at_bottom:
+                bar.setValue(bar.maximum())
+            else:
+                bar.setValue(0)
+        finally:
+            self._loading = False
+        self._update_label()
+
+    def _update_label(self):
+        total = len(self.index) if self.index else 0
+        shown = self.text.blockCount() if total else 0
+        size_mb = self.index.size / (1024 * 1024) if self.index else 0
+        self.position_label.setText(
+            f"Строки {self._start + 1}–{self._start + shown} из {total} ({size_mb:.1f} МиБ)")
+
+    def go_first(self):
+        self.follow_checkbox.setChecked(False)
+        self._show(0)
+
+    def go_last(self):
+        if self.index is not None:
+            self._show(len(self.index) - PAGE_LINES, at_bottom=True)
+
+    def page_up(self):
+        self.follow_checkbox.setChecked(False)
+        self._show(self._start - PAGE_LINES // 2, at_bottom=True)
+
+    def page_down(self):
+        self._show(self._start + PAGE_LINES // 2)
+
+    def _on_scroll(self, value):
+        if self._loading or self.index is None:
+            return
+        bar = self.text.verticalScrollBar()
+        if value == bar.minimum() and self._start > 0:
+            self.follow_checkbox.setChecked(False)
+            anchor = self._start
+            self._show(self._start - PAGE_LINES // 2)
+            self.text.verticalScrollBar().setValue(anchor - self._start)
+        elif value == bar.maximum() and self._start + self.text.blockCount() < len(self.index):
+            anchor = self._start + self.text.blockCount()
+            self._show(self._start + PAGE_LINES // 2)
+            visible = bar.pageStep()
+            self.text.verticalScrollBar().setValue(max(0, anchor - self._start - visible))
+
+    # --- переходы ---
+
+    def jump_to_date(self):
+        if self.index is None:
+            return
+        self.follow_checkbox.setChecked(False)
+        when = self.date_edit.dateTime().toPyDateTime().replace(second=0, microsecond=0)
+        line = self.index.line_for_time(when)
+        self._show(line - PAGE_LINES // 4, cursor_line=line)
+
+    def find_next(self):
+        needle = self.find_input.text()
+        if self.index is None or not needle:
+            return
+        self.follow_checkbox.setChecked(False)
+        current = self._start + self.text.textCursor().blockNumber() + 1
+        line = self.index.find(needle, start_line=current)
+        if line is None:
+            line = self.index.find(needle, start_line=0)  # по кругу
+        if line is None:
+            self.position_label.setText(f"«{needle}» не найдено")
+            return
+        self._show(line - PAGE_LINES // 4, cursor_line=line)
+
+    def done(self, result):
+        self.timer.stop()
+        if self.index is not None:
+            self.index.close()
+        super().done(result)
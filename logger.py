@@ -1,10 +1,281 @@
 # logger.py
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from logging.handlers import TimedRotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from typing import List, Optional
 
-def setup_logger():
+from log_compression import SUFFIXES, compress_file, is_compressed, resolve_method
+from log_reader import LOG_ENCODING, LOG_NAME_RE
+
+# Результаты длиннее порога пишутся в отдельный файл, в логе остаётся ссылка
+PAYLOAD_INLINE_LIMIT = 16 * 1024
+QUEUE_SIZE = 1000
+# Что делать, если очередь записи переполнена:
+#   block — ждать места (не дольше BLOCK_TIMEOUT, затем как drop),
+#   drop  — отбросить запись и посчитать,
+#   spill — дописать запись в файл переполнения прямо из вызывающего потока.
+OVERFLOW_POLICIES = ("block", "drop", "spill")
+BLOCK_TIMEOUT = 5.0
+# Ротация: в полночь и при достижении размера; сегменты сжимаются в фоне
+MAX_LOG_BYTES = 32 * 1024 * 1024
+RETENTION_DAYS = 7
+MAX_TOTAL_BYTES = 1024 * 1024 * 1024
+
+_listener: Optional[QueueListener] = None
+_compressor: Optional["SegmentCompressor"] = None
+
+
+class PayloadSpooler(logging.Filter):
+    """
+    Выполняется в потоке записи: крупный результат (record.payload) сохраняется
+    в logs/payloads, в строку лога попадает ссылка на файл; мелкий — вставляется как есть.
+    """
+
+    def __init__(self, payloads_dir: str, inline_limit: int = PAYLOAD_INLINE_LIMIT,
+                 compressor: Optional["SegmentCompressor"] = None):
+        super().__init__()
+        self.payloads_dir = payloads_dir
+        self.inline_limit = inline_limit
+        # Файлы результатов тоже сжимаются в фоне; в логе сразу указывается итоговое имя
+        self.compressor = compressor
+        self._counter = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        payload = getattr(record, "payload", None)
+        if payload is None:
+            return True
+        record.payload = None
+        payload = str(payload)
+        if len(payload) <= self.inline_limit:
+            record.msg = f"{record.msg}\nResult: {payload}"
+            return True
+        os.makedirs(self.payloads_dir, exist_ok=True)
+        self._counter += 1
+        name = datetime.fromtimestamp(record.created).strftime("result_%Y%m%d_%H%M%S")
+        path = os.path.join(self.payloads_dir, f"{name}_{self._counter:04d}.txt")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            if self.compressor is not None:
+                self.compressor.submit(path)
+                path += SUFFIXES[self.compressor.method]
+            record.msg = f"{record.msg}\nResult: [{len(payload)} символов в {path}]"
+        except OSError as e:
+            record.msg = f"{record.msg}\nResult: [{len(payload)} символов, не удалось сохранить: {e}]"
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """QueueHandler с ограниченной очередью и политикой переполнения."""
+
+    def __init__(self, log_queue: "queue.Queue", policy: str = "spill", spill_path: Optional[str] = None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {policy}")
+        super().__init__(log_queue)
+        self.policy = policy
+        self.spill_path = spill_path
+        self.dropped = 0
+        self.spilled = 0
+        self._spill_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=BLOCK_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            if self.policy == "spill" and self.spill_path:
+                self._spill(record)
+            else:
+                self.dropped += 1
+
+    def _spill(self, record: logging.LogRecord):
+        payload = getattr(record, "payload", None)
+        text = record.getMessage()
+        if payload is not None:
+            text = f"{text}\nResult: [{len(str(payload))} символов не записано: очередь лога переполнена]"
+        line = f"{datetime.fromtimestamp(record.created):%Y-%m-%d %H:%M:%S} - {record.levelname} - {text}\n"
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self.spilled += 1
+            except OSError:
+                self.dropped += 1
+
+
+def prune_logs(logs_dir: str, keep: List[str], retention_days: Optional[float] = RETENTION_DAYS,
+               max_total_bytes: Optional[int] = MAX_TOTAL_BYTES) -> int:
+    """
+    Удаляет старые сегменты логов и файлы результатов: старше retention_days, затем
+    самые старые, пока общий объём больше max_total_bytes. keep — активные файлы.
+    Возвращает число удалённых файлов.
+    """
+    candidates = []
+    payloads_dir = os.path.join(logs_dir, 'payloads')
+    for directory, match in ((logs_dir, LOG_NAME_RE.match), (payloads_dir, lambda n: n.startswith("result_"))):
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            if not match(name) or path in keep:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            candidates.append((st.st_mtime, st.st_size, path))
+    candidates.sort()
+    total = sum(size for _, size, _ in candidates)
+    cutoff = time.time() - retention_days * 86400 if retention_days else None
+    removed = 0
+    for mtime, size, path in candidates:
+        expired = cutoff is not None and mtime < cutoff
+        if not expired and (not max_total_bytes or total <= max_total_bytes):
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+class SegmentCompressor:
+    """
+    Фоновый поток: сжимает ротированные сегменты и применяет срок хранения.
+    Поток записи лога только переименовывает файл и ставит его в очередь.
+    """
+
+    def __init__(self, logs_dir: str, method: Optional[str] = None, keep: Optional[List[str]] = None,
+                 retention_days: Optional[float] = RETENTION_DAYS,
+                 max_total_bytes: Optional[int] = MAX_TOTAL_BYTES):
+        self.logs_dir = logs_dir
+        self.method = resolve_method(method)
+        self.keep = list(keep or [])
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = threading.Thread(target=self._loop, name="log-compressor", daemon=True)
+        self._thread.start()
+
+    def submit(self, path: str):
+        self._idle.clear()
+        self._queue.put(path)
+
+    def submit_leftovers(self):
+        """Несжатые сегменты прошлых запусков (например, не успели сжаться при выходе)."""
+        try:
+            names = os.listdir(self.logs_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.logs_dir, name)
+            if LOG_NAME_RE.match(name) and not is_compressed(path) and path not in self.keep:
+                self.submit(path)
+
+    def _loop(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                break
+            try:
+                size = os.path.getsize(path)
+                target = compress_file(path, self.method)
+                self.compressed += 1
+                self.bytes_in += size
+                self.bytes_out += os.path.getsize(target)
+            except OSError:
+                pass
+            if self._queue.empty():
+                prune_logs(self.logs_dir, self.keep, self.retention_days, self.max_total_bytes)
+                self._idle.set()
+        self._idle.set()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт, пока очередь сжатия опустеет."""
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    """
+    Ротация в полночь (как раньше) и дополнительно при превышении max_bytes.
+    Сегмент по размеру получает суффикс с точным временем: log_20260131.txt.2026-01-31_14-05-09.
+    Ротированный файл передаётся в compressor (если задан) вместо хранения как есть.
+    """
+
+    def __init__(self, filename: str, max_bytes: int = MAX_LOG_BYTES,
+                 compressor: Optional[SegmentCompressor] = None, **kwargs):
+        kwargs.setdefault("when", "midnight")
+        kwargs["backupCount"] = 0  # сроком хранения занимается SegmentCompressor/prune_logs
+        super().__init__(filename, **kwargs)
+        self.max_bytes = max_bytes
+        self.compressor = compressor
+        self.size_rollovers = 0
+        if compressor is not None:
+            self.rotator = self._rotate_and_compress
+
+    def _rotate_and_compress(self, source: str, dest: str):
+        if os.path.exists(source):
+            os.rename(source, dest)
+            self.compressor.submit(dest)
+
+    def _size_exceeded(self) -> bool:
+        if not self.max_bytes:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.max_bytes
+
+    def shouldRollover(self, record) -> bool:
+        return super().shouldRollover(record) or self._size_exceeded()
+
+    def doRollover(self):
+        if int(time.time()) >= self.rolloverAt:
+            super().doRollover()
+            return
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        base = self.baseFilename + "." + datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        dfn, n = base, 1
+        while os.path.exists(dfn) or any(os.path.exists(dfn + s) for s in (".gz", ".zst")):
+            n += 1
+            dfn = f"{base}-{n}"
+        self.rotate(self.baseFilename, self.rotation_filename(dfn))
+        self.size_rollovers += 1
+        if not self.delay:
+            self.stream = self._open()
+
+
+def setup_logger(policy: str = "spill", queue_size: int = QUEUE_SIZE,
+                 inline_limit: int = PAYLOAD_INLINE_LIMIT, max_bytes: int = MAX_LOG_BYTES,
+                 compression: Optional[str] = "auto", retention_days: Optional[float] = RETENTION_DAYS,
+                 max_total_bytes: Optional[int] = MAX_TOTAL_BYTES):
+    """
+    Запись лога идёт в фоновом потоке (QueueListener); вызывающий поток только
+    кладёт короткую запись в ограниченную очередь. compression: "auto" (zstd, если
+    установлен, иначе gzip), "gzip", "zstd" или None — без сжатия сегментов.
+    """
+    global _listener, _compressor
     # Папка для логов
     logs_dir = os.path.join(os.getcwd(), 'logs')
     os.makedirs(logs_dir, exist_ok=True)
@@ -13,23 +284,74 @@ def setup_logger():
     log_filename = datetime.now().strftime("log_%Y%m%d.txt")
     log_path = os.path.join(logs_dir, log_filename)
 
-    # Настраиваем ротацию по дням, храним неделю
-    handler = TimedRotatingFileHandler(
-        log_path, when='midnight', interval=1, backupCount=7, encoding='cp1251'
+    shutdown_logger()
+    # Ротация в полночь и по размеру; сегменты сжимаются в фоне, храним неделю
+    _compressor = SegmentCompressor(
+        logs_dir, None if compression == "auto" else compression, keep=[log_path],
+        retention_days=retention_days, max_total_bytes=max_total_bytes,
+    ) if compression else None
+    handler = SizedTimedRotatingFileHandler(
+        log_path, max_bytes=max_bytes, compressor=_compressor,
+        when='midnight', interval=1, encoding=LOG_ENCODING, errors='replace'
     )
+    if _compressor is not None:
+        _compressor.submit_leftovers()
     formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     handler.setFormatter(formatter)
+    handler.addFilter(PayloadSpooler(os.path.join(logs_dir, 'payloads'), inline_limit, _compressor))
+
+    log_queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(
+        log_queue, policy, spill_path=os.path.join(logs_dir, datetime.now().strftime("overflow_%Y%m%d.txt"))
+    )
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
 
     logger = logging.getLogger()
     logger.setLevel(logging.INFO)
     # Убираем старые хендлеры, чтобы не дублировать записи
     logger.handlers = []
-    logger.addHandler(handler)
+    logger.addHandler(queue_handler)
+
+
+def shutdown_logger():
+    """Дописывает очередь и останавливает потоки записи и сжатия."""
+    global _listener, _compressor
+    if _listener is not None:
+        listener, _listener = _listener, None
+        while True:
+            try:
+                listener.stop()
+                break
+            except queue.Full:
+                # Маркер остановки не помещается — ждём, пока поток записи разгребёт очередь
+                time.sleep(0.05)
+        for handler in listener.handlers:
+            handler.close()
+    if _compressor is not None:
+        compressor, _compressor = _compressor, None
+        compressor.stop()
+
+
+def logging_stats() -> dict:
+    handler = next((h for h in logging.getLogger().handlers if isinstance(h, BoundedQueueHandler)), None)
+    stats = {"queued": 0, "dropped": 0, "spilled": 0}
+    if handler is not None:
+        stats.update(queued=handler.queue.qsize(), dropped=handler.dropped, spilled=handler.spilled)
+    if _compressor is not None:
+        stats.update(segments_compressed=_compressor.compressed, bytes_before=_compressor.bytes_in,
+                     bytes_after=_compressor.bytes_out)
+    return stats
+
+
+atexit.register(shutdown_logger)
+
 
 def log_command_result(command, result, success=True):
-    status = "SUCCESS" if success else "ERROR"
-    message = f"Command: {command}\nResult: {result}"
+    # Результат передаётся отдельно: склейка, кодирование и запись — в потоке записи
+    message = f"Command: {command}"
+    extra = {"payload": "" if result is None else result}
     if success:
-        logging.info(message)
+        logging.info(message, extra=extra)
     else:
-        logging.error(message)
\ No newline at end of file
+        logging.error(message, extra=extra)
@@ -1,29 +1,41 @@
 # main.py
 import sys
 import os
-from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QComboBox, QPushButton, QVBoxLayout, QWidget, QTextEdit, QProgressBar, QSpinBox, QLineEdit, QCheckBox, QMessageBox, QFileDialog, QInputDialog
+from PyQt5.QtWidgets import QApplication, QMainWindow, QLabel, QComboBox, QPushButton, QVBoxLayout, QWidget, QProgressBar, QSpinBox, QLineEdit, QCheckBox, QMessageBox, QFileDialog, QInputDialog
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import QThread, pyqtSignal, QSettings
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSettings, QTimer
 from PyQt5.QtWidgets import QShortcut
 from PyQt5.QtGui import QKeySequence
-import re
- 
-import ctypes
-from system_checks import run_command, launch_command, collect_output
-from logger import setup_logger, log_command_result
-from admin_check import is_admin
-from commands import commands
+from output_coalescer import OutputCoalescer, DEFAULT_FLUSH_INTERVAL_MS, normalize_newlines
+from output_view import OutputView, DEFAULT_SCROLLBACK
+import threading
+import time
 from datetime import datetime
 
+# Для первой отрисовки окна нужны только Qt и виджет вывода. Каталог команд, пул PowerShell
+# и SQLite (system_checks), логгер, поиск, окна истории и лога импортируются при первом
+# обращении или на втором этапе запуска, когда окно уже показано.
+
+SEARCH_DEBOUNCE_MS = 150
+STARTUP_FALLBACK_MS = 500
+
 class CommandWorker(QThread):
     finished = pyqtSignal(str, object)
     progress = pyqtSignal(str, bool)  # text, is_stderr
 
-    def __init__(self, command, command_name, timeout=30):
+    def __init__(self, command, command_name, timeout=30, structured=None, argv=None, backend=None,
+                 timeout_policy=None):
         super().__init__()
         self.command = command
         self.command_name = command_name
         self.timeout = timeout
+        # Как выбран таймаут (timeout_policy.TimeoutDecision.to_dict()), попадает в результат
+        self.timeout_policy = timeout_policy
+        # В структурированном режиме ("json"/"csv") поток в окно не показываем
+        self.structured = structured
+        # argv — прямой запуск программы без PowerShell (ключ "argv" записи каталога)
+        self.argv = argv
+        self.backend = backend
         self.process = None
         self._cancelled = False
 
@@ -36,43 +48,72 @@ class CommandWorker(QThread):
             pass
 
     def run(self):
-        # Потоковый вывод
-        self.process = launch_command(self.command)
-        try:
-            # Чтение stdout построчно
-            if self.process.stdout is not None:
-                while True:
-                    line = self.process.stdout.readline()
-                    if not line:
-                        break
-                    try:
-                        text = line.decode('cp1251', errors='replace')
-                    except Exception:
-                        text = line.decode(errors='replace')
-                    self.progress.emit(text, False)
-            # После завершения stdout дочитываем stderr
-            if self.process.stderr is not None:
-                while True:
-                    err = self.process.stderr.readline()
-                    if not err:
-                        break
-                    try:
-                        etext = err.decode('cp1251', errors='replace')
-                    except Exception:
-                        etext = err.decode(errors='replace')
-                    self.progress.emit(etext, True)
-        except Exception:
-            pass
-        # Собираем итог
-        result = collect_output(self.process, timeout=self.timeout)
-        if self._cancelled and result.get("returncode", 0) != 0:
+        from system_checks import launch_command, collect_output, stream_output, finish_result, get_flights, flight_key
+        from commands import commands
+        from process_tree import KILL_GRACE
+        meta = commands.get(self.command_name, {})
+
+        def work(flight):
+            started_at = time.time()
+            process = flight.track(launch_command(self.command, self.argv, self.backend))
+            if self.structured:
+                result = collect_output(process, timeout=self.timeout)
+            else:
+                # stdout и stderr читаются одновременно и декодируются по ходу; куски целых строк —
+                # всем окнам и запросам, ждущим эту команду
+                result = stream_output(process, on_chunk=flight.publish, timeout=self.timeout,
+                                       cancelled=flight.cancelled)
+                result["streamed"] = True
+            result["started_at"], result["duration"] = started_at, time.time() - started_at
+            return finish_result(self.command_name, meta, self.command, result, "gui", fmt=self.structured)
+
+        # Та же команда уже выполняется (пакет, другое окно) — подключаемся к ней, а не запускаем заново;
+        # уже выданный вывод приходит из буфера повтора
+        self.process = get_flights().join(flight_key(self.command, self.argv, self.backend, self.structured,
+                                                     name=self.command_name),
+                                          on_chunk=None if self.structured else self.progress.emit)
+        result = self.process.run(work, self.timeout, grace=KILL_GRACE)
+        if self._cancelled and result.get("returncode", 0) != 0 and not result.get("cancelled"):
+            result["cancelled"] = True
             result["stderr"] = (result.get("stderr") or "").strip()
             if result["stderr"]:
                 result["stderr"] = f"Отменено пользователем.\n{result['stderr']}"
             else:
                 result["stderr"] = "Отменено пользователем."
+        result["timeout_policy"] = self.timeout_policy
         self.finished.emit(self.command_name, result)
 
+class BatchWorker(QThread):
+    item_finished = pyqtSignal(str, object)
+    all_finished = pyqtSignal(int)
+
+    def __init__(self, names, max_workers=4, timeout=30, structured=None, adaptive_timeouts=False, batch_cim=False):
+        super().__init__()
+        self.names = list(names)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.structured = structured
+        self.adaptive_timeouts = adaptive_timeouts
+        self.batch_cim = batch_cim
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        from system_checks import run_many
+        from admin_check import is_admin, is_recovery_environment
+        from commands import commands
+        count = 0
+        for name, result in run_many(self.names, commands, max_workers=self.max_workers,
+                                     timeout=self.timeout, admin=bool(is_admin()),
+                                     recovery=is_recovery_environment(), cancel_event=self._cancel,
+                                     structured=self.structured, adaptive_timeouts=self.adaptive_timeouts,
+                                     batch_cim=self.batch_cim):
+            count += 1
+            self.item_finished.emit(name, result)
+        self.all_finished.emit(count)
+
 class SystemCheckApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -80,7 +121,25 @@ class SystemCheckApp(QMainWindow):
         self.setGeometry(100, 100, 600, 400)
         # Настройки приложения
         self.settings = QSettings("SystemCheckPy", "SystemCheckPyApp")
+        self.commands = {}
+        self.favorites = set()
+        self.startup_done = False
+        self._startup_scheduled = False
+        # Время отрисовки потока текущей команды (этап «отрисовка» в её трассе)
+        self._render_time = 0.0
+        self._render_start = None
         self.initUI()
+        # Второй этап запуска — после первой отрисовки окна (или по таймеру, если окно свёрнуто)
+        QTimer.singleShot(STARTUP_FALLBACK_MS, self._schedule_startup)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        self._schedule_startup()
+
+    def _schedule_startup(self):
+        if not self._startup_scheduled:
+            self._startup_scheduled = True
+            QTimer.singleShot(0, self.finish_startup)
 
     def initUI(self):
         layout = QVBoxLayout()
@@ -88,9 +147,23 @@ class SystemCheckApp(QMainWindow):
         # Поиск и избранное
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск команды...")
-        self.search_input.textChanged.connect(self.refresh_command_list)
+        # Поиск запускается после короткой паузы в наборе, а не на каждую букву
+        self._search_debounce = QTimer(self)
+        self._search_debounce.setSingleShot(True)
+        self._search_debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_debounce.timeout.connect(self.refresh_command_list)
+        self.search_input.textChanged.connect(lambda _: self._search_debounce.start())
+        self.search_input.returnPressed.connect(self.refresh_command_list)
         layout.addWidget(self.search_input)
 
+        self.structured_checkbox = QCheckBox("Структурированный вывод (JSON)")
+        layout.addWidget(self.structured_checkbox)
+
+        # Для инвентаризационных проверок (snapshot_key) — разница с прошлым запуском вместо списка
+        self.changes_checkbox = QCheckBox("Показывать только изменения с прошлого запуска")
+        self.changes_checkbox.setToolTip("Только в структурированном режиме, для списков служб, портов, ПО и т.п.")
+        layout.addWidget(self.changes_checkbox)
+
         self.fav_only_checkbox = QCheckBox("Показывать только избранные")
         self.fav_only_checkbox.stateChanged.connect(self.refresh_command_list)
         layout.addWidget(self.fav_only_checkbox)
@@ -106,16 +179,40 @@ class SystemCheckApp(QMainWindow):
         self.description_label = QLabel("Выберите команду для отображения описания.")
         layout.addWidget(self.description_label)
 
-        self.result_text = QTextEdit()
-        self.result_text.setReadOnly(True)
-        # Моноширинный шрифт и перенос
+        # Окно вывода показывает ограниченное число строк; всё остальное — в хранилище строк
+        self.result_text = OutputView()
+        # Моноширинный шрифт без переноса
         mono = QFont("Consolas")
         mono.setStyleHint(QFont.Monospace)
         self.result_text.setFont(mono)
-        self.result_text.setLineWrapMode(QTextEdit.NoWrap)
         layout.addWidget(QLabel("Результат:"))
         layout.addWidget(self.result_text)
 
+        self.find_input = QLineEdit()
+        self.find_input.setPlaceholderText("Найти в результате (Enter — далее, F3)...")
+        self.find_input.returnPressed.connect(self.find_in_result)
+        layout.addWidget(self.find_input)
+
+        layout.addWidget(QLabel("Строк в окне вывода:"))
+        self.scrollback_spin = QSpinBox()
+        self.scrollback_spin.setRange(2000, 1000000)
+        self.scrollback_spin.setSingleStep(5000)
+        self.scrollback_spin.setValue(DEFAULT_SCROLLBACK)
+        self.scrollback_spin.editingFinished.connect(
+            lambda: self.result_text.set_scrollback(self.scrollback_spin.value()))
+        layout.addWidget(self.scrollback_spin)
+
+        # Потоковый вывод копится и выводится пачками по таймеру
+        self.output_buffer = OutputCoalescer()
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.timeout.connect(self.flush_output)
+        layout.addWidget(QLabel("Интервал обновления вывода (мс):"))
+        self.flush_interval_spin = QSpinBox()
+        self.flush_interval_spin.setRange(10, 2000)
+        self.flush_interval_spin.setValue(DEFAULT_FLUSH_INTERVAL_MS)
+        layout.addWidget(self.flush_interval_spin)
+
         # Настройка таймаута выполнения команды
         timeout_row_label = QLabel("Таймаут (сек):")
         self.timeout_spin = QSpinBox()
@@ -123,6 +220,12 @@ class SystemCheckApp(QMainWindow):
         self.timeout_spin.setValue(60)
         layout.addWidget(timeout_row_label)
         layout.addWidget(self.timeout_spin)
+        self.adaptive_timeout_checkbox = QCheckBox("Адаптивный таймаут по истории запусков")
+        self.adaptive_timeout_checkbox.setToolTip(
+            "Таймаут каждой команды — по длительности её прошлых запусков на этом компьютере "
+            "(95-й перцентиль с запасом); без истории — значение выше")
+        self.adaptive_timeout_checkbox.setChecked(True)
+        layout.addWidget(self.adaptive_timeout_checkbox)
 
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
@@ -132,13 +235,33 @@ class SystemCheckApp(QMainWindow):
         self.execute_button.clicked.connect(self.execute_command)
         layout.addWidget(self.execute_button)
 
+        self.refresh_button = QPushButton("Обновить (без кэша)")
+        self.refresh_button.clicked.connect(lambda: self.execute_command(force_refresh=True))
+        layout.addWidget(self.refresh_button)
+
+        self.batch_workers_spin = QSpinBox()
+        self.batch_workers_spin.setRange(1, 32)
+        self.batch_workers_spin.setValue(4)
+        layout.addWidget(QLabel("Параллельных проверок:"))
+        layout.addWidget(self.batch_workers_spin)
+
+        self.batch_cim_checkbox = QCheckBox("Запросы CIM в пакете — одним PowerShell")
+        self.batch_cim_checkbox.setToolTip("Независимые Get-CimInstance выполняются одним сценарием с общей "
+                                           "CIM-сессией; у каждой проверки свой результат и статус")
+        self.batch_cim_checkbox.setChecked(True)
+        layout.addWidget(self.batch_cim_checkbox)
+
+        self.batch_button = QPushButton("Выполнить все из списка")
+        self.batch_button.clicked.connect(self.execute_batch)
+        layout.addWidget(self.batch_button)
+
         self.cancel_button = QPushButton("Отмена")
         self.cancel_button.setEnabled(False)
         self.cancel_button.clicked.connect(self.cancel_command)
         layout.addWidget(self.cancel_button)
 
         self.clear_button = QPushButton("Очистить")
-        self.clear_button.clicked.connect(self.result_text.clear)
+        self.clear_button.clicked.connect(self.clear_output)
         layout.addWidget(self.clear_button)
 
         self.copy_button = QPushButton("Копировать результат")
@@ -153,6 +276,10 @@ class SystemCheckApp(QMainWindow):
         self.view_log_button.clicked.connect(self.view_log)
         layout.addWidget(self.view_log_button)
 
+        self.monitor_button = QPushButton("Мониторинг")
+        self.monitor_button.clicked.connect(self.open_monitor)
+        layout.addWidget(self.monitor_button)
+
         self.open_logs_button = QPushButton("Открыть папку логов")
         self.open_logs_button.clicked.connect(self.open_logs_folder)
         layout.addWidget(self.open_logs_button)
@@ -168,16 +295,10 @@ class SystemCheckApp(QMainWindow):
         self.statusBar = self.statusBar()
         self.set_status("Готово")
 
-        # Инициализация списка команд и избранного
-        self.all_commands = list(commands.keys())
-        fav_list = self.settings.value("favorites", [])
-        # QSettings может вернуть строку; нормализуем к списку
-        if isinstance(fav_list, str):
-            fav_list = [x for x in fav_list.split("||") if x]
-        self.favorites = set(fav_list)
-
+        # Список команд заполнится в finish_startup; до тех пор кнопки запуска неактивны
+        self.command_proxy = None
         self.command_dropdown.currentIndexChanged.connect(self.update_description)
-        self.refresh_command_list()
+        self.update_description()
 
         # Горячие клавиши
         QShortcut(QKeySequence("Ctrl+Enter"), self, activated=self.execute_command)
@@ -185,15 +306,54 @@ class SystemCheckApp(QMainWindow):
         QShortcut(QKeySequence("Ctrl+D"), self, activated=self.toggle_favorite)
         QShortcut(QKeySequence("Ctrl+L"), self, activated=self.open_logs_folder)
         QShortcut(QKeySequence("Esc"), self, activated=self.cancel_command)
+        QShortcut(QKeySequence("F3"), self, activated=self.find_in_result)
         # Темная тема отключена, горячая клавиша убрана
 
         # Восстанавливаем настройки
         saved_timeout = int(self.settings.value("timeout", 60))
         self.timeout_spin.setValue(saved_timeout)
+        self.batch_workers_spin.setValue(int(self.settings.value("batch_workers", 4)))
+        self.flush_interval_spin.setValue(int(self.settings.value("flush_interval_ms", DEFAULT_FLUSH_INTERVAL_MS)))
+        self.scrollback_spin.setValue(int(self.settings.value("scrollback_lines", DEFAULT_SCROLLBACK)))
+        self.result_text.set_scrollback(self.scrollback_spin.value())
+        self.structured_checkbox.setChecked(str(self.settings.value("structured", "false")).lower() == "true")
+        self.changes_checkbox.setChecked(str(self.settings.value("changes_only", "false")).lower() == "true")
+        self.adaptive_timeout_checkbox.setChecked(
+            str(self.settings.value("adaptive_timeout", "true")).lower() == "true")
+        self.batch_cim_checkbox.setChecked(str(self.settings.value("batch_cim", "true")).lower() == "true")
         # Тема по умолчанию (светлая). Темная тема отключена.
 
+    def finish_startup(self):
+        """Каталог команд, индекс поиска и логгер — уже при показанном окне."""
+        from commands import commands
+        from command_search import CommandSearchIndex
+        from command_list import CommandFilterProxy
+        from logger import setup_logger
+        from admin_check import is_admin
+
+        if not is_admin():
+            print("Предупреждение: Для некоторых проверок требуются права администратора.")
+        self.set_status("Загрузка списка команд...")
+        QApplication.processEvents()
+        setup_logger()
+        # Инициализация списка команд и избранного
+        self.commands = commands
+        self.all_commands = list(commands.keys())
+        # Индекс поиска и элементы списка строятся один раз, дальше меняется только фильтр
+        self.command_proxy = CommandFilterProxy(CommandSearchIndex(commands), self)
+        self.command_dropdown.setModel(self.command_proxy)
+        fav_list = self.settings.value("favorites", [])
+        # QSettings может вернуть строку; нормализуем к списку
+        if isinstance(fav_list, str):
+            fav_list = [x for x in fav_list.split("||") if x]
+        self.favorites = set(fav_list)
+        self.refresh_command_list()
+        self.startup_done = True
+        self.set_status("Готово")
+
     def update_description(self):
         selected_command = self.command_dropdown.currentText()
+        commands = self.commands
         if selected_command and selected_command in commands:
             description = commands[selected_command]["description"]
             self.description_label.setText(description)
@@ -203,16 +363,23 @@ class SystemCheckApp(QMainWindow):
             else:
                 self.favorite_button.setText("☆ В избранное")
             self.execute_button.setEnabled(True)
+            self.refresh_button.setEnabled(True)
         else:
             self.description_label.setText("Команда не выбрана или не найдена.")
             self.favorite_button.setText("☆ В избранное")
             self.execute_button.setEnabled(False)
-
-    def execute_command(self):
+            self.refresh_button.setEnabled(False)
+
+    def execute_command(self, force_refresh=False):
+        from admin_check import is_admin
+        from system_checks import (lookup_cached, get_cache, command_argv, command_backend, decide_timeout,
+                                   render_command)
+        from timeout_policy import TimeoutPolicy
+        from structured_output import structured_command, build_structured_command
         selected_command = self.command_dropdown.currentText()
-        if not selected_command:
+        if not selected_command or selected_command not in self.commands:
             return
-        meta = commands.get(selected_command, {})
+        meta = self.commands[selected_command]
         # Проверка прав администратора для команды
         if meta.get("requires_admin") and not is_admin():
             reply = QMessageBox.question(
@@ -236,45 +403,118 @@ class SystemCheckApp(QMainWindow):
                 self.set_status("Отменено пользователем", is_error=True)
                 return
             user_input = text.strip()
-            # Базовая проверка недопустимых символов для безопасности
-            disallowed = set(";|&><`$\n\r\t\0")
-            if any(ch in disallowed for ch in user_input):
-                self.set_status("Недопустимые символы во вводе", is_error=True)
+        else:
+            user_input = None
+        # Те же проверки ввода, что у пакетного запуска и cli.py
+        try:
+            command = render_command(meta, user_input)
+        except ValueError as e:
+            self.set_status(str(e), is_error=True)
+            return
+        structured = None
+        if self.structured_checkbox.isChecked():
+            query = structured_command(meta, command, user_input)
+            if query is not None:
+                command = build_structured_command(query, "json")
+                structured = "json"
+
+        # Кэшируемые записи (ключ "cache" в commands.py) показываем сразу из кэша
+        if not force_refresh:
+            cached = lookup_cached(meta, command, structured)
+            if cached is not None:
+                self.clear_output()
+                self.on_command_finished(selected_command, cached)
+                stamp = datetime.fromtimestamp(cached["cached_at"]).strftime("%H:%M:%S")
+                hits = get_cache().stats()["hits"]
+                self.set_status(f"Готово: из кэша от {stamp} (попаданий: {hits}); «Обновить» — перезапуск",
+                                is_success=True)
                 return
-            # Проверка по шаблону, если задан
-            pattern = meta.get("input_pattern")
-            if pattern:
-                try:
-                    if re.fullmatch(pattern, user_input) is None:
-                        example = meta.get("input_example", "")
-                        hint = f" Пример: {example}" if example else ""
-                        self.set_status("Ввод не соответствует ожидаемому формату." + hint, is_error=True)
-                        return
-                except re.error:
-                    # Если шаблон неисправен, пропускаем проверку по нему
-                    pass
-            command = meta["template"].format(input=user_input)
+        # Таймаут по истории запусков команды; без неё — из поля (и timeout_min каталога)
+        user_timeout = int(self.timeout_spin.value())
+        if self.adaptive_timeout_checkbox.isChecked():
+            decision = decide_timeout(selected_command, meta, user_timeout)
         else:
-            command = meta["command"]
-        self.set_status("Выполняется...")
-        self.result_text.clear()
+            decision = TimeoutPolicy(None).decide(selected_command, meta, user_timeout)
+        self.set_status(f"Выполняется... (таймаут {decision.seconds} с: {decision.policy})")
+        self.clear_output()
         self.append_stream("Выполняется...\n", False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)
         self.execute_button.setEnabled(False)
+        self.refresh_button.setEnabled(False)
+        self.batch_button.setEnabled(False)
         self.cancel_button.setEnabled(True)
         QApplication.processEvents()
 
-        # Увеличенный таймаут для долгих команд
-        LONG = {"Проверить целостность системных файлов", "Выполнить CHKDSK", "Выполнить DISM"}
-        user_timeout = int(self.timeout_spin.value())
-        timeout = max(user_timeout, 1800) if selected_command in LONG else user_timeout
-        self.worker = CommandWorker(command, selected_command, timeout=timeout)
+        self.worker = CommandWorker(command, selected_command, timeout=decision.seconds, structured=structured,
+                                    argv=command_argv(meta, user_input, structured),
+                                    backend=command_backend(meta, structured),
+                                    timeout_policy=decision.to_dict())
         self.worker.progress.connect(self.on_stream_progress)
         self.worker.finished.connect(self.on_command_finished)
         self.worker.start()
 
+    def execute_batch(self):
+        """Параллельно запускает все команды текущего списка (без шаблонов ввода)."""
+        names = [self.command_dropdown.itemText(i) for i in range(self.command_dropdown.count())]
+        names = [n for n in names if "template" not in self.commands.get(n, {})]
+        if not names:
+            return
+        self.clear_output()
+        self.set_status(f"Выполняется пакет: {len(names)} команд...")
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, len(names))
+        self.progress_bar.setValue(0)
+        self.execute_button.setEnabled(False)
+        self.refresh_button.setEnabled(False)
+        self.batch_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.batch_worker = BatchWorker(names, max_workers=int(self.batch_workers_spin.value()),
+                                        timeout=int(self.timeout_spin.value()),
+                                        structured="json" if self.structured_checkbox.isChecked() else None,
+                                        adaptive_timeouts=self.adaptive_timeout_checkbox.isChecked(),
+                                        batch_cim=self.batch_cim_checkbox.isChecked())
+        self.batch_worker.item_finished.connect(self.on_batch_item_finished)
+        self.batch_worker.all_finished.connect(self.on_batch_finished)
+        self.batch_worker.start()
+
+    def on_batch_item_finished(self, command_name, result):
+        from structured_output import render_records
+        from snapshot_store import format_diff
+        from logger import log_command_result
+        stdout = result.get("stdout", "")
+        snapshot = result.get("snapshot")
+        if snapshot is not None and not snapshot.baseline and self.changes_checkbox.isChecked():
+            stdout = format_diff(snapshot)
+        elif result.get("records") is not None:
+            stdout = render_records(result["records"])
+        from timing import timing_of, summarize
+        stderr = result.get("stderr", "")
+        success = result.get("returncode", 0) == 0
+        timing = timing_of(result)
+        spent = f" ({summarize(timing)})" if timing else ""
+        batch = result.get("batch")
+        if batch:
+            spent += f" [пакет CIM: {batch['index'] + 1}/{batch['size']}]"
+        self.append_stream(f"=== {command_name}{spent} ===\n", False)
+        if stdout:
+            self.append_stream(stdout + "\n", False)
+        if stderr:
+            self.append_stream(stderr + "\n", True)
+        if not result.get("skipped"):
+            log_command_result(command_name, stdout if success else stderr, success=success)
+        self.progress_bar.setValue(self.progress_bar.value() + 1)
+
+    def on_batch_finished(self, count):
+        self.progress_bar.setVisible(False)
+        self.execute_button.setEnabled(True)
+        self.refresh_button.setEnabled(True)
+        self.batch_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.set_status(f"Пакет завершён: {count} команд", is_success=True)
+
     def elevate_and_restart(self):
+        import ctypes
         try:
             script = os.path.abspath(sys.argv[0])
             params = f'"{script}"'
@@ -292,22 +532,15 @@ class SystemCheckApp(QMainWindow):
 
     def refresh_command_list(self):
         """Фильтрует список команд по поиску и флагу избранного."""
-        filter_text = (self.search_input.text() or "").lower()
-        fav_only = self.fav_only_checkbox.isChecked()
-        # Фильтрация по имени и описанию
-        filtered = []
-        for name in self.all_commands:
-            if fav_only and name not in self.favorites:
-                continue
-            descr = commands.get(name, {}).get("description", "").lower()
-            if filter_text in name.lower() or filter_text in descr:
-                filtered.append(name)
-
-        # Обновляем выпадающий список
+        self._search_debounce.stop()
+        if self.command_proxy is None:
+            return  # каталог ещё не загружен; фильтр применится в finish_startup
+        query = self.search_input.text() or ""
+        allowed = self.favorites if self.fav_only_checkbox.isChecked() else None
+        # Поиск по имени, описанию и тексту команды, лучшие совпадения сверху
         self.command_dropdown.blockSignals(True)
-        self.command_dropdown.clear()
-        if filtered:
-            self.command_dropdown.addItems(filtered)
+        self.command_proxy.set_query(query, allowed=allowed)
+        self.command_dropdown.setCurrentIndex(0 if self.command_proxy.rowCount() else -1)
         self.command_dropdown.blockSignals(False)
 
         # Обновляем описание и кнопку
@@ -333,86 +566,165 @@ class SystemCheckApp(QMainWindow):
 
     def on_command_finished(self, command_name, result):
         # result: dict => {'stdout','stderr','returncode','timeout'}
+        from structured_output import render_records
+        from snapshot_store import format_diff
+        from logger import log_command_result
+        from timing import stage, timing_of, summarize, format_timing
+        from system_checks import get_flights, persistence_failures
+        self.flush_output()
+        trace = result.get("trace") if isinstance(result, dict) else None
+        if trace is not None and self._render_time:
+            trace.accumulate("render", self._render_time, self._render_start)
         stdout = result.get("stdout", "") if isinstance(result, dict) else str(result)
         stderr = result.get("stderr", "") if isinstance(result, dict) else ""
         returncode = result.get("returncode", 0) if isinstance(result, dict) else (0 if stdout and not stdout.startswith("Ошибка") else 1)
         success = (returncode == 0)
 
-        # Финальный вывод: гарантированно показываем результат stdout как есть
-        if stdout:
-            self.result_text.setPlainText(stdout)
-        if stderr:
-            # Добавим stderr в конец, выделив цветом
-            self.append_stream("\n" + stderr + "\n", True)
-
-        log_command_result(command_name, stdout if success else stderr, success=success)
+        # Финальный вывод: потоковый результат уже в окне — второй раз его не строим;
+        # записи структурированного режима превращаем в таблицу только здесь, при показе
+        records = result.get("records") if isinstance(result, dict) else None
+        streamed = isinstance(result, dict) and result.get("streamed")
+        snapshot = result.get("snapshot") if isinstance(result, dict) else None
+        with stage(result, "render"):
+            # Первый снимок сравнивать не с чем — показываем весь список
+            if records is not None and snapshot is not None and not snapshot.baseline and self.changes_checkbox.isChecked():
+                self.result_text.set_text(format_diff(snapshot))
+            elif records is not None:
+                self.result_text.set_text(render_records(records) or "(нет данных)")
+            elif stdout and not streamed:
+                self.result_text.set_text(stdout)
+            self.result_text.finish()
+            if stderr and (not streamed or result.get("timeout") or result.get("cancelled")):
+                # Добавим stderr в конец, выделив цветом
+                self.append_stream("\n" + stderr + "\n", True)
+
+        with stage(result, "log"):
+            log_command_result(command_name, stdout if success else stderr, success=success)
         self.progress_bar.setVisible(False)
         self.execute_button.setEnabled(True)
+        self.refresh_button.setEnabled(True)
+        self.batch_button.setEnabled(True)
         self.cancel_button.setEnabled(False)
         self.progress_bar.setVisible(False)
+        # Этапы выполнения: кратко в строке состояния, полностью — в подсказке к ней
+        timing = timing_of(result)
+        spent = f" · {summarize(timing)}" if timing else ""
+        flights = get_flights().stats()
+        self.statusBar.setToolTip(format_timing(timing) + (
+            f"\nОдинаковых запусков объединено за сеанс: {flights['joins']} "
+            f"(выполнений: {flights['launches']})" if flights["joins"] else ""))
+        kill = result.get("kill")
+        if kill and kill["survivors"]:
+            spent += f" · не завершены процессы: {', '.join(map(str, kill['survivors']))}"
+        elif kill and kill["members"]:
+            spent += f" · завершено процессов: {kill['members']}"
+        coalesced = result.get("coalesced")
+        if coalesced and coalesced["joined"]:
+            spent += f" · подключено к уже идущему запуску (запросов: {coalesced['requests']})"
+        policy = result.get("timeout_policy")
+        if result.get("timeout") and policy:
+            spent += f" · таймаут {policy['seconds']} с ({policy['policy']}: {policy['detail']})"
+        if self.result_text.dropped:
+            # Хранилище окна ограничено (output_view.STORE_SCROLLBACKS окон прокрутки)
+            spent += f" · начало вывода отброшено: {self.result_text.dropped} строк"
+        failures = {store: count for store, count in persistence_failures().items() if count}
+        if failures:
+            # Подробности (какая база, ошибка) — в логе
+            spent += " · сбои сохранения: " + ", ".join(f"{store} {count}" for store, count in failures.items())
         if success:
-            self.set_status("Готово: выполнено успешно", is_success=True)
+            changes = f"; снимок: {snapshot.summary()}" if snapshot is not None else ""
+            self.set_status("Готово: выполнено успешно" + changes + spent, is_success=True)
         else:
-            self.set_status(f"Ошибка выполнения (код {returncode})", is_error=True)
+            self.set_status(f"Ошибка выполнения (код {returncode})" + spent, is_error=True)
 
     def on_stream_progress(self, text, is_stderr):
-        self.append_stream(text, is_stderr)
+        # Не трогаем виджет на каждый кусок: копим и сбрасываем по таймеру или порогу объёма
+        if self.output_buffer.add(text, is_stderr):
+            self.flush_output()
+        elif not self.flush_timer.isActive():
+            self.flush_timer.start(int(self.flush_interval_spin.value()))
+
+    def flush_output(self):
+        self.flush_timer.stop()
+        segments = self.output_buffer.take()
+        if segments:
+            start = time.perf_counter()
+            self.render_segments(segments)
+            self._render_time += time.perf_counter() - start
+            if self._render_start is None:
+                self._render_start = start
+
+    def render_segments(self, segments):
+        # Одна операция редактирования на пачку; цвет stderr — через формат, без insertHtml
+        self.result_text.append_segments(segments)
 
     def append_stream(self, text, is_stderr):
-        # Добавляем поток в QTextEdit
+        # Добавляем текст в окно сразу, сохранив порядок с уже накопленным потоком
         # Нормализуем окончания строк (CRLF/CR -> LF) и гарантируем завершающий перевод строки
-        normalized = text.replace("\r\n", "\n").replace("\r", "\n")
+        normalized = normalize_newlines(text)
         if not normalized.endswith("\n"):
             normalized += "\n"
-        self.result_text.moveCursor(self.result_text.textCursor().End)
-        if is_stderr:
-            # Для stderr используем HTML с <br> и цветом
-            html = self.escape_html(normalized).replace("\n", "<br>")
-            self.result_text.insertHtml(f"<span style='color:#ff5555'>{html}</span>")
-        else:
-            # Для stdout добавляем как обычный текст — надёжно сохраняет переводы строк
-            self.result_text.insertPlainText(normalized)
-        self.result_text.moveCursor(self.result_text.textCursor().End)
-
-    @staticmethod
-    def escape_html(s):
-        return (s.replace("&", "&amp;")
-                 .replace("<", "&lt;")
-                 .replace(">", "&gt;"))
+        self.output_buffer.add(normalized, is_stderr)
+        self.flush_output()
+
+    def clear_output(self):
+        self.output_buffer.take()
+        self.flush_timer.stop()
+        self._render_time = 0.0
+        self._render_start = None
+        self.result_text.clear_output()
+
+    def find_in_result(self):
+        needle = self.find_input.text()
+        if not needle:
+            self.find_input.setFocus()
+            return
+        if not self.result_text.find_next(needle):
+            self.set_status(f"Не найдено: {needle}", is_error=True)
 
     def cancel_command(self):
         if hasattr(self, 'worker') and self.worker and self.worker.isRunning():
             self.worker.cancel()
             self.set_status("Отмена выполнения...", is_error=True)
+        if hasattr(self, 'batch_worker') and self.batch_worker and self.batch_worker.isRunning():
+            self.batch_worker.cancel()
+            self.set_status("Отмена пакета...", is_error=True)
 
     def copy_to_clipboard(self):
         clipboard = QApplication.clipboard()
-        clipboard.setText(self.result_text.toPlainText())
+        clipboard.setText(self.result_text.plain_text())
 
     def view_log(self):
-        log_filename = datetime.now().strftime("log_%Y%m%d.txt")
+        # История запусков из SQLite; текстовый лог за сегодня — по кнопке в окне
+        from system_checks import get_history
+        from history_dialog import HistoryDialog
+        dialog = HistoryDialog(get_history(), self, open_text_log=lambda: dialog.done(2))
+        if dialog.exec_() == 2:
+            self.view_text_log()
+
+    def view_text_log(self):
+        # Лог открывается постранично с конца; ротированные копии — в списке файлов окна
+        from log_reader import list_log_files
+        from log_viewer import LogViewerDialog
         logs_dir = os.path.join(os.getcwd(), 'logs')
-        log_path = os.path.join(logs_dir, log_filename)
-        try:
-            # Пробуем открыть файл с разными кодировками
-            encodings = ['utf-8', 'cp1251', 'cp866']
-            content = None
-            for encoding in encodings:
-                try:
-                    with open(log_path, 'r', encoding=encoding) as log_file:
-                        content = log_file.read()
-                    break
-                except UnicodeDecodeError:
-                    continue
-            if content is not None:
-                self.result_text.setPlainText(content)
-                self.set_status("Лог загружен")
-            else:
-                self.result_text.setPlainText("Не удалось прочитать лог-файл из-за проблем с кодировкой.")
-                self.set_status("Ошибка: проблема с кодировкой", is_error=True)
-        except FileNotFoundError:
-            self.result_text.setPlainText("Лог-файл не найден.")
+        log_path = os.path.join(logs_dir, datetime.now().strftime("log_%Y%m%d.txt"))
+        if not list_log_files(logs_dir) and not os.path.exists(log_path):
+            self.result_text.set_text("Лог-файл не найден.")
             self.set_status("Ошибка: лог не найден", is_error=True)
+            return
+        dialog = LogViewerDialog(logs_dir, self, path=log_path if os.path.exists(log_path) else None)
+        dialog.exec_()
+
+    def open_monitor(self):
+        # Немодальное окно: один сэмплер на всё время, пока окно открыто
+        from metrics_view import MetricsDialog
+        dialog = getattr(self, "metrics_dialog", None)
+        if dialog is None or not dialog.isVisible():
+            self.metrics_dialog = dialog = MetricsDialog(self)
+            dialog.setAttribute(Qt.WA_DeleteOnClose)
+            dialog.finished.connect(lambda _: setattr(self, "metrics_dialog", None))
+        dialog.show()
+        dialog.raise_()
 
     def open_logs_folder(self):
         logs_dir = os.path.join(os.getcwd(), 'logs')
@@ -421,7 +733,7 @@ class SystemCheckApp(QMainWindow):
                 os.makedirs(logs_dir, exist_ok=True)
             os.startfile(logs_dir)
         except Exception as e:
-            self.result_text.setPlainText(f"Не удалось открыть папку логов: {e}")
+            self.result_text.set_text(f"Не удалось открыть папку логов: {e}")
             self.set_status("Ошибка: не удалось открыть логи", is_error=True)
 
     # Темная тема удалена
@@ -430,9 +742,17 @@ class SystemCheckApp(QMainWindow):
         # Сохраняем таймаут и тему при выходе
         try:
             self.settings.setValue("timeout", int(self.timeout_spin.value()))
+            self.settings.setValue("batch_workers", int(self.batch_workers_spin.value()))
+            self.settings.setValue("flush_interval_ms", int(self.flush_interval_spin.value()))
+            self.settings.setValue("scrollback_lines", int(self.scrollback_spin.value()))
+            self.settings.setValue("structured", self.structured_checkbox.isChecked())
+            self.settings.setValue("changes_only", self.changes_checkbox.isChecked())
+            self.settings.setValue("adaptive_timeout", self.adaptive_timeout_checkbox.isChecked())
+            self.settings.setValue("batch_cim", self.batch_cim_checkbox.isChecked())
             # Темная тема удалена — ничего не сохраняем
-            fav_serialized = "||".join(sorted(self.favorites))
-            self.settings.setValue("favorites", fav_serialized)
+            if self.startup_done:  # иначе избранное ещё не прочитано и затёрлось бы пустым
+                fav_serialized = "||".join(sorted(self.favorites))
+                self.settings.setValue("favorites", fav_serialized)
         except Exception:
             pass
         super().closeEvent(event)
@@ -443,17 +763,11 @@ class SystemCheckApp(QMainWindow):
             path, _ = QFileDialog.getSaveFileName(self, "Сохранить результат", os.path.join(default_dir, "result.txt"), "Text Files (*.txt);;HTML Files (*.html)")
             if not path:
                 return
-            # Определяем формат по расширению
-            if path.lower().endswith(".html"):
-                content = self.result_text.toHtml()
-                mode = "html"
-            else:
-                content = self.result_text.toPlainText()
-                mode = "txt"
-                if not path.lower().endswith(".txt"):
-                    path += ".txt"
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content)
+            # Определяем формат по расширению; пишем прямо из хранилища строк
+            as_html = path.lower().endswith(".html")
+            if not as_html and not path.lower().endswith(".txt"):
+                path += ".txt"
+            self.result_text.save_to(path, as_html=as_html)
             self.settings.setValue("last_save_dir", os.path.dirname(path))
             self.set_status(f"Сохранено: {path}")
         except Exception as e:
@@ -472,9 +786,6 @@ class SystemCheckApp(QMainWindow):
             pass
 
 if __name__ == "__main__":
-    setup_logger()
-    if not is_admin():
-        print("Предупреждение: Для некоторых проверок требуются права администратора.")
     app = QApplication(sys.argv)
     window = SystemCheckApp()
     window.show()
@@ -0,0 +1,544 @@
+# metric_store.py
+"""
+Компактное хранилище числовых рядов: счётчики мониторинга и числа из результатов проверок.
+
+Каждый ряд — несколько кольцевых буферов array('d') фиксированного размера, выделенных
+один раз при создании ряда:
+  сырые точки — время и значение, последние raw_capacity замеров;
+  свёртки     — корзины по resolution секунд (по умолчанию минута и час): начало
+                корзины, min, max, сумма и число точек (среднее = сумма / число).
+Каждая точка сразу попадает во все уровни, поэтому память ряда не зависит от того,
+сколько работает сбор: старые сырые точки вытесняются, а за длинный период остаются
+минутные и часовые корзины.
+
+Файл (save/open_mmap): заголовок, каталог рядов в JSON и блоки уровней — подряд
+значения double в порядке байтов машины. open_mmap отображает файл в память и
+читает буферы без копирования: открытие не зависит от размера файла.
+"""
+import bisect
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+RAW_CAPACITY = 6 * 3600            # сырых точек на ряд: 6 часов при замере раз в секунду
+ROLLUPS = ((60, 7 * 24 * 60),      # минутные корзины за неделю
+           (3600, 365 * 24))       # часовые корзины за год
+DEFAULT_MAX_POINTS = 4000          # сколько точек query отдаёт без явного разрешения
+# Ряды из результатов проверок пополняются редко (по запуску) — буферы меньше
+RECORD_CAPACITY = 512
+RECORD_ROLLUPS = ((3600, 30 * 24),   # часовые корзины за месяц
+                  (86400, 2 * 365))  # суточные за два года
+MAX_RECORDS = 32                   # результаты с большим числом записей (списки процессов) не пишутся
+
+MAGIC = b"SCPMTS01"
+_HEADER = struct.Struct("<8sBxxxII")  # сигнатура, порядок байтов (1 — little), версия, длина каталога
+_VERSION = 1
+
+# Заголовок уровня в начале его блока: разрешение, ёмкость, позиция записи, число точек,
+# незакрытая корзина (начало, min, max, сумма, число)
+_LEVEL_HEADER = 9
+_RAW_COLUMNS = ("time", "value")
+_ROLLUP_COLUMNS = ("time", "min", "max", "sum", "count")
+
+
+class SeriesSlice(NamedTuple):
+    """Результат query: для сырых точек min, avg и max — один и тот же массив значений."""
+    resolution: float
+    times: array
+    min: array
+    avg: array
+    max: array
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def points(self) -> List[Tuple[float, float]]:
+        return list(zip(self.times, self.avg))
+
+
+def _copy(buffer, start: int, end: int) -> array:
+    out = array("d")
+    if end > start:
+        # frombytes принимает только байтовый буфер: срез столбца приводится к 'B' без копии
+        out.frombytes(memoryview(buffer)[start:end].cast("B"))
+    return out
+
+
+class _Ring:
+    """
+    Кольцевой буфер одного уровня в плоском массиве double: заголовок и столбцы по
+    capacity элементов. data — array('d') или memoryview поверх mmap (только чтение).
+    """
+
+    def __init__(self, resolution: float, capacity: int, data=None):
+        self.columns = len(_ROLLUP_COLUMNS) if resolution else len(_RAW_COLUMNS)
+        if data is None:
+            data = array("d", bytes(8 * (_LEVEL_HEADER + self.columns * capacity)))
+            data[0], data[1] = float(resolution), float(capacity)
+            self.head = self.count = 0
+        else:
+            self.head, self.count = int(data[2]), int(data[3])
+        self.data = data
+        self.resolution = float(resolution)
+        self.capacity = capacity
+        self.offsets = [_LEVEL_HEADER + i * capacity for i in range(self.columns)]
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def sync_header(self):
+        self.data[2], self.data[3] = float(self.head), float(self.count)
+
+    def push(self, values: Sequence[float]):
+        i = self.head
+        data = self.data
+        for offset, value in zip(self.offsets, values):
+            data[offset + i] = value
+        self.head = i + 1 if i + 1 < self.capacity else 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def _physical(self, index: int) -> int:
+        return (self.head - self.count + index) % self.capacity
+
+    def time_at(self, index: int) -> float:
+        return self.data[_LEVEL_HEADER + self._physical(index)]
+
+    def last_time(self) -> Optional[float]:
+        return self.time_at(self.count - 1) if self.count else None
+
+    def lower_bound(self, timestamp: float) -> int:
+        """Первый логический индекс с временем >= timestamp (время в кольце не убывает)."""
+        lo, hi = 0, self.count
+        data, base, first, cap = self.data, _LEVEL_HEADER, self.head - self.count, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if data[base + (first + mid) % cap] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def column(self, column: int, start: int, end: int) -> array:
+        """Значения столбца для логических индексов [start, end) — не больше двух копирований."""
+        offset = self.offsets[column]
+        first = self._physical(start) if start < self.count else 0
+        n = end - start
+        if first + n <= self.capacity:
+            return _copy(self.data, offset + first, offset + first + n)
+        out = _copy(self.data, offset + first, offset + self.capacity)
+        out.extend(_copy(self.data, offset, offset + n - (self.capacity - first)))
+        return out
+
+
+class MetricSeries:
+    """Один ряд: сырые точки и свёртки. Точки с временем меньше последнего отбрасываются."""
+
+    def __init__(self, name: str, raw_capacity: int = RAW_CAPACITY,
+                 rollups: Sequence[Tuple[float, int]] = ROLLUPS, levels: Optional[List[_Ring]] = None):
+        self.name = name
+        if levels is None:
+            levels = [_Ring(0, raw_capacity)] + [_Ring(res, cap) for res, cap in rollups]
+        self.raw = levels[0]
+        self.rollups = levels[1:]
+        self.dropped = 0
+
+    @property
+    def levels(self) -> List[_Ring]:
+        return [self.raw] + self.rollups
+
+    @property
+    def nbytes(self) -> int:
+        return sum(level.size for level in self.levels) * 8
+
+    def append(self, timestamp: float, value: float):
+        raw = self.raw
+        data, i = raw.data, raw.head
+        if raw.count and timestamp < data[_LEVEL_HEADER + (i - 1) % raw.capacity]:
+            self.dropped += 1
+            return
+        # Сырые точки пишутся напрямую — это самый частый путь
+        data[_LEVEL_HEADER + i] = timestamp
+        data[_LEVEL_HEADER + raw.capacity + i] = value
+        raw.head = i + 1 if i + 1 < raw.capacity else 0
+        if raw.count < raw.capacity:
+            raw.count += 1
+        for level in self.rollups:
+            data = level.data
+            bucket = timestamp - timestamp % level.resolution
+            if data[8] and data[4] == bucket:
+                if value < data[5]:
+                    data[5] = value
+                if value > data[6]:
+                    data[6] = value
+                data[7] += value
+                data[8] += 1
+                continue
+            if data[8]:
+                level.push((data[4], data[5], data[6], data[7], data[8]))
+            data[4], data[5], data[6], data[7], data[8] = bucket, value, value, value, 1.0
+
+    def extend(self, times: Iterable[float], values: Iterable[float]):
+        """
+        Пакетная запись (импорт, заполнение из истории). Упорядоченные по времени точки
+        пишутся срезами: сырые — не больше чем двумя копированиями, свёртки — по корзине
+        за раз через min/max/sum над срезом. Неупорядоченные — по одной через append.
+        """
+        times, values = array("d", times), array("d", values)
+        n = min(len(times), len(values))
+        last = self.last()
+        start = 0
+        if last is not None:
+            start = bisect.bisect_left(times, last[0], 0, n)
+            self.dropped += start
+        if any(times[i] > times[i + 1] for i in range(start, n - 1)):
+            for i in range(start, n):
+                self.append(times[i], values[i])
+            return
+        if start >= n:
+            return
+        self._extend_raw(times[start:n], values[start:n])
+        for level in self.rollups:
+            self._extend_rollup(level, times[start:n], values[start:n])
+
+    def _extend_raw(self, times: array, values: array):
+        raw, n = self.raw, len(times)
+        cap, data = raw.capacity, raw.data
+        if n >= cap:
+            times, values, n = times[n - cap:], values[n - cap:], cap
+        for column, source in ((raw.offsets[0], times), (raw.offsets[1], values)):
+            first = min(n, cap - raw.head)
+            data[column + raw.head:column + raw.head + first] = source[:first]
+            if first < n:
+                data[column:column + n - first] = source[first:]
+        raw.head = (raw.head + n) % cap
+        raw.count = min(cap, raw.count + n)
+
+    @staticmethod
+    def _extend_rollup(level: _Ring, times: array, values: array):
+        data, res, i, n = level.data, level.resolution, 0, len(times)
+        while i < n:
+            bucket = times[i] - times[i] % res
+            j = bisect.bisect_left(times, bucket + res, i, n)
+            chunk = values[i:j]
+            low, high, total = min(chunk), max(chunk), sum(chunk)
+            if data[8] and data[4] == bucket:
+                data[5], data[6] = min(data[5], low), max(data[6], high)
+                data[7] += total
+                data[8] += j - i
+            else:
+                if data[8]:
+                    level.push((data[4], data[5], data[6], data[7], data[8]))
+                data[4], data[5], data[6], data[7], data[8] = bucket, low, high, total, float(j - i)
+            i = j
+
+    def last(self) -> Optional[Tuple[float, float]]:
+        raw = self.raw
+        if not raw.count:
+            return None
+        i = raw._physical(raw.count - 1)
+        return raw.data[raw.offsets[0] + i], raw.data[raw.offsets[1] + i]
+
+    def _pending(self, level: _Ring, start: float, end: float) -> Optional[Tuple[float, ...]]:
+        data = level.data
+        if data[8] and start <= data[4] < end:
+            return data[4], data[5], data[6], data[7], data[8]
+        return None
+
+    def _level_count(self, level: _Ring, start: float, end: float) -> Tuple[int, int, int]:
+        lo = level.lower_bound(start)
+        hi = level.lower_bound(end)
+        extra = 1 if level is not self.raw and self._pending(level, start, end) else 0
+        return lo, hi, hi - lo + extra
+
+    def choose_level(self, start: float, end: float, max_points: Optional[int]) -> _Ring:
+        """
+        Самый подробный уровень, который покрывает начало интервала и даёт не больше
+        max_points точек; если такого нет — самый грубый.
+        """
+        levels = self.levels
+        for level in levels:
+            if not level.count and (level is self.raw or not level.data[8]):
+                continue
+            # Неполный буфер хранит всё с начала сбора; полный — только начиная с первой точки
+            if level.count == level.capacity and level.time_at(0) > start:
+                continue
+            if max_points is None or self._level_count(level, start, end)[2] <= max_points:
+                return level
+        return levels[-1]
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              max_points: Optional[int] = DEFAULT_MAX_POINTS, resolution: Optional[float] = None) -> SeriesSlice:
+        """
+        Точки с временем в [start, end). resolution выбирает уровень явно (0 — сырые точки,
+        60 — минутные корзины ...), иначе уровень подбирается по max_points.
+        """
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        if resolution is not None:
+            matches = [level for level in self.levels if level.resolution == resolution]
+            if not matches:
+                raise ValueError(f"Нет уровня с разрешением {resolution} с у ряда {self.name}")
+            level = matches[0]
+        else:
+            level = self.choose_level(start, end, max_points)
+        lo, hi, _ = self._level_count(level, start, end)
+        times = level.column(0, lo, hi)
+        if level is self.raw:
+            values = level.column(1, lo, hi)
+            return SeriesSlice(0.0, times, values, values, values)
+        mins, maxs = level.column(1, lo, hi), level.column(2, lo, hi)
+        sums, counts = level.column(3, lo, hi), level.column(4, lo, hi)
+        pending = self._pending(level, start, end)
+        if pending:
+            times.append(pending[0])
+            mins.append(pending[1])
+            maxs.append(pending[2])
+            sums.append(pending[3])
+            counts.append(pending[4])
+        avgs = array("d", [s / c for s, c in zip(sums, counts)])
+        return SeriesSlice(level.resolution, times, mins, avgs, maxs)
+
+
+class MetricStore:
+    """
+    Набор рядов по имени. Пишут сэмплер мониторинга (append — тот же интерфейс, что у
+    подписчика MetricsSampler) и проверки (ingest_records); path — файл для save().
+    autosave — сохранять не чаще раза в столько секунд при записи (None — только явно).
+    """
+
+    def __init__(self, path: Optional[str] = None, raw_capacity: int = RAW_CAPACITY,
+                 rollups: Sequence[Tuple[float, int]] = ROLLUPS, autosave: Optional[float] = None):
+        self.path = path
+        self.raw_capacity = raw_capacity
+        self.rollups = tuple((float(res), int(cap)) for res, cap in rollups)
+        self.autosave = autosave
+        self.readonly = False
+        self._series: Dict[str, MetricSeries] = {}
+        self._lock = threading.RLock()
+        self._saved_at = time.monotonic()
+        self._dirty = False
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = None
+        self._last: Tuple[Optional[float], Dict[str, float]] = (None, {})
+        if path and os.path.exists(path):
+            self._load(path)
+
+    # --- запись ---
+
+    def series(self, name: str, raw_capacity: Optional[int] = None,
+               rollups: Optional[Sequence[Tuple[float, int]]] = None) -> MetricSeries:
+        """Ряд по имени; новый создаётся с ёмкостями хранилища или переданными."""
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                if self.readonly:
+                    raise KeyError(name)
+                series = self._series[name] = MetricSeries(
+                    name, raw_capacity or self.raw_capacity, self.rollups if rollups is None else rollups)
+            return series
+
+    def add(self, name: str, timestamp: float, value: float):
+        with self._lock:
+            self.series(name).append(timestamp, float(value))
+            self._dirty = True
+        self._maybe_save()
+
+    def append(self, timestamp: float, sample: Dict[str, float]):
+        """Замер сразу по нескольким метрикам с общим временем."""
+        with self._lock:
+            for name, value in sample.items():
+                self.series(name).append(timestamp, float(value))
+            self._last = (timestamp, dict(sample))
+            self._dirty = True
+        self._maybe_save()
+
+    def ingest_records(self, prefix: str, records: Sequence[Dict[str, Any]],
+                       timestamp: Optional[float] = None) -> int:
+        """
+        Числовые поля записей результата → ряды «prefix/ключ/поле». Ключ записи — значение
+        первого строкового поля (Name адаптера, буква диска ...) или её номер.
+        Результаты больше чем из MAX_RECORDS записей пропускаются. Возвращает число точек.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        added = 0
+        if len(records) > MAX_RECORDS:
+            return added
+        with self._lock:
+            for i, record in enumerate(records):
+                if not isinstance(record, dict):
+                    continue
+                key = next((v for v in record.values() if isinstance(v, str) and v), str(i))
+                for field, value in record.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    series = self.series(f"{prefix}/{key}/{field}", RECORD_CAPACITY, RECORD_ROLLUPS)
+                    series.append(timestamp, float(value))
+                    added += 1
+            self._dirty = self._dirty or bool(added)
+        if added:
+            self._maybe_save()
+        return added
+
+    # --- чтение ---
+
+    def __len__(self) -> int:
+        with self._lock:
+            return max((s.raw.count for s in self._series.values()), default=0)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._series
+
+    def names(self, prefix: str = "") -> List[str]:
+        with self._lock:
+            return sorted(n for n in self._series if n.startswith(prefix))
+
+    def last(self) -> Tuple[Optional[float], Dict[str, float]]:
+        """Последний замер, переданный в append (для окна мониторинга)."""
+        with self._lock:
+            return self._last
+
+    def query(self, name: str, start: Optional[float] = None, end: Optional[float] = None,
+              max_points: Optional[int] = DEFAULT_MAX_POINTS, resolution: Optional[float] = None) -> SeriesSlice:
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                raise KeyError(name)
+            return series.query(start, end, max_points, resolution)
+
+    def window(self, name: str, seconds: Optional[float] = None,
+               max_points: Optional[int] = DEFAULT_MAX_POINTS) -> List[Tuple[float, float]]:
+        """(время, значение) за последние seconds секунд; на длинном окне — средние по корзинам."""
+        with self._lock:
+            series = self._series.get(name)
+            last = series.last() if series else None
+            if last is None:
+                return []
+            start = last[0] - seconds if seconds is not None else None
+            return series.query(start, None, max_points).points()
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(s.nbytes for s in self._series.values())
+
+    # --- файл ---
+
+    def _maybe_save(self):
+        if self.autosave is None or not self.path:
+            return
+        if time.monotonic() - self._saved_at >= self.autosave:
+            try:
+                self.save()
+            except OSError:
+                # Сбой записи не должен останавливать сбор
+                self._saved_at = time.monotonic()
+
+    def save(self, path: Optional[str] = None):
+        """Пишет все ряды во временный файл и атомарно заменяет им прежний."""
+        path = path or self.path
+        if not path:
+            raise ValueError("Не задан файл хранилища")
+        with self._lock:
+            directory, blocks, offset = [], [], 0
+            for name, series in self._series.items():
+                levels = []
+                for level in series.levels:
+                    if not self.readonly:
+                        level.sync_header()
+                    levels.append({"offset": offset, "resolution": level.resolution, "capacity": level.capacity})
+                    blocks.append(level.data)
+                    offset += level.size * 8
+                directory.append({"name": name, "levels": levels})
+            meta = json.dumps({"series": directory}, ensure_ascii=False).encode("utf-8")
+            meta += b" " * (-(_HEADER.size + len(meta)) % 8)  # данные выровнены на 8 байт
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(MAGIC, sys.byteorder == "little", _VERSION, len(meta)))
+                f.write(meta)
+                for block in blocks:
+                    f.write(block)
+            os.replace(tmp, path)
+            self._saved_at = time.monotonic()
+            self._dirty = False
+
+    @staticmethod
+    def _read_directory(f) -> Tuple[List[Dict[str, Any]], int, bool]:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError("Файл хранилища повреждён: короткий заголовок")
+        magic, little, version, meta_len = _HEADER.unpack(header)
+        if magic != MAGIC or version != _VERSION:
+            raise ValueError("Не файл хранилища метрик или другая версия формата")
+        meta = json.loads(f.read(meta_len).decode("utf-8"))
+        return meta["series"], _HEADER.size + meta_len, bool(little) != (sys.byteorder == "little")
+
+    def _load(self, path: str):
+        """Загрузка в память для дозаписи; ряды с другими ёмкостями остаются как в файле."""
+        with open(path, "rb") as f:
+            directory, base, swap = self._read_directory(f)
+            for entry in directory:
+                levels = []
+                for spec in entry["levels"]:
+                    capacity = int(spec["capacity"])
+                    columns = len(_ROLLUP_COLUMNS) if spec["resolution"] else len(_RAW_COLUMNS)
+                    data = array("d")
+                    f.seek(base + spec["offset"])
+                    data.fromfile(f, _LEVEL_HEADER + columns * capacity)
+                    if swap:
+                        data.byteswap()
+                    levels.append(_Ring(spec["resolution"], capacity, data))
+                self._series[entry["name"]] = MetricSeries(entry["name"], levels=levels)
+
+    @classmethod
+    def open_mmap(cls, path: str) -> "MetricStore":
+        """Только чтение: буферы рядов — представления отображённого в память файла."""
+        store = cls(None)
+        store.readonly = True
+        store.path = path
+        store._file = open(path, "rb")
+        try:
+            directory, base, swap = cls._read_directory(store._file)
+            if swap:
+                raise ValueError("Файл записан на машине с другим порядком байтов — откройте через MetricStore(path)")
+            store._mmap = mmap.mmap(store._file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(store._mmap)
+            for entry in directory:
+                levels = []
+                for spec in entry["levels"]:
+                    capacity = int(spec["capacity"])
+                    columns = len(_ROLLUP_COLUMNS) if spec["resolution"] else len(_RAW_COLUMNS)
+                    start = base + spec["offset"]
+                    data = view[start:start + 8 * (_LEVEL_HEADER + columns * capacity)].cast("d")
+                    levels.append(_Ring(spec["resolution"], capacity, data))
+                store._series[entry["name"]] = MetricSeries(entry["name"], levels=levels)
+            view.release()
+        except Exception:
+            store.close()
+            raise
+        return store
+
+    def close(self):
+        """Сохраняет несохранённое (если задан файл) или освобождает отображение файла."""
+        with self._lock:
+            if self._mmap is not None:
+                # Представления нужно отпустить до закрытия mmap, иначе BufferError
+                for series in self._series.values():
+                    for level in series.levels:
+                        level.data.release()
+                self._series.clear()
+                self._mmap.close()
+                self._mmap = None
+            elif self._dirty and self.path:
+                self.save()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
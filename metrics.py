@@ -0,0 +1,424 @@
+# metrics.py
+"""
+Непрерывный сбор счётчиков производительности: загрузка ЦП, память, очередь диска, сеть.
+
+Вместо процесса PowerShell на каждый замер счётчики читает один источник (backend):
+  ProcBackend          — Linux, /proc/stat, /proc/meminfo, /proc/diskstats, /proc/net/dev;
+  PdhBackend           — Windows, PDH через ctypes в этом же процессе (английские имена
+                         счётчиков через PdhAddEnglishCounterW, не зависят от языка системы);
+  CommandStreamBackend — один долгоживущий процесс, печатающий по строке на замер
+                         («cpu_percent=12.5 mem_percent=40 ...»), например Get-Counter -Continuous.
+MetricsSampler опрашивает источник в фоновом потоке с заданным интервалом и складывает
+значения в MetricStore (кольцевые буферы со свёртками, см. metric_store.py); подписчики
+получают каждый замер.
+"""
+import os
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from metric_store import MetricStore
+
+# Имена метрик и подписи для показа
+METRICS = {
+    "cpu_percent": ("ЦП", "%"),
+    "mem_percent": ("Память", "%"),
+    "mem_available_mb": ("Свободно памяти", "МБ"),
+    "disk_queue": ("Очередь диска", ""),
+    "net_rx_bps": ("Сеть, приём", "Б/с"),
+    "net_tx_bps": ("Сеть, отправка", "Б/с"),
+}
+DEFAULT_INTERVAL = 1.0
+
+Sample = Dict[str, float]
+
+
+# --- источники ---
+
+class SamplerBackend:
+    """
+    Источник замеров. Опрашиваемый (streaming=False): read() сразу возвращает текущие
+    значения, интервал выдерживает MetricsSampler. Потоковый (streaming=True): read()
+    ждёт очередной замер от источника сам.
+    """
+    name = "base"
+    streaming = False
+
+    def open(self, interval: float):
+        pass
+
+    def read(self) -> Optional[Sample]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class ProcBackend(SamplerBackend):
+    """Linux: счётчики ядра из /proc; скорости считаются по разнице с прошлым замером."""
+    name = "proc"
+
+    def __init__(self, root: str = "/proc"):
+        self.root = root
+        self._prev: Dict[str, Tuple[float, ...]] = {}
+        self._prev_time: Optional[float] = None
+
+    def open(self, interval: float):
+        self.read()  # базовая точка для загрузки ЦП и скорости сети
+
+    def _read(self, name: str) -> List[str]:
+        with open(os.path.join(self.root, name), "r") as f:
+            return f.read().splitlines()
+
+    def _cpu(self) -> Tuple[float, float]:
+        fields = [float(x) for x in self._read("stat")[0].split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0.0)  # idle + iowait
+        return sum(fields[:8]), idle  # без guest: он уже учтён в user
+
+    def _memory(self) -> Sample:
+        info = {}
+        for line in self._read("meminfo"):
+            key, _, rest = line.partition(":")
+            info[key] = float(rest.split()[0]) if rest.split() else 0.0
+        total = info.get("MemTotal", 0.0)
+        available = info.get("MemAvailable", info.get("MemFree", 0.0))
+        percent = 100.0 * (total - available) / total if total else 0.0
+        return {"mem_percent": percent, "mem_available_mb": available / 1024}
+
+    def _disk_queue(self) -> float:
+        # Запросы «в работе» по целым устройствам (без разделов, loop и ram)
+        queue = 0.0
+        for line in self._read("diskstats"):
+            parts = line.split()
+            if len(parts) < 12:
+                continue
+            device = parts[2]
+            if device.startswith(("loop", "ram", "zram")) or not os.path.exists(f"/sys/block/{device}"):
+                continue
+            queue += float(parts[11])
+        return queue
+
+    def _network(self) -> Tuple[float, float]:
+        rx = tx = 0.0
+        for line in self._read("net/dev")[2:]:
+            name, _, data = line.partition(":")
+            if name.strip() == "lo":
+                continue
+            fields = data.split()
+            rx += float(fields[0])
+            tx += float(fields[8])
+        return rx, tx
+
+    def read(self) -> Optional[Sample]:
+        now = time.monotonic()
+        cpu_total, cpu_idle = self._cpu()
+        rx, tx = self._network()
+        sample = self._memory()
+        sample["disk_queue"] = self._disk_queue()
+        prev = self._prev
+        if prev:
+            total_delta = cpu_total - prev["cpu"][0]
+            idle_delta = cpu_idle - prev["cpu"][1]
+            if total_delta > 0:
+                sample["cpu_percent"] = max(0.0, min(100.0, 100.0 * (total_delta - idle_delta) / total_delta))
+            elapsed = now - self._prev_time
+            if elapsed > 0:
+                sample["net_rx_bps"] = max(0.0, (rx - prev["net"][0]) / elapsed)
+                sample["net_tx_bps"] = max(0.0, (tx - prev["net"][1]) / elapsed)
+        self._prev = {"cpu": (cpu_total, cpu_idle), "net": (rx, tx)}
+        self._prev_time = now
+        return sample
+
+
+class PdhBackend(SamplerBackend):
+    """Windows: один запрос PDH в этом процессе, значения форматирует сама PDH."""
+    name = "pdh"
+    COUNTERS = {
+        "cpu_percent": r"\Processor(_Total)\% Processor Time",
+        "mem_available_mb": r"\Memory\Available MBytes",
+        "disk_queue": r"\PhysicalDisk(_Total)\Current Disk Queue Length",
+        "net_rx_bps": r"\Network Interface(*)\Bytes Received/sec",
+        "net_tx_bps": r"\Network Interface(*)\Bytes Sent/sec",
+    }
+    PDH_FMT_DOUBLE = 0x00000200
+    PDH_FMT_NOCAP100 = 0x00008000
+    PDH_MORE_DATA = 0x800007D2
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class FmtValue(ctypes.Structure):
+            _fields_ = [("CStatus", wintypes.DWORD), ("doubleValue", ctypes.c_double)]
+
+        class FmtValueItem(ctypes.Structure):
+            _fields_ = [("szName", wintypes.LPWSTR), ("FmtValue", FmtValue)]
+
+        class MemoryStatus(ctypes.Structure):
+            _fields_ = [("dwLength", wintypes.DWORD), ("dwMemoryLoad", wintypes.DWORD),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        self._ctypes = ctypes
+        self._FmtValue, self._FmtValueItem, self._MemoryStatus = FmtValue, FmtValueItem, MemoryStatus
+        self._pdh = ctypes.WinDLL("pdh")
+        self._kernel32 = ctypes.WinDLL("kernel32")
+        self._query = None
+        self._counters: Dict[str, object] = {}
+
+    def open(self, interval: float):
+        ctypes = self._ctypes
+        query = ctypes.c_void_p()
+        status = self._pdh.PdhOpenQueryW(None, None, ctypes.byref(query))
+        if status != 0:
+            raise OSError(f"PdhOpenQuery: 0x{status & 0xFFFFFFFF:08X}")
+        self._query = query
+        for name, path in self.COUNTERS.items():
+            counter = ctypes.c_void_p()
+            if self._pdh.PdhAddEnglishCounterW(query, path, None, ctypes.byref(counter)) == 0:
+                self._counters[name] = counter
+        # Скоростным счётчикам нужны два замера — первый делаем сразу
+        self._pdh.PdhCollectQueryData(query)
+
+    def _value(self, counter) -> Optional[float]:
+        ctypes = self._ctypes
+        value = self._FmtValue()
+        fmt = self.PDH_FMT_DOUBLE | self.PDH_FMT_NOCAP100
+        if self._pdh.PdhGetFormattedCounterValue(counter, fmt, None, ctypes.byref(value)) == 0:
+            return value.doubleValue
+        # Счётчик с (*) — сумма по экземплярам
+        size, count = ctypes.c_ulong(0), ctypes.c_ulong(0)
+        status = self._pdh.PdhGetFormattedCounterArrayW(counter, fmt, ctypes.byref(size), ctypes.byref(count), None)
+        if status & 0xFFFFFFFF != self.PDH_MORE_DATA:
+            return None
+        buffer = (ctypes.c_byte * size.value)()
+        if self._pdh.PdhGetFormattedCounterArrayW(counter, fmt, ctypes.byref(size), ctypes.byref(count), buffer) != 0:
+            return None
+        items = ctypes.cast(buffer, ctypes.POINTER(self._FmtValueItem))
+        return sum(items[i].FmtValue.doubleValue for i in range(count.value))
+
+    def read(self) -> Optional[Sample]:
+        if self._query is None or self._pdh.PdhCollectQueryData(self._query) != 0:
+            return None
+        sample = {}
+        for name, counter in self._counters.items():
+            value = self._value(counter)
+            if value is not None:
+                sample[name] = value
+        memory = self._MemoryStatus()
+        memory.dwLength = self._ctypes.sizeof(memory)
+        if self._kernel32.GlobalMemoryStatusEx(self._ctypes.byref(memory)):
+            sample["mem_percent"] = float(memory.dwMemoryLoad)
+        return sample
+
+    def close(self):
+        if self._query is not None:
+            self._pdh.PdhCloseQuery(self._query)
+            self._query = None
+
+
+def parse_sample_line(line: str) -> Optional[Sample]:
+    """«cpu_percent=12.5 mem_percent=40» → словарь; строки без пар ключ=число пропускаются."""
+    sample = {}
+    for part in line.split():
+        key, sep, value = part.partition("=")
+        if not sep:
+            continue
+        try:
+            sample[key] = float(value.replace(",", "."))
+        except ValueError:
+            continue
+    return sample or None
+
+
+class CommandStreamBackend(SamplerBackend):
+    """
+    Один процесс на всё время мониторинга: argv печатает строку на каждый замер.
+    argv может содержать {interval} — он подставляется при открытии (целыми секундами,
+    если whole_seconds: так требует Get-Counter -SampleInterval).
+    """
+    name = "stream"
+    streaming = True
+
+    def __init__(self, argv: Sequence[str], whole_seconds: bool = False):
+        self.argv = list(argv)
+        self.whole_seconds = whole_seconds
+        self.process: Optional[subprocess.Popen] = None
+
+    def open(self, interval: float):
+        value = str(max(1, round(interval))) if self.whole_seconds else f"{interval:g}"
+        argv = [arg.replace("{interval}", value) for arg in self.argv]
+        self.process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        stdin=subprocess.DEVNULL, bufsize=0)
+
+    def read(self) -> Optional[Sample]:
+        while self.process is not None:
+            line = self.process.stdout.readline()
+            if not line:
+                raise EOFError("Процесс счётчиков завершился")
+            sample = parse_sample_line(line.decode("ascii", errors="replace"))
+            if sample:
+                return sample
+        return None
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.process.kill()
+                self.process.wait(timeout=5)
+            except Exception:
+                pass
+            self.process = None
+
+
+# Get-Counter в одном процессе PowerShell; имена счётчиков английские — на локализованной
+# Windows предпочтительнее PdhBackend
+GET_COUNTER_SCRIPT = r"""
+$map = [ordered]@{
+  '*\% processor time' = 'cpu_percent'; '*\available mbytes' = 'mem_available_mb';
+  '*\current disk queue length' = 'disk_queue'; '*\bytes received/sec' = 'net_rx_bps'; '*\bytes sent/sec' = 'net_tx_bps'
+}
+$paths = '\Processor(_Total)\% Processor Time', '\Memory\Available MBytes',
+  '\PhysicalDisk(_Total)\Current Disk Queue Length', '\Network Interface(*)\Bytes Received/sec',
+  '\Network Interface(*)\Bytes Sent/sec'
+$inv = [Globalization.CultureInfo]::InvariantCulture
+Get-Counter -Counter $paths -SampleInterval {interval} -Continuous | ForEach-Object {
+  $v = @{}
+  foreach ($s in $_.CounterSamples) {
+    foreach ($k in $map.Keys) { if ($s.Path -like $k) { $v[$map[$k]] = [double]$v[$map[$k]] + $s.CookedValue } }
+  }
+  [Console]::Out.WriteLine((($v.GetEnumerator() | ForEach-Object { '{0}={1}' -f $_.Key, $_.Value.ToString($inv) }) -join ' '))
+  [Console]::Out.Flush()
+}
+"""
+
+
+def get_counter_backend(executable: str = "powershell.exe") -> CommandStreamBackend:
+    return CommandStreamBackend([executable, "-NoProfile", "-NonInteractive", "-Command", GET_COUNTER_SCRIPT],
+                                whole_seconds=True)
+
+
+def default_backend(spec: Optional[str] = None) -> SamplerBackend:
+    """
+    Источник по имени: "proc", "pdh", "get-counter" или "cmd:<команда>" (CommandStreamBackend);
+    без имени — pdh на Windows, proc на Linux.
+    """
+    if spec is None:
+        spec = "pdh" if sys.platform == "win32" else "proc"
+    if spec == "proc":
+        return ProcBackend()
+    if spec == "pdh":
+        return PdhBackend()
+    if spec == "get-counter":
+        return get_counter_backend()
+    if spec.startswith("cmd:"):
+        return CommandStreamBackend(shlex.split(spec[4:], posix=os.name != "nt"))
+    raise ValueError(f"Неизвестный источник метрик: {spec}")
+
+
+class MetricsSampler:
+    """
+    Фоновый поток: замер раз в interval секунд → series и подписчики. По умолчанию
+    series — MetricStore только в памяти; окно мониторинга передаёт общее хранилище
+    с файлом (system_checks.get_metrics).
+    """
+
+    def __init__(self, backend: Optional[SamplerBackend] = None, interval: float = DEFAULT_INTERVAL,
+                 series: Optional[MetricStore] = None):
+        self.backend = backend or default_backend()
+        self.interval = max(0.05, float(interval))
+        self.series = series if series is not None else MetricStore()
+        self.samples = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._listeners: List[Callable[[float, Sample], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._cpu_start: Tuple[float, float] = (0.0, 0.0)
+
+    def subscribe(self, callback: Callable[[float, Sample], None]):
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self.backend.open(self.interval)
+        self._cpu_start = (time.process_time(), time.monotonic())
+        self._thread = threading.Thread(target=self._run, name="metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        # Потоковый источник ждёт строку — закрытие процесса его разбудит
+        self.backend.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def cpu_percent(self) -> float:
+        """
+        Доля одного ядра, которую процесс потратил с момента start (весь процесс, не только
+        поток сэмплера; в простое GUI это почти одна стоимость замеров).
+        """
+        cpu0, wall0 = self._cpu_start
+        wall = time.monotonic() - wall0
+        return 100.0 * (time.process_time() - cpu0) / wall if wall > 0 else 0.0
+
+    def _run(self):
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            if not self.backend.streaming:
+                # Расписание по монотонным часам: интервал не уплывает на время замера
+                next_at += self.interval
+                delay = next_at - time.monotonic()
+                if delay < 0:
+                    next_at = time.monotonic()
+                elif self._stop.wait(delay):
+                    break
+            try:
+                sample = self.backend.read()
+            except EOFError as e:
+                self.errors += 1
+                self.last_error = str(e)
+                break
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                if self._stop.wait(self.interval):
+                    break
+                continue
+            if not sample or self._stop.is_set():
+                continue
+            now = time.time()
+            self.series.append(now, sample)
+            self.samples += 1
+            for callback in list(self._listeners):
+                try:
+                    callback(now, sample)
+                except Exception:
+                    pass
+
+
+def format_value(name: str, value: Optional[float]) -> str:
+    if value is None:
+        return "—"
+    unit = METRICS.get(name, ("", ""))[1]
+    if unit == "Б/с":
+        if value < 1024:
+            return f"{value:.0f} Б/с"
+        if value < 1024 * 1024:
+            return f"{value / 1024:.1f} КБ/с"
+        return f"{value / (1024 * 1024):.1f} МБ/с"
+    if unit == "%":
+        return f"{value:.1f} %"
+    return f"{value:.1f} {unit}".strip()
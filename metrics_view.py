@@ -0,0 +1,145 @@
+# metrics_view.py
+"""
+Окно «Мониторинг»: живые графики счётчиков из MetricsSampler.
+
+Сэмплер пишет в общее хранилище рядов (system_checks.get_metrics) из своего потока;
+окно раз в интервал перерисовывает графики по выборке из него — в поток Qt из
+сэмплера ничего не передаётся. Ряды сохраняются в logs/metrics.tsm, поэтому после
+перезапуска графики продолжаются с прежних значений.
+"""
+from PyQt5.QtCore import Qt, QTimer, QPointF
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QGridLayout, QLabel, QWidget,
+                             QDoubleSpinBox, QComboBox, QPushButton)
+
+from metrics import METRICS, DEFAULT_INTERVAL, MetricsSampler, default_backend, format_value
+
+# Длинные окна читаются из минутных и часовых свёрток хранилища
+WINDOWS = [("1 мин", 60), ("5 мин", 300), ("15 мин", 900), ("1 час", 3600),
+           ("24 часа", 86400), ("7 дней", 7 * 86400)]
+
+
+class Sparkline(QWidget):
+    """Линия значений за окно; шкала от нуля до максимума (для процентов — до 100)."""
+
+    def __init__(self, fixed_max=None, parent=None):
+        super().__init__(parent)
+        self.fixed_max = fixed_max
+        self.points = []
+        self.setMinimumHeight(48)
+
+    def set_points(self, points):
+        self.points = points
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#fafafa"))
+        painter.setPen(QColor("#dddddd"))
+        painter.drawRect(self.rect().adjusted(0, 0, -1, -1))
+        if len(self.points) < 2:
+            return
+        t0, t1 = self.points[0][0], self.points[-1][0]
+        top = self.fixed_max or max(v for _, v in self.points) or 1.0
+        w, h = self.width() - 2, self.height() - 4
+        span = (t1 - t0) or 1.0
+        line = QPolygonF([QPointF(1 + w * (t - t0) / span, 2 + h * (1 - min(v, top) / top))
+                          for t, v in self.points])
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor("#1976d2"), 1.5))
+        painter.drawPolyline(line)
+
+
+class MetricsDialog(QDialog):
+    def __init__(self, parent=None, backend=None, interval: float = DEFAULT_INTERVAL):
+        super().__init__(parent)
+        self.setWindowTitle("Мониторинг")
+        self.resize(700, 480)
+        self._backend_spec = backend
+        self.sampler = None
+        layout = QVBoxLayout(self)
+
+        top = QHBoxLayout()
+        top.addWidget(QLabel("Интервал, с:"))
+        self.interval_spin = QDoubleSpinBox()
+        self.interval_spin.setRange(0.2, 60.0)
+        self.interval_spin.setSingleStep(0.5)
+        self.interval_spin.setValue(interval)
+        self.interval_spin.editingFinished.connect(self.restart)
+        top.addWidget(self.interval_spin)
+        top.addWidget(QLabel("Окно:"))
+        self.window_combo = QComboBox()
+        for title, _ in WINDOWS:
+            self.window_combo.addItem(title)
+        self.window_combo.currentIndexChanged.connect(lambda _: self.redraw())
+        top.addWidget(self.window_combo)
+        self.pause_button = QPushButton("Пауза")
+        self.pause_button.setCheckable(True)
+        self.pause_button.toggled.connect(self.on_pause)
+        top.addWidget(self.pause_button)
+        top.addStretch(1)
+        layout.addLayout(top)
+
+        grid = QGridLayout()
+        self.value_labels = {}
+        self.charts = {}
+        for row, (name, (title, unit)) in enumerate(METRICS.items()):
+            grid.addWidget(QLabel(title), row, 0)
+            value = QLabel("—")
+            value.setMinimumWidth(110)
+            value.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            grid.addWidget(value, row, 1)
+            chart = Sparkline(100.0 if unit == "%" else None)
+            grid.addWidget(chart, row, 2)
+            self.value_labels[name] = value
+            self.charts[name] = chart
+        grid.setColumnStretch(2, 1)
+        layout.addLayout(grid, 1)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.redraw)
+        self.restart()
+
+    def restart(self):
+        """Пересоздаёт сэмплер с новым интервалом; накопленные ряды остаются в хранилище."""
+        from system_checks import get_metrics
+
+        if self.sampler is not None:
+            self.sampler.stop()
+        try:
+            backend = default_backend(self._backend_spec)
+            self.sampler = MetricsSampler(backend, interval=self.interval_spin.value(), series=get_metrics())
+            self.sampler.start()
+        except Exception as e:
+            self.sampler = None
+            self.status_label.setText(f"Счётчики недоступны: {e}")
+            return
+        self.timer.start(max(200, int(self.interval_spin.value() * 1000)))
+
+    def on_pause(self, paused):
+        if paused:
+            self.timer.stop()
+        else:
+            self.redraw()
+            self.timer.start(max(200, int(self.interval_spin.value() * 1000)))
+
+    def redraw(self):
+        if self.sampler is None:
+            return
+        seconds = WINDOWS[self.window_combo.currentIndex()][1]
+        _, last = self.sampler.series.last()
+        for name, chart in self.charts.items():
+            self.value_labels[name].setText(format_value(name, last.get(name)))
+            chart.set_points(self.sampler.series.window(name, seconds))
+        error = f", ошибок {self.sampler.errors}: {self.sampler.last_error}" if self.sampler.errors else ""
+        self.status_label.setText(
+            f"Источник: {self.sampler.backend.name}, замеров: {self.sampler.samples}, "
+            f"ЦП процесса: {self.sampler.cpu_percent():.2f} %{error}")
+
+    def done(self, result):
+        self.timer.stop()
+        if self.sampler is not None:
+            self.sampler.stop()
+        super().done(result)
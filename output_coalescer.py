@@ -0,0 +1,48 @@
+# output_coalescer.py
+"""
+Буфер потокового вывода для GUI: куски копятся и отдаются пачкой по таймеру
+или по достижении порога объёма. Соседние куски одного потока склеиваются,
+поэтому окно перестраивается один раз на пачку, а не на каждую строку.
+"""
+import threading
+from typing import List, Tuple
+
+Segment = Tuple[str, bool]  # текст, is_stderr
+
+DEFAULT_FLUSH_INTERVAL_MS = 50
+DEFAULT_FLUSH_BYTES = 64 * 1024
+
+
+def normalize_newlines(text: str) -> str:
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class OutputCoalescer:
+    def __init__(self, flush_bytes: int = DEFAULT_FLUSH_BYTES):
+        self.flush_bytes = flush_bytes
+        self._segments: List[List] = []
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._pending
+
+    def add(self, text: str, is_stderr: bool) -> bool:
+        """Добавляет кусок; True — накоплено достаточно, пора сбросить немедленно."""
+        if not text:
+            return False
+        with self._lock:
+            if self._segments and self._segments[-1][1] == is_stderr:
+                self._segments[-1][0].append(text)
+            else:
+                self._segments.append([[text], is_stderr])
+            self._pending += len(text)
+            return self._pending >= self.flush_bytes
+
+    def take(self) -> List[Segment]:
+        """Забирает накопленное: список (текст, is_stderr) с нормализованными переводами строк."""
+        with self._lock:
+            segments, self._segments = self._segments, []
+            self._pending = 0
+        return [(normalize_newlines("".join(parts)), is_stderr) for parts, is_stderr in segments]
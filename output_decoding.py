@@ -0,0 +1,174 @@
+# output_decoding.py
+"""
+Определение кодировки вывода команд и потоковое декодирование.
+
+Кодировка определяется один раз на поток: BOM, затем строгая проверка UTF-8 на первом
+блоке с не-ASCII байтами, затем выбор между однобайтовыми кодовыми страницами консоли
+(OEM cp866 и ANSI cp1251 для русской Windows) по доле букв. Дальше поток декодируется
+инкрементальным декодером codecs, поэтому многобайтовые символы, разрезанные границей
+блока, собираются корректно.
+"""
+import codecs
+import sys
+from typing import List, Optional
+
+# Кодовые страницы по умолчанию, если спросить систему нельзя (не Windows)
+DEFAULT_CODEPAGES = ("cp866", "cp1251")
+# Решение принимается по началу потока не длиннее этого
+DETECT_BYTES = 64 * 1024
+# Меньше этого начала потока не хватает, чтобы отличить UTF-16 без BOM: такие байты ждут следующих
+UTF16_PROBE_BYTES = 4
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+_codepages: Optional[List[str]] = None
+
+
+def console_codepages() -> List[str]:
+    """Однобайтовые кодовые страницы-кандидаты: консоль, OEM и ANSI этой системы."""
+    global _codepages
+    if _codepages is not None:
+        return _codepages
+    found: List[str] = []
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            for cp in (kernel32.GetConsoleOutputCP(), kernel32.GetOEMCP(), kernel32.GetACP()):
+                if cp and cp != 65001:
+                    found.append(f"cp{cp}")
+        except Exception:
+            pass
+    valid = []
+    for name in dict.fromkeys(found + list(DEFAULT_CODEPAGES)):
+        try:
+            codecs.lookup(name)
+        except LookupError:
+            continue
+        valid.append(name)
+    _codepages = valid
+    return _codepages
+
+
+def _looks_utf16(sample: bytes) -> bool:
+    """
+    Вывод в UTF-16LE без BOM: старшие байты (нечётные позиции) почти все одинаковы —
+    0x00 у латиницы и цифр, 0x04 у кириллицы.
+    """
+    if len(sample) < UTF16_PROBE_BYTES:
+        return False
+    high = sample[1::2]
+    return high.count(0) + high.count(4) >= len(high) * 0.9
+
+
+def _letter_score(text: str) -> int:
+    """Буквы минус «мусор» среди не-ASCII символов: псевдографика, знаки, управляющие."""
+    score = 0
+    for ch in text:
+        if ch < "\x80":
+            continue
+        if ch.isalpha():
+            score += 2 if ch.islower() else 1
+        else:
+            score -= 2
+    return score
+
+
+def guess_codepage(sample: bytes, preferred: Optional[str] = None) -> str:
+    """Выбирает однобайтовую кодовую страницу для данных, не являющихся UTF-8."""
+    candidates = console_codepages()
+    if preferred and preferred not in candidates:
+        candidates = [preferred] + candidates
+    best, best_score = None, None
+    for name in candidates:
+        score = _letter_score(sample.decode(name, errors="replace"))
+        if preferred == name:
+            score += 1  # при равенстве выигрывает подсказка
+        if best_score is None or score > best_score:
+            best, best_score = name, score
+    return best or "cp1251"
+
+
+def detect_encoding(sample: bytes, final: bool = False, preferred: Optional[str] = None) -> Optional[str]:
+    """
+    Кодировка по началу потока или None, если данных для решения пока мало
+    (только ASCII или обрезанная многобайтовая последовательность).
+    """
+    if len(sample) > DETECT_BYTES:
+        sample, final = sample[:DETECT_BYTES], False
+    for bom, name in _BOMS:
+        if sample.startswith(bom):
+            return name
+        if not final and bom.startswith(sample):
+            return None  # начало BOM разрезано границей блока
+    if _looks_utf16(sample):
+        return "utf-16-le"
+    if sample.isascii():
+        return None
+    try:
+        probe = codecs.getincrementaldecoder("utf-8")("strict").decode(sample, final)
+    except UnicodeDecodeError:
+        return guess_codepage(sample, preferred)
+    if probe.isascii():
+        # Пока только начало многобайтового символа — ждём продолжения
+        return None
+    return "utf-8"
+
+
+class StreamDecoder:
+    """
+    Инкрементальный декодер одного потока (stdout или stderr).
+    Пока кодировка не определена, ASCII-префикс отдаётся сразу — он одинаков во всех кандидатах,
+    но не раньше, чем накопится UTF16_PROBE_BYTES байт начала потока.
+    """
+
+    def __init__(self, preferred: Optional[str] = None, errors: str = "replace"):
+        self.preferred = preferred
+        self.errors = errors
+        self.encoding: Optional[str] = None
+        self._decoder = None
+        self._pending = b""
+
+    def _start(self, encoding: str):
+        self.encoding = encoding
+        self._decoder = codecs.getincrementaldecoder(encoding)(self.errors)
+
+    def decode(self, data: bytes, final: bool = False) -> str:
+        if self._decoder is not None:
+            return self._decoder.decode(data, final)
+        data = self._pending + data if self._pending else data
+        self._pending = b""
+        if not data and not final:
+            return ""
+        encoding = detect_encoding(data, final=final, preferred=self.preferred)
+        if encoding is None:
+            if final:
+                # Поток закончился, а решать не по чему: чистый ASCII
+                return data.decode("ascii", errors=self.errors)
+            if len(data) < UTF16_PROBE_BYTES:
+                # По одному-трём байтам UTF-16 без BOM не отличить: «С» в UTF-16LE — это «!» и 0x04.
+                # Отданный как ASCII байт сдвинул бы весь поток на один байт
+                self._pending = data
+                return ""
+            if data.isascii():
+                return data.decode("ascii")
+            # ASCII-часть отдаём, обрезанный хвост ждёт следующего блока
+            cut = next(i for i, b in enumerate(data) if b >= 0x80)
+            self._pending = data[cut:]
+            return data[:cut].decode("ascii")
+        self._start(encoding)
+        return self._decoder.decode(data, final)
+
+    def flush(self) -> str:
+        return self.decode(b"", final=True)
+
+
+def decode_bytes(raw: Optional[bytes], preferred: Optional[str] = None) -> str:
+    """Декодирует полный вывод за один вызов с тем же определением кодировки."""
+    if not raw:
+        return ""
+    return StreamDecoder(preferred).decode(raw, final=True)
@@ -0,0 +1,197 @@
+# output_view.py
+"""
+Окно вывода поверх LineStore: QPlainTextEdit показывает не более scrollback строк,
+более старые подгружаются страницами при прокрутке к началу, новые — при прокрутке
+к концу. Пока пользователь внизу, окно «следует» за потоком.
+
+Само хранилище тоже ограничено: STORE_SCROLLBACKS окон (по умолчанию 200 000 строк), более
+старые строки отбрасываются (dropped), чтобы многомегабайтный листинг не держать в памяти целиком.
+"""
+from PyQt5.QtGui import QColor, QTextCharFormat, QTextCursor
+from PyQt5.QtWidgets import QPlainTextEdit
+
+from line_store import LineStore
+
+DEFAULT_SCROLLBACK = 20000
+PAGE_LINES = 2000
+# Хранилище держит столько окон прокрутки; остальное отбрасывается с начала
+STORE_SCROLLBACKS = 10
+
+
+class OutputView(QPlainTextEdit):
+    def __init__(self, parent=None, scrollback: int = DEFAULT_SCROLLBACK):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.store = LineStore(max_lines=DEFAULT_SCROLLBACK * STORE_SCROLLBACKS)
+        self._start = 0  # индекс первой показанной строки хранилища
+        self._end = 0    # индекс после последней показанной строки
+        self._loading = False
+        self._last_found = -1
+        self.stdout_format = QTextCharFormat()
+        self.stderr_format = QTextCharFormat()
+        self.stderr_format.setForeground(QColor("#ff5555"))
+        self.set_scrollback(scrollback)
+        self.verticalScrollBar().valueChanged.connect(self._on_scroll)
+
+    def set_scrollback(self, lines: int):
+        self.scrollback = max(PAGE_LINES, int(lines))
+        self.store.max_lines = self.scrollback * STORE_SCROLLBACKS
+        self.setMaximumBlockCount(self.scrollback)
+        self._render(max(0, self._end - self.scrollback), self._end)
+
+    @property
+    def dropped(self) -> int:
+        """Сколько старых строк отброшено из хранилища (копирование и сохранение их не содержат)."""
+        return self.store.dropped
+
+    # --- наполнение ---
+
+    def append_segments(self, segments):
+        following = self._end == len(self.store)
+        first_new = len(self.store)
+        dropped = self.store.dropped
+        for text, is_stderr in segments:
+            self.store.append(text, is_stderr)
+        shift = self.store.dropped - dropped
+        if shift:
+            # Индексы хранилища сдвинулись на число отброшенных строк
+            if shift > self._start:
+                # Показанные строки вытеснены из хранилища — окно строится заново
+                self._last_found = -1
+                if following:
+                    self._render(max(0, len(self.store) - self.scrollback), len(self.store))
+                    self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+                else:
+                    self._render(0, min(len(self.store), self.scrollback))
+                return
+            self._start -= shift
+            self._end -= shift
+            self._last_found = max(-1, self._last_found - shift)
+            first_new -= shift
+        if not following or len(self.store) == first_new:
+            return
+        at_bottom = self._at_bottom()
+        self._insert_lines(self.store.lines(first_new, len(self.store)), append=self._end > self._start)
+        self._end = len(self.store)
+        self._start = max(self._start, self._end - self.document().blockCount())
+        if at_bottom:
+            self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+
+    def finish(self):
+        """Показывает незавершённую последнюю строку (вывод закончился без перевода строки)."""
+        if self.store.has_partial:
+            self.append_segments([("\n", False)])
+
+    def set_text(self, text: str, is_stderr: bool = False):
+        self.clear_output()
+        self.append_segments([(text if text.endswith("\n") else text + "\n", is_stderr)])
+
+    def clear_output(self):
+        self.store.clear()
+        self._start = self._end = 0
+        self._last_found = -1
+        self.clear()
+
+    def plain_text(self) -> str:
+        return self.store.text()
+
+    def save_to(self, path: str, as_html: bool = False):
+        chunks = self.store.iter_html() if as_html else self.store.iter_text()
+        with open(path, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+    # --- отрисовка окна ---
+
+    def _insert_lines(self, lines, append: bool):
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        first = True
+        # Подряд идущие строки одного потока вставляются одним куском
+        run, run_err = [], None
+        for text, is_stderr in lines:
+            if run and is_stderr != run_err:
+                cursor.insertText(("\n" if append or not first else "") + "\n".join(run),
+                                  self.stderr_format if run_err else self.stdout_format)
+                first = False
+                run = []
+            run.append(text)
+            run_err = is_stderr
+        if run:
+            cursor.insertText(("\n" if append or not first else "") + "\n".join(run),
+                              self.stderr_format if run_err else self.stdout_format)
+        cursor.endEditBlock()
+
+    def _render(self, start: int, end: int):
+        self._loading = True
+        try:
+            self.clear()
+            self._start, self._end = start, end
+            if end > start:
+                self._insert_lines(self.store.lines(start, end), append=False)
+        finally:
+            self._loading = False
+
+    def _at_bottom(self) -> bool:
+        bar = self.verticalScrollBar()
+        return bar.value() >= bar.maximum() - 2
+
+    def _on_scroll(self, value):
+        if self._loading:
+            return
+        bar = self.verticalScrollBar()
+        if value == bar.minimum() and self._start > 0:
+            anchor = self._start
+            start = max(0, self._start - PAGE_LINES)
+            self._render(start, min(len(self.store), start + self.scrollback))
+            self._scroll_to_line(anchor - start)
+        elif value == bar.maximum() and self._end < len(self.store):
+            anchor = self._end
+            end = min(len(self.store), self._end + PAGE_LINES)
+            start = max(0, end - self.scrollback)
+            self._render(start, end)
+            self._scroll_to_line(anchor - start, bottom=True)
+
+    def _scroll_to_line(self, offset: int, bottom: bool = False, select: bool = False):
+        block = self.document().findBlockByNumber(max(0, offset))
+        cursor = QTextCursor(block)
+        if select:
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+        self._loading = True
+        try:
+            self.setTextCursor(cursor)
+            if bottom or select:
+                self.ensureCursorVisible()
+            else:
+                # Без переноса строк значение полосы прокрутки — номер первой видимой строки
+                self.verticalScrollBar().setValue(offset)
+        finally:
+            self._loading = False
+
+    # --- поиск ---
+
+    def show_line(self, index: int):
+        """Показывает строку хранилища index (подгружая окно вокруг неё) и выделяет её."""
+        if not (self._start <= index < self._end):
+            start = max(0, min(index - self.scrollback // 2, len(self.store) - self.scrollback))
+            self._render(start, min(len(self.store), start + self.scrollback))
+        self._scroll_to_line(index - self._start, select=True)
+
+    def find_next(self, needle: str, backwards: bool = False) -> bool:
+        if self._last_found < 0:
+            start = len(self.store) - 1 if backwards else 0
+        else:
+            start = self._last_found - 1 if backwards else self._last_found + 1
+        index = self.store.search(needle, start=start, backwards=backwards)
+        if index is None and self._last_found >= 0:
+            # Поиск по кругу
+            index = self.store.search(needle, start=len(self.store) - 1 if backwards else 0,
+                                      backwards=backwards)
+        if index is None:
+            return False
+        self._last_found = index
+        self.show_line(index)
+        return True
+
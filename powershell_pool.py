@@ -0,0 +1,507 @@
+# powershell_pool.py
+"""
+Пул долгоживущих хостов PowerShell.
+
+Вместо запуска нового powershell.exe на каждую проверку держим несколько «тёплых»
+процессов, которые получают команды через stdin и отвечают кадрами с маркерами:
+
+    -> "<id> <base64(utf-8 команда)>\\n"
+    <- @@SCP:BEGIN:<id>@@
+       ...stdout...
+       @@SCP:STDERR:<id>@@
+       ...stderr...
+       @@SCP:END:<id>:<код возврата>@@
+
+Хост-процесс подключаемый: по умолчанию это powershell.exe со сценарием HOST_SCRIPT,
+но можно передать любой argv, говорящий на том же построчном протоколе
+(например, pwsh на Linux или benchmarks/fake_powershell.py в тестах).
+"""
+import base64
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from process_tree import TreePopen, KILL_GRACE, process_clock
+from timing import process_usage
+
+MARKER = b"@@SCP:"
+READY_MARKER = b"@@SCP:READY@@"
+
+# Сценарий цикла хоста: читает запросы построчно, выполняет, пишет кадр ответа.
+# Команда выполняется в дочерней области (& { }), после ответа хост возвращает то, что она могла
+# поменять глобально: текущий каталог, переменные окружения, глобальные переменные и
+# предпочтения ($ErrorActionPreference и др.) — результат проверки не зависит от предыдущей.
+HOST_SCRIPT = r"""
+$ProgressPreference = 'SilentlyContinue'
+$utf8 = New-Object System.Text.UTF8Encoding $false
+[Console]::OutputEncoding = $utf8
+$OutputEncoding = $utf8
+$in = [Console]::In
+$out = [Console]::Out
+$line = $null; $sep = 0; $id = ''; $code = ''; $errs = $null; $rc = 0; $text = ''
+$scpLocation = (Get-Location).Path
+$scpEnv = @{}
+Get-ChildItem Env: | ForEach-Object { $scpEnv[$_.Name] = $_.Value }
+$scpPreferences = @{}
+foreach ($name in 'ErrorActionPreference', 'WarningPreference', 'VerbosePreference', 'DebugPreference',
+                  'InformationPreference', 'ConfirmPreference', 'WhatIfPreference') {
+    $scpPreferences[$name] = (Get-Variable -Name $name -Scope Global -ErrorAction SilentlyContinue).Value
+}
+$scpGlobals = [System.Collections.Generic.HashSet[string]]::new([StringComparer]::OrdinalIgnoreCase)
+foreach ($v in Get-Variable -Scope Global) { [void]$scpGlobals.Add($v.Name) }
+[void]$scpGlobals.Add('scpGlobals'); [void]$scpGlobals.Add('v'); [void]$scpGlobals.Add('name')
+function Reset-ScpState {
+    Set-Location -LiteralPath $scpLocation
+    [Environment]::CurrentDirectory = $scpLocation
+    foreach ($item in @(Get-ChildItem Env:)) {
+        if (-not $scpEnv.ContainsKey($item.Name)) { Remove-Item -LiteralPath "Env:$($item.Name)" }
+    }
+    foreach ($key in $scpEnv.Keys) {
+        if ([Environment]::GetEnvironmentVariable($key) -cne $scpEnv[$key]) {
+            [Environment]::SetEnvironmentVariable($key, $scpEnv[$key])
+        }
+    }
+    foreach ($v in @(Get-Variable -Scope Global)) {
+        if (-not $scpGlobals.Contains($v.Name)) {
+            Remove-Variable -Name $v.Name -Scope Global -Force -ErrorAction SilentlyContinue
+        }
+    }
+    foreach ($key in $scpPreferences.Keys) {
+        Set-Variable -Name $key -Value $scpPreferences[$key] -Scope Global -ErrorAction SilentlyContinue
+    }
+    $global:ProgressPreference = 'SilentlyContinue'
+    $global:Error.Clear()
+}
+$out.WriteLine('@@SCP:READY@@')
+$out.Flush()
+while ($true) {
+    $line = $in.ReadLine()
+    if ($null -eq $line) { break }
+    $sep = $line.IndexOf(' ')
+    if ($sep -lt 0) { continue }
+    $id = $line.Substring(0, $sep)
+    $code = [System.Text.Encoding]::UTF8.GetString([Convert]::FromBase64String($line.Substring($sep + 1)))
+    $errs = New-Object System.Collections.Generic.List[string]
+    $rc = 0
+    $text = ''
+    $out.WriteLine("@@SCP:BEGIN:$id@@")
+    $out.Flush()
+    try {
+        $global:LASTEXITCODE = 0
+        $text = & ([scriptblock]::Create($code)) 2>&1 | ForEach-Object {
+            if ($_ -is [System.Management.Automation.ErrorRecord]) { $errs.Add(($_ | Out-String).TrimEnd()) } else { $_ }
+        } | Out-String -Width 4096
+        if ($LASTEXITCODE) { $rc = $LASTEXITCODE }
+    } catch {
+        $errs.Add(($_ | Out-String).TrimEnd())
+    }
+    if ($errs.Count -gt 0 -and $rc -eq 0) { $rc = 1 }
+    if ($text.Length -gt 0) {
+        $out.Write($text)
+        if (-not $text.EndsWith("`n")) { $out.WriteLine() }
+    }
+    $out.WriteLine("@@SCP:STDERR:$id@@")
+    foreach ($e in $errs) { $out.WriteLine($e) }
+    $out.WriteLine("@@SCP:END:${id}:$rc@@")
+    $out.Flush()
+    Reset-ScpState
+}
+"""
+
+
+def powershell_host_argv(executable: str = "powershell.exe") -> List[str]:
+    """argv хоста PowerShell: сценарий цикла передаётся через -EncodedCommand (UTF-16LE)."""
+    encoded = base64.b64encode(HOST_SCRIPT.encode("utf-16-le")).decode("ascii")
+    return [
+        executable, "-NoProfile", "-NonInteractive",
+        "-ExecutionPolicy", "Bypass", "-EncodedCommand", encoded,
+    ]
+
+
+class _StreamBuffer:
+    """Потокобезопасный буфер байтов с интерфейсом чтения как у пайпа Popen."""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def feed(self, data: bytes):
+        with self._cond:
+            self._data += data
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _take(self, size: int) -> bytes:
+        chunk = bytes(self._data[:size])
+        del self._data[:size]
+        return chunk
+
+    def readline(self) -> bytes:
+        with self._cond:
+            while True:
+                idx = self._data.find(b"\n")
+                if idx >= 0:
+                    return self._take(idx + 1)
+                if self._closed:
+                    return self._take(len(self._data))
+                self._cond.wait()
+
+    def read1(self, size: int = -1) -> bytes:
+        """Возвращает то, что уже есть в буфере (блокируется только если буфер пуст)."""
+        with self._cond:
+            while not self._data and not self._closed:
+                self._cond.wait()
+            return self._take(len(self._data) if size < 0 else size)
+
+    def read(self, size: int = -1) -> bytes:
+        with self._cond:
+            while not self._closed and (size < 0 or len(self._data) < size):
+                self._cond.wait()
+            return self._take(len(self._data) if size < 0 else size)
+
+
+class PooledProcess:
+    """
+    Выполнение команды в хосте пула. Повторяет используемую часть интерфейса
+    subprocess.Popen (stdout/stderr, poll, wait, communicate, kill), поэтому
+    collect_output и CommandWorker работают с ним без изменений.
+    """
+
+    def __init__(self, pool: "PowerShellPool", host: "PowerShellHost", command: str):
+        self.args = command
+        self.request_id = uuid.uuid4().hex
+        self.stdout = _StreamBuffer()
+        self.stderr = _StreamBuffer()
+        self.returncode: Optional[int] = None
+        self.pid = host.pid
+        # Отметки time.perf_counter(): команда передана хосту, маркеры BEGIN и END;
+        # usage — ЦП хоста за время команды и пик его памяти (за всю жизнь хоста)
+        self.submitted_at: Optional[float] = None
+        self.begun_at: Optional[float] = None
+        self.ended_at: Optional[float] = None
+        self.usage: Optional[Dict[str, Any]] = None
+        # Отметка process_clock() передачи команды: потомков хоста, запущенных раньше (окна
+        # Invoke-Item прошлых проверок), kill() не трогает; None — сравнить нечем, kill() завершает
+        # только хост. Дерево перечисляется лишь при kill, не на каждой команде
+        self.since: Optional[float] = None
+        self._killed: Optional[TreePopen] = None
+        self._pool = pool
+        self._host = host
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def _finish(self, returncode: int):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.returncode = returncode
+            self.stdout.close()
+            self.stderr.close()
+            self._done.set()
+        self._pool.release(self._host)
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def communicate(self, input=None, timeout: Optional[float] = None):
+        self.wait(timeout)
+        return self.stdout.read(), self.stderr.read()
+
+    def kill(self):
+        # Прервать команду внутри PowerShell нельзя — убиваем хост и потомков, появившихся за время
+        # этой команды; пул перезапустит хост
+        if self._done.is_set():
+            return
+        self._killed = self._host.process
+        if self.since is not None:
+            self._host.kill(since=self.since)
+        else:
+            self._host.kill(keep=set())
+        self._finish(-9)
+
+    terminate = kill
+
+    @property
+    def kill_report(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._killed, "kill_report", None)
+
+    def verify_killed(self, grace: float = KILL_GRACE) -> Optional[Dict[str, Any]]:
+        """Как TreePopen.verify_killed для убитого хоста."""
+        verify = getattr(self._killed, "verify_killed", None)
+        return verify(grace) if verify is not None else None
+
+
+class PowerShellHost:
+    """Один долгоживущий процесс-интерпретатор с построчным протоколом."""
+
+    def __init__(self, argv: Sequence[str], start_timeout: float = 20.0):
+        self.argv = list(argv)
+        self.start_timeout = start_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.pid: Optional[int] = None
+        self._current: Optional[PooledProcess] = None
+        self._section = None
+        self._usage_start: Optional[Dict[str, Any]] = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self._eof = False
+
+    def alive(self) -> bool:
+        return self.process is not None and not self._eof and self.process.poll() is None
+
+    def start(self):
+        self._ready.clear()
+        self._eof = False
+        self.process = TreePopen(
+            self.argv,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+        self.pid = self.process.pid
+        threading.Thread(target=self._read_loop, args=(self.process,), daemon=True).start()
+        if not self._ready.wait(self.start_timeout):
+            self.kill()
+            raise OSError(f"Хост PowerShell не ответил за {self.start_timeout} сек: {self.argv[0]}")
+
+    def ensure_started(self) -> bool:
+        """Запускает процесс, если он не запущен или умер. Возвращает True при (пере)запуске."""
+        with self._start_lock:
+            if self.alive():
+                return False
+            self.start()
+            return True
+
+    def kill(self, keep: Optional[Set[int]] = None, since: Optional[float] = None):
+        """Убивает хост с потомками, кроме keep и запущенных до since (TreePopen.kill)."""
+        process = self.process
+        if process is None:
+            return
+        self._current = None
+        try:
+            process.kill(keep=keep, since=since)
+            process.wait(timeout=KILL_GRACE)
+        except Exception:
+            pass
+
+    def stop(self):
+        """
+        Завершает хост без его потомков: конец ввода — цикл хоста выходит сам; не вышел за
+        KILL_GRACE — завершается только процесс хоста. Окна, открытые проверками, остаются.
+        """
+        process = self.process
+        if process is None:
+            return
+        self._current = None
+        try:
+            process.stdin.close()
+        except Exception:
+            pass
+        try:
+            process.wait(timeout=KILL_GRACE)
+        except Exception:
+            try:
+                subprocess.Popen.kill(process)
+                process.wait(timeout=KILL_GRACE)
+            except Exception:
+                pass
+
+    def submit(self, execution: PooledProcess):
+        self._current = execution
+        self._section = None
+        execution.since = process_clock()
+        payload = base64.b64encode(execution.args.encode("utf-8"))
+        execution.submitted_at = time.perf_counter()
+        self.process.stdin.write(execution.request_id.encode("ascii") + b" " + payload + b"\n")
+        self.process.stdin.flush()
+
+    def _read_loop(self, process: subprocess.Popen):
+        for raw in iter(process.stdout.readline, b""):
+            if raw.startswith(MARKER):
+                if raw.rstrip() == READY_MARKER:
+                    self._ready.set()
+                    continue
+                if self._handle_marker(raw.rstrip()[len(MARKER):-2].decode("ascii", "replace")):
+                    continue
+            execution = self._current
+            if execution is None or self._section is None:
+                continue
+            if self._section == "stdout":
+                execution.stdout.feed(raw)
+            else:
+                execution.stderr.feed(raw)
+        # EOF: хост завершился (упал или был убит) — закрываем текущее выполнение
+        if self.process is not process:
+            return
+        self._eof = True
+        execution = self._current
+        self._current = None
+        if execution is not None:
+            code = process.poll()
+            execution.stderr.feed("Хост PowerShell неожиданно завершился\n".encode("utf-8"))
+            execution._finish(code if code else -1)
+
+    def _handle_marker(self, body: str) -> bool:
+        parts = body.split(":")
+        execution = self._current
+        if execution is None or len(parts) < 2 or parts[1] != execution.request_id:
+            return False
+        if parts[0] == "BEGIN":
+            self._section = "stdout"
+            execution.begun_at = time.perf_counter()
+            self._usage_start = process_usage(self.pid)
+        elif parts[0] == "STDERR":
+            self._section = "stderr"
+        elif parts[0] == "END":
+            self._section = None
+            self._current = None
+            execution.ended_at = time.perf_counter()
+            start, end = self._usage_start, process_usage(self.pid)
+            if start is not None and end is not None:
+                execution.usage = {"cpu": end["cpu"] - start["cpu"], "peak_rss": end["peak_rss"], "scope": "host"}
+            try:
+                code = int(parts[2])
+            except (IndexError, ValueError):
+                code = -1
+            execution._finish(code)
+        else:
+            return False
+        return True
+
+
+class PowerShellPool:
+    """
+    Ограниченный пул хостов. launch() занимает свободный хост (или ждёт его),
+    при необходимости (первый запуск, падение, зависание) перезапуская процесс.
+    """
+
+    def __init__(self, host_argv: Optional[Sequence[str]] = None, size: int = 2,
+                 start_timeout: float = 20.0):
+        self.host_argv = list(host_argv) if host_argv else powershell_host_argv()
+        self.size = max(1, int(size))
+        # Настроенный размер; grow() временно добавляет хосты под пакет, shrink() их убирает
+        self.base_size = self.size
+        self._demands: List[int] = []
+        self._hosts = [PowerShellHost(self.host_argv, start_timeout) for _ in range(self.size)]
+        self._idle = list(self._hosts)
+        self._cond = threading.Condition()
+        self.host_starts = 0
+        self.executions = 0
+
+    def _ensure_started(self, host: PowerShellHost):
+        if host.ensure_started():
+            with self._cond:
+                self.host_starts += 1
+
+    def acquire(self, timeout: Optional[float] = None) -> PowerShellHost:
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._idle, timeout):
+                raise TimeoutError("Нет свободного хоста PowerShell")
+            host = self._idle.pop()
+        try:
+            self._ensure_started(host)
+        except Exception:
+            self.release(host)
+            raise
+        return host
+
+    def release(self, host: PowerShellHost):
+        with self._cond:
+            if host not in self._hosts:
+                return
+            if len(self._hosts) > self._target():
+                # Лишний после shrink() хост, занятый в тот момент, — останавливаем по освобождении
+                self._hosts.remove(host)
+                self.size = len(self._hosts)
+                surplus = host
+            else:
+                surplus = None
+                if host not in self._idle:
+                    self._idle.append(host)
+                    self._cond.notify()
+        if surplus is not None:
+            surplus.stop()
+
+    def launch(self, command: str) -> PooledProcess:
+        host = self.acquire()
+        execution = PooledProcess(self, host, command)
+        try:
+            try:
+                host.submit(execution)
+            except OSError:
+                # Хост умер между проверкой и записью — перезапускаем и пробуем ещё раз
+                host.stop()
+                self._ensure_started(host)
+                host.submit(execution)
+        except Exception:
+            self.release(host)
+            raise
+        with self._cond:
+            self.executions += 1
+        return execution
+
+    def _target(self) -> int:
+        return max([self.base_size] + self._demands)
+
+    def grow(self, size: int):
+        """
+        Увеличивает пул до size хостов на время пакета; каждому grow(size) — свой shrink(size).
+        Пока идут несколько пакетов, хостов столько, сколько нужно самому большому.
+        """
+        with self._cond:
+            self._demands.append(int(size))
+            while len(self._hosts) < size:
+                host = PowerShellHost(self.host_argv, self._hosts[0].start_timeout)
+                self._hosts.append(host)
+                self._idle.append(host)
+                self._cond.notify()
+            self.size = len(self._hosts)
+
+    def shrink(self, size: int):
+        """
+        Снимает потребность grow(size) и возвращает пул к наибольшей из оставшихся (не меньше
+        настроенного размера): свободные лишние хосты останавливаются сразу, занятые —
+        по окончании своей команды (release).
+        """
+        with self._cond:
+            if int(size) in self._demands:
+                self._demands.remove(int(size))
+            surplus = []
+            while len(self._hosts) > self._target():
+                idle = [h for h in self._idle if h is not self._hosts[0]]
+                if not idle:
+                    break
+                # Незапущенные хосты — первыми: останавливать нечего
+                host = min(idle, key=lambda h: h.alive())
+                self._idle.remove(host)
+                self._hosts.remove(host)
+                surplus.append(host)
+            self.size = len(self._hosts)
+        for host in surplus:
+            host.stop()
+
+    def warm_up(self):
+        """Заранее запускает все хосты, чтобы первая проверка не платила за холодный старт."""
+        for host in self._hosts:
+            self._ensure_started(host)
+
+    def shutdown(self):
+        """Останавливает хосты; их потомков (окна, открытые проверками) не трогает."""
+        for host in self._hosts:
+            host.stop()
+
+    def stats(self):
+        return {"size": self.size, "host_starts": self.host_starts, "executions": self.executions}
@@ -0,0 +1,399 @@
+# process_tree.py
+"""
+Завершение проверки вместе со всеми её потомками.
+
+powershell.exe под cmd.exe запускает chkdsk, dism, tracert; kill() внешнего процесса их не
+трогает — они продолжают грузить диск и держат пайпы вывода, и communicate ждёт их конца.
+TreePopen запускает процесс так, чтобы всё его дерево можно было найти и завершить разом:
+
+- POSIX: новая сессия (start_new_session) — свой идентификатор группы процессов; kill()
+  шлёт SIGKILL группе и, на Linux, ещё потомкам по PPid из /proc (на случай setsid);
+- Windows: объект задания (job object). Процесс создаётся приостановленным, включается в
+  задание и только потом продолжает работу, поэтому ни один потомок не успевает родиться
+  вне задания; kill() — TerminateJobObject. Если задание недоступно — taskkill /T.
+
+kill() только рассылает сигналы и не ждёт (его зовут из потока GUI). verify_killed(),
+вызванный там, где можно подождать, не дольше KILL_GRACE секунд проверяет, что участников
+дерева не осталось, и дополняет kill_report: сколько процессов было, кто выжил, за сколько.
+При обычном завершении потомки не трогаются: Invoke-Item мог открыть браузер. Долгоживущий
+хост пула выполняет много команд подряд, поэтому kill(since=...) оставляет в живых участников,
+запущенных до начала текущей команды (по времени создания процесса, process_clock()).
+Дерево перечисляется только в момент kill, а не перед каждой командой.
+"""
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+from timing import AccountedPopen
+
+# Верхняя граница ожидания после kill(): исчезновение дерева и конец чтения пайпов
+KILL_GRACE = 2.0
+_IS_LINUX = sys.platform.startswith("linux")
+# Точность времени запуска процесса (тик /proc, квант системных часов Windows): потомок, запущенный
+# в пределах этого до отметки since, считается новым и завершается
+START_TIME_SLACK = 0.02
+
+
+# --- POSIX ---
+
+def _proc_stat(pid: int):
+    """(состояние, PPid, группа) из /proc/<pid>/stat или None, если процесса нет."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return fields[0], int(fields[1]), int(fields[2])
+
+
+def _proc_started(pid: int) -> Optional[float]:
+    """Время запуска процесса в секундах от загрузки системы (поле starttime /proc/<pid>/stat)."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            ticks = int(f.read().rsplit(b")", 1)[1].split()[19])
+    except (OSError, IndexError, ValueError):
+        return None
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def _linux_tree(root: int, pgid: int) -> Set[int]:
+    """Живые участники группы pgid и потомки root по PPid (в т.ч. ушедшие в свою сессию)."""
+    parents: Dict[int, int] = {}
+    members: Set[int] = set()
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        stat = _proc_stat(int(entry))
+        if stat is None or stat[0] in (b"Z", b"X"):
+            continue
+        parents[int(entry)] = stat[1]
+        if stat[2] == pgid:
+            members.add(int(entry))
+    # Потомки по цепочке PPid от корня и от участников группы
+    frontier = set(members) | {root}
+    while frontier:
+        frontier = {pid for pid, ppid in parents.items() if ppid in frontier and pid not in members}
+        members |= frontier
+    return members
+
+
+def _alive(pid: int) -> bool:
+    if _IS_LINUX:
+        stat = _proc_stat(pid)
+        return stat is not None and stat[0] not in (b"Z", b"X")
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+# --- Windows: объект задания ---
+
+class _Job:
+    """Объект задания Windows через ctypes: включение процесса, завершение, учёт."""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+        self._ctypes = ctypes
+        self._kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+        self.handle = self._kernel32.CreateJobObjectW(None, None)
+        if not self.handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+
+    def assign(self, process_handle) -> bool:
+        from ctypes import wintypes
+        return bool(self._kernel32.AssignProcessToJobObject(wintypes.HANDLE(self.handle),
+                                                            wintypes.HANDLE(process_handle)))
+
+    def terminate(self, exit_code: int = 1) -> bool:
+        from ctypes import wintypes
+        return bool(self._kernel32.TerminateJobObject(wintypes.HANDLE(self.handle), exit_code))
+
+    def accounting(self) -> Optional[Dict[str, Any]]:
+        """JobObjectBasicAccountingInformation: ЦП всего дерева и число процессов."""
+        ctypes = self._ctypes
+        from ctypes import wintypes
+
+        class BASIC_ACCOUNTING(ctypes.Structure):
+            _fields_ = [("TotalUserTime", ctypes.c_int64), ("TotalKernelTime", ctypes.c_int64),
+                        ("ThisPeriodTotalUserTime", ctypes.c_int64), ("ThisPeriodTotalKernelTime", ctypes.c_int64),
+                        ("TotalPageFaultCount", wintypes.DWORD), ("TotalProcesses", wintypes.DWORD),
+                        ("ActiveProcesses", wintypes.DWORD), ("TotalTerminatedProcesses", wintypes.DWORD)]
+
+        info = BASIC_ACCOUNTING()
+        if not self._kernel32.QueryInformationJobObject(wintypes.HANDLE(self.handle), 1, ctypes.byref(info),
+                                                        ctypes.sizeof(info), None):
+            return None
+        return {"cpu": (info.TotalUserTime + info.TotalKernelTime) / 1e7,
+                "total": info.TotalProcesses, "active": info.ActiveProcesses}
+
+    def pids(self) -> List[int]:
+        """
+        JobObjectBasicProcessIdList: процессы, ещё входящие в задание. Список размером по
+        NumberOfAssignedProcesses; если за время запроса процессов стало больше — повтор.
+        """
+        ctypes = self._ctypes
+        from ctypes import wintypes
+
+        capacity = 64
+        for _ in range(8):
+            class PID_LIST(ctypes.Structure):
+                _fields_ = [("NumberOfAssignedProcesses", wintypes.DWORD),
+                            ("NumberOfProcessIdsInList", wintypes.DWORD),
+                            ("ProcessIdList", ctypes.c_size_t * capacity)]
+
+            info = PID_LIST()
+            ok = self._kernel32.QueryInformationJobObject(wintypes.HANDLE(self.handle), 3, ctypes.byref(info),
+                                                          ctypes.sizeof(info), None)
+            if not ok and ctypes.get_last_error() != 234:  # ERROR_MORE_DATA
+                return []
+            if ok and info.NumberOfProcessIdsInList >= info.NumberOfAssignedProcesses:
+                return list(info.ProcessIdList[:info.NumberOfProcessIdsInList])
+            capacity = max(capacity * 2, info.NumberOfAssignedProcesses + 16)
+        return list(info.ProcessIdList[:info.NumberOfProcessIdsInList])
+
+    def close(self):
+        if self.handle:
+            self._kernel32.CloseHandle(self._ctypes.c_void_p(self.handle))
+            self.handle = None
+
+
+def _terminate_pid(pid: int):
+    """Завершает один процесс по pid (участник задания, которого нельзя убить всем заданием)."""
+    import ctypes
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(0x0001, False, pid)  # PROCESS_TERMINATE
+    if handle:
+        kernel32.TerminateProcess(ctypes.c_void_p(handle), 1)
+        kernel32.CloseHandle(ctypes.c_void_p(handle))
+
+
+def _win_started(pid: int) -> Optional[float]:
+    """Время создания процесса (GetProcessTimes) в секундах FILETIME."""
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+    if not handle:
+        return None
+    try:
+        times = [wintypes.FILETIME() for _ in range(4)]
+        if not kernel32.GetProcessTimes(ctypes.c_void_p(handle), *(ctypes.byref(t) for t in times)):
+            return None
+        return ((times[0].dwHighDateTime << 32) | times[0].dwLowDateTime) / 1e7
+    finally:
+        kernel32.CloseHandle(ctypes.c_void_p(handle))
+
+
+def process_clock() -> Optional[float]:
+    """
+    Текущее время по часам, которыми меряется запуск процессов (для kill(since=...));
+    None — сравнивать не с чем (не Linux и не Windows).
+    """
+    if _IS_LINUX:
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+        now = wintypes.FILETIME()
+        ctypes.windll.kernel32.GetSystemTimeAsFileTime(ctypes.byref(now))
+        return ((now.dwHighDateTime << 32) | now.dwLowDateTime) / 1e7
+    return None
+
+
+def process_started(pid: int) -> Optional[float]:
+    """Время запуска процесса по часам process_clock(); None — процесса нет или узнать нечем."""
+    if _IS_LINUX:
+        return _proc_started(pid)
+    if os.name == "nt":
+        return _win_started(pid)
+    return None
+
+
+def _resume(process_handle):
+    import ctypes
+    ctypes.WinDLL("ntdll").NtResumeProcess(ctypes.c_void_p(int(process_handle)))
+
+
+class TreePopen(AccountedPopen):
+    """
+    Popen, чей kill() завершает всё дерево процессов. kill_report после kill():
+    {'at': perf_counter момента kill, 'members': число участников дерева, 'survivors': pid
+    выживших или None (неизвестно), 'latency': сек до исчезновения дерева или None}.
+    На Windows usage дополняется ЦП всего дерева (scope 'tree').
+    """
+    kill_report: Optional[Dict[str, Any]] = None
+    _members: Optional[Set[int]] = None
+    _kept: Optional[FrozenSet[int]] = None
+
+    def __init__(self, args, **kwargs):
+        self._job: Optional[_Job] = None
+        if os.name != "nt":
+            kwargs["start_new_session"] = True
+            super().__init__(args, **kwargs)
+            return
+        job = None
+        try:
+            job = _Job()
+        except OSError:
+            pass
+        if job is not None:
+            kwargs["creationflags"] = kwargs.get("creationflags", 0) | 0x00000004  # CREATE_SUSPENDED
+        super().__init__(args, **kwargs)
+        if job is not None:
+            try:
+                if job.assign(int(self._handle)):
+                    self._job = job
+                else:
+                    job.close()
+            finally:
+                _resume(self._handle)
+
+    def members(self) -> Optional[Set[int]]:
+        """pid живых участников дерева, кроме самого процесса; None — перечислить нечем."""
+        if os.name != "nt":
+            return _linux_tree(self.pid, self.pid) - {self.pid} if _IS_LINUX else None
+        if self._job is not None:
+            return set(self._job.pids()) - {self.pid}
+        return None
+
+    def kill(self, keep: Optional[Set[int]] = None, since: Optional[float] = None):
+        """
+        Завершает процесс и его дерево. keep — pid потомков, которых не трогать; since — отметка
+        process_clock(): не трогать потомков, запущенных раньше неё (они перечисляются сейчас).
+        С keep или since, если участников перечислить нечем, завершается только сам процесс.
+        """
+        if since is not None and keep is None and self._kept is None:
+            keep = self._started_before(since)
+        if keep is not None:
+            self._kept = frozenset(keep)
+        if self.kill_report is not None:
+            if self.poll() is None:
+                self._signal_tree()
+            return
+        self.kill_report = {"at": time.perf_counter(), "members": None, "survivors": None, "latency": None}
+        self._members = self._signal_tree()
+        self.kill_report["members"] = len(self._members) if self._members is not None else None
+
+    terminate = kill
+
+    def _started_before(self, since: float) -> Set[int]:
+        """Потомки, запущенные раньше отметки since; время неизвестно — не оставляем."""
+        kept = set()
+        for pid in self.members() or ():
+            started = process_started(pid)
+            if started is not None and started < since - START_TIME_SLACK:
+                kept.add(pid)
+        return kept
+
+    def _signal_tree(self) -> Optional[Set[int]]:
+        """Рассылает завершение всем участникам; возвращает их pid (None — неизвестны)."""
+        if self._kept is not None:
+            return self._signal_new()
+        if os.name != "nt":
+            pgid = self.pid  # start_new_session: процесс — лидер своей группы
+            members = _linux_tree(self.pid, pgid) if _IS_LINUX else None
+            try:
+                os.killpg(pgid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            for pid in members or ():
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            try:
+                super().kill()  # уже вышедший лидер группы — не ошибка
+            except OSError:
+                pass
+            return members
+        if self._job is not None:
+            members = set(self._job.pids())
+            self._job.terminate()
+            return members
+        try:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(self.pid)], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=KILL_GRACE,
+                           creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        try:
+            super().kill()
+        except OSError:
+            pass
+        return None
+
+    def _signal_new(self) -> Optional[Set[int]]:
+        """Как _signal_tree, но участники из _kept остаются: группу и задание целиком не трогаем."""
+        members = self.members()
+        targets = {self.pid} | (members - self._kept if members is not None else set())
+        for pid in targets - {self.pid}:
+            try:
+                if os.name != "nt":
+                    os.kill(pid, signal.SIGKILL)
+                else:
+                    _terminate_pid(pid)
+            except (ProcessLookupError, PermissionError, OSError):
+                pass
+        try:
+            super().kill()
+        except OSError:
+            pass
+        return targets if members is not None else None
+
+    def survivors(self) -> Optional[List[int]]:
+        """Участники дерева, ещё живые после kill(); None — проверить нечем."""
+        if self._kept is not None:
+            if self._members is None:
+                return None if self.poll() is not None else [self.pid]
+            return sorted(pid for pid in self._members if _alive(pid))
+        if os.name != "nt":
+            if self._members is None:
+                if self.poll() is None:
+                    return [self.pid]
+                try:
+                    os.killpg(self.pid, 0)
+                except (ProcessLookupError, PermissionError):
+                    return []
+                return None
+            return sorted(pid for pid in self._members if _alive(pid))
+        if self._job is not None:
+            return self._job.pids()
+        return None if self.poll() is not None else [self.pid]
+
+    def verify_killed(self, grace: float = KILL_GRACE) -> Optional[Dict[str, Any]]:
+        """Ждёт исчезновения дерева не дольше grace секунд и дописывает kill_report."""
+        report = self.kill_report
+        if report is None or report["latency"] is not None:
+            return report
+        deadline = report["at"] + grace
+        while True:
+            left = self.survivors()
+            now = time.perf_counter()
+            if left == [] or left is None or now >= deadline:
+                break
+            time.sleep(0.01)
+        report["survivors"] = left
+        if left == []:
+            report["latency"] = now - report["at"]
+        return report
+
+    def wait(self, timeout=None):
+        returncode = super().wait(timeout)
+        if self._job is not None and (self.usage or {}).get("scope") != "tree":
+            accounting = self._job.accounting()
+            if accounting is not None:
+                self.usage = dict(self.usage or {}, cpu=accounting["cpu"], scope="tree")
+        return returncode
+
+    def __del__(self):
+        job, self._job = getattr(self, "_job", None), None
+        if job is not None:
+            job.close()
+        super().__del__()
@@ -0,0 +1,247 @@
+# result_cache.py
+"""
+Кэш результатов команд с TTL по классу изменчивости, LRU-вытеснением по размеру
+и хранением на диске (переживает перезапуск приложения).
+
+Класс изменчивости задаётся в commands.py ключом "cache":
+    static   — почти не меняется (BIOS, материнская плата, RAM)
+    slow     — меняется редко (установленное ПО, драйверы, пользователи)
+    volatile — живые данные, кэшируются ненадолго
+    never    — не кэшируется (по умолчанию; команды с побочными эффектами и замеры)
+
+Размер записи — байты её файла на диске (JSON в UTF-8), а не символы вывода. Файл результата
+пишется сразу, во временный файл вне блокировки (get других потоков не ждёт диска); под
+блокировкой — только os.replace и обновление индекса. index.json — не чаще раза в INDEX_SAVE_DELAY секунд (и при flush()): пакет
+из десятков результатов не переписывает индекс на каждый. Файлы результатов, которых нет в
+индексе (процесс завершился до его записи), удаляются при загрузке.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+CACHE_TTLS = {
+    "static": 24 * 3600,
+    "slow": 3600,
+    "volatile": 60,
+    "never": 0,
+}
+
+# Поля результата, которые сохраняются (records пересобираются из stdout при выдаче)
+_STORED_FIELDS = ("stdout", "stderr", "returncode", "timeout")
+# Отложенная запись индекса: изменения за это время — одной записью
+INDEX_SAVE_DELAY = 2.0
+
+
+def cache_ttl(meta: Dict[str, Any]) -> int:
+    """TTL записи каталога в секундах; 0 — не кэшировать."""
+    return CACHE_TTLS.get(meta.get("cache", "never"), 0)
+
+
+def cache_key(command: str, variant: Optional[str] = None) -> str:
+    """Ключ — хэш итоговой команды (после подстановки ввода) и варианта вывода."""
+    raw = f"{variant or 'text'}\0{command}".encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    # --- диск ---
+
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "index.json")
+
+    def _payload_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        # Индекс хранится в порядке LRU (от старых к новым)
+        for key, info in index:
+            if info.get("expires", 0) <= now or not os.path.exists(self._payload_path(key)):
+                self._remove_payload(key)
+                continue
+            self._entries[key] = {**info, "result": None}
+            self._size += info.get("size", 0)
+        for name in os.listdir(self.directory):
+            key, ext = os.path.splitext(name)
+            if ext == ".json" and name != "index.json" and key not in self._entries:
+                self._remove_payload(key)
+            elif ext == ".tmp":
+                # Недописанный результат прерванного put
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _save_index(self):
+        if not self.directory:
+            return
+        index = [(key, {k: v for k, v in entry.items() if k != "result"})
+                 for key, entry in self._entries.items()]
+        tmp = self._index_path() + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp, self._index_path())
+        except OSError:
+            pass
+
+    def _index_changed(self):
+        """Индекс изменился: запись — по таймеру, не на каждое изменение (вызывается под _lock)."""
+        if not self.directory:
+            return
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(INDEX_SAVE_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Записывает отложенные изменения индекса сейчас (перед выходом из приложения)."""
+        with self._lock:
+            timer, self._timer = self._timer, None
+            if timer is not None:
+                timer.cancel()
+            if self._dirty:
+                self._dirty = False
+                self._save_index()
+
+    def _write_temp(self, key: str, payload: bytes) -> Optional[str]:
+        """Пишет результат во временный файл (вне _lock); его имя или None."""
+        if not self.directory:
+            return None
+        tmp = f"{self._payload_path(key)}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(payload)
+        except OSError:
+            return None
+        return tmp
+
+    def _commit_payload(self, key: str, tmp: Optional[str]):
+        """Ставит записанный файл на место (под _lock: порядок с _drop того же ключа)."""
+        if tmp is None:
+            return
+        try:
+            os.replace(tmp, self._payload_path(key))
+        except OSError:
+            pass
+
+    def _read_payload(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._payload_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _remove_payload(self, key: str):
+        if not self.directory:
+            return
+        try:
+            os.remove(self._payload_path(key))
+        except OSError:
+            pass
+
+    # --- API ---
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Результат из кэша (копия с полями cached=True и cached_at) или None."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None or entry["expires"] <= time.time():
+                    if entry is not None:
+                        self._drop(key)
+                        self._index_changed()
+                    self.misses += 1
+                    return None
+                result = entry["result"]
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return {**result, "cached": True, "cached_at": entry["stored"]}
+            # Запись с диска (после перезапуска) читается вне блокировки
+            result = self._read_payload(key)
+            with self._lock:
+                if self._entries.get(key) is not entry:
+                    continue  # за время чтения запись заменили или удалили
+                if result is None:
+                    self._drop(key)
+                    self._index_changed()
+                    self.misses += 1
+                    return None
+                entry["result"] = result
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return {**result, "cached": True, "cached_at": entry["stored"]}
+
+    def put(self, key: str, result: Dict[str, Any], ttl: int, command: str = ""):
+        """Сохраняет успешный результат на ttl секунд. Неуспешные и таймауты не кэшируются."""
+        if ttl <= 0 or result.get("returncode") != 0 or result.get("timeout"):
+            return
+        stored = {k: result.get(k) for k in _STORED_FIELDS}
+        payload = json.dumps(stored, ensure_ascii=False).encode("utf-8")
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        tmp = self._write_temp(key, payload)
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {"stored": now, "expires": now + ttl, "size": size,
+                                  "command": command[:200], "result": stored}
+            self._size += size
+            self.stores += 1
+            while self._size > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+            self._commit_payload(key, tmp)
+            self._index_changed()
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.get("size", 0)
+            self._remove_payload(key)
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._drop(key)
+            self._index_changed()
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+            self._index_changed()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "hits": self.hits,
+                    "misses": self.misses, "stores": self.stores, "evictions": self.evictions}
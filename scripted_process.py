@@ -0,0 +1,98 @@
+# scripted_process.py
+"""
+Заменитель процесса: заранее заданный вывод через ту же часть интерфейса subprocess.Popen,
+что и PooledProcess (stdout/stderr, poll, wait, communicate, kill), без запуска программ.
+
+Используется как исполнитель "scripted" (system_checks.register_backend): чтение, декодирование,
+кэш и история проверяются без Windows, а замер на нём показывает накладные расходы самого
+конвейера — нижнюю границу для любого настоящего исполнителя.
+
+    register_backend("scripted", scripted_backend({"arp -a": "Интерфейс: 192.168.0.10"}))
+"""
+import subprocess
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+from powershell_pool import _StreamBuffer
+
+# Ответ: текст stdout или (stdout, stderr, код возврата[, задержка в секундах])
+Response = Union[str, bytes, Tuple[Any, ...]]
+
+
+def _as_bytes(data) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+
+class ScriptedProcess:
+    """Отдаёт stdout и stderr через delay секунд после создания и завершается с returncode."""
+
+    def __init__(self, args, stdout: Union[str, bytes] = b"", stderr: Union[str, bytes] = b"",
+                 returncode: int = 0, delay: float = 0.0):
+        self.args = args
+        self.stdout = _StreamBuffer()
+        self.stderr = _StreamBuffer()
+        self.returncode: Optional[int] = None
+        self.pid = None
+        self.usage: Optional[Dict[str, Any]] = None
+        self._output = (_as_bytes(stdout), _as_bytes(stderr), returncode)
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        if delay > 0:
+            timer = threading.Timer(delay, self._emit)
+            timer.daemon = True
+            timer.start()
+        else:
+            self._emit()
+
+    def _emit(self):
+        stdout, stderr, returncode = self._output
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.stdout.feed(stdout)
+            self.stderr.feed(stderr)
+        self._finish(returncode)
+
+    def _finish(self, returncode: int):
+        with self._lock:
+            if self._done.is_set():
+                return
+            self.returncode = returncode
+            self.stdout.close()
+            self.stderr.close()
+            self._done.set()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def communicate(self, input=None, timeout: Optional[float] = None):
+        self.wait(timeout)
+        return self.stdout.read(), self.stderr.read()
+
+    def kill(self):
+        self._finish(-9)
+
+    terminate = kill
+
+
+def scripted_backend(responses: Dict[str, Response], default: Optional[Response] = None):
+    """
+    Исполнитель по таблице ответов: ключ — текст команды или argv, склеенный пробелами.
+    Команда без ответа (и без default) завершается с кодом 1 и сообщением в stderr.
+    """
+    def launch(command: str, argv: Optional[Sequence[str]] = None) -> ScriptedProcess:
+        response = responses.get(command)
+        if response is None and argv:
+            response = responses.get(" ".join(argv))
+        if response is None:
+            response = default if default is not None else ("", f"Нет заготовленного ответа: {command}", 1)
+        if not isinstance(response, tuple):
+            response = (response,)
+        return ScriptedProcess(list(argv) if argv else command, *response)
+
+    return launch
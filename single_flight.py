@@ -0,0 +1,240 @@
+# single_flight.py
+"""
+Одно выполнение на все одинаковые одновременные запросы (single flight).
+
+Кнопка в окне, пакетный прогон, планировщик и CLI могут одновременно попросить одну и ту же
+проверку: ту же запись каталога с той же итоговой командой и исполнителем. Раньше каждый
+запрос запускал свой процесс. Теперь первый запрос открывает «полёт» и выполняет работу (запуск,
+чтение вывода, кэш, история) в своём же потоке (Ticket.run), а запросы с тем же ключом, пришедшие
+до её конца, подключаются к ней и только ждут тот же результат. Потоковый вывод рассылается всем
+подключённым; подключившийся позже сначала получает уже выданные куски из буфера повтора, затем
+новые — в том же порядке. Обработчики кусков вызываются без блокировок: медленное окно или
+заблокированный stdout не задерживают подключение и отказ других запросов.
+Буфер хранит вывод текущего выполнения целиком и освобождается вместе с ним.
+
+Каждый запрос держит билет (Ticket). Ticket.kill() отменяет только этот запрос; процесс
+завершается, когда отказались все подключённые. Поэтому билет кладётся туда, где раньше лежал
+процесс: отмена в окне, cancel_event в run_many. Начавший запрос, отменённый при оставшихся
+подключённых, получает 'cancelled', когда работа закончится: её выполняет его поток.
+
+Счётчики stats(): launches — начатых выполнений, joins — подключений к уже идущему (столько
+запусков сэкономлено), replayed — кусков вывода, отданных из буфера повтора, abandoned —
+выполнений, прерванных из-за отказа всех запросов, peak — наибольшее число запросов на одном
+выполнении.
+"""
+import copy
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+ChunkCallback = Callable[[str, bool], None]
+
+
+class Flight:
+    """Одно выполнение; его получает функция работы, переданная в SingleFlight.join."""
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self.lock = threading.Lock()
+        self.chunks: List[Tuple[str, bool]] = []
+        self.listeners: Dict["Ticket", Optional[ChunkCallback]] = {}
+        self.requests = 0
+        self.process = None
+        self.abandoned = False
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+    def publish(self, text: str, is_stderr: bool):
+        """on_chunk для stream_output: кусок — в буфер повтора и всем подключённым."""
+        with self.lock:
+            self.chunks.append((text, is_stderr))
+            tickets = [ticket for ticket, on_chunk in self.listeners.items() if on_chunk is not None]
+            for ticket in tickets:
+                ticket._outbox.append((text, is_stderr))
+        for ticket in tickets:
+            ticket._deliver()
+
+    def track(self, process):
+        """Запоминает процесс для отмены; если все уже отказались — сразу завершает его."""
+        with self.lock:
+            self.process = process
+            abandoned = self.abandoned
+        if abandoned:
+            process.kill()
+        return process
+
+    def cancelled(self) -> bool:
+        """cancelled для stream_output: от выполнения отказались все запросы."""
+        return self.abandoned
+
+
+class Ticket:
+    """Участие одного запроса в выполнении: ожидание результата и отмена только своего запроса."""
+
+    def __init__(self, group: "SingleFlight", flight: Flight, leader: bool,
+                 on_chunk: Optional[ChunkCallback] = None):
+        self._group = group
+        self.flight = flight
+        # leader — запрос, который начал выполнение; остальные подключились к нему
+        self.leader = leader
+        self.left = False
+        self._last = False
+        self._timed_out = False
+        self._wake = threading.Event()
+        self._on_chunk = on_chunk
+        # Куски, ещё не отданные on_chunk, и признак, что их уже отдаёт другой поток (под flight.lock)
+        self._outbox: List[Tuple[str, bool]] = []
+        self._draining = False
+
+    def _deliver(self):
+        """
+        Отдаёт накопленные куски on_chunk вне блокировок. Если их уже отдаёт другой поток,
+        он заберёт и новые: порядок кусков у запроса сохраняется.
+        """
+        flight = self.flight
+        while True:
+            with flight.lock:
+                if self._draining or not self._outbox:
+                    return
+                if self.left:
+                    self._outbox = []
+                    return
+                self._draining = True
+                items, self._outbox = self._outbox, []
+            try:
+                for text, is_stderr in items:
+                    self._on_chunk(text, is_stderr)
+            finally:
+                with flight.lock:
+                    self._draining = False
+
+    def kill(self):
+        self._group._leave(self)
+
+    terminate = kill
+
+    def run(self, work: Callable[[Flight], Dict[str, Any]], timeout: Optional[float] = None,
+            grace: float = 0.0) -> Dict[str, Any]:
+        """
+        Начавший запрос выполняет work(flight) в своём потоке, подключившийся — ждёт (wait).
+        timeout и grace — для ожидания; своё ограничение времени работа соблюдает сама.
+        """
+        if self.leader:
+            self._group._run(self.flight, work)
+            self._wake.set()
+        return self.wait(timeout, grace)
+
+    def wait(self, timeout: Optional[float] = None, grace: float = 0.0) -> Dict[str, Any]:
+        """
+        Результат выполнения (у каждого запроса своя глубокая копия; при нескольких запросах —
+        с полем 'coalesced').
+        Не дождавшись за timeout + grace секунд, запрос отказывается от выполнения и получает
+        результат с 'timeout'; отменённый kill() — с 'cancelled'. Последний отказавшийся
+        дожидается конца прерванного выполнения и получает его настоящий результат (частичный
+        вывод, отчёт kill). Исключение функции работы поднимается у всех.
+        """
+        if not self._wake.wait(None if timeout is None else timeout + grace):
+            self._timed_out = True
+            self.kill()  # если выполнение успело закончиться, kill() ничего не делает
+        flight = self.flight
+        if self.left and not self._last:
+            if self._timed_out:
+                return {"stdout": "", "stderr": f"Превышено время ожидания ({timeout} сек)",
+                        "returncode": -1, "timeout": True}
+            return {"stdout": "", "stderr": "Отменено пользователем.", "returncode": -1,
+                    "timeout": False, "cancelled": True}
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        # Каждому запросу — своя копия: трасса, записи, снимок и отчёт kill дальше меняются по-разному
+        # (окно добавляет в трассу время отрисовки); единственный запрос забирает результат как есть
+        result = dict(flight.result) if flight.requests == 1 else copy.deepcopy(flight.result)
+        if self._timed_out and self.left:
+            result.update(stderr=f"Превышено время ожидания ({timeout} сек)", returncode=-1, timeout=True)
+        if flight.requests > 1:
+            result["coalesced"] = {"joined": not self.leader, "requests": flight.requests}
+        return result
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+        self.launches = 0
+        self.joins = 0
+        self.replayed = 0
+        self.abandoned = 0
+        self.peak = 0
+
+    def join(self, key: Hashable, on_chunk: Optional[ChunkCallback] = None) -> Ticket:
+        """
+        Подключает запрос к идущему выполнению с ключом key или открывает новое (ticket.leader);
+        работу передают в ticket.run. on_chunk получает сначала уже выданные куски, затем новые.
+        Билет возвращается до начала работы, чтобы его можно было отменить из другого потока.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight(key)
+                self.launches += 1
+            else:
+                self.joins += 1
+            ticket = Ticket(self, flight, leader, on_chunk)
+            with flight.lock:
+                if on_chunk is not None:
+                    ticket._outbox = list(flight.chunks)
+                    self.replayed += len(flight.chunks)
+                flight.listeners[ticket] = on_chunk
+                flight.requests += 1
+                self.peak = max(self.peak, flight.requests)
+        ticket._deliver()
+        return ticket
+
+    def _run(self, flight: Flight, work: Callable[[Flight], Dict[str, Any]]):
+        try:
+            flight.result = work(flight)
+        except BaseException as e:
+            flight.error = e
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+        with flight.lock:
+            flight.done.set()
+            tickets = list(flight.listeners)
+            flight.chunks = []
+        for ticket in tickets:
+            ticket._wake.set()
+
+    def _leave(self, ticket: Ticket):
+        flight = ticket.flight
+        with self._lock:
+            with flight.lock:
+                if ticket.left or flight.done.is_set():
+                    return
+                ticket.left = True
+                flight.listeners.pop(ticket, None)
+                if flight.listeners:
+                    process = None
+                else:
+                    # Отказались все: новые запросы начнут своё выполнение, это — завершаем
+                    flight.abandoned = True
+                    ticket._last = True
+                    process = flight.process
+                    self.abandoned += 1
+                    if self._flights.get(flight.key) is flight:
+                        del self._flights[flight.key]
+        ticket._wake.set()
+        if process is not None:
+            try:
+                process.kill()
+            except Exception:
+                pass
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        return {"launches": self.launches, "joins": self.joins, "replayed": self.replayed,
+                "abandoned": self.abandoned, "peak": self.peak, "in_flight": self.in_flight()}
@@ -0,0 +1,348 @@
+# snapshot_store.py
+"""
+Снимки результатов инвентаризационных проверок (службы, порты, правила брандмауэра,
+USB, установленное ПО) и разница с предыдущим снимком.
+
+Записи структурированного результата хранятся по ключу (поля snapshot_key записи
+каталога, например Name). Записи разложены по BUCKETS корзинам по хэшу ключа,
+у каждой корзины — хэш её содержимого. Сравнение с прошлым снимком идёт сначала
+по корзинам: из базы читаются и перезаписываются только корзины, чей хэш изменился,
+и только в них записи сравниваются по одной — чтение и запись пропорциональны
+изменению, а не размеру списка.
+
+В SQLite (режим WAL) лежит только текущее состояние — корзины (хэш корзины и хэши
+её записей по ключам) и сами записи (rows, читаются только удалённые и изменённые) —
+и журнал изменений по снимкам (changes). Снимок без изменений — одна строка
+в snapshots; прежнее состояние восстанавливается обратным применением журнала (state_at).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+Record = Dict[str, Any]
+
+BUCKETS = 4096                # ~25 записей на корзину при 100k строк
+DEFAULT_MAX_SNAPSHOTS = 200   # снимков (и их журнала изменений) на проверку
+_MASK = (1 << 63) - 1         # хэши — в знаковом INTEGER SQLite
+_CHUNK = 500                  # параметров в одном IN (...)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    removed INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    baseline INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS snapshots_name ON snapshots(name, id);
+CREATE TABLE IF NOT EXISTS changes (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    old TEXT,
+    new TEXT
+);
+CREATE INDEX IF NOT EXISTS changes_snapshot ON changes(snapshot_id);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    digest INTEGER NOT NULL,
+    keys TEXT NOT NULL,
+    PRIMARY KEY (name, bucket)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rows (
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (name, key)
+) WITHOUT ROWID;
+"""
+
+# Порядок полей сохраняется — по нему строятся столбцы при показе
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+class SnapshotDiff(NamedTuple):
+    snapshot_id: int
+    name: str
+    taken_at: float
+    previous_at: Optional[float]
+    baseline: bool                  # первый снимок: сравнивать не с чем
+    total: int
+    added: List[Record]
+    removed: List[Record]
+    changed: List[Tuple[Record, Record]]  # (было, стало)
+    key_fields: Optional[Sequence[str]] = None
+
+    @property
+    def count(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.changed)
+
+    @property
+    def unchanged(self) -> int:
+        return self.total - len(self.added) - len(self.changed)
+
+    def summary(self) -> str:
+        if self.baseline:
+            return f"первый снимок: {self.total} записей"
+        if not self.count:
+            return f"без изменений ({self.total} записей)"
+        return f"+{len(self.added)} −{len(self.removed)} ~{len(self.changed)} из {self.total}"
+
+
+def record_key(record: Record, key_fields: Optional[Sequence[str]]) -> str:
+    """Ключ записи: значения полей key_fields через « / »; без полей — вся запись."""
+    if not key_fields:
+        return repr(record)
+    return " / ".join("" if record.get(f) is None else str(record.get(f)) for f in key_fields)
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(blake2b(text.encode("utf-8"), digest_size=8).digest(), "little") & _MASK
+
+
+def _dedupe(keys: List[str]) -> List[str]:
+    """Повтор ключа (одинаковые DisplayName правил) различается порядковым номером: «ключ #2»."""
+    seen = set(keys)
+    counts: Dict[str, int] = {}
+    out = []
+    for key in keys:
+        n = counts.get(key, 0) + 1
+        counts[key] = n
+        if n > 1:
+            candidate = f"{key} #{n}"
+            while candidate in seen:
+                n += 1
+                candidate = f"{key} #{n}"
+            counts[key] = n
+            seen.add(candidate)
+            key = candidate
+        out.append(key)
+    return out
+
+
+def _chunks(items: Sequence[Any], size: int = _CHUNK) -> Iterable[Sequence[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SnapshotStore:
+    def __init__(self, path: str, max_snapshots: Optional[int] = DEFAULT_MAX_SNAPSHOTS):
+        self.path = path
+        self.max_snapshots = max_snapshots
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = _connect(path)
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # Сколько хэшей записей пришлось прочитать при последнем сравнении
+        self.rows_read = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- снимок ---
+
+    @staticmethod
+    def _index(records: Sequence[Record], key_fields: Optional[Sequence[str]]
+               ) -> Tuple[Dict[str, Tuple[int, str, Record]], List[int]]:
+        """
+        ключ → (корзина, repr записи, запись) и хэши корзин. Хэш корзины — один blake2b
+        по repr её записей в порядке ключей, поэтому от порядка строк в выводе не зависит.
+        repr вдвое дешевле JSON, а порядок полей у одного запроса PowerShell постоянен.
+        """
+        records = [r for r in records if isinstance(r, dict)]
+        # Построчная работа — в map и списковых выражениях: на 100k записей это основная цена
+        texts = list(map(repr, records))
+        if not key_fields:
+            keys = texts
+        elif len(key_fields) == 1:
+            values = [r.get(key_fields[0]) for r in records]
+            keys = ["" if v is None else str(v) for v in values]
+        else:
+            keys = [record_key(r, key_fields) for r in records]
+        if len(set(keys)) != len(keys):
+            keys = _dedupe(keys)
+        crc32 = zlib.crc32
+        buckets = [crc32(k.encode("utf-8")) % BUCKETS for k in keys]
+        rows = dict(zip(keys, zip(buckets, texts, records)))
+        keys_by_bucket: List[List[str]] = [[] for _ in range(BUCKETS)]
+        for key, bucket in zip(keys, buckets):
+            keys_by_bucket[bucket].append(key)
+        sums = [0] * BUCKETS
+        for bucket, members in enumerate(keys_by_bucket):
+            if members:
+                members.sort()
+                sums[bucket] = _digest("\0".join([rows[k][1] for k in members]))
+        return rows, sums
+
+    def take(self, name: str, records: Sequence[Record], key_fields: Optional[Sequence[str]] = None,
+             taken_at: Optional[float] = None) -> SnapshotDiff:
+        """Сохраняет снимок и возвращает разницу с предыдущим."""
+        taken_at = time.time() if taken_at is None else taken_at
+        rows, sums = self._index(records, key_fields)
+        with self._lock, self._conn as conn:
+            previous = conn.execute("SELECT taken_at FROM snapshots WHERE name = ? ORDER BY id DESC LIMIT 1",
+                                    (name,)).fetchone()
+            baseline = previous is None
+            # Столбец keys не читается: хэш корзины лежит раньше в строке
+            old_sums = dict(conn.execute("SELECT bucket, digest FROM buckets WHERE name = ?", (name,)))
+            dirty = [b for b in range(BUCKETS) if old_sums.get(b, 0) != sums[b]]
+            dirty_set = set(dirty)
+
+            # Хэши записей только изменившихся корзин
+            old: Dict[str, int] = {}
+            for part in _chunks(dirty):
+                marks = ",".join("?" * len(part))
+                for (keys,) in conn.execute(
+                        f"SELECT keys FROM buckets WHERE name = ? AND bucket IN ({marks})", (name, *part)):
+                    old.update(json.loads(keys))
+            self.rows_read = len(old)
+            groups: Dict[int, Dict[str, int]] = {b: {} for b in dirty}
+            for key, (bucket, text, _) in rows.items():
+                if bucket in dirty_set:
+                    groups[bucket][key] = _digest(text)
+
+            added, changed = [], []
+            for group in groups.values():
+                for key, digest in group.items():
+                    previous_digest = old.get(key)
+                    if previous_digest is None:
+                        added.append(key)
+                    elif previous_digest != digest:
+                        changed.append(key)
+            removed = [k for k in old if k not in rows]
+            before: Dict[str, str] = {}  # прежний JSON удалённых и изменённых записей
+            for part in _chunks(removed + changed):
+                marks = ",".join("?" * len(part))
+                before.update(conn.execute(f"SELECT key, data FROM rows WHERE name = ? AND key IN ({marks})",
+                                           (name, *part)))
+
+            cursor = conn.execute(
+                "INSERT INTO snapshots (name, taken_at, total, added, removed, changed, baseline) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (name, taken_at, len(rows), 0 if baseline else len(added), len(removed), len(changed), int(baseline)))
+            snapshot_id = cursor.lastrowid
+            encode = _ENCODER.encode
+            after = {k: encode(rows[k][2]) for k in added + changed}
+            if not baseline:
+                conn.executemany(
+                    "INSERT INTO changes (snapshot_id, kind, key, old, new) VALUES (?, ?, ?, ?, ?)",
+                    [(snapshot_id, "added", k, None, after[k]) for k in added]
+                    + [(snapshot_id, "removed", k, before[k], None) for k in removed]
+                    + [(snapshot_id, "changed", k, before[k], after[k]) for k in changed])
+            conn.executemany("DELETE FROM rows WHERE name = ? AND key = ?", [(name, k) for k in removed])
+            conn.executemany("INSERT OR REPLACE INTO rows (name, key, data) VALUES (?, ?, ?)",
+                             [(name, k, data) for k, data in after.items()])
+            conn.executemany("DELETE FROM buckets WHERE name = ? AND bucket = ?",
+                             [(name, b) for b in dirty if not groups[b]])
+            conn.executemany("INSERT OR REPLACE INTO buckets (name, bucket, digest, keys) VALUES (?, ?, ?, ?)",
+                             [(name, b, sums[b], json.dumps(groups[b])) for b in dirty if groups[b]])
+            self._prune(conn, name)
+
+        if baseline:
+            return SnapshotDiff(snapshot_id, name, taken_at, None, True, len(rows), [], [], [], key_fields)
+        # Прежние записи — из JSON базы (даты строками); новые — как пришли
+        return SnapshotDiff(snapshot_id, name, taken_at, previous[0], False, len(rows),
+                            [rows[k][2] for k in added], [json.loads(before[k]) for k in removed],
+                            [(json.loads(before[k]), rows[k][2]) for k in changed], key_fields)
+
+    def _prune(self, conn: sqlite3.Connection, name: str):
+        if not self.max_snapshots:
+            return
+        conn.execute("DELETE FROM snapshots WHERE name = ? AND id NOT IN "
+                     "(SELECT id FROM snapshots WHERE name = ? ORDER BY id DESC LIMIT ?)",
+                     (name, name, self.max_snapshots))
+
+    def reset(self, name: str):
+        """Забыть снимки проверки: следующий станет первым."""
+        with self._lock, self._conn as conn:
+            for table in ("snapshots", "buckets", "rows"):
+                conn.execute(f"DELETE FROM {table} WHERE name = ?", (name,))
+
+    # --- чтение ---
+
+    def snapshots(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        columns = ("id", "name", "taken_at", "total", "added", "removed", "changed", "baseline")
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM snapshots WHERE name = ? ORDER BY id DESC LIMIT ?",
+                (name, limit)).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def changes(self, snapshot_id: int) -> List[Dict[str, Any]]:
+        """Журнал одного снимка: kind (added/removed/changed), key, old, new."""
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, key, old, new FROM changes WHERE snapshot_id = ?",
+                                      (snapshot_id,)).fetchall()
+        return [{"kind": kind, "key": key, "old": json.loads(old) if old else None,
+                 "new": json.loads(new) if new else None} for kind, key, old, new in rows]
+
+    def current(self, name: str) -> Dict[str, Record]:
+        """Состояние по последнему снимку: ключ → запись (значения — как в JSON)."""
+        with self._lock:
+            return {key: json.loads(data) for key, data in
+                    self._conn.execute("SELECT key, data FROM rows WHERE name = ?", (name,))}
+
+    def state_at(self, name: str, snapshot_id: int) -> Dict[str, Record]:
+        """Состояние на момент снимка: текущее, откатанное по журналу более поздних снимков."""
+        state = self.current(name)
+        with self._lock:
+            later = self._conn.execute(
+                "SELECT c.kind, c.key, c.old FROM changes c JOIN snapshots s ON s.id = c.snapshot_id "
+                "WHERE s.name = ? AND s.id > ? ORDER BY s.id DESC", (name, snapshot_id)).fetchall()
+        for kind, key, old in later:
+            if kind == "added":
+                state.pop(key, None)
+            else:
+                state[key] = json.loads(old)
+        return state
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def format_diff(diff: SnapshotDiff, limit: int = 500) -> str:
+    """Текст только с изменениями: добавленные и удалённые записи, у изменённых — поля «было → стало»."""
+    from structured_output import render_records
+
+    since = ""
+    if diff.previous_at:
+        since = " с " + time.strftime("%d.%m.%Y %H:%M:%S", time.localtime(diff.previous_at))
+    lines = [f"Снимок «{diff.name}»{since}: {diff.summary()}"]
+    for title, records in (("Добавлено", diff.added), ("Удалено", diff.removed)):
+        if records:
+            lines += ["", f"{title} ({len(records)}):", render_records(records[:limit])]
+            if len(records) > limit:
+                lines.append(f"... и ещё {len(records) - limit}")
+    if diff.changed:
+        lines += ["", f"Изменено ({len(diff.changed)}):"]
+        for before, after in diff.changed[:limit]:
+            fields = [f for f in dict.fromkeys([*before, *after]) if _cell(before.get(f)) != _cell(after.get(f))]
+            changes = "; ".join(f"{f}: {_cell(before.get(f))} → {_cell(after.get(f))}" for f in fields)
+            key = record_key(after, diff.key_fields) + ": " if diff.key_fields else ""
+            lines.append(f"  {key}{changes}")
+        if len(diff.changed) > limit:
+            lines.append(f"... и ещё {len(diff.changed) - limit}")
+    return "\n".join(lines)
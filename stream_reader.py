@@ -0,0 +1,105 @@
+# stream_reader.py
+"""
+Одновременное чтение stdout и stderr процесса крупными блоками.
+
+Каждый пайп читает свой поток (на Windows select() для пайпов недоступен), блоки
+складываются в общую очередь в порядке поступления и помечаются источником.
+Потребитель получает уже разрезанные на целые строки куски, поэтому многобайтовые
+символы и переводы строк не рвутся между блоками.
+"""
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from process_tree import KILL_GRACE
+
+CHUNK_SIZE = 64 * 1024
+
+
+class LineSplitter:
+    """Инкрементально отделяет завершённые строки; хвост без перевода строки ждёт продолжения."""
+
+    def __init__(self):
+        self._tail = b""
+
+    def feed(self, data: bytes) -> bytes:
+        """Возвращает все завершённые строки блока (вместе с переводами строк) одним куском."""
+        data = self._tail + data
+        idx = data.rfind(b"\n")
+        if idx < 0:
+            self._tail = data
+            return b""
+        self._tail = data[idx + 1:]
+        return data[:idx + 1]
+
+    def flush(self) -> bytes:
+        tail, self._tail = self._tail, b""
+        return tail
+
+
+def _pump(pipe, is_stderr: bool, out: "queue.Queue", chunk_size: int):
+    read = getattr(pipe, "read1", None) or pipe.read
+    try:
+        while True:
+            data = read(chunk_size)
+            if not data:
+                break
+            out.put((is_stderr, data))
+    except (OSError, ValueError):
+        pass
+    finally:
+        out.put((is_stderr, None))
+
+
+def drain(process, on_chunk: Optional[Callable[[bytes, bool], None]] = None,
+          timeout: Optional[float] = None, chunk_size: int = CHUNK_SIZE,
+          cancelled: Callable[[], bool] = lambda: False) -> Tuple[bytes, bytes, bool]:
+    """
+    Читает оба пайпа до EOF. on_chunk(данные, is_stderr) вызывается в потоке вызывающего
+    для каждого куска целых строк в порядке поступления. По истечении timeout процесс
+    убивается. Возвращает (весь stdout, весь stderr, timed_out).
+    """
+    chunks: "queue.Queue" = queue.Queue()
+    pipes = [(p, flag) for p, flag in ((process.stdout, False), (process.stderr, True)) if p is not None]
+    for pipe, flag in pipes:
+        threading.Thread(target=_pump, args=(pipe, flag, chunks, chunk_size), daemon=True).start()
+
+    collected: List[List[bytes]] = [[], []]
+    splitters = [LineSplitter(), LineSplitter()]
+    open_pipes = len(pipes)
+    deadline = time.monotonic() + timeout if timeout else None
+    timed_out = False
+    killed_at = None
+    while open_pipes:
+        now = time.monotonic()
+        if killed_at is None and (cancelled() or (deadline is not None and now >= deadline)):
+            timed_out = not cancelled()
+            killed_at = now
+            try:
+                process.kill()
+            except Exception:
+                pass
+        elif killed_at is not None and now - killed_at >= KILL_GRACE:
+            # Пайпы держат потомки убитого процесса — дальше не ждём
+            break
+        wait = 0.2
+        if deadline is not None and killed_at is None:
+            wait = min(wait, max(0.0, deadline - now))
+        try:
+            is_stderr, data = chunks.get(timeout=wait)
+        except queue.Empty:
+            continue
+        slot = 1 if is_stderr else 0
+        if data is None:
+            open_pipes -= 1
+            tail = splitters[slot].flush()
+            if tail and on_chunk is not None:
+                on_chunk(tail, is_stderr)
+            continue
+        collected[slot].append(data)
+        if on_chunk is not None:
+            lines = splitters[slot].feed(data)
+            if lines:
+                on_chunk(lines, is_stderr)
+    return b"".join(collected[0]), b"".join(collected[1]), timed_out
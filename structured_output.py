@@ -0,0 +1,194 @@
+# structured_output.py
+"""
+Структурированный режим вывода команд каталога.
+
+Вместо Format-Table/Format-List + Out-String команда выполняется с проекцией
+в ConvertTo-Json -Compress, а результат разбирается в список записей (dict) с
+приведёнными типами. Текст для человека строится из записей только при показе.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+Record = Dict[str, Any]
+
+_FORMAT_TAIL = re.compile(r"\|\s*Format-(?:Table|List)\b(?P<args>[^|{}]*)$", re.IGNORECASE)
+_PROPERTY_ARG = re.compile(r"-Property\s+(?P<props>.+?)(?=\s+-\w|$)", re.IGNORECASE)
+_MS_DATE = re.compile(r"^/Date\((?P<ms>-?\d+)(?:[+-]\d{4})?\)/$")
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?P<frac>\.\d+)?(?P<tz>Z|[+-]\d{2}:\d{2})?$")
+# Ведущий ноль (кроме самого «0») — признак кода, серийного номера или идентификатора: остаётся строкой
+_NUMBER = re.compile(r"^-?(?:0|[1-9]\d*)(?:[.,]\d+)?$")
+
+
+def _balanced(text: str) -> bool:
+    return text.count("{") == text.count("}") and text.count("(") == text.count(")")
+
+
+def derive_query(command: str) -> Optional[str]:
+    """
+    Выводит структурированный запрос из текстовой команды: отрезает завершающий
+    Format-Table/Format-List верхнего уровня и превращает -Property в Select-Object.
+    Возвращает None, если команда не табличная (нативные утилиты, try/catch, -Property *).
+    """
+    match = _FORMAT_TAIL.search(command)
+    if match is None:
+        return None
+    head = command[:match.start()].rstrip()
+    if not head or not _balanced(head):
+        return None
+    props = _PROPERTY_ARG.search(match.group("args"))
+    if props is None:
+        return head
+    props_text = props.group("props").strip()
+    if props_text == "*":
+        return None
+    return f"{head} | Select-Object -Property {props_text}"
+
+
+def structured_command(meta: Dict[str, Any], command: str, user_input: Optional[str] = None) -> Optional[str]:
+    """
+    Запрос для структурированного режима: явный ключ 'structured' записи каталога
+    (строка; для шаблонов подставляется тот же, уже проверенный {input}) или производный
+    от готовой команды command. 'structured': False отключает режим для записи.
+    """
+    explicit = meta.get("structured")
+    if explicit is False:
+        return None
+    if isinstance(explicit, str):
+        if "template" in meta:
+            return explicit.format(input=(user_input or "").strip())
+        return explicit
+    return derive_query(command)
+
+
+def build_json_command(query: str, depth: int = 3) -> str:
+    """
+    Оборачивает запрос в компактную JSON-проекцию. JSON пишется напрямую в stdout,
+    минуя Out-String, чтобы длинная строка не резалась по ширине.
+    """
+    return (
+        f"$__scp = ConvertTo-Json -InputObject @({query}) -Compress -Depth {depth}; "
+        "[Console]::Out.WriteLine($__scp)"
+    )
+
+
+def build_csv_command(query: str) -> str:
+    """CSV-проекция: заголовок один раз, поэтому компактнее JSON на длинных списках."""
+    return (
+        f"$__scp = @({query}) | ConvertTo-Csv -NoTypeInformation; "
+        "[Console]::Out.WriteLine(($__scp -join [Environment]::NewLine))"
+    )
+
+
+def build_structured_command(query: str, fmt: str = "json") -> str:
+    if fmt == "csv":
+        return build_csv_command(query)
+    return build_json_command(query)
+
+
+def parse_records(text: str, fmt: str = "json") -> List[Record]:
+    if fmt == "csv":
+        return parse_csv_records(text)
+    return parse_json_records(text)
+
+
+def _convert_value(value: Any) -> Any:
+    if isinstance(value, str):
+        match = _MS_DATE.match(value)
+        if match:
+            return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=int(match.group("ms")))
+        match = _ISO_DATE.match(value)
+        if match:
+            text = value
+            frac = match.group("frac")
+            if frac and len(frac) > 7:
+                text = text.replace(frac, frac[:7], 1)
+            if match.group("tz") == "Z":
+                text = text[:-1] + "+00:00"
+            try:
+                return datetime.fromisoformat(text)
+            except ValueError:
+                return value
+        return value
+    if isinstance(value, dict):
+        return {k: _convert_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_convert_value(v) for v in value]
+    return value
+
+
+def parse_json_records(text: str) -> List[Record]:
+    """Разбирает вывод ConvertTo-Json в список записей. ValueError при неверном JSON."""
+    text = (text or "").strip().lstrip("\ufeff")
+    if not text:
+        return []
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = [data]
+    elif not isinstance(data, list):
+        data = [{"Value": data}]
+    records = []
+    for item in data:
+        if not isinstance(item, dict):
+            item = {"Value": item}
+        records.append({k: _convert_value(v) for k, v in item.items()})
+    return records
+
+
+def _convert_csv_cell(value: str, column: str = "") -> Any:
+    if value == "":
+        return None
+    if value in ("True", "False"):
+        return value == "True"
+    # Версии («1.10», «10.0» у драйверов, BIOS, ОС) — строки, иначе «1.10» станет 1.1
+    if _NUMBER.match(value) and "version" not in column.lower():
+        number = value.replace(",", ".")
+        if "." not in number:
+            return int(number)
+        # Дробное — только если число записывается обратно тем же текстом
+        if str(float(number)) == number:
+            return float(number)
+        return value
+    return _convert_value(value)
+
+
+def parse_csv_records(text: str) -> List[Record]:
+    """Разбирает вывод ConvertTo-Csv -NoTypeInformation (или CSV нативных утилит)."""
+    text = (text or "").strip().lstrip("\ufeff")
+    if not text:
+        return []
+    reader = csv.DictReader(io.StringIO(text))
+    return [{k: _convert_csv_cell(v or "", k or "") for k, v in row.items()} for row in reader]
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y %H:%M:%S")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+def render_records(records: List[Record], columns: Optional[List[str]] = None) -> str:
+    """Текстовая таблица в духе Format-Table -AutoSize — строится только для показа."""
+    if not records:
+        return ""
+    if columns is None:
+        columns = []
+        for record in records:
+            for key in record:
+                if key not in columns:
+                    columns.append(key)
+    rows = [[_cell(record.get(col)) for col in columns] for record in records]
+    widths = [max(len(col), *(len(row[i]) for row in rows)) for i, col in enumerate(columns)]
+    lines = [
+        " ".join(col.ljust(w) for col, w in zip(columns, widths)).rstrip(),
+        " ".join("-" * w for w in widths),
+    ]
+    lines.extend(" ".join(val.ljust(w) for val, w in zip(row, widths)).rstrip() for row in rows)
+    return "\n".join(lines)
@@ -1,6 +1,247 @@
 # system_checks.py
+import atexit
+import logging
+import os
+import re
 import subprocess
-from typing import Optional, Tuple, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Optional, Tuple, Dict, Any, List, Sequence, Iterator, Callable
+
+from powershell_pool import PowerShellPool
+from structured_output import structured_command, build_structured_command, parse_records
+from result_cache import ResultCache, cache_key, cache_ttl
+from stream_reader import drain
+from output_decoding import StreamDecoder, decode_bytes
+from history_store import HistoryStore
+from metric_store import MetricStore
+from snapshot_store import SnapshotStore
+from timing import Trace, stage
+from process_tree import TreePopen, KILL_GRACE
+from single_flight import Flight, SingleFlight
+from timeout_policy import TimeoutDecision, TimeoutPolicy
+import cim_batch
+
+# Режим запуска: "pool" — команды выполняются в тёплых хостах PowerShell,
+# "spawn" — новый powershell.exe на каждую команду (прежнее поведение).
+_execution_mode = "pool"
+# Исполнители кроме встроенных ("exec", "pool", "spawn", "powershell"): имя → launcher(команда, argv)
+_backends: Dict[str, Callable[[str, Optional[Sequence[str]]], Any]] = {}
+_pool: Optional[PowerShellPool] = None
+_pool_lock = threading.Lock()
+_cache: Optional[ResultCache] = None
+_history: Optional[HistoryStore] = None
+_metrics: Optional[MetricStore] = None
+_snapshots: Optional[SnapshotStore] = None
+# Одинаковые одновременные запуски (та же запись, команда, исполнитель, формат) — одним процессом
+_flights = SingleFlight()
+# Сбои сохранения: не записанное в историю, ряды, снимки и недоступная для таймаутов история.
+# Выполнение проверок они не ломают, но считаются и попадают в лог (не чаще раза в минуту)
+FAILURE_LOG_INTERVAL = 60.0
+_failures: Dict[str, int] = {"history": 0, "metrics": 0, "snapshots": 0, "timeout_policy": 0}
+_failure_logged: Dict[str, float] = {}
+_failures_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+def configure_pool(host_argv: Optional[Sequence[str]] = None, size: int = 2) -> PowerShellPool:
+    """
+    Пересоздаёт пул хостов. host_argv позволяет подменить интерпретатор
+    (pwsh или тестовый заменитель с тем же построчным протоколом).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = PowerShellPool(host_argv=host_argv, size=size)
+        return _pool
+
+def get_pool() -> PowerShellPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PowerShellPool()
+        return _pool
+
+def set_execution_mode(mode: str):
+    global _execution_mode
+    if mode not in ("pool", "spawn"):
+        raise ValueError(f"Неизвестный режим выполнения: {mode}")
+    _execution_mode = mode
+
+def register_backend(name: str, launcher: Callable[[str, Optional[Sequence[str]]], Any]):
+    """
+    Добавляет исполнитель (например, scripted_process.scripted_backend для проверок без Windows).
+    launcher(текст команды, argv или None) возвращает объект с интерфейсом subprocess.Popen.
+    Запись каталога выбирает его ключом "backend".
+    """
+    if name in ("exec", "pool", "spawn", "powershell"):
+        raise ValueError(f"Имя исполнителя занято встроенным: {name}")
+    _backends[name] = launcher
+
+def configure_cache(directory: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024) -> ResultCache:
+    """Пересоздаёт кэш результатов. directory=None — только в памяти."""
+    global _cache
+    with _pool_lock:
+        if _cache is not None:
+            _cache.flush()
+        _cache = ResultCache(directory=directory, max_bytes=max_bytes)
+        return _cache
+
+def get_cache() -> ResultCache:
+    global _cache
+    with _pool_lock:
+        if _cache is None:
+            _cache = ResultCache(directory=os.path.join(os.getcwd(), "cache"))
+        return _cache
+
+def configure_history(path: Optional[str] = None, **options) -> HistoryStore:
+    """Пересоздаёт хранилище истории запусков (options — параметры HistoryStore)."""
+    global _history
+    with _pool_lock:
+        if _history is not None:
+            _history.close()
+        _history = HistoryStore(path or os.path.join(os.getcwd(), "logs", "history.db"), **options)
+        return _history
+
+def get_history() -> HistoryStore:
+    global _history
+    with _pool_lock:
+        if _history is None:
+            _history = HistoryStore(os.path.join(os.getcwd(), "logs", "history.db"))
+        return _history
+
+def _store_failed(store: str, name: str):
+    """Сбой хранилища store для проверки name (вызывается в except): счётчик и предупреждение в лог."""
+    now = time.monotonic()
+    with _failures_lock:
+        _failures[store] += 1
+        count = _failures[store]
+        last = _failure_logged.get(store)
+        if last is not None and now - last < FAILURE_LOG_INTERVAL:
+            return
+        _failure_logged[store] = now
+    _log.warning("Сбой хранилища «%s» для проверки «%s» (всего сбоев: %d)", store, name, count,
+                 exc_info=True)
+
+def persistence_failures() -> Dict[str, int]:
+    """
+    Сбои сохранения за сеанс: history — запуски, не попавшие в историю (в т.ч. потерянные пачки
+    фоновой записи), metrics, snapshots, timeout_policy — решения таймаута без истории.
+    """
+    with _failures_lock:
+        failures = dict(_failures)
+    if _history is not None:
+        failures["history"] += _history.dropped
+    return failures
+
+def record_history(name: str, command: str, result: Dict[str, Any], source: str = ""):
+    """Записывает выполненный запуск в историю; пропуски и выдачи из кэша не пишутся."""
+    if result.get("skipped") or result.get("cached"):
+        return
+    try:
+        get_history().record(name, command, result, started_at=result.get("started_at"), source=source)
+    except Exception:
+        # История не должна ломать выполнение проверок
+        _store_failed("history", name)
+
+def decide_timeout(name: str, meta: Dict[str, Any], default: int,
+                   override: Optional[int] = None) -> TimeoutDecision:
+    """Таймаут записи каталога по истории её запусков (timeout_policy); без истории — default."""
+    try:
+        return TimeoutPolicy(get_history()).decide(name, meta, default, override)
+    except Exception as e:
+        # Недоступная история не должна мешать запуску: прежний таймаут
+        _store_failed("timeout_policy", name)
+        return TimeoutDecision(int(override if override is not None else default), "default",
+                               f"история недоступна: {e}")
+
+def configure_metrics(path: Optional[str] = None, **options) -> MetricStore:
+    """Пересоздаёт хранилище числовых рядов (options — параметры MetricStore)."""
+    global _metrics
+    with _pool_lock:
+        if _metrics is not None:
+            _metrics.close()
+        options.setdefault("autosave", 60.0)
+        _metrics = MetricStore(path or os.path.join(os.getcwd(), "logs", "metrics.tsm"), **options)
+        return _metrics
+
+def get_metrics() -> MetricStore:
+    global _metrics
+    with _pool_lock:
+        if _metrics is None:
+            _metrics = MetricStore(os.path.join(os.getcwd(), "logs", "metrics.tsm"), autosave=60.0)
+        return _metrics
+
+def record_metrics(name: str, result: Dict[str, Any]):
+    """Числовые поля структурированного результата → ряды «имя проверки/ключ/поле»."""
+    if result.get("skipped") or result.get("cached") or not result.get("records"):
+        return
+    try:
+        get_metrics().ingest_records(name, result["records"], result.get("started_at"))
+    except Exception:
+        # Как и история, ряды не должны ломать выполнение проверок
+        _store_failed("metrics", name)
+
+def configure_snapshots(path: Optional[str] = None, **options) -> SnapshotStore:
+    """Пересоздаёт хранилище снимков (options — параметры SnapshotStore)."""
+    global _snapshots
+    with _pool_lock:
+        if _snapshots is not None:
+            _snapshots.close()
+        _snapshots = SnapshotStore(path or os.path.join(os.getcwd(), "logs", "snapshots.db"), **options)
+        return _snapshots
+
+def get_snapshots() -> SnapshotStore:
+    global _snapshots
+    with _pool_lock:
+        if _snapshots is None:
+            _snapshots = SnapshotStore(os.path.join(os.getcwd(), "logs", "snapshots.db"))
+        return _snapshots
+
+def record_snapshot(name: str, meta: Dict[str, Any], result: Dict[str, Any]):
+    """
+    Для записей каталога с snapshot_key сохраняет снимок records и кладёт разницу с прошлым
+    снимком в result['snapshot'] (SnapshotDiff). Кэш и пропуски снимков не дают.
+    """
+    key = meta.get("snapshot_key")
+    if not key or result.get("skipped") or result.get("cached") or result.get("records") is None:
+        return
+    try:
+        result["snapshot"] = get_snapshots().take(name, result["records"], key, taken_at=result.get("started_at"))
+    except Exception:
+        _store_failed("snapshots", name)
+
+def get_flights() -> SingleFlight:
+    """Общий слой объединения одинаковых одновременных запусков (stats() — счётчики)."""
+    return _flights
+
+def flight_key(command: str, argv: Optional[Sequence[str]] = None, backend: Optional[str] = None,
+               fmt: Optional[str] = None, launcher: Any = None, name: Optional[str] = None) -> Tuple:
+    """
+    Ключ объединения: запись каталога, итоговая команда, argv, исполнитель (как его выберет
+    launch_command) и формат. Запись входит в ключ, потому что историю, ряды и снимки пишет
+    выполнение под её именем: разные записи с одинаковой командой выполняются отдельно.
+    """
+    backend = backend or ("exec" if argv else "powershell")
+    return name, command, tuple(argv) if argv else None, backend, fmt, launcher
+
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown()
+    if _cache is not None:
+        _cache.flush()
+    if _history is not None:
+        _history.close()
+    if _metrics is not None:
+        try:
+            _metrics.close()
+        except OSError:
+            pass
+    if _snapshots is not None:
+        _snapshots.close()
+
+atexit.register(_shutdown_pool)
 
 def _build_powershell_command(command: str) -> str:
     """
@@ -21,13 +262,60 @@ def _build_powershell_command(command: str) -> str:
     wrapped = f"& {{ {command} | Out-String -Width 4096 }}"
     return f'powershell.exe -NoProfile -ExecutionPolicy Bypass -Command "{ps_preamble}{wrapped}"'
 
-def launch_command(command: str) -> subprocess.Popen:
+def launch_command(command: str, argv: Optional[Sequence[str]] = None, backend: Optional[str] = None):
     """
-    Запускает команду в PowerShell и возвращает объект процесса. Вывод захватывается как байты,
+    Запускает команду и возвращает объект процесса. Вывод захватывается как байты,
     чтобы затем безопасно декодировать с fallback по кодировкам.
+    Исполнитель (backend): "exec" — argv напрямую, без cmd.exe и PowerShell; "powershell" —
+    по режиму выполнения; "pool"/"spawn" — явно; иначе — зарегистрированный register_backend.
+    По умолчанию — "exec", если передан argv, иначе "powershell".
+    В режиме "pool" возвращается PooledProcess с тем же интерфейсом, что и subprocess.Popen;
+    если хост пула запустить не удалось, откатываемся к отдельному процессу. Если программу
+    из argv запустить не удалось (нет в PATH), команда выполняется в PowerShell.
+    У процесса есть поля trace (timing.Trace) с этапом запуска и backend; collect_output и
+    stream_output кладут их в result['trace'] и result['backend'].
+    Процесс запускается как TreePopen: kill() завершает и всех его потомков.
     """
+    backend = backend or ("exec" if argv else "powershell")
+    if backend == "powershell" or (backend == "exec" and not argv):
+        backend = _execution_mode
+    trace = Trace()
+    with trace.span("launch"):
+        process = None
+        if backend == "exec":
+            try:
+                process = _exec_argv(argv)
+            except OSError:
+                backend = _execution_mode
+        elif backend not in ("exec", "pool", "spawn"):
+            if backend not in _backends:
+                raise ValueError(f"Неизвестный исполнитель: {backend}")
+            process = _backends[backend](command, argv)
+        if process is None and backend == "pool":
+            try:
+                process = get_pool().launch(command)
+            except OSError:
+                backend = "spawn"
+        if process is None:
+            backend = "spawn"
+            process = _spawn_command(command)
+    process.trace = trace
+    process.backend = backend
+    return process
+
+def _exec_argv(argv: Sequence[str]) -> subprocess.Popen:
+    # Без оболочки: ни cmd.exe, ни PowerShell, вывод программы не переформатируется Out-String.
+    # stdin закрыт, чтобы утилиты, спрашивающие подтверждение (chkdsk), не ждали ввода.
+    return TreePopen(
+        list(argv),
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+def _spawn_command(command: str) -> subprocess.Popen:
     powershell_command = _build_powershell_command(command)
-    process = subprocess.Popen(
+    process = TreePopen(
         powershell_command,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -36,63 +324,499 @@ def launch_command(command: str) -> subprocess.Popen:
     return process
 
 def _decode_output(raw: Optional[bytes]) -> str:
-    if raw is None:
-        return ""
-    # Сначала пробуем cp1251, затем UTF-8; в конце подстраховываемся replace
-    for enc in ("cp1251", "utf-8"):
-        try:
-            return raw.decode(enc)
-        except UnicodeDecodeError:
-            continue
-    return raw.decode("utf-8", errors="replace")
+    # Кодировка определяется по данным: BOM, строгий UTF-8, затем кодовые страницы консоли
+    return decode_bytes(raw)
+
+def _trace_of(process) -> Trace:
+    trace = getattr(process, "trace", None)
+    return trace if trace is not None else Trace()
+
+def _finish_trace(process, trace: Trace, result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Этапы хоста пула и ресурсы процесса → трасса; трасса → result['trace']. Если процесс
+    убивали (таймаут, отмена), дожидается исчезновения его дерева (не дольше KILL_GRACE) и
+    кладёт отчёт в result['kill']: {'members', 'survivors', 'latency'}.
+    """
+    if getattr(process, "kill_report", None) is not None:
+        report = process.verify_killed()
+        end = report["at"] + report["latency"] if report["latency"] is not None else time.perf_counter()
+        trace.add("kill", report["at"], end)
+        result["kill"] = {k: report[k] for k in ("members", "survivors", "latency")}
+    submitted, begun, ended = (getattr(process, f, None) for f in ("submitted_at", "begun_at", "ended_at"))
+    if submitted is not None and begun is not None:
+        trace.add("dispatch", submitted, begun, lane="host")
+        if ended is not None:
+            trace.add("query", begun, ended, lane="host")
+    usage = getattr(process, "usage", None)
+    if usage:
+        trace.set_usage(**usage)
+    result["trace"] = trace
+    result["backend"] = getattr(process, "backend", None)
+    return result
 
 def collect_output(process: subprocess.Popen, timeout: int = 30) -> Dict[str, Any]:
     """
     Ожидает завершения процесса и возвращает словарь с stdout, stderr и кодом возврата.
     В случае таймаута процесс убивается и возвращается соответствующее сообщение об ошибке.
-    { 'stdout': str, 'stderr': str, 'returncode': int, 'timeout': bool }
+    { 'stdout': str, 'stderr': str, 'returncode': int, 'timeout': bool, 'trace': Trace }
     """
+    trace = _trace_of(process)
     try:
-        stdout_b, stderr_b = process.communicate(timeout=timeout)
-        stdout = _decode_output(stdout_b).strip()
-        stderr = _decode_output(stderr_b).strip()
-        return {
+        with trace.span("drain"):
+            stdout_b, stderr_b = process.communicate(timeout=timeout)
+        with trace.span("decode"):
+            stdout = _decode_output(stdout_b).strip()
+            stderr = _decode_output(stderr_b).strip()
+        return _finish_trace(process, trace, {
             "stdout": stdout,
             "stderr": stderr,
             "returncode": process.returncode,
             "timeout": False,
-        }
+        })
     except subprocess.TimeoutExpired:
         process.kill()
-        return {
+        return _finish_trace(process, trace, {
             "stdout": "",
             "stderr": f"Превышено время ожидания ({timeout} сек)",
             "returncode": -1,
             "timeout": True,
-        }
+        })
+    except Exception as e:
+        try:
+            process.kill()
+        except Exception:
+            pass
+        return _finish_trace(process, trace, {
+            "stdout": "",
+            "stderr": f"Неизвестная ошибка: {str(e)}",
+            "returncode": -1,
+            "timeout": False,
+        })
+
+def stream_output(process, on_chunk: Optional[Callable[[str, bool], None]] = None, timeout: int = 30,
+                  cancelled: Callable[[], bool] = lambda: False) -> Dict[str, Any]:
+    """
+    Как collect_output, но читает stdout и stderr одновременно крупными блоками и по ходу
+    отдаёт декодированные куски целых строк в on_chunk(текст, is_stderr). Каждый поток
+    декодируется инкрементально один раз; полный вывод собирается из тех же кусков.
+    """
+    decoders = (StreamDecoder(), StreamDecoder())
+    texts: Tuple[List[str], List[str]] = ([], [])
+    trace = _trace_of(process)
+    started = time.perf_counter()
+    first_byte = []
+
+    def feed(data: bytes, is_stderr: bool):
+        if not first_byte:
+            first_byte.append(time.perf_counter())
+            trace.add("first_byte", started, first_byte[0])
+        with trace.summed("decode"):
+            text = decoders[is_stderr].decode(data)
+        if text:
+            texts[is_stderr].append(text)
+            if on_chunk is not None:
+                on_chunk(text, is_stderr)
+
+    try:
+        stdout_b, stderr_b, timed_out = drain(process, feed, timeout=timeout, cancelled=cancelled)
     except Exception as e:
         try:
             process.kill()
         except Exception:
             pass
-        return {
+        return _finish_trace(process, trace, {
             "stdout": "",
             "stderr": f"Неизвестная ошибка: {str(e)}",
             "returncode": -1,
             "timeout": False,
-        }
+        })
+    trace.add("drain", first_byte[0] if first_byte else started, time.perf_counter())
+    if timed_out:
+        # Хвост без перевода строки мог не дойти до feed — декодируем собранные байты целиком
+        return _finish_trace(process, trace, {
+            "stdout": _decode_output(stdout_b).strip(),
+            "stderr": f"Превышено время ожидания ({timeout} сек)",
+            "returncode": -1,
+            "timeout": True,
+        })
+    try:
+        with trace.span("wait"):
+            returncode = process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        returncode = -1
+    for is_stderr in (False, True):
+        with trace.summed("decode"):
+            texts[is_stderr].append(decoders[is_stderr].flush())
+    return _finish_trace(process, trace, {
+        "stdout": "".join(texts[0]).strip(),
+        "stderr": "".join(texts[1]).strip(),
+        "returncode": returncode,
+        "timeout": False,
+    })
 
 def run_command(command: str, timeout: int = 30, details: bool = False):
     """
     Совместимая обёртка: по умолчанию возвращает строку stdout или сообщение об ошибке (как раньше),
     но при details=True возвращает словарь с полями stdout, stderr, returncode, timeout.
+    Одновременные вызовы с той же командой делят один запуск (get_flights).
     """
-    process = launch_command(command)
-    result = collect_output(process, timeout=timeout)
+    result = _flights.join(flight_key(command)).run(
+        lambda flight: collect_output(flight.track(launch_command(command)), timeout=timeout),
+        timeout, grace=KILL_GRACE)
     if details:
         return result
     # Режим совместимости со старыми вызовами
     if result["returncode"] != 0:
         err = result["stderr"] or "Ошибка выполнения команды"
         return f"Ошибка выполнения команды '{command}':\n{err}"
-    return result["stdout"].strip()
\ No newline at end of file
+    return result["stdout"].strip()
+
+DISALLOWED_INPUT_CHARS = set(";|&><`$\n\r\t\0")
+
+def render_command(meta: Dict[str, Any], user_input: Optional[str] = None) -> str:
+    """
+    Возвращает текст команды из записи каталога. Для записей с 'template' подставляет
+    user_input с теми же проверками, что и GUI; при некорректном вводе — ValueError.
+    """
+    if "template" not in meta:
+        return meta["command"]
+    user_input = (user_input or "").strip()
+    if not user_input:
+        raise ValueError("Команда требует ввода параметра")
+    if any(ch in DISALLOWED_INPUT_CHARS for ch in user_input):
+        raise ValueError("Недопустимые символы во вводе")
+    pattern = meta.get("input_pattern")
+    if pattern:
+        try:
+            if re.fullmatch(pattern, user_input) is None:
+                example = meta.get("input_example", "")
+                hint = f" Пример: {example}" if example else ""
+                raise ValueError("Ввод не соответствует ожидаемому формату." + hint)
+        except re.error:
+            pass
+    return meta["template"].format(input=user_input)
+
+def command_argv(meta: Dict[str, Any], user_input: Optional[str] = None,
+                 fmt: Optional[str] = None) -> Optional[List[str]]:
+    """
+    argv для прямого запуска записи каталога (ключ "argv", для шаблонов — с {input} в элементах)
+    или None: у записи нет argv, выбран другой исполнитель или команда заменена структурированной
+    проекцией (она пишется на PowerShell). Ввод проверяется так же, как в render_command, и
+    передаётся одним аргументом, без разбора оболочкой.
+    """
+    argv = meta.get("argv")
+    if not argv or fmt or meta.get("backend", "exec") != "exec":
+        return None
+    if "template" in meta:
+        render_command(meta, user_input)
+        user_input = user_input.strip()
+        return [arg.format(input=user_input) for arg in argv]
+    return list(argv)
+
+def command_backend(meta: Dict[str, Any], fmt: Optional[str] = None) -> Optional[str]:
+    """Исполнитель записи для launch_command: явный ключ "backend" или None — по умолчанию."""
+    backend = meta.get("backend")
+    if backend == "exec" and fmt:
+        return None
+    return backend
+
+def prepare_command(meta: Dict[str, Any], user_input: Optional[str] = None,
+                    structured: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Готовит команду к запуску: (текст команды, формат структурированного вывода или None).
+    structured="json"/"csv" включает проекцию, если она есть у записи каталога.
+    """
+    command = render_command(meta, user_input)
+    if structured:
+        query = structured_command(meta, command, user_input)
+        if query is not None:
+            return build_structured_command(query, structured), structured
+    return command, None
+
+def attach_records(result: Dict[str, Any], fmt: Optional[str]) -> Dict[str, Any]:
+    """Добавляет в результат поле 'records' (список записей или None, если разбор невозможен)."""
+    result["records"] = None
+    if fmt and result.get("returncode") == 0:
+        try:
+            result["records"] = parse_records(result.get("stdout", ""), fmt)
+        except ValueError:
+            pass
+    return result
+
+def lookup_cached(meta: Dict[str, Any], command: str, fmt: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Результат из кэша для подготовленной команды или None (в т.ч. для некэшируемых записей)."""
+    if cache_ttl(meta) <= 0:
+        return None
+    result = get_cache().get(cache_key(command, fmt))
+    return attach_records(result, fmt) if result is not None else None
+
+def store_cached(meta: Dict[str, Any], command: str, fmt: Optional[str], result: Dict[str, Any]):
+    """Кладёт результат в кэш согласно классу изменчивости записи."""
+    ttl = cache_ttl(meta)
+    if ttl > 0:
+        get_cache().put(cache_key(command, fmt), result, ttl, command=command)
+
+def finish_result(name: Optional[str], meta: Dict[str, Any], command: str, result: Dict[str, Any],
+                  source: str = "", fmt: Optional[str] = None, cache: bool = True,
+                  history: bool = True) -> Dict[str, Any]:
+    """
+    Общий конец выполненного запуска для окна, run_cached и run_many: кэш, records, история,
+    ряды и снимок. Без имени записи история не пишется.
+    """
+    if name and result.get("trace") is not None:
+        result["trace"].name = name
+    if cache:
+        with stage(result, "cache"):
+            store_cached(meta, command, fmt, result)
+    with stage(result, "parse"):
+        attach_records(result, fmt)
+    if history and name:
+        with stage(result, "record"):
+            record_history(name, command, result, source=source)
+            record_metrics(name, result)
+            record_snapshot(name, meta, result)
+    return result
+
+def run_cached(meta: Dict[str, Any], command: str, timeout: int = 30, fmt: Optional[str] = None,
+               force_refresh: bool = False, name: Optional[str] = None, source: str = "") -> Dict[str, Any]:
+    """
+    Выполняет подготовленную команду с учётом кэша. force_refresh=True игнорирует
+    сохранённый результат и перезаписывает его свежим. Одновременные вызовы с той же
+    командой и форматом делят один запуск (get_flights). С именем записи name запуск
+    пишется в историю с пометкой source.
+    """
+    if not force_refresh:
+        cached = lookup_cached(meta, command, fmt)
+        if cached is not None:
+            return cached
+
+    def work(flight: Flight) -> Dict[str, Any]:
+        started_at = time.time()
+        result = collect_output(flight.track(launch_command(command)), timeout=timeout)
+        result["started_at"], result["duration"] = started_at, time.time() - started_at
+        return finish_result(name, meta, command, result, source, fmt=fmt)
+
+    return _flights.join(flight_key(command, fmt=fmt, name=name)).run(work, timeout, grace=KILL_GRACE)
+
+def run_structured(meta: Dict[str, Any], timeout: int = 30, user_input: Optional[str] = None,
+                   fmt: str = "json") -> Dict[str, Any]:
+    """
+    Выполняет запись каталога в структурированном режиме. Для команд без проекции
+    возвращается обычный текстовый результат с records=None.
+    """
+    command, fmt = prepare_command(meta, user_input, structured=fmt)
+    return run_cached(meta, command, timeout=timeout, fmt=fmt)
+
+def _skipped(reason: str) -> Dict[str, Any]:
+    return {"stdout": "", "stderr": reason, "returncode": -1, "timeout": False, "skipped": reason,
+            "records": None}
+
+def run_many(names: Sequence[str], catalog: Dict[str, Dict[str, Any]], max_workers: int = 4,
+             timeout: int = 30, timeouts: Optional[Dict[str, int]] = None,
+             inputs: Optional[Dict[str, str]] = None, admin: bool = False, recovery: bool = False,
+             cancel_event: Optional[threading.Event] = None,
+             launcher: Callable[[str], Any] = None,
+             structured: Optional[str] = None, use_cache: bool = True,
+             force_refresh: bool = False, history: bool = True,
+             source: str = "batch", adaptive_timeouts: bool = False,
+             coalesce: bool = True, batch_cim: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Параллельно выполняет проверки каталога (не более max_workers одновременно) и отдаёт
+    пары (имя, результат) по мере завершения. Результат — словарь collect_output с полями
+    'name', 'duration', 'skipped' (причина пропуска или None) и 'trace' (этапы выполнения).
+    Записи с requires_admin пропускаются без admin=True, с requires_recovery — без recovery=True.
+    launcher позволяет подменить запуск (по умолчанию launch_command с argv и исполнителем
+    записи: command_argv, command_backend). В режиме "pool" пул на время пакета растёт до
+    max_workers хостов и по его окончании возвращается к прежнему размеру.
+    При structured="json"/"csv" команды с проекцией выполняются в структурированном режиме
+    и получают 'records'. Кэшируемые записи (ключ "cache") берутся из кэша, если
+    use_cache=True и не задан force_refresh. Выполненные запуски пишутся в историю
+    (get_history) с пометкой source, числа из records — в ряды get_metrics, а записи с
+    snapshot_key — в снимки (result['snapshot'] — разница с прошлым), если history=True.
+    Таймаут записи — timeouts[имя], иначе timeout, но не меньше её "timeout_min";
+    adaptive_timeouts=True выбирает его по истории запусков (decide_timeout), решение — в
+    result['timeout_policy'].
+    При coalesce=True проверка, которая уже выполняется под тем же именем с той же командой,
+    исполнителем и форматом (в другом пакете, в окне, в CLI), не запускается заново: результат — общий
+    (get_flights, поле 'coalesced'), кэш и историю пишет тот, кто начал выполнение.
+    При batch_cim=True независимые запросы Get-CimInstance (cim_batch.batchable) выполняются
+    пакетами — один PowerShell и одна CIM-сессия на пакет, пакетов не больше max_workers; у
+    каждой проверки свой результат, статус и время ('batch': номер, размер, статус, мс).
+    """
+    timeouts = timeouts or {}
+    inputs = inputs or {}
+    cancel_event = cancel_event or threading.Event()
+    running = {}
+    running_lock = threading.Lock()
+
+    # Хосты сверх настроенного пула нужны только на время пакета: shrink() в конце генератора
+    grown = get_pool() if launcher is None and _execution_mode == "pool" else None
+    if grown is not None:
+        grown.grow(max_workers)
+
+    def cached_result(meta: Dict[str, Any], command: str, fmt: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not use_cache or force_refresh:
+            return None
+        cached = lookup_cached(meta, command, fmt)
+        if cached is not None:
+            cached["duration"] = 0.0
+            cached["skipped"] = None
+        return cached
+
+    def limit_for(name: str, meta: Dict[str, Any]) -> Tuple[Optional[TimeoutDecision], int]:
+        decision = decide_timeout(name, meta, timeout, timeouts.get(name)) if adaptive_timeouts else None
+        if decision is not None:
+            return decision, decision.seconds
+        return None, timeouts.get(name, max(timeout, int(meta.get("timeout_min") or 0)))
+
+    def finish(name: str, meta: Dict[str, Any], command: str, fmt: Optional[str], result: Dict[str, Any]):
+        result["skipped"] = None
+        finish_result(name, meta, command, result, source, fmt=fmt, cache=use_cache, history=history)
+
+    def task(name: str, command: str, fmt: Optional[str]) -> Dict[str, Any]:
+        if cancel_event.is_set():
+            return _skipped("Отменено пользователем.")
+        meta = catalog[name]
+        cached = cached_result(meta, command, fmt)
+        if cached is not None:
+            return cached
+        decision, limit = limit_for(name, meta)
+        argv = command_argv(meta, inputs.get(name), fmt)
+        backend = command_backend(meta, fmt)
+
+        def work(flight: Optional[Flight]) -> Dict[str, Any]:
+            started_at = time.time()
+            started = time.perf_counter()
+            if launcher is None:
+                process = launch_command(command, argv, backend)
+            else:
+                process = launcher(command)
+            if flight is not None:
+                # Отменяют билет (running[name]), он завершает процесс
+                result = collect_output(flight.track(process), timeout=limit)
+            else:
+                with running_lock:
+                    running[name] = process
+                try:
+                    result = collect_output(process, timeout=limit)
+                finally:
+                    with running_lock:
+                        running.pop(name, None)
+            result["duration"] = time.perf_counter() - started
+            result["started_at"] = started_at
+            finish(name, meta, command, fmt, result)
+            return result
+
+        if coalesce:
+            ticket = _flights.join(flight_key(command, argv, backend, fmt, launcher, name=name))
+            with running_lock:
+                running[name] = ticket
+            try:
+                result = ticket.run(work, limit, grace=KILL_GRACE)
+            finally:
+                with running_lock:
+                    running.pop(name, None)
+        else:
+            result = work(None)
+        if decision is not None:
+            result["timeout_policy"] = decision.to_dict()
+        return result
+
+    def batch_task(group: List[Tuple[str, Dict[str, Any], str, Optional[str]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """Подзапросы CIM группы — одним сценарием PowerShell (cim_batch), результаты — по отдельности."""
+        results: Dict[str, Dict[str, Any]] = {}
+        queries = []
+        for name, meta, command, fmt in group:
+            if cancel_event.is_set():
+                results[name] = _skipped("Отменено пользователем.")
+                continue
+            cached = cached_result(meta, command, fmt)
+            if cached is not None:
+                results[name] = cached
+            else:
+                queries.append((name, meta, command, fmt) + limit_for(name, meta))
+        if queries:
+            token = cim_batch.new_token()
+            script = cim_batch.build_script([q[2] for q in queries], token, [q[5] for q in queries])
+            started_at = time.time()
+            started = time.perf_counter()
+            process = launch_command(script)
+            with running_lock:
+                running[token] = process
+            try:
+                batch = collect_output(process, timeout=sum(q[5] for q in queries) + cim_batch.BATCH_SLACK)
+            finally:
+                with running_lock:
+                    running.pop(token, None)
+            elapsed = time.perf_counter() - started
+            for (name, meta, command, fmt, decision, _), result in zip(
+                    queries, cim_batch.split_results(batch, token, len(queries))):
+                query_ms = result["batch"]["query_ms"]
+                result["duration"] = query_ms / 1000 if query_ms is not None else elapsed
+                result["started_at"] = started_at
+                finish(name, meta, command, fmt, result)
+                if decision is not None:
+                    result["timeout_policy"] = decision.to_dict()
+                results[name] = result
+        return [(name, results[name]) for name, _, _, _ in group]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers))) as pool:
+            futures = {}
+            batched = []
+            for name in names:
+                meta = catalog.get(name)
+                if meta is None:
+                    result = _skipped("Команда не найдена в каталоге")
+                elif meta.get("requires_admin") and not admin:
+                    result = _skipped("Требуются права администратора")
+                elif meta.get("requires_recovery") and not recovery:
+                    result = _skipped("Требуется среда восстановления Windows")
+                else:
+                    try:
+                        command, fmt = prepare_command(meta, inputs.get(name), structured)
+                    except ValueError as e:
+                        result = _skipped(str(e))
+                    else:
+                        if batch_cim and launcher is None and cim_batch.batchable(meta, command):
+                            batched.append((name, meta, command, fmt))
+                        else:
+                            futures[pool.submit(task, name, command, fmt)] = name
+                        continue
+                result["name"] = name
+                yield name, result
+            if len(batched) == 1:
+                name, _, command, fmt = batched[0]
+                futures[pool.submit(task, name, command, fmt)] = name
+            elif batched:
+                # Пакеты поровну между исполнителями, чтобы они шли параллельно
+                size = min(cim_batch.MAX_BATCH, max(2, -(-len(batched) // max(1, int(max_workers)))))
+                for i in range(0, len(batched), size):
+                    group = batched[i:i + size]
+                    futures[pool.submit(batch_task, group)] = tuple(item[0] for item in group)
+
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                if cancel_event.is_set():
+                    with running_lock:
+                        for process in list(running.values()):
+                            try:
+                                process.kill()
+                            except Exception:
+                                pass
+                for future in done:
+                    key = futures[future]
+                    try:
+                        pairs = future.result() if isinstance(key, tuple) else [(key, future.result())]
+                    except Exception as e:
+                        pairs = [(name, {"stdout": "", "stderr": f"Неизвестная ошибка: {e}", "returncode": -1,
+                                         "timeout": False, "skipped": None, "records": None})
+                                 for name in (key if isinstance(key, tuple) else (key,))]
+                    for name, result in pairs:
+                        result["name"] = name
+                        yield name, result
+    finally:
+        if grown is not None:
+            grown.shrink(max_workers)
@@ -0,0 +1,38 @@
+# tests/test_accounted_popen.py
+"""AccountedPopen: код возврата и rusage из собственного wait4, без внутренностей Popen."""
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+from timing import AccountedPopen
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="wait4 — только POSIX")
+
+BURN = "import sys; sum(range(3 * 10 ** 6)); sys.exit(int(sys.argv[1]))"
+
+
+@pytest.mark.parametrize("code", [0, 3])
+def test_wait_reports_returncode_and_usage(code):
+    process = AccountedPopen([sys.executable, "-c", BURN, str(code)])
+    assert process.wait() == code
+    assert process.usage["cpu"] > 0 and process.usage["peak_rss"]
+
+
+def test_wait_with_timeout_and_poll():
+    process = AccountedPopen([sys.executable, "-c", "import time; time.sleep(30)"])
+    with pytest.raises(subprocess.TimeoutExpired):
+        process.wait(timeout=0.05)
+    assert process.poll() is None
+    process.kill()
+    assert process.wait(timeout=5) == -signal.SIGKILL
+    assert process.usage is not None
+
+
+def test_status_taken_elsewhere_is_not_reported_as_success():
+    process = AccountedPopen([sys.executable, "-c", "pass"])
+    os.waitpid(process.pid, 0)
+    assert process.wait() == -1
+    assert process.usage is None
@@ -0,0 +1,78 @@
+# tests/test_cli.py
+"""Коды выхода cli.py run и выбор команд по меткам; PowerShell заменён benchmarks/fake_powershell.py."""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE = os.path.join(ROOT, "benchmarks", "fake_powershell.py")
+
+CATALOG = {
+    "Успех": {"command": "echo ok", "tags": ["net"]},
+    "Вторая сетевая": {"command": "echo net", "tags": ["net"]},
+    "Ошибка": {"command": "error сбой", "tags": ["disk"]},
+    "Зависание": {"command": "sleep 30", "tags": ["slow"]},
+    "С вводом": {"template": "echo {input}", "input_pattern": r"\w+", "tags": ["net"]},
+}
+
+
+def run_cli(tmp_path, *args):
+    catalog = tmp_path / "catalog.json"
+    catalog.write_text(json.dumps(CATALOG, ensure_ascii=False), encoding="utf-8")
+    argv = [sys.executable, os.path.join(ROOT, "cli.py"), "--catalog", str(catalog)] + list(args)
+    if args and args[0] == "run":
+        argv += ["--host", f"{sys.executable} {FAKE}", "--mode", "pool", "--no-cache", "--no-history",
+                 "--format", "jsonl"]
+    process = subprocess.run(argv, cwd=str(tmp_path), capture_output=True, text=True, encoding="utf-8",
+                             timeout=60)
+    records = [json.loads(line) for line in process.stdout.splitlines() if line.startswith("{")]
+    return process.returncode, records
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shlex-разбор --host рассчитан на POSIX-пути")
+@pytest.mark.parametrize("args, code", [
+    (["Успех"], 0),
+    (["Успех", "Ошибка"], 1),
+    (["Нет такой"], 2),
+    (["Успех", "Зависание", "--timeout", "1"], 3),
+    (["Успех", "С вводом"], 4),
+])
+def test_exit_codes(tmp_path, args, code):
+    returncode, _ = run_cli(tmp_path, "run", *args)
+    assert returncode == code
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shlex-разбор --host рассчитан на POSIX-пути")
+def test_timeout_outranks_failure(tmp_path):
+    returncode, records = run_cli(tmp_path, "run", "Ошибка", "Зависание", "--timeout", "1")
+    assert returncode == 3
+    assert {r["name"]: r["status"] for r in records} == {"Ошибка": "failed", "Зависание": "timeout"}
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shlex-разбор --host рассчитан на POSIX-пути")
+def test_run_by_tag(tmp_path):
+    returncode, records = run_cli(tmp_path, "run", "--tag", "net")
+    assert returncode == 0
+    # Шаблон с меткой без -i не выбирается
+    assert sorted(r["name"] for r in records) == ["Вторая сетевая", "Успех"]
+    assert all(r["status"] == "ok" for r in records)
+
+
+@pytest.mark.skipif(os.name == "nt", reason="shlex-разбор --host рассчитан на POSIX-пути")
+def test_run_by_tag_with_input(tmp_path):
+    returncode, records = run_cli(tmp_path, "run", "--tag", "net", "-i", "abc")
+    assert returncode == 0
+    assert {r["name"]: r["stdout"] for r in records}["С вводом"] == "abc"
+
+
+def test_unknown_tag_is_usage_error(tmp_path):
+    assert run_cli(tmp_path, "run", "--tag", "нет")[0] == 2
+
+
+def test_list_by_tags(tmp_path):
+    returncode, rows = run_cli(tmp_path, "list", "--tag", "disk", "--tag", "slow", "--format", "jsonl")
+    assert returncode == 0
+    assert [r["name"] for r in rows] == ["Ошибка", "Зависание"]
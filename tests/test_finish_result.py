@@ -0,0 +1,41 @@
+# tests/test_finish_result.py
+"""finish_result: один конец запуска для окна, run_cached и run_many."""
+import pytest
+
+import system_checks
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    calls = []
+    monkeypatch.setattr(system_checks, "record_history", lambda name, command, result, source="":
+                        calls.append(("history", name, source)))
+    monkeypatch.setattr(system_checks, "record_metrics", lambda name, result: calls.append(("metrics", name)))
+    monkeypatch.setattr(system_checks, "record_snapshot", lambda name, meta, result:
+                        calls.append(("snapshot", name)))
+    system_checks.configure_cache(None)
+    return calls
+
+
+def _ok(stdout):
+    return {"stdout": stdout, "stderr": "", "returncode": 0, "timeout": False}
+
+
+def test_structured_result_is_cached_parsed_and_recorded(recorded):
+    meta = {"command": "q", "cache": "slow"}
+    result = system_checks.finish_result("Диски", meta, "q", _ok('[{"Size": 5}]'), "gui", fmt="json")
+    assert result["records"] == [{"Size": 5}]
+    assert recorded == [("history", "Диски", "gui"), ("metrics", "Диски"), ("snapshot", "Диски")]
+    assert system_checks.lookup_cached(meta, "q", "json")["records"] == [{"Size": 5}]
+
+
+def test_text_result_gets_no_records_and_same_recording(recorded):
+    result = system_checks.finish_result("Сеть", {"command": "q"}, "q", _ok("text"), "batch")
+    assert result["records"] is None
+    assert [call[0] for call in recorded] == ["history", "metrics", "snapshot"]
+
+
+def test_without_name_or_history_nothing_is_recorded(recorded):
+    system_checks.finish_result(None, {"command": "q"}, "q", _ok("x"))
+    system_checks.finish_result("Сеть", {"command": "q"}, "q", _ok("x"), history=False)
+    assert recorded == []
@@ -0,0 +1,28 @@
+# tests/test_history_failures.py
+"""Сбой записи истории не теряется молча: счётчики stats() и предупреждение в логе."""
+import logging
+import sqlite3
+
+from history_store import HistoryStore
+
+
+def _ok():
+    return {"stdout": "ok", "stderr": "", "returncode": 0, "timeout": False, "duration": 0.1}
+
+
+def test_failed_batch_is_counted_and_logged(tmp_path, caplog):
+    store = HistoryStore(str(tmp_path / "history.db"), flush_interval=0.05)
+    try:
+        # Таблица пропала из-под писателя — INSERT падает, как при повреждённой базе
+        with sqlite3.connect(str(tmp_path / "history.db")) as conn:
+            conn.execute("DROP TABLE outputs")
+        with caplog.at_level(logging.WARNING, logger="history_store"):
+            for _ in range(3):
+                store.record("Сеть", "ipconfig", _ok())
+            assert store.flush(5)
+        stats = store.stats()
+        assert stats["dropped"] == 3 and stats["dropped_batches"] >= 1
+        assert "outputs" in stats["last_error"]
+        assert len([r for r in caplog.records if r.name == "history_store"]) == 1
+    finally:
+        store.close()
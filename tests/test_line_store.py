@@ -0,0 +1,22 @@
+# tests/test_line_store.py
+"""LineStore с max_lines: старые строки отбрасываются и считаются, флаги stderr не съезжают."""
+from line_store import LineStore
+
+
+def test_max_lines_drops_oldest_and_counts():
+    store = LineStore(max_lines=3)
+    store.append("a\nb\n")
+    store.append("c\nd\n", is_stderr=True)
+    store.append("e\n")
+    assert store.lines(0, len(store)) == [("c", True), ("d", True), ("e", False)]
+    assert store.dropped == 2
+
+
+def test_lowered_limit_applies_on_next_append():
+    store = LineStore(max_lines=10)
+    store.append("".join(f"{i}\n" for i in range(8)))
+    store.max_lines = 4
+    store.append("8\n")
+    assert [text for text, _ in store.lines(0, len(store))] == ["5", "6", "7", "8"]
+    assert store.dropped == 5
+    assert store.search("6") == 1
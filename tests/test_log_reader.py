@@ -0,0 +1,22 @@
+# tests/test_log_reader.py
+"""LogIndex: кодировка лога, у которого кириллица начинается дальше первых 64 КиБ."""
+from log_reader import LOG_ENCODING, LogIndex
+
+
+def test_ascii_head_falls_back_to_logger_encoding(tmp_path):
+    path = tmp_path / "log_20260101.txt"
+    head = "2026-01-01 00:00:00,000 - INFO - started\n" * 2000  # > 64 КиБ ASCII
+    tail = "2026-01-01 00:00:01,000 - INFO - Служба запущена\n"
+    path.write_bytes((head + tail).encode(LOG_ENCODING))
+    index = LogIndex(str(path))
+    assert index.encoding == LOG_ENCODING
+    assert index.read_lines(len(index) - 1, 1) == [tail.rstrip("\n")]
+    assert index.find("Служба") == len(index) - 1
+
+
+def test_detected_encoding_wins(tmp_path):
+    path = tmp_path / "log.txt"
+    path.write_bytes("=== 2026-01-01 00:00:00 ===\nКоманда: ipconfig\n".encode("utf-8"))
+    index = LogIndex(str(path))
+    assert index.encoding == "utf-8"
+    assert index.read_lines(1, 1) == ["Команда: ipconfig"]
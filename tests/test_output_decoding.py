@@ -0,0 +1,47 @@
+# tests/test_output_decoding.py
+"""Потоковое декодирование: результат не зависит от того, как вывод разрезан на блоки."""
+import codecs
+
+import pytest
+
+from output_decoding import StreamDecoder, decode_bytes
+
+TEXT = "Служба выполняется\r\nИмя: Spooler\r\n"
+
+
+def feed(raw: bytes, size: int) -> str:
+    decoder = StreamDecoder()
+    parts = [decoder.decode(raw[i:i + size]) for i in range(0, len(raw), size)]
+    return "".join(parts) + decoder.flush()
+
+
+@pytest.mark.parametrize("encoding", ["utf-16-le", "utf-8", "utf-8-sig", "cp866", "cp1251"])
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 4096])
+def test_chunked_stream_matches_whole(encoding, size):
+    raw = TEXT.encode(encoding)
+    assert feed(raw, size) == TEXT
+    assert decode_bytes(raw) == TEXT
+
+
+@pytest.mark.parametrize("size", [1, 3])
+def test_utf16_without_bom_latin_first(size):
+    text = "OK: служба запущена\n"
+    assert feed(text.encode("utf-16-le"), size) == text
+
+
+def test_utf16_with_bom():
+    text = "Диск C:\n"
+    assert feed(codecs.BOM_UTF16_LE + text.encode("utf-16-le"), 1) == text
+
+
+def test_short_ascii_is_flushed():
+    decoder = StreamDecoder()
+    assert decoder.decode(b"ok") == ""
+    assert decoder.flush() == "ok"
+
+
+def test_ascii_prefix_streams_before_encoding_is_known():
+    decoder = StreamDecoder()
+    assert decoder.decode(b"Name  Status\n") == "Name  Status\n"
+    assert decoder.encoding is None
+    assert decoder.decode("Служба\n".encode("cp866")) + decoder.flush() == "Служба\n"
@@ -0,0 +1,55 @@
+# tests/test_pool_kill.py
+"""Отмена команды в хосте пула: потомки прошлых команд остаются, потомки текущей — завершаются."""
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+from powershell_pool import PowerShellPool
+from process_tree import _alive
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FAKE = os.path.join(ROOT, "benchmarks", "fake_powershell.py")
+
+
+def _children(path, host_pid):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            with open(path, encoding="ascii") as f:
+                pids = [int(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            pids = []
+        children = [pid for pid in pids if pid != host_pid]
+        if children:
+            return children
+        time.sleep(0.02)
+    raise AssertionError(f"потомки не записались в {path}")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="время запуска процессов — из /proc")
+def test_kill_spares_children_of_earlier_commands(tmp_path):
+    pool = PowerShellPool(host_argv=[sys.executable, FAKE], size=1)
+    earlier, current = str(tmp_path / "earlier.pids"), str(tmp_path / "current.pids")
+    old = []
+    try:
+        first = pool.launch(f"pidfile {earlier}; tree 1 1")
+        first.wait(10)
+        old = _children(earlier, first.pid)
+        time.sleep(0.1)
+        second = pool.launch(f"pidfile {current}; tree 1 1; hang")
+        new = _children(current, second.pid)
+        second.kill()
+        report = second.verify_killed()
+        assert report["survivors"] == []
+        assert not any(_alive(pid) for pid in new)
+        assert all(_alive(pid) for pid in old)
+    finally:
+        pool.shutdown()
+        for pid in old:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
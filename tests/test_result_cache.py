@@ -0,0 +1,75 @@
+# tests/test_result_cache.py
+"""ResultCache: размер в байтах и отложенная запись index.json."""
+import json
+import os
+
+import result_cache
+from result_cache import ResultCache
+
+
+def _ok(stdout):
+    return {"stdout": stdout, "stderr": "", "returncode": 0, "timeout": False}
+
+
+def test_size_counts_encoded_bytes():
+    cache = ResultCache()
+    cache.put("a", _ok("Служба"), ttl=60)
+    cache.put("b", _ok("Sluzhba"), ttl=60)
+    assert cache.stats()["bytes"] == sum(
+        len(json.dumps(_ok(text), ensure_ascii=False).encode("utf-8"))
+        for text in ("Служба", "Sluzhba"))
+
+
+def test_cyrillic_entry_evicted_by_byte_limit():
+    text = "Ж" * 600  # 600 символов, 1200 байт
+    cache = ResultCache(max_bytes=1000)
+    cache.put("a", _ok(text), ttl=60)
+    assert cache.get("a") is None
+
+
+def test_index_written_once_per_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "INDEX_SAVE_DELAY", 60)
+    directory = str(tmp_path)
+    cache = ResultCache(directory=directory)
+    saves = []
+    original = cache._save_index
+    monkeypatch.setattr(cache, "_save_index", lambda: (saves.append(1), original()))
+    for i in range(20):
+        cache.put(f"k{i}", _ok(f"out {i}"), ttl=60)
+    assert saves == []
+    assert not os.path.exists(os.path.join(directory, "index.json"))
+    cache.flush()
+    assert saves == [1]
+    reloaded = ResultCache(directory=directory)
+    assert reloaded.stats()["entries"] == 20
+    assert reloaded.get("k7")["stdout"] == "out 7"
+
+
+def test_payloads_missing_from_index_removed_on_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, "INDEX_SAVE_DELAY", 60)
+    directory = str(tmp_path)
+    cache = ResultCache(directory=directory)
+    cache.put("kept", _ok("1"), ttl=60)
+    cache.flush()
+    cache.put("lost", _ok("2"), ttl=60)  # процесс «упал» до записи индекса
+    reloaded = ResultCache(directory=directory)
+    assert reloaded.stats()["entries"] == 1
+    assert not os.path.exists(os.path.join(directory, "lost.json"))
+    assert reloaded.get("kept")["stdout"] == "1"
+
+
+def test_put_writes_payload_outside_the_lock(tmp_path, monkeypatch):
+    cache = ResultCache(directory=str(tmp_path))
+    held = []
+    original = cache._write_temp
+
+    def write_temp(key, payload):
+        held.append(cache._lock.locked())
+        return original(key, payload)
+
+    monkeypatch.setattr(cache, "_write_temp", write_temp)
+    cache.put("k", _ok("вывод"), ttl=60)
+    assert held == [False]
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(".tmp")]
+    cache.flush()
+    assert ResultCache(directory=str(tmp_path)).get("k")["stdout"] == "вывод"
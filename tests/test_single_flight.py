@@ -0,0 +1,69 @@
+# tests/test_single_flight.py
+"""SingleFlight: работа в потоке начавшего запроса, обработчики кусков — вне блокировок."""
+import threading
+
+from single_flight import SingleFlight
+
+
+def test_leader_runs_work_in_its_own_thread():
+    group = SingleFlight()
+    ran_in = []
+    ticket = group.join("k")
+    result = ticket.run(lambda flight: ran_in.append(threading.current_thread()) or {"stdout": "ok"})
+    assert ran_in == [threading.current_thread()]
+    assert result == {"stdout": "ok"}
+    assert group.in_flight() == 0
+
+
+def test_joiner_gets_replay_then_live_chunks_in_order():
+    group = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    late_chunks = []
+
+    def work(flight):
+        flight.publish("a", False)
+        started.set()
+        release.wait(5)
+        flight.publish("b", False)
+        return {"stdout": "ab"}
+
+    leader = group.join("k")
+    thread = threading.Thread(target=leader.run, args=(work,))
+    thread.start()
+    started.wait(5)
+    late = group.join("k", on_chunk=lambda text, is_stderr: late_chunks.append(text))
+    assert not late.leader
+    release.set()
+    result = late.run(work, timeout=5)
+    thread.join(5)
+    assert late_chunks == ["a", "b"]
+    assert result["stdout"] == "ab" and result["coalesced"]["joined"]
+
+
+def test_slow_listener_does_not_block_join_or_cancel():
+    group = SingleFlight()
+    in_listener, unblock = threading.Event(), threading.Event()
+    joined = threading.Event()
+
+    def slow(text, is_stderr):
+        in_listener.set()
+        unblock.wait(5)
+
+    def work(flight):
+        flight.publish("x", False)
+        return {"stdout": "x"}
+
+    leader = group.join("k", on_chunk=slow)
+    thread = threading.Thread(target=leader.run, args=(work,))
+    thread.start()
+    in_listener.wait(5)
+
+    def other():
+        group.join("k").kill()
+        joined.set()
+
+    threading.Thread(target=other).start()
+    # Пока первый обработчик стоит, второй запрос подключается и отказывается без ожидания
+    assert joined.wait(2)
+    unblock.set()
+    thread.join(5)
@@ -0,0 +1,20 @@
+# tests/test_structured_output.py
+"""Разбор CSV-вывода: числа становятся числами, коды с ведущими нулями и версии остаются строками."""
+from structured_output import parse_csv_records
+
+
+def test_numbers_and_flags():
+    text = '"Name","Size","Ratio","Enabled","Empty"\r\n"C:","1024","0,5","True",""\r\n'
+    assert parse_csv_records(text) == [{"Name": "C:", "Size": 1024, "Ratio": 0.5, "Enabled": True, "Empty": None}]
+
+
+def test_leading_zeros_are_kept():
+    text = '"SerialNumber","Code","Zero","Negative"\r\n"0123","007.5","0","-12"\r\n'
+    assert parse_csv_records(text) == [{"SerialNumber": "0123", "Code": "007.5", "Zero": 0, "Negative": -12}]
+
+
+def test_versions_are_kept():
+    text = ('"DriverVersion","SMBIOSBIOSVersion","Build","Load","Share"\r\n'
+            '"10.0","2.0","1.10","1.5","0,25"\r\n')
+    assert parse_csv_records(text) == [{"DriverVersion": "10.0", "SMBIOSBIOSVersion": "2.0", "Build": "1.10",
+                                        "Load": 1.5, "Share": 0.25}]
@@ -0,0 +1,15 @@
+# tests/test_timeout_policy.py
+"""Решение о таймауте — в результате, а в лог только на уровне DEBUG."""
+import logging
+
+from timeout_policy import TimeoutPolicy
+
+
+def test_decision_is_not_logged_at_info(caplog):
+    with caplog.at_level(logging.INFO):
+        decision = TimeoutPolicy(None).decide("Сеть", {"timeout_min": 60}, 30)
+    assert (decision.seconds, decision.policy) == (60, "catalog")
+    assert caplog.records == []
+    with caplog.at_level(logging.DEBUG, logger="timeout_policy"):
+        TimeoutPolicy(None).decide("Сеть", {}, 30)
+    assert [r.levelno for r in caplog.records] == [logging.DEBUG]
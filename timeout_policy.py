@@ -0,0 +1,112 @@
+# timeout_policy.py
+"""
+Таймаут проверки по истории её запусков вместо одного числа на все команды.
+
+Правила по порядку, первое подходящее решает (backoff может только увеличить срок):
+
+override     таймаут задан явно для этой команды (cli.py --timeout-for);
+history      не меньше MIN_SAMPLES успешных запусков на этом компьютере: PERCENTILE их
+             длительностей × MARGIN, но не меньше перцентиля + MIN_SLACK секунд;
+history-all  то же по запускам со всех компьютеров, если своих мало;
+catalog      истории нет, у записи каталога есть "timeout_min" — не меньше его;
+default      истории нет — таймаут по умолчанию (поле в окне, --timeout в CLI);
+backoff      поверх всех правил, кроме override: если прошлый запуск на этом компьютере упёрся
+             в таймаут, срок не меньше удвоенной его длительности — долгая, но нормальная
+             проверка на медленной машине не убивается снова на той же секунде.
+
+"timeout_min" из каталога (SFC, CHKDSK, DISM — 1800 с) — нижняя граница и для решений по
+истории. Итог — в пределах [FLOOR, CEILING] секунд. Решение попадает в результат проверки
+(result['timeout_policy']); в лог — только на уровне DEBUG: пакетный прогон иначе писал бы
+в ежедневный лог строку на каждую проверку.
+"""
+import logging
+import math
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from history_store import HistoryStore
+
+MIN_SAMPLES = 5
+WINDOW = 50
+PERCENTILE = 0.95
+MARGIN = 2.0
+MIN_SLACK = 10.0
+BACKOFF = 2.0
+FLOOR = 5
+CEILING = 36000
+
+_log = logging.getLogger(__name__)
+
+
+class TimeoutDecision(NamedTuple):
+    seconds: int
+    policy: str
+    detail: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"seconds": self.seconds, "policy": self.policy, "detail": self.detail}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Перцентиль по ближайшему рангу: значение, не меньше которого fraction выборки."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _clamp(seconds: float, minimum: int) -> int:
+    return int(min(CEILING, max(FLOOR, minimum, math.ceil(seconds))))
+
+
+class TimeoutPolicy:
+    def __init__(self, history: Optional[HistoryStore], host: Optional[str] = None,
+                 min_samples: int = MIN_SAMPLES, window: int = WINDOW, fraction: float = PERCENTILE,
+                 margin: float = MARGIN, slack: float = MIN_SLACK):
+        self.history = history
+        self.host = host or (history.host if history is not None else None)
+        self.min_samples = min_samples
+        self.window = window
+        self.fraction = fraction
+        self.margin = margin
+        self.slack = slack
+
+    def decide(self, name: str, meta: Dict[str, Any], default: int,
+               override: Optional[int] = None) -> TimeoutDecision:
+        """
+        Таймаут для запуска записи каталога name (в лог — на уровне DEBUG).
+        TimeoutPolicy(None) — фиксированный таймаут: default, но не меньше timeout_min.
+        """
+        decision = self._decide(name, meta, default, override)
+        _log.debug("Таймаут «%s»: %s с — %s (%s)", name, decision.seconds, decision.policy, decision.detail)
+        return decision
+
+    def _decide(self, name: str, meta: Dict[str, Any], default: int,
+                override: Optional[int]) -> TimeoutDecision:
+        minimum = int(meta.get("timeout_min") or 0)
+        if override is not None:
+            return TimeoutDecision(int(override), "override", "задан явно")
+        if self.history is None:
+            return self._fallback(default, minimum, "история не используется")
+
+        decision = None
+        for policy, host in (("history", self.host), ("history-all", None)):
+            durations = self.history.durations(name, limit=self.window, successful_only=True, host=host)
+            if len(durations) >= self.min_samples:
+                high = percentile(durations, self.fraction)
+                seconds = max(high * self.margin, high + self.slack)
+                decision = TimeoutDecision(_clamp(seconds, minimum), policy,
+                                           f"p{self.fraction * 100:g} {high:.1f} с по {len(durations)} запускам, "
+                                           f"×{self.margin:g}, не меньше +{self.slack:g} с")
+                break
+        if decision is None:
+            decision = self._fallback(default, minimum, f"успешных запусков меньше {self.min_samples}")
+
+        last = self.history.runs(name=name, host=self.host, limit=1)
+        if last and last[0]["timeout"] and last[0]["duration"] * BACKOFF > decision.seconds:
+            return TimeoutDecision(_clamp(last[0]["duration"] * BACKOFF, minimum), "backoff",
+                                   f"прошлый запуск прерван через {last[0]['duration']:.0f} с, ×{BACKOFF:g}; "
+                                   f"иначе {decision.seconds} с ({decision.policy})")
+        return decision
+
+    def _fallback(self, default: int, minimum: int, reason: str) -> TimeoutDecision:
+        if minimum > default:
+            return TimeoutDecision(_clamp(default, minimum), "catalog", f"timeout_min {minimum} с; {reason}")
+        return TimeoutDecision(_clamp(default, 0), "default", reason)
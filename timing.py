@@ -0,0 +1,369 @@
+# timing.py
+"""
+Время по этапам одного выполнения проверки и выгрузка в формат трассировки Chrome.
+
+Trace создаётся в launch_command и едет на объекте процесса (process.trace). collect_output
+и stream_output дописывают чтение и декодирование и кладут трассу в result['trace'],
+дальше вызывающий код добавляет разбор, кэш, запись в историю и отрисовку.
+Trace.to_dict() — обычный словарь (этапы, ЦП и пик памяти дочернего процесса) для истории,
+jsonl и файла трассировки.
+
+Этапы идут по рядам (lane): "main" — поток, выполняющий проверку; "host" — что сообщил
+хост пула (передача команды и выполнение между маркерами BEGIN и END); "sum" — этапы из
+многих коротких кусков (декодирование, отрисовка потока): одна запись с суммой и числом вызовов.
+
+Файл трассировки — JSON «Trace Event Format» (chrome://tracing, ui.perfetto.dev): каждая
+проверка — отдельный процесс, ряды — потоки, этапы — события "X" в микросекундах.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+# Этап → подпись для строки состояния, отчётов и трассировки
+STAGES = {
+    "launch": "запуск",
+    "dispatch": "передача хосту",
+    "query": "выполнение в хосте",
+    "first_byte": "до первого байта",
+    "drain": "чтение вывода",
+    "decode": "декодирование",
+    "wait": "завершение",
+    "parse": "разбор",
+    "cache": "кэш",
+    "record": "история",
+    "log": "лог",
+    "render": "отрисовка",
+    "kill": "завершение дерева",
+}
+LANES = ("main", "host", "sum")
+
+
+def stage_label(stage: str) -> str:
+    return STAGES.get(stage, stage)
+
+
+class Trace:
+    """Этапы одного выполнения: отметки time.perf_counter() относительно начала трассы."""
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.usage: Dict[str, Any] = {}
+        self._sums: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, start: float, end: float, lane: str = "main"):
+        """Этап по отметкам time.perf_counter()."""
+        with self._lock:
+            self.spans.append({"stage": stage, "lane": lane, "start": start - self.origin,
+                               "duration": max(0.0, end - start), "calls": 1})
+
+    def accumulate(self, stage: str, seconds: float, start: Optional[float] = None):
+        """Добавляет seconds к суммарному этапу; start (perf_counter) — начало первого куска."""
+        with self._lock:
+            span = self._sums.get(stage)
+            if span is None:
+                first = (start if start is not None else time.perf_counter() - seconds) - self.origin
+                span = {"stage": stage, "lane": "sum", "start": first, "duration": 0.0, "calls": 0}
+                self._sums[stage] = span
+                self.spans.append(span)
+            span["duration"] += seconds
+            span["calls"] += 1
+
+    @contextmanager
+    def span(self, stage: str, lane: str = "main"):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, start, time.perf_counter(), lane)
+
+    @contextmanager
+    def summed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.accumulate(stage, time.perf_counter() - start, start)
+
+    def __deepcopy__(self, memo) -> "Trace":
+        """Независимая копия: этапы, добавленные потом в одну, не попадают в другую."""
+        copy = Trace(self.name)
+        copy.started_at, copy.origin = self.started_at, self.origin
+        with self._lock:
+            copy.spans = [dict(s) for s in self.spans]
+            copy.usage = dict(self.usage)
+        copy._sums = {s["stage"]: s for s in copy.spans if s["lane"] == "sum"}
+        return copy
+
+    def set_usage(self, cpu: Optional[float] = None, peak_rss: Optional[int] = None, scope: str = "process"):
+        self.usage = {"cpu": cpu, "peak_rss": peak_rss, "scope": scope}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted((dict(s) for s in self.spans), key=lambda s: s["start"])
+        total = max((s["start"] + s["duration"] for s in spans if s["lane"] == "main"), default=0.0)
+        return {"name": self.name, "started_at": self.started_at, "total": total, "spans": spans,
+                "usage": dict(self.usage)}
+
+
+@contextmanager
+def stage(result: Any, name: str):
+    """trace.span для result['trace']; без трассы (кэш, пропуск, подменённый запуск) — ничего."""
+    trace = result.get("trace") if isinstance(result, dict) else None
+    if trace is None:
+        yield
+        return
+    with trace.span(name):
+        yield
+
+
+def timing_of(result: Any) -> Optional[Dict[str, Any]]:
+    """Словарь этапов результата или None."""
+    trace = result.get("trace") if isinstance(result, dict) else None
+    return trace.to_dict() if trace is not None else None
+
+
+# --- ресурсы дочернего процесса ---
+
+def _rusage_dict(rusage) -> Dict[str, Any]:
+    # ru_maxrss: Linux — КиБ, macOS — байты
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {"cpu": rusage.ru_utime + rusage.ru_stime, "peak_rss": rusage.ru_maxrss * scale or None,
+            "scope": "process"}
+
+
+def _windows_usage(handle) -> Optional[Dict[str, Any]]:
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    times = [wintypes.FILETIME() for _ in range(4)]
+    if not ctypes.windll.kernel32.GetProcessTimes(wintypes.HANDLE(handle), *[ctypes.byref(t) for t in times]):
+        return None
+    kernel, user = (t.dwHighDateTime << 32 | t.dwLowDateTime for t in times[2:])
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    peak = None
+    if ctypes.windll.psapi.GetProcessMemoryInfo(wintypes.HANDLE(handle), ctypes.byref(counters), counters.cb):
+        peak = counters.PeakWorkingSetSize or None
+    return {"cpu": (kernel + user) / 1e7, "peak_rss": peak, "scope": "process"}
+
+
+def process_usage(pid: Optional[int]) -> Optional[Dict[str, Any]]:
+    """
+    ЦП (с, с учётом дождавшихся потомков) и пик памяти (байты) работающего процесса:
+    /proc на Linux, GetProcessTimes и GetProcessMemoryInfo на Windows; иначе None.
+    """
+    if not pid:
+        return None
+    try:
+        if sys.platform.startswith("linux"):
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                fields = f.read().rsplit(b")", 1)[1].split()
+            ticks = os.sysconf("SC_CLK_TCK")
+            # utime, stime, cutime, cstime — поля 14–17 (после имени процесса — с 12-го)
+            cpu = sum(int(v) for v in fields[11:15]) / ticks
+            peak = None
+            with open(f"/proc/{pid}/status", "rb") as f:
+                for line in f:
+                    if line.startswith(b"VmHWM:"):
+                        peak = int(line.split()[1]) * 1024
+                        break
+            return {"cpu": cpu, "peak_rss": peak, "scope": "process"}
+        if os.name == "nt":
+            import ctypes
+            handle = ctypes.windll.kernel32.OpenProcess(0x1000 | 0x0010, False, pid)
+            if not handle:
+                return None
+            try:
+                return _windows_usage(handle)
+            finally:
+                ctypes.windll.kernel32.CloseHandle(handle)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+    return None
+
+
+class AccountedPopen(subprocess.Popen):
+    """
+    Popen, который при ожидании завершения сохраняет ресурсы процесса в self.usage:
+    на POSIX — rusage из wait4 (процесс и дождавшиеся им потомки, в т.ч. PowerShell под sh),
+    на Windows — время ЦП и пик рабочего набора по дескриптору (только сам процесс).
+    На POSIX статус процесса забирает сам класс (os.wait4 в poll и wait), а не внутренний
+    waitpid Popen; если его подобрал кто-то другой, код возврата неизвестен: -1, usage — None.
+    """
+    usage: Optional[Dict[str, Any]] = None
+
+    if os.name == "posix":
+        def __init__(self, *args, **kwargs):
+            # Один забирающий статус за раз, как _waitpid_lock внутри Popen
+            self._reap_lock = threading.Lock()
+            super().__init__(*args, **kwargs)
+
+        def _reap(self, flags: int) -> bool:
+            """wait4 под _reap_lock: True — процесс завершён и returncode известен."""
+            if self.returncode is not None:
+                return True
+            try:
+                pid, status, rusage = os.wait4(self.pid, flags)
+            except ChildProcessError:
+                # Статус забрали мимо нас (SIGCHLD=SIG_IGN, чужой os.wait): успехом это не считаем
+                self.returncode = -1
+                return True
+            if pid != self.pid:
+                return False
+            self.usage = _rusage_dict(rusage)
+            self.returncode = os.waitstatus_to_exitcode(status)
+            return True
+
+        def poll(self):
+            # Статус уже забирает ждущий поток — как и Popen.poll, не ждём его
+            if self._reap_lock.acquire(False):
+                try:
+                    self._reap(os.WNOHANG)
+                finally:
+                    self._reap_lock.release()
+            return self.returncode
+
+        def wait(self, timeout=None):
+            if timeout is None:
+                with self._reap_lock:
+                    self._reap(0)
+                return self.returncode
+            deadline = time.monotonic() + timeout
+            delay = 0.0005
+            while True:
+                if self._reap_lock.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                    try:
+                        if self._reap(os.WNOHANG):
+                            return self.returncode
+                    finally:
+                        self._reap_lock.release()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(self.args, timeout)
+                delay = min(delay * 2, remaining, 0.05)
+                time.sleep(delay)
+    else:
+        def wait(self, timeout=None):
+            returncode = super().wait(timeout)
+            if self.usage is None:
+                try:
+                    self.usage = _windows_usage(int(self._handle))
+                except (OSError, AttributeError, ValueError):
+                    pass
+            return returncode
+
+
+# --- отображение ---
+
+def format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "—"
+    if seconds <= 0:
+        return "0"
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} мс" if seconds >= 0.001 else f"{seconds * 1000:.2f} мс"
+    return f"{seconds:.1f} с" if seconds < 100 else f"{seconds:.0f} с"
+
+
+def format_bytes(size: Optional[int]) -> str:
+    if not size:
+        return "—"
+    return f"{size / 2 ** 20:.0f} МБ" if size >= 2 ** 20 else f"{size / 1024:.0f} КБ"
+
+
+def stage_totals(timing: Dict[str, Any], lanes: Iterable[str] = ("main", "sum")) -> Dict[str, float]:
+    """Суммарное время по этапам выбранных рядов, от больших к меньшим."""
+    totals: Dict[str, float] = {}
+    for span in timing.get("spans", ()):
+        if span["lane"] in lanes:
+            totals[span["stage"]] = totals.get(span["stage"], 0.0) + span["duration"]
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def summarize(timing: Optional[Dict[str, Any]], limit: int = 3) -> str:
+    """Одна строка: общее время, самые долгие этапы, ЦП и пик памяти."""
+    if not timing:
+        return ""
+    parts = [f"{stage_label(s)} {format_seconds(v)}" for s, v in list(stage_totals(timing).items())[:limit]]
+    text = format_seconds(timing["total"]) + (": " + ", ".join(parts) if parts else "")
+    usage = timing.get("usage") or {}
+    if usage.get("cpu") is not None:
+        text += f" · ЦП {format_seconds(usage['cpu'])}"
+    if usage.get("peak_rss"):
+        text += f" · пик {format_bytes(usage['peak_rss'])}" + (" (хост)" if usage.get("scope") == "host" else "")
+    return text
+
+
+def format_timing(timing: Optional[Dict[str, Any]]) -> str:
+    """Все этапы по порядку, по строке на этап (подсказка, окно истории)."""
+    if not timing:
+        return ""
+    lines = []
+    for span in timing["spans"]:
+        lane = {"host": " [хост]", "sum": f" [сумма, {span.get('calls', 1)}×]"}.get(span["lane"], "")
+        lines.append(f"{format_seconds(span['start']):>9} +{format_seconds(span['duration']):>9}  "
+                     f"{stage_label(span['stage'])}{lane}")
+    summary = summarize(timing, limit=0)
+    return "\n".join(lines + ([f"Итого: {summary}"] if summary else []))
+
+
+def format_slowest(rows: List[Dict[str, Any]]) -> str:
+    """Отчёт «самые медленные проверки» по строкам HistoryStore.slowest."""
+    if not rows:
+        return "Нет запусков за период"
+    lines = [f"{'Проверка':40} {'запусков':>8} {'среднее':>9} {'p95':>9} {'макс.':>9} {'ЦП':>9} {'пик':>7}"]
+    for row in rows:
+        lines.append(f"{row['name'][:40]:40} {row['runs']:8} {format_seconds(row['avg']):>9} "
+                     f"{format_seconds(row['p95']):>9} {format_seconds(row['max']):>9} "
+                     f"{format_seconds(row['cpu']):>9} {format_bytes(row['peak_rss']):>7}")
+        if row["stages"]:
+            lines.append("    " + ", ".join(f"{stage_label(s)} {format_seconds(v)}" for s, v in row["stages"].items()))
+    return "\n".join(lines)
+
+
+# --- трассировка Chrome ---
+
+def chrome_trace(timings: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Trace Event Format: проверка — процесс, ряд этапов — поток; время от эпохи в мкс."""
+    events: List[Dict[str, Any]] = []
+    for pid, timing in enumerate(timings, 1):
+        base = timing["started_at"] * 1e6
+        name = timing.get("name") or f"#{pid}"
+        events.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": name}})
+        for tid, lane in enumerate(LANES, 1):
+            events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": lane}})
+        args = {k: v for k, v in (timing.get("usage") or {}).items() if v is not None}
+        events.append({"ph": "X", "name": name, "cat": "check", "pid": pid, "tid": 1, "ts": round(base, 1),
+                       "dur": round(timing["total"] * 1e6, 1), "args": args})
+        for span in timing["spans"]:
+            event = {"ph": "X", "name": stage_label(span["stage"]), "cat": span["stage"], "pid": pid,
+                     "tid": LANES.index(span["lane"]) + 1 if span["lane"] in LANES else len(LANES) + 1,
+                     "ts": round(base + span["start"] * 1e6, 1), "dur": round(span["duration"] * 1e6, 1)}
+            if span.get("calls", 1) != 1:
+                event["args"] = {"calls": span["calls"]}
+            events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(path: str, timings: Iterable[Dict[str, Any]]) -> int:
+    """Записывает файл трассировки; возвращает число проверок в нём."""
+    timings = [t for t in timings if t]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(timings), f, ensure_ascii=False)
+    return len(timings)